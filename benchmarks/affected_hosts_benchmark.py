@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+    Benchmark for the lookup of affected hosts (ConfigRpmMaker._get_affected_hosts).
+
+    Generates a synthetic data center with the given number of hosts and
+    a change set with the given number of changed paths. Then measures how
+    long it takes to build the svn path index and to resolve all changed
+    paths. For comparison the former linear scan over all hosts is measured
+    on a small sample of changed paths and extrapolated.
+
+    Usage: PYTHONPATH=src python benchmarks/affected_hosts_benchmark.py [options]
+"""
+
+import random
+
+from optparse import OptionParser
+from time import time
+
+from config_rpm_maker.segment import OVERLAY_ORDER, SvnPathIndex
+
+LOCATIONS = ['ber', 'ham', 'dev', 'tuv', 'pre', 'prd', 'tst', 'fra', 'muc', 'cgn']
+SUB_DIRECTORIES = ['files', 'VARIABLES', 'files/etc', 'files/etc/httpd/conf.d']
+
+
+def generate_type_names(count):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    names = []
+    for first in letters:
+        for second in letters:
+            for third in letters:
+                names.append(first + second + third)
+                if len(names) == count:
+                    return names
+    return names
+
+
+def generate_hosts(count_of_hosts):
+    type_names = generate_type_names(max(1, count_of_hosts // (len(LOCATIONS) * 50) + 1))
+    hosts = []
+    number = 0
+    while len(hosts) < count_of_hosts:
+        number += 1
+        for type_name in type_names:
+            for location in LOCATIONS:
+                hosts.append('%s%s%02d' % (location, type_name, number))
+                if len(hosts) == count_of_hosts:
+                    return hosts
+    return hosts
+
+
+def generate_changed_paths(hosts, count_of_changed_paths, seed):
+    generator = random.Random(seed)
+    changed_paths = []
+    while len(changed_paths) < count_of_changed_paths:
+        host = generator.choice(hosts)
+        segment = generator.choice(OVERLAY_ORDER)
+        svn_path = generator.choice(segment.get_svn_paths(host))
+        sub_directory = generator.choice(SUB_DIRECTORIES)
+        changed_paths.append('%s/%s/file%d' % (svn_path, sub_directory, len(changed_paths)))
+    return changed_paths
+
+
+def linear_scan(changed_paths, available_hosts):
+    """ The algorithm which has been used before the svn path index was introduced. """
+
+    result = set()
+    for segment in OVERLAY_ORDER:
+        for changed_path in changed_paths:
+            for host in available_hosts:
+                for path in segment.get_svn_paths(host):
+                    if changed_path.startswith(path):
+                        result.add(host)
+                        break
+    return result
+
+
+def indexed_lookup(changed_paths, available_hosts):
+    return SvnPathIndex(available_hosts).find_hosts(changed_paths)
+
+
+def measure(function, *args):
+    start_time = time()
+    result = function(*args)
+    return time() - start_time, result
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--hosts', dest='hosts', type='int', default=50000,
+                      help='number of generated hosts (default 50000)')
+    parser.add_option('--changed-paths', dest='changed_paths', type='int', default=10000,
+                      help='number of changed paths in the change set (default 10000)')
+    parser.add_option('--linear-scan-sample', dest='linear_scan_sample', type='int', default=5,
+                      help='number of changed paths used to measure the linear scan (0 disables it)')
+    parser.add_option('--seed', dest='seed', type='int', default=42,
+                      help='seed for the random change set')
+    values, _ = parser.parse_args()
+
+    hosts = generate_hosts(values.hosts)
+    changed_paths = generate_changed_paths(hosts, values.changed_paths, values.seed)
+
+    print 'Hosts: %d, changed paths: %d' % (len(hosts), len(changed_paths))
+
+    index_build_time, svn_path_index = measure(SvnPathIndex, hosts)
+    print 'Building svn path index:        %8.3fs (%d svn paths)' % (index_build_time, len(svn_path_index.hosts_by_svn_path))
+
+    lookup_time, affected_hosts = measure(indexed_lookup, changed_paths, hosts)
+    print 'Indexed lookup (incl. index):   %8.3fs (%d affected hosts)' % (lookup_time, len(affected_hosts))
+
+    if values.linear_scan_sample:
+        sample = changed_paths[:values.linear_scan_sample]
+        sample_time, sample_result = measure(linear_scan, sample, hosts)
+        if sample_result != indexed_lookup(sample, hosts):
+            raise Exception('Linear scan and indexed lookup disagree on the sample of changed paths!')
+
+        extrapolated_time = sample_time / len(sample) * len(changed_paths)
+        print 'Linear scan of %d path(s):      %8.3fs (extrapolated to all paths: %.1fs)' % (
+            len(sample), sample_time, extrapolated_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Generates a synthetic fleet for the benchmarks: a configuration tree
+    with the usual segments (all, typ, loc, loctyp and host) for the given
+    hosts, a file:// subversion repository containing it and a stub
+    rpmbuild which writes a dummy rpm instead of building one.
+
+    The host names follow the scheme of create-test-data-hosts.py
+    (location, type and number, e.g. "prdapp01"), so all segments are
+    populated just like in a real data center.
+"""
+
+import os
+import stat
+
+from os.path import abspath, dirname, join
+from shutil import copy
+from subprocess import PIPE, Popen, check_call
+
+from affected_hosts_benchmark import generate_hosts
+from config_rpm_maker.segment import OVERLAY_ORDER
+
+PATH_TO_DEFAULT_SPEC_FILE = join(dirname(abspath(__file__)), '..', 'testdata', 'svn_repo', 'config', 'default.spec')
+
+STUB_RPMBUILD = """#!/bin/sh
+# Writes an empty file named like the rpm which would have been built.
+rpm_dir=""
+for argument in "$@"; do
+    case "$argument" in
+        _rpmdir\\ *) rpm_dir="${argument#_rpmdir }" ;;
+    esac
+    last_argument="$argument"
+done
+name=$(basename "$last_argument" | sed -e 's/\\.tar\\.gz$//' -e 's/\\.spec$//')
+mkdir -p "$rpm_dir/noarch" && : > "$rpm_dir/noarch/$name-1-1.noarch.rpm"
+"""
+
+
+class Fleet(object):
+    """ Describes the generated fleet. segment_depth is the number of
+        nested directories the files of each segment are put in,
+        variable_depth the length of the chain of variables referencing
+        each other. """
+
+    def __init__(self, count_of_hosts, files_per_segment=10, files_per_host=2, segment_depth=3, variable_depth=5):
+        self.hosts = generate_hosts(count_of_hosts)
+        self.files_per_segment = files_per_segment
+        self.files_per_host = files_per_host
+        self.segment_depth = segment_depth
+        self.variable_depth = variable_depth
+
+    def get_segment_svn_paths(self):
+        """ Returns the svn paths of all segments except the host segment. """
+
+        svn_paths = set()
+        for host in self.hosts:
+            for segment in OVERLAY_ORDER[:-1]:
+                svn_paths.update(segment.get_svn_paths(host))
+        return sorted(svn_paths)
+
+    def get_parameters(self):
+        return {'hosts': len(self.hosts),
+                'files_per_segment': self.files_per_segment,
+                'files_per_host': self.files_per_host,
+                'segment_depth': self.segment_depth,
+                'variable_depth': self.variable_depth}
+
+
+def write_file(path, content):
+    if not os.path.exists(dirname(path)):
+        os.makedirs(dirname(path))
+
+    with open(path, 'w') as target_file:
+        target_file.write(content)
+
+
+def generate_variables(fleet, variables_directory, svn_path):
+    write_file(join(variables_directory, 'SEGMENT'), svn_path)
+
+    if svn_path == 'all':
+        write_file(join(variables_directory, 'RPM_REQUIRES'), 'yadt-minion, httpd >= 2.2, bash\n')
+        write_file(join(variables_directory, 'RPM_PROVIDES'), 'yadt-config-fleet\n')
+        write_file(join(variables_directory, 'VARIABLE_0'), 'value')
+        for level in range(1, fleet.variable_depth + 1):
+            write_file(join(variables_directory, 'VARIABLE_%d' % level), '@@@VARIABLE_%d@@@-%d' % (level - 1, level))
+    else:
+        write_file(join(variables_directory, 'RPM_REQUIRES'), 'package-of-%s\n' % svn_path.replace('/', '-'))
+
+
+def generate_files(fleet, files_directory, svn_path, count_of_files):
+    directory = files_directory
+    for level in range(fleet.segment_depth):
+        directory = join(directory, 'level%d' % level)
+
+    for number in range(count_of_files):
+        content = ['# generated file %d of segment %s' % (number, svn_path),
+                   'segment = @@@SEGMENT@@@',
+                   'host = @@@HOST@@@',
+                   'nested = @@@VARIABLE_%d@@@' % fleet.variable_depth]
+        content.extend('line%d = some configuration value' % line for line in range(20))
+        write_file(join(directory, '%s-%d.conf' % (svn_path.replace('/', '-'), number)), '\n'.join(content) + '\n')
+
+
+def generate_config_tree(fleet, config_directory):
+    """ Writes the segments of all hosts of the fleet to the given directory. """
+
+    if not os.path.exists(config_directory):
+        os.makedirs(config_directory)
+    copy(PATH_TO_DEFAULT_SPEC_FILE, join(config_directory, 'default.spec'))
+
+    for svn_path in fleet.get_segment_svn_paths():
+        generate_variables(fleet, join(config_directory, svn_path, 'VARIABLES'), svn_path)
+        generate_files(fleet, join(config_directory, svn_path, 'files'), svn_path, fleet.files_per_segment)
+
+    for host in fleet.hosts:
+        svn_path = 'host/' + host
+        generate_variables(fleet, join(config_directory, svn_path, 'VARIABLES'), svn_path)
+        generate_files(fleet, join(config_directory, svn_path, 'files'), svn_path, fleet.files_per_host)
+
+
+def create_svn_repository(fleet, directory):
+    """ Creates a subversion repository containing the configuration tree of
+        the fleet in revision 1. Returns the file:// url of the repository. """
+
+    repository_directory = join(abspath(directory), 'repository')
+    config_directory = join(abspath(directory), 'config')
+    repository_url = 'file://' + repository_directory
+
+    generate_config_tree(fleet, config_directory)
+    check_call(['svnadmin', 'create', repository_directory])
+    check_call(['svn', 'import', '--quiet', '-m', 'Generated fleet of %d hosts' % len(fleet.hosts),
+                config_directory, repository_url + '/config'])
+
+    return repository_url
+
+
+def commit_change(repository_url, svn_path, directory):
+    """ Changes a file of the given segment svn path (e.g. "all" or
+        "host/prdapp01") and returns the committed revision. """
+
+    working_copy = join(abspath(directory), 'working-copy-%s' % svn_path.replace('/', '-'))
+    check_call(['svn', 'checkout', '--quiet', '--depth', 'files', '%s/config/%s/VARIABLES' % (repository_url, svn_path),
+                working_copy])
+
+    with open(join(working_copy, 'SEGMENT'), 'a') as variable_file:
+        variable_file.write('-changed')
+
+    check_call(['svn', 'commit', '--quiet', '-m', 'Changed segment %s' % svn_path, working_copy])
+    return _get_youngest_revision(repository_url)
+
+
+def _get_youngest_revision(repository_url):
+    process = Popen(['svnlook', 'youngest', repository_url[len('file://'):]], stdout=PIPE)
+    return process.communicate()[0].strip()
+
+
+def write_static_hosts_file(fleet, path):
+    """ Maps all hosts of the fleet to localhost, so no DNS lookups are made. """
+
+    with open(path, 'w') as static_hosts_file:
+        for host in fleet.hosts:
+            static_hosts_file.write('127.0.0.1 %s.fleet.local %s\n' % (host, host))
+
+
+def install_stub_rpmbuild(directory):
+    """ Writes the stub rpmbuild to directory/bin and returns the directory,
+        which has to be put in front of PATH. """
+
+    bin_directory = join(abspath(directory), 'bin')
+    write_file(join(bin_directory, 'rpmbuild'), STUB_RPMBUILD)
+    os.chmod(join(bin_directory, 'rpmbuild'), stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
+    return bin_directory
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Benchmark suite running on a synthetic fleet (see fleet.py).
+
+    Generates a file:// subversion repository with the given number of
+    hosts, commits a change of one segment and builds the affected hosts
+    end-to-end using ConfigRpmMaker with a stub rpmbuild and "/bin/true" as
+    upload command. Additionally the components TokenReplacer, Dependency,
+    ConfigRpmMaker._get_affected_hosts and SvnService.export are measured on
+    a sample of the hosts (best of --repeat runs).
+
+    The results are written as JSON file. If a baseline (the results of an
+    earlier run) is given, every benchmark which is slower than its
+    baseline by more than --max-regression percent is reported as
+    regression and the exit code is 1.
+
+    Requires svn, svnadmin, svnlook and pysvn.
+
+    Usage: PYTHONPATH=src python benchmarks/fleet_benchmark.py [options]
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+
+from optparse import OptionParser
+from os.path import abspath, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+import yaml
+
+from affected_hosts_benchmark import generate_changed_paths
+from fleet import (Fleet,
+                   commit_change,
+                   create_svn_repository,
+                   install_stub_rpmbuild,
+                   write_static_hosts_file)
+
+from config_rpm_maker.configuration import ENVIRONMENT_VARIABLE_KEY_CONFIGURATION_FILE, load_configuration_file
+from config_rpm_maker.configrpmmaker import ConfigRpmMaker
+from config_rpm_maker.dependency import Dependency
+from config_rpm_maker.segment import OVERLAY_ORDER
+from config_rpm_maker.svnservice import SvnService
+from config_rpm_maker.token.tokenreplacer import TokenReplacer
+from config_rpm_maker.utilities.profiler import EXECUTION_TIME_PROFILER
+
+COMPONENTS = ('token_replacer', 'dependency', 'affected_hosts', 'svn_export')
+
+#  Differences below this are noise, even if they exceed the relative threshold.
+MINIMUM_REGRESSION_IN_SECONDS = 0.05
+
+
+def measure(function, repeat=1):
+    """ Returns the shortest of repeat runs of function in seconds. """
+
+    best_time = None
+    for _ in range(repeat):
+        start_time = time()
+        function()
+        elapsed_time = time() - start_time
+        if best_time is None or elapsed_time < best_time:
+            best_time = elapsed_time
+    return best_time
+
+
+def read_file(path):
+    with open(path) as source_file:
+        return source_file.read()
+
+
+def list_files(directory):
+    return [join(root, name) for root, _, names in os.walk(directory) for name in names]
+
+
+def benchmark_token_replacer(fleet, config_directory, sample_hosts):
+    """ Resolves the (nested) variables of each sample host and filters the
+        files of all of its segments. """
+
+    variables_directory = join(config_directory, 'all', 'VARIABLES')
+    contents = dict((svn_path, [read_file(path) for path in list_files(join(config_directory, svn_path, 'files'))])
+                    for svn_path in fleet.get_segment_svn_paths())
+
+    def run():
+        for host in sample_hosts:
+            token_replacer = TokenReplacer.from_directory(variables_directory)
+            token_replacer.token_values['HOST'] = host
+            for segment in OVERLAY_ORDER[:-1]:
+                for svn_path in segment.get_svn_paths(host):
+                    for content in contents[svn_path]:
+                        token_replacer.filter(content)
+
+    return run
+
+
+def benchmark_dependency(fleet, config_directory, sample_hosts):
+    """ Collects the requirements of all segments of each sample host. """
+
+    requirements = {}
+    for host in sample_hosts:
+        for segment in OVERLAY_ORDER:
+            for svn_path in segment.get_svn_paths(host):
+                requirements[svn_path] = read_file(join(config_directory, svn_path, 'VARIABLES', 'RPM_REQUIRES'))
+
+    def run():
+        for host in sample_hosts:
+            dependency = Dependency(accumulate_dependencies=True)
+            for segment in OVERLAY_ORDER:
+                for svn_path in segment.get_svn_paths(host):
+                    dependency.add(requirements[svn_path])
+            str(dependency)
+
+    return run
+
+
+def benchmark_affected_hosts(fleet, config_rpm_maker, count_of_changed_paths, seed):
+    changed_paths = generate_changed_paths(fleet.hosts, count_of_changed_paths, seed)
+
+    def run():
+        config_rpm_maker._get_affected_hosts(changed_paths, fleet.hosts)
+
+    return run
+
+
+def benchmark_svn_export(svn_service, sample_hosts, revision, directory):
+    """ Exports the host segment of each sample host and the "all" segment. """
+
+    counter = [0]
+
+    def run():
+        counter[0] += 1
+        export_directory = join(directory, 'export-%d' % counter[0])
+        svn_service.export('all', join(export_directory, 'all'), revision)
+        for host in sample_hosts:
+            svn_service.export('host/' + host, join(export_directory, host), revision)
+        rmtree(export_directory)
+
+    return run
+
+
+def write_configuration(path, work_directory, thread_count, overrides):
+    configuration = {'allow_unknown_hosts': True,
+                     'build_cache_dir': join(work_directory, 'build-cache'),
+                     'config_viewer_hosts_dir': join(work_directory, 'configviewer', 'hosts'),
+                     'dns_static_hosts_file': join(work_directory, 'hosts'),
+                     'error_log_dir': join(work_directory, 'errors'),
+                     'log_level': 'INFO',
+                     'rpm_upload_cmd': '/bin/true',
+                     'temp_dir': join(work_directory, 'tmp'),
+                     'thread_count': thread_count}
+    configuration.update(overrides)
+
+    for directory in ('tmp', join('configviewer', 'hosts')):
+        if not os.path.exists(join(work_directory, directory)):
+            os.makedirs(join(work_directory, directory))
+
+    with open(path, 'w') as configuration_file:
+        yaml.dump(configuration, configuration_file, default_flow_style=False)
+
+
+def parse_overrides(assignments):
+    """ Parses "key=value" assignments, the values are read as yaml. """
+
+    overrides = {}
+    for assignment in assignments:
+        key, value = assignment.split('=', 1)
+        overrides[key] = yaml.safe_load(value)
+    return overrides
+
+
+def compare_with_baseline(results, baseline, max_regression):
+    """ Adds the baseline and the threshold to each result and returns the
+        names of the benchmarks exceeding their threshold. """
+
+    regressions = []
+    for name, result in sorted(results.iteritems()):
+        if name not in baseline:
+            continue
+
+        baseline_seconds = baseline[name]['seconds']
+        threshold_seconds = max(baseline_seconds * (1 + max_regression / 100.0),
+                                baseline_seconds + MINIMUM_REGRESSION_IN_SECONDS)
+        result['baseline_seconds'] = baseline_seconds
+        result['threshold_seconds'] = threshold_seconds
+
+        if result['seconds'] > threshold_seconds:
+            regressions.append(name)
+
+    return regressions
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--hosts', dest='hosts', type='int', default=1000,
+                      help='number of generated hosts, e.g. 100 to 20000 (default 1000)')
+    parser.add_option('--files-per-segment', dest='files_per_segment', type='int', default=10,
+                      help='number of files in each shared segment (default 10)')
+    parser.add_option('--files-per-host', dest='files_per_host', type='int', default=2,
+                      help='number of files in each host segment (default 2)')
+    parser.add_option('--segment-depth', dest='segment_depth', type='int', default=3,
+                      help='number of nested directories containing the files of a segment (default 3)')
+    parser.add_option('--variable-depth', dest='variable_depth', type='int', default=5,
+                      help='length of the chain of variables referencing each other (default 5)')
+    parser.add_option('--change', dest='change', default='all',
+                      help='segment changed by the built revision: all, typ, loc or host (default all)')
+    parser.add_option('--thread-count', dest='thread_count', type='int', default=4,
+                      help='thread_count used for the end-to-end build (default 4)')
+    parser.add_option('--set', dest='overrides', action='append', default=[], metavar='KEY=VALUE',
+                      help='override a configuration property of the end-to-end build (repeatable)')
+    parser.add_option('--sample', dest='sample', type='int', default=100,
+                      help='number of hosts used by the component benchmarks (default 100)')
+    parser.add_option('--changed-paths', dest='changed_paths', type='int', default=1000,
+                      help='number of changed paths for the affected hosts benchmark (default 1000)')
+    parser.add_option('--repeat', dest='repeat', type='int', default=3,
+                      help='runs of each component benchmark, the best one counts (default 3)')
+    parser.add_option('--skip-end-to-end', dest='skip_end_to_end', action='store_true', default=False,
+                      help='run the component benchmarks only')
+    parser.add_option('--results', dest='results', default='benchmark-results.json',
+                      help='path of the results file (default benchmark-results.json)')
+    parser.add_option('--baseline', dest='baseline',
+                      help='results of an earlier run to compare with')
+    parser.add_option('--max-regression', dest='max_regression', type='float', default=20.0,
+                      help='allowed slowdown compared with the baseline in percent (default 20)')
+    parser.add_option('--work-dir', dest='work_dir',
+                      help='directory for the generated fleet (default: a new temporary directory)')
+    parser.add_option('--keep', dest='keep', action='store_true', default=False,
+                      help='do not remove the generated fleet')
+    parser.add_option('--seed', dest='seed', type='int', default=42,
+                      help='seed for the sample of hosts and the changed paths')
+    values, _ = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='[%(levelname)5s] %(message)s')
+
+    work_directory = abspath(values.work_dir or mkdtemp(prefix='yadt-config-rpm-maker-benchmark.'))
+    if not os.path.exists(work_directory):
+        os.makedirs(work_directory)
+
+    fleet = Fleet(values.hosts, values.files_per_segment, values.files_per_host,
+                  values.segment_depth, values.variable_depth)
+    sample_hosts = random.Random(values.seed).sample(fleet.hosts, min(values.sample, len(fleet.hosts)))
+    changed_host = sample_hosts[0]
+    changed_svn_path = {'all': 'all',
+                        'typ': 'typ/' + changed_host[3:6],
+                        'loc': OVERLAY_ORDER[2].get_svn_paths(changed_host)[-1],
+                        'host': 'host/' + changed_host}[values.change]
+
+    results = {}
+    try:
+        print 'Generating %d hosts in "%s"' % (len(fleet.hosts), work_directory)
+        generation_time = time()
+        repository_url = create_svn_repository(fleet, work_directory)
+        revision = commit_change(repository_url, changed_svn_path, work_directory)
+        write_static_hosts_file(fleet, join(work_directory, 'hosts'))
+        print 'Generated repository %s in %.1fs, building revision %s' % (repository_url, time() - generation_time, revision)
+
+        configuration_path = join(work_directory, 'yadt-config-rpm-maker.yaml')
+        write_configuration(configuration_path, work_directory, values.thread_count, parse_overrides(values.overrides))
+        os.environ[ENVIRONMENT_VARIABLE_KEY_CONFIGURATION_FILE] = configuration_path
+        os.environ['PATH'] = install_stub_rpmbuild(work_directory) + os.pathsep + os.environ['PATH']
+        load_configuration_file()
+
+        svn_service = SvnService(base_url=repository_url, path_to_config='/config')
+        config_directory = join(work_directory, 'config')
+        components = {'token_replacer': benchmark_token_replacer(fleet, config_directory, sample_hosts),
+                      'dependency': benchmark_dependency(fleet, config_directory, sample_hosts),
+                      'affected_hosts': benchmark_affected_hosts(fleet, ConfigRpmMaker(revision, svn_service),
+                                                                 values.changed_paths, values.seed),
+                      'svn_export': benchmark_svn_export(svn_service, sample_hosts, revision, work_directory)}
+
+        for name in COMPONENTS:
+            results[name] = {'seconds': measure(components[name], values.repeat)}
+            print '%-20s %8.3fs' % (name, results[name]['seconds'])
+
+        execution_times = None
+        if not values.skip_end_to_end:
+            EXECUTION_TIME_PROFILER.reset()
+            build = ConfigRpmMaker(revision, svn_service).build
+            results['end_to_end'] = {'seconds': measure(build)}
+            execution_times = EXECUTION_TIME_PROFILER.to_dict()['functions']
+            print '%-20s %8.3fs' % ('end_to_end', results['end_to_end']['seconds'])
+
+    finally:
+        if not values.keep:
+            rmtree(work_directory, ignore_errors=True)
+
+    regressions = []
+    if values.baseline:
+        with open(values.baseline) as baseline_file:
+            regressions = compare_with_baseline(results, json.load(baseline_file)['results'], values.max_regression)
+
+    with open(values.results, 'w') as results_file:
+        json.dump({'parameters': dict(fleet.get_parameters(), changed_svn_path=changed_svn_path,
+                                      thread_count=values.thread_count, sample=len(sample_hosts),
+                                      repeat=values.repeat, overrides=parse_overrides(values.overrides)),
+                   'results': results,
+                   'execution_times': execution_times,
+                   'regressions': regressions}, results_file, indent=2, sort_keys=True)
+    print 'Wrote results to "%s"' % values.results
+
+    for name in regressions:
+        print 'Regression: %s took %.3fs, threshold is %.3fs (baseline %.3fs)' % (
+            name, results[name]['seconds'], results[name]['threshold_seconds'], results[name]['baseline_seconds'])
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
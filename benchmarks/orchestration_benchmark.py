@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Benchmark for the overhead of the build orchestration.
+
+    Builds a synthetic fleet (see fleet.py) using the FakeSvnService and the
+    StubRpmBuilder, so neither a subversion server nor rpmbuild is needed.
+    The simulated latencies stay the same while thread_count and
+    svn_client_pool_size vary, so the table shows how the threads, the
+    queues and the svn service pool scale. Efficiency is the speedup
+    compared with the first thread count divided by the added threads.
+
+    Usage: PYTHONPATH=src python benchmarks/orchestration_benchmark.py [options]
+"""
+
+import logging
+import os
+
+from optparse import OptionParser
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+import yaml
+
+from fleet import Fleet, generate_config_tree, write_static_hosts_file
+
+from config_rpm_maker.configuration import (ENVIRONMENT_VARIABLE_KEY_CONFIGURATION_FILE,
+                                            get_svn_client_pool_size,
+                                            get_thread_count,
+                                            load_configuration_file,
+                                            set_property)
+from config_rpm_maker.configrpmmaker import ConfigRpmMaker
+from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+from config_rpm_maker.simulation import FakeSvnService, SimulatedLatency, StubRpmBuilder
+
+
+def parse_integers(value):
+    return [int(item) for item in value.split(',')]
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--hosts', dest='hosts', type='int', default=200,
+                      help='number of generated hosts (default 200)')
+    parser.add_option('--thread-counts', dest='thread_counts', default='1,2,4,8,16',
+                      help='comma separated thread counts (default 1,2,4,8,16)')
+    parser.add_option('--pool-sizes', dest='pool_sizes', default='4',
+                      help='comma separated svn client pool sizes (default 4)')
+    parser.add_option('--svn-latency', dest='svn_latency', type='float', default=0.01,
+                      help='latency of each svn call in seconds (default 0.01)')
+    parser.add_option('--svn-jitter', dest='svn_jitter', type='float', default=0.005,
+                      help='jitter of each svn call in seconds (default 0.005)')
+    parser.add_option('--svn-failure-rate', dest='svn_failure_rate', type='float', default=0.0,
+                      help='probability of a failing svn call (default 0)')
+    parser.add_option('--rpmbuild-delay', dest='rpmbuild_delay', type='float', default=0.2,
+                      help='duration of each stub rpmbuild in seconds (default 0.2)')
+    parser.add_option('--set', dest='overrides', action='append', default=[], metavar='KEY=VALUE',
+                      help='override a configuration property (repeatable)')
+    parser.add_option('--seed', dest='seed', type='int', default=42,
+                      help='seed for the jitter and the failures')
+    values, _ = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format='[%(levelname)5s] %(message)s')
+
+    work_directory = mkdtemp(prefix='yadt-config-rpm-maker-orchestration.')
+    try:
+        fleet = Fleet(values.hosts)
+        generate_config_tree(fleet, join(work_directory, 'repository', 'config'))
+        write_static_hosts_file(fleet, join(work_directory, 'hosts'))
+
+        configuration = {'allow_unknown_hosts': True,
+                         'config_viewer_hosts_dir': join(work_directory, 'configviewer'),
+                         'dns_static_hosts_file': join(work_directory, 'hosts'),
+                         'error_log_dir': join(work_directory, 'errors'),
+                         'log_level': 'ERROR',
+                         'rpm_upload_cmd': '/bin/true',
+                         'temp_dir': join(work_directory, 'tmp')}
+        for assignment in values.overrides:
+            key, value = assignment.split('=', 1)
+            configuration[key] = yaml.safe_load(value)
+
+        for directory in ('configviewer', 'tmp'):
+            os.makedirs(join(work_directory, directory))
+
+        configuration_path = join(work_directory, 'yadt-config-rpm-maker.yaml')
+        with open(configuration_path, 'w') as configuration_file:
+            yaml.dump(configuration, configuration_file, default_flow_style=False)
+        os.environ[ENVIRONMENT_VARIABLE_KEY_CONFIGURATION_FILE] = configuration_path
+        load_configuration_file()
+
+        print 'Hosts: %d, svn latency: %.3fs +/- %.3fs, failure rate %.2f, rpmbuild: %.3fs' % (
+            len(fleet.hosts), values.svn_latency, values.svn_jitter, values.svn_failure_rate, values.rpmbuild_delay)
+        print '%8s %6s %10s %10s %10s %10s %10s' % ('threads', 'pool', 'wall', 'hosts/s', 'efficiency', 'svn calls',
+                                                   'failures')
+
+        first_result = None
+        revision = 1
+        for pool_size in parse_integers(values.pool_sizes):
+            for thread_count in parse_integers(values.thread_counts):
+                set_property(get_thread_count, thread_count)
+                set_property(get_svn_client_pool_size, pool_size)
+
+                svn_latency = SimulatedLatency(values.svn_latency, values.svn_jitter, values.svn_failure_rate, values.seed)
+                svn_service = FakeSvnService(join(work_directory, 'repository'), changed_paths=['all/VARIABLES/SEGMENT'],
+                                             latency=svn_latency)
+                rpm_builder = StubRpmBuilder(SimulatedLatency(values.rpmbuild_delay, seed=values.seed))
+
+                start_time = time()
+                try:
+                    ConfigRpmMaker(str(revision), svn_service, rpm_builder=rpm_builder).build()
+                except BaseConfigRpmMakerException:
+                    pass  # the simulated failures are counted below
+                wall_time = time() - start_time
+                revision += 1
+
+                if first_result is None:
+                    first_result = (thread_count, wall_time)
+                speedup = first_result[1] / wall_time
+                efficiency = speedup / (float(thread_count) / first_result[0])
+
+                print '%8d %6d %9.2fs %10.1f %9.0f%% %10d %10d' % (thread_count, pool_size, wall_time,
+                                                                    len(fleet.hosts) / wall_time, efficiency * 100,
+                                                                    svn_latency.calls, svn_latency.failures)
+    finally:
+        rmtree(work_directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+"""
+    Benchmark for TokenReplacer.filter.
+
+    Generates a large file containing many references to hundreds of
+    distinct tokens and measures how long it takes to filter it. For
+    comparison the former implementation, which searched the content
+    again after every replaced token, is measured as well.
+
+    Usage: PYTHONPATH=src python benchmarks/token_replacer_benchmark.py [options]
+"""
+
+import random
+
+from optparse import OptionParser
+from time import time
+
+from config_rpm_maker.token.template import TEMPLATE_CACHE
+from config_rpm_maker.token.tokenreplacer import MissingTokenException, TokenReplacer
+
+
+def generate_token_values(count_of_tokens):
+    return dict(('TOKEN_%04d' % number, 'value-of-token-%04d' % number) for number in range(count_of_tokens))
+
+
+def generate_content(token_names, count_of_lines, seed):
+    generator = random.Random(seed)
+    lines = []
+    for number in range(count_of_lines):
+        if generator.random() < 0.5:
+            lines.append('key%d = @@@%s@@@' % (number, generator.choice(token_names)))
+        else:
+            lines.append('# line %d without any token, just some text to make the line longer' % number)
+    return '\n'.join(lines) + '\n'
+
+
+def legacy_filter(token_replacer, content):
+    """ The algorithm which has been used before the single pass substitution was introduced. """
+
+    while True:
+        match = TokenReplacer.TOKEN_PATTERN.search(content)
+        if not match:
+            return content
+
+        token_name = match.group(1)
+        if token_name not in token_replacer.token_values:
+            raise MissingTokenException(token_name)
+
+        value = token_replacer.replacer_function(token_name, token_replacer.token_values[token_name])
+        content = content.replace('@@@%s@@@' % token_name, value)
+
+
+def measure(function, *args):
+    start_time = time()
+    result = function(*args)
+    return time() - start_time, result
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--tokens', dest='tokens', type='int', default=500,
+                      help='number of distinct tokens (default 500)')
+    parser.add_option('--lines', dest='lines', type='int', default=200000,
+                      help='number of lines in the generated file (default 200000)')
+    parser.add_option('--seed', dest='seed', type='int', default=42,
+                      help='seed for the generated file')
+    values, _ = parser.parse_args()
+
+    token_values = generate_token_values(values.tokens)
+    content = generate_content(sorted(token_values.keys()), values.lines, values.seed)
+    token_replacer = TokenReplacer(token_values)
+    TEMPLATE_CACHE.maximum_size = 1000
+
+    print 'Tokens: %d, lines: %d, size: %d bytes' % (len(token_values), values.lines, len(content))
+
+    filter_time, filtered_content = measure(token_replacer.filter, content)
+    print 'Single pass filter:             %8.3fs' % filter_time
+
+    other_token_replacer = TokenReplacer(dict((name, value.upper()) for name, value in token_values.iteritems()))
+    cached_filter_time, _ = measure(other_token_replacer.filter, content)
+    print 'Filter using cached template:   %8.3fs' % cached_filter_time
+
+    legacy_time, legacy_content = measure(legacy_filter, token_replacer, content)
+    print 'Legacy filter:                  %8.3fs' % legacy_time
+
+    if filtered_content != legacy_content:
+        raise Exception('Single pass filter and legacy filter disagree on the filtered content!')
+
+
+if __name__ == '__main__':
+    main()
@@ -39,7 +39,8 @@ setup(name="yadt-config-rpm-maker",
       description="This program is called as a commit hook in a config SVN repository and automatically creates the necessary RPMs after every commit and puts them in the configured RPM repository.",
       keywords="rpm config host svn hook",
 
-      entry_points={'console_scripts': ['config-rpm-maker = config_rpm_maker:main']},
+      entry_points={'console_scripts': ['config-rpm-maker = config_rpm_maker:main',
+                                        'config-rpm-maker-daemon = config_rpm_maker:daemon_main']},
       packages=find_packages(where=SOURCE_DIRECTORY),
       package_dir={'': SOURCE_DIRECTORY},
       test_suite='test')
@@ -17,7 +17,7 @@
 import traceback
 
 from logging import DEBUG, getLogger, getLevelName
-from sys import argv
+from sys import argv, stdout
 
 from config_rpm_maker.cli.argumentvalidation import ensure_valid_repository_url, ensure_valid_revision
 from config_rpm_maker.cli.exitprogram import start_measuring_time, exit_program
@@ -30,17 +30,37 @@ from config_rpm_maker.cli.parsearguments import (ARGUMENT_REPOSITORY,
                                                  ARGUMENT_REVISION,
                                                  OPTION_NO_SYSLOG,
                                                  apply_arguments_to_config,
+                                                 apply_daemon_arguments_to_config,
                                                  determine_console_log_level,
-                                                 parse_arguments)
-from config_rpm_maker.configuration import get_svn_path_to_config, ConfigurationException, load_configuration_file
+                                                 parse_arguments,
+                                                 parse_daemon_arguments)
+from config_rpm_maker.configuration import (PROFILING_MODE_OFF,
+                                            get_daemon_address,
+                                            get_daemon_job_history,
+                                            get_error_log_directory,
+                                            get_execution_times_file,
+                                            get_profiling_mode,
+                                            get_profiling_sampling_interval,
+                                            get_svn_client_pool_size,
+                                            get_svn_path_to_config,
+                                            get_temporary_directory,
+                                            get_trace_file,
+                                            is_dry_run_enabled,
+                                            ConfigurationException,
+                                            load_configuration_file)
 from config_rpm_maker.configrpmmaker import ConfigRpmMaker
 from config_rpm_maker.cleaner import clean_up_deleted_hosts_data
+from config_rpm_maker.daemon import BuildDaemon, create_server
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+from config_rpm_maker.impact import ImpactAnalyzer
 from config_rpm_maker.utilities.logutils import (append_console_logger,
                                                  create_sys_log_handler,
                                                  log_additional_information,
                                                  log_exception_message)
-from config_rpm_maker.svnservice import SvnService
+from config_rpm_maker.utilities.chrometrace import write_chrome_trace
+from config_rpm_maker.utilities.codeprofiler import CODE_PROFILER
+from config_rpm_maker.utilities.profiler import EXECUTION_TIME_PROFILER
+from config_rpm_maker.svnservice import SvnService, SvnServicePool
 
 from config_rpm_maker.version import __version__
 
@@ -48,6 +68,8 @@ LOGGER = getLogger(__name__)
 
 MESSAGE_SUCCESS = "Success."
 
+SYS_LOG_NAME_OF_DAEMON = 'daemon'
+
 
 def main():
     """ This function will be called by the command line interface. """
@@ -86,6 +108,42 @@ def main():
     exit_program(MESSAGE_SUCCESS, return_code=RETURN_CODE_SUCCESS)
 
 
+def daemon_main():
+    """ This function will be called by the command line interface of the build daemon. """
+
+    LOGGER.setLevel(DEBUG)
+
+    try:
+        arguments = parse_daemon_arguments(argv[1:], version='yadt-config-rpm-maker %s' % __version__)
+
+        initialize_logging_to_console(arguments)
+        repository_url = ensure_valid_repository_url(arguments[ARGUMENT_REPOSITORY])
+        initialize_logging_to_syslog(arguments, SYS_LOG_NAME_OF_DAEMON)
+        load_configuration_file()
+        apply_daemon_arguments_to_config(arguments)
+
+        start_measuring_time()
+        log_additional_information()
+        serve_build_requests(repository_url)
+
+    except ConfigurationException as e:
+        log_exception_message(e)
+        return exit_program('Configuration error!', return_code=RETURN_CODE_CONFIGURATION_ERROR)
+
+    except BaseConfigRpmMakerException as e:
+        log_exception_message(e)
+        return exit_program('An exception occurred!', return_code=RETURN_CODE_EXCEPTION_OCCURRED)
+
+    except Exception:
+        stack_trace = traceback.format_exc(5)
+        for line in stack_trace.split('\n'):
+            LOGGER.error(line)
+        return exit_program('An unknown exception occurred!', return_code=RETURN_CODE_UNKNOWN_EXCEPTION_OCCURRED)
+
+    except KeyboardInterrupt:
+        return exit_program('Build daemon stopped.', return_code=RETURN_CODE_SUCCESS)
+
+
 def initialize_logging_to_console(arguments):
     """ Initializes the logging to console and
         appends the console handler to the root logger """
@@ -127,5 +185,104 @@ def building_configuration_rpms_and_clean_host_directories(repository, revision)
     path_to_config = get_svn_path_to_config()
     svn_service = SvnService(base_url=repository, path_to_config=path_to_config)
     svn_service.log_change_set_meta_information(revision)
-    ConfigRpmMaker(revision=revision, svn_service=svn_service).build()
-    clean_up_deleted_hosts_data(svn_service, revision)
+
+    if is_dry_run_enabled():
+        print_affected_hosts(svn_service, revision)
+        return
+
+    build_revision(svn_service, revision)
+
+
+def build_revision(svn_service, revision, **config_rpm_maker_arguments):
+    """ Builds the configuration rpms of the given revision, cleans up the
+        data of deleted hosts and writes the collected execution times. """
+
+    EXECUTION_TIME_PROFILER.record_arguments = bool(get_trace_file())
+    CODE_PROFILER.start(get_profiling_mode(), get_profiling_sampling_interval() / 1000.0)
+    try:
+        CODE_PROFILER.profile(ConfigRpmMaker(revision=revision, svn_service=svn_service,
+                                             **config_rpm_maker_arguments).build)
+        CODE_PROFILER.profile(clean_up_deleted_hosts_data, svn_service, revision)
+
+    finally:
+        write_execution_times(revision)
+        write_code_profile(revision)
+
+
+def serve_build_requests(repository_url):
+    """ Starts the build daemon, which builds the submitted revisions using
+        the same svn service pool, until the process is interrupted. """
+
+    svn_service = SvnService(base_url=repository_url, path_to_config=get_svn_path_to_config())
+    svn_service_pool = SvnServicePool(svn_service, size=get_svn_client_pool_size())
+
+    def build_submitted_revision(revision):
+        svn_service_pool.reset_statistics()
+        try:
+            svn_service.log_change_set_meta_information(revision)
+            build_revision(svn_service, revision, svn_service_pool=svn_service_pool)
+
+        finally:
+            # the cached metadata of a revision is not used by the builds of other revisions
+            svn_service.metadata_cache.clear()
+
+    build_daemon = BuildDaemon(build_submitted_revision, job_history=get_daemon_job_history())
+    address = get_daemon_address()
+    server = create_server(address, build_daemon)
+
+    build_daemon.start()
+    LOGGER.info('Accepting build requests on "%s".', address)
+    try:
+        server.serve_forever()
+
+    finally:
+        server.server_close()
+        build_daemon.stop()
+
+
+def write_execution_times(revision):
+    """ Writes the execution time statistics and the trace of all measured
+        calls to the configured files, so the execution times of several
+        revisions can be compared. """
+
+    execution_times_file = get_execution_times_file()
+    if execution_times_file:
+        path = execution_times_file.format(revision=revision)
+        LOGGER.info('Writing execution times to "%s"', path)
+        EXECUTION_TIME_PROFILER.write_json(path)
+
+    trace_file = get_trace_file()
+    if trace_file:
+        path = trace_file.format(revision=revision)
+        LOGGER.info('Writing trace to "%s"', path)
+        write_chrome_trace(path, EXECUTION_TIME_PROFILER.get_measurements())
+
+
+def write_code_profile(revision):
+    """ Writes the profile of the build to the error log directory (or the
+        temporary directory if no error log directory is configured). """
+
+    if CODE_PROFILER.mode == PROFILING_MODE_OFF:
+        return
+
+    CODE_PROFILER.stop()
+    directory = get_error_log_directory() or get_temporary_directory()
+    pstats_path, collapsed_stacks_path = CODE_PROFILER.write(directory, 'profile-%s' % revision)
+    LOGGER.info('Wrote profile to "%s" and collapsed stacks to "%s"', pstats_path, collapsed_stacks_path)
+
+
+def print_affected_hosts(svn_service, revision):
+    """ Prints each host which has a segment svn path the changed paths of
+        the given revision start with, whether its configuration would
+        actually change and why. """
+
+    changed_paths = svn_service.get_changed_paths(revision)
+    available_hosts = svn_service.get_hosts(revision)
+    host_impacts = ImpactAnalyzer(svn_service, revision).analyze(changed_paths, available_hosts)
+
+    affected_hosts_count = len([host_impact for host_impact in host_impacts if host_impact.affected])
+    LOGGER.info('Dry run: %d of %d host(s) are affected by revision %s.', affected_hosts_count,
+                len(host_impacts), revision)
+
+    for host_impact in host_impacts:
+        stdout.write(str(host_impact) + '\n')
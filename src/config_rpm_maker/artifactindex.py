@@ -0,0 +1,69 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    The artifact index keeps track of the rpms which have been built for
+    each host during one run, so nobody has to search the rpmbuild
+    directories for them afterwards.
+"""
+
+from collections import OrderedDict
+from logging import getLogger
+from threading import Lock
+
+LOGGER = getLogger(__name__)
+
+ARTIFACT_INDEX_FILE_NAME = 'artifacts.index'
+
+
+class ArtifactIndex(object):
+
+    def __init__(self):
+        self._rpms_by_host = OrderedDict()
+        self._lock = Lock()
+
+    def add(self, host, rpms):
+        with self._lock:
+            self._rpms_by_host.setdefault(host, []).extend(rpms)
+
+    def get_rpms(self, host):
+        with self._lock:
+            return list(self._rpms_by_host.get(host, []))
+
+    @property
+    def hosts(self):
+        with self._lock:
+            return self._rpms_by_host.keys()
+
+    @property
+    def rpms(self):
+        with self._lock:
+            return [rpm for rpms in self._rpms_by_host.itervalues() for rpm in rpms]
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(rpms) for rpms in self._rpms_by_host.itervalues())
+
+    def write(self, path):
+        """ Writes one line "<host> <rpm>" for each rpm to the given file. """
+
+        LOGGER.debug('Writing index of %d rpm(s) for %d host(s) to "%s"', len(self), len(self.hosts), path)
+
+        with self._lock:
+            with open(path, 'w') as index_file:
+                for host, rpms in self._rpms_by_host.iteritems():
+                    for rpm in rpms:
+                        index_file.write('%s %s\n' % (host, rpm))
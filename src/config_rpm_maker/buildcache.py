@@ -0,0 +1,198 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    The build cache remembers a digest of the effective inputs of each host
+    (the overlaid files, the variables and the spec file) together with the
+    rpms which have been built from them. When the digest did not change,
+    the rpms do not have to be built again.
+
+    The rpms of a run are staged first and committed after all rpms of the
+    run have been uploaded, so a failed run never hides a host which still
+    has to be built.
+"""
+
+import os
+
+from hashlib import sha256
+from logging import getLogger
+from os.path import exists, isdir, islink, join, relpath
+from shutil import copy2, rmtree
+
+LOGGER = getLogger(__name__)
+
+DIGEST_FILE_NAME = 'DIGEST'
+COMMITTED_DIRECTORY_NAME = 'current'
+STAGED_DIRECTORY_PREFIX = 'staged-'
+
+# these variables change with every revision although the content did not change
+REVISION_ONLY_VARIABLES = ('REVISION', 'SVNLOG', 'VARIABLES')
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def calculate_digest(directories, ignored_names=(), settings=()):
+    """ Returns a hex digest of the names, modes and contents of all files
+        in the given directories. Files in the top level of the directories
+        with a name in ignored_names are left out. The given settings are added to the digest, since they
+        change the rpms which are built from the same files. """
+
+    digest = sha256()
+
+    for setting in settings:
+        digest.update('setting %s\0' % setting)
+
+    for directory in directories:
+        digest.update('directory %s\0' % os.path.basename(directory))
+
+        for root, dir_names, file_names in os.walk(directory):
+            dir_names.sort()
+
+            for name in sorted(dir_names + file_names):
+                if root == directory and name in ignored_names:
+                    continue
+
+                path = join(root, name)
+                relative_path = relpath(path, directory)
+
+                if islink(path):
+                    digest.update('link %s %s\0' % (relative_path, os.readlink(path)))
+                elif isdir(path):
+                    digest.update('dir %s\0' % relative_path)
+                else:
+                    digest.update('file %s %o\0' % (relative_path, os.stat(path).st_mode & 0777))
+                    _update_digest_with_file_content(digest, path)
+
+    return digest.hexdigest()
+
+
+def _update_digest_with_file_content(digest, path):
+    with open(path, 'rb') as file_to_digest:
+        while True:
+            block = file_to_digest.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+    digest.update('\0')
+
+
+class BuildCache(object):
+    """ The layout of the cache directory is
+
+            <cache_dir>/<hostname>/current/DIGEST
+            <cache_dir>/<hostname>/current/RPMS/noarch/<rpm>
+            <cache_dir>/<hostname>/staged-<revision>/...
+
+        so every host has its own directory and the build threads or
+        processes never write to the same files. """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def get_digest(self, hostname):
+        digest_file_path = join(self._get_committed_dir(hostname), DIGEST_FILE_NAME)
+        if not exists(digest_file_path):
+            return None
+
+        with open(digest_file_path) as digest_file:
+            return digest_file.read().strip()
+
+    def is_unchanged(self, hostname, digest):
+        return digest is not None and self.get_digest(hostname) == digest
+
+    def get_rpms(self, hostname):
+        """ Returns the rpms of the last committed build relative to the
+            rpm output directory. """
+
+        committed_dir = self._get_committed_dir(hostname)
+        result = []
+        for root, _, file_names in os.walk(committed_dir):
+            for file_name in file_names:
+                if file_name.endswith('.rpm'):
+                    result.append(relpath(join(root, file_name), committed_dir))
+        return sorted(result)
+
+    def link_rpms(self, hostname, rpm_output_dir):
+        """ Links the rpms of the last committed build into the given rpm
+            output directory. Returns the linked rpms or an empty list if no
+            rpms have been cached. """
+
+        committed_dir = self._get_committed_dir(hostname)
+        linked_rpms = []
+
+        for rpm in self.get_rpms(hostname):
+            target = join(rpm_output_dir, rpm)
+            self._link_or_copy(join(committed_dir, rpm), target)
+            linked_rpms.append(target)
+
+        return linked_rpms
+
+    def stage(self, hostname, revision, digest, rpm_output_dir, rpms):
+        """ Stages the digest and the rpms of the given build. They will be
+            used by later runs as soon as they have been committed. """
+
+        staged_dir = self._get_staged_dir(hostname, revision)
+        if exists(staged_dir):
+            rmtree(staged_dir)
+        os.makedirs(staged_dir)
+
+        for rpm in rpms:
+            self._link_or_copy(rpm, join(staged_dir, relpath(rpm, rpm_output_dir)))
+
+        with open(join(staged_dir, DIGEST_FILE_NAME), 'w') as digest_file:
+            digest_file.write(digest + '\n')
+
+    def commit(self, hostname, revision):
+        """ Replaces the last committed build of the host by the build staged
+            for the given revision, if there is one. Builds staged by other
+            (failed) runs are removed. """
+
+        host_dir = join(self.cache_dir, hostname)
+        if not exists(host_dir):
+            return
+
+        staged_dir = self._get_staged_dir(hostname, revision)
+        if exists(staged_dir):
+            committed_dir = self._get_committed_dir(hostname)
+            outdated_dir = committed_dir + '.outdated'
+            if exists(committed_dir):
+                os.rename(committed_dir, outdated_dir)
+            os.rename(staged_dir, committed_dir)
+            if exists(outdated_dir):
+                rmtree(outdated_dir)
+            LOGGER.debug('Committed build cache entry of host "%s" for revision %s', hostname, revision)
+
+        for name in os.listdir(host_dir):
+            if name.startswith(STAGED_DIRECTORY_PREFIX):
+                rmtree(join(host_dir, name))
+
+    def _get_committed_dir(self, hostname):
+        return join(self.cache_dir, hostname, COMMITTED_DIRECTORY_NAME)
+
+    def _get_staged_dir(self, hostname, revision):
+        return join(self.cache_dir, hostname, STAGED_DIRECTORY_PREFIX + str(revision))
+
+    def _link_or_copy(self, source, target):
+        target_dir = os.path.dirname(target)
+        if not exists(target_dir):
+            os.makedirs(target_dir)
+        if exists(target):
+            os.remove(target)
+
+        try:
+            os.link(source, target)
+        except OSError:
+            copy2(source, target)
@@ -0,0 +1,136 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Functions which are executed within the worker processes when the
+    build engine "processes" has been configured. Each worker process
+    initializes its own svn services, since pysvn clients can not be
+    shared between processes, and then builds one host per call.
+
+    The shared segments have been staged by the parent process already.
+    The statistics collected while building a host are returned together
+    with its result, so the parent process can merge them.
+"""
+
+import os
+import traceback
+
+from logging import ERROR, FileHandler, Formatter, getLogger
+from threading import current_thread
+
+from config_rpm_maker import configuration
+from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+from config_rpm_maker.hostrpmbuilder import HostRpmBuilder
+from config_rpm_maker.segmentcache import SegmentExportCache
+from config_rpm_maker.svnservice import SvnService, SvnServicePool
+from config_rpm_maker.token.encoding import ENCODING_DETECTION_STATISTICS
+from config_rpm_maker.utilities.filecopy import FILE_COPY_STATISTICS
+from config_rpm_maker.utilities.profiler import EXECUTION_TIME_PROFILER
+
+LOGGER = getLogger(__name__)
+
+_build_process_context = {}
+
+
+def initialize_build_process(revision, work_dir, svn_service_parameters, svn_client_pool_size,
+                             error_log_file, segment_staging_dir, abort_event, resolved_hosts=None, rpm_builder=None,
+                             staged_segments=None):
+    """ Initializes the worker process. Will be called once in each worker process. """
+
+    # the worker process has been forked and inherited the statistics of the parent process
+    current_thread().name = 'Process-%d' % os.getpid()
+    EXECUTION_TIME_PROFILER.reset()
+    ENCODING_DETECTION_STATISTICS.reset()
+    FILE_COPY_STATISTICS.reset()
+
+    svn_service = SvnService(**svn_service_parameters)
+    svn_service_queue = SvnServicePool(svn_service, size=svn_client_pool_size)
+
+    segment_export_cache = None
+    if segment_staging_dir:
+        process_staging_dir = os.path.join(segment_staging_dir, 'process-%d' % os.getpid())
+        os.makedirs(process_staging_dir)
+        segment_export_cache = SegmentExportCache(revision=revision,
+                                                  staging_dir=process_staging_dir,
+                                                  svn_service_queue=svn_service_queue,
+                                                  staged_segments=staged_segments)
+
+    error_logging_handler = FileHandler(error_log_file)
+    error_logging_handler.setFormatter(Formatter(configuration.LOG_FILE_FORMAT, configuration.LOG_FILE_DATE_FORMAT))
+    error_logging_handler.setLevel(ERROR)
+
+    _build_process_context.clear()
+    _build_process_context.update(revision=revision,
+                                  work_dir=work_dir,
+                                  svn_service_queue=svn_service_queue,
+                                  segment_export_cache=segment_export_cache,
+                                  error_logging_handler=error_logging_handler,
+                                  abort_event=abort_event,
+                                  resolved_hosts=resolved_hosts,
+                                  rpm_builder=rpm_builder)
+
+
+def build_host_in_process(host):
+    """ Builds the configuration rpms for the given host.
+
+        Returns a tuple (host, rpms, error, statistics). rpms is None if the
+        build has been skipped since too many other hosts failed already.
+        error is None if the build succeeded, otherwise it contains the error
+        message. statistics can be merged using merge_build_process_statistics. """
+
+    if _build_process_context['abort_event'].is_set():
+        return host, None, None, take_build_process_statistics()
+
+    rpms, error = _build_host(host)
+    return host, rpms, error, take_build_process_statistics()
+
+
+def _build_host(host):
+    try:
+        rpms = HostRpmBuilder(thread_name=current_thread().name,
+                              hostname=host,
+                              revision=_build_process_context['revision'],
+                              work_dir=_build_process_context['work_dir'],
+                              svn_service_queue=_build_process_context['svn_service_queue'],
+                              error_logging_handler=_build_process_context['error_logging_handler'],
+                              segment_export_cache=_build_process_context['segment_export_cache'],
+                              resolved_hosts=_build_process_context['resolved_hosts'],
+                              rpm_builder=_build_process_context['rpm_builder']).build()
+        return rpms, None
+
+    except BaseConfigRpmMakerException as e:
+        return [], str(e)
+
+    except Exception:
+        return [], traceback.format_exc()
+
+
+def take_build_process_statistics():
+    """ Returns the statistics collected in this process since the last call and resets them. """
+
+    return {'measurements': EXECUTION_TIME_PROFILER.take_measurements(),
+            'encoding_detection': ENCODING_DETECTION_STATISTICS.take_counters(),
+            'file_copies': FILE_COPY_STATISTICS.take_counters(),
+            'svn_service_pool': _build_process_context['svn_service_queue'].take_statistics()}
+
+
+def merge_build_process_statistics(statistics, svn_service_pool):
+    """ Merges the statistics returned by a worker process into the statistics of this process. """
+
+    EXECUTION_TIME_PROFILER.add_measurements(statistics['measurements'])
+    ENCODING_DETECTION_STATISTICS.add_counters(statistics['encoding_detection'])
+    FILE_COPY_STATISTICS.add_counters(statistics['file_copies'])
+    svn_service_pool.add_statistics(statistics['svn_service_pool'])
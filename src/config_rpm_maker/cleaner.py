@@ -18,10 +18,14 @@
 
 from logging import getLogger
 from os import sep as PATH_SEPARATOR
-from os.path import exists
+from os.path import exists, islink
 from shutil import rmtree
 
-from config_rpm_maker.configuration import build_config_viewer_host_directory
+from config_rpm_maker.configuration import (CONFIG_VIEWER_PUBLICATION_SYMLINK,
+                                            build_config_viewer_host_directory,
+                                            get_config_viewer_host_directory,
+                                            get_config_viewer_publication)
+from config_rpm_maker.configviewer import ConfigViewerGarbageCollector, ConfigViewerPublisher
 from config_rpm_maker.segment import Host
 from config_rpm_maker.utilities.logutils import verbose
 
@@ -36,24 +40,30 @@ def clean_up_deleted_hosts_data(svn_service, revision):
 
     if deleted_paths:
         LOGGER.debug("Change set contains %d deleted path(s).", len(deleted_paths))
-        _delete_host_directories(deleted_paths)
+        _delete_host_directories(deleted_paths, revision)
     else:
         verbose(LOGGER).debug("Change set did not contain any deleted paths.")
 
 
-def _delete_host_directories(deleted_paths):
+def _delete_host_directories(deleted_paths, revision):
     """ checks for each given path if it contains the svn_prefix for a host
         and if it does it will check if the rest of the path is a host name
         if so it will delete the corresponding directory """
 
     svn_prefix = Host().get_svn_prefix()
     svn_prefix_length = len(svn_prefix)
+    publisher = ConfigViewerPublisher(get_config_viewer_host_directory(), revision)
+    deleted_hosts = []
 
     for deleted_path in deleted_paths:
         if deleted_path.startswith(svn_prefix):
             host_name = deleted_path[svn_prefix_length:]
             if _is_a_host_name_and_not_a_path(host_name):
-                _delete_host_directory(host_name)
+                _delete_host_directory(host_name, publisher)
+                deleted_hosts.append(host_name)
+
+    if deleted_hosts and get_config_viewer_publication() == CONFIG_VIEWER_PUBLICATION_SYMLINK:
+        ConfigViewerGarbageCollector(publisher, [], deleted_hosts=deleted_hosts).start()
 
 
 def _is_a_host_name_and_not_a_path(host_name):
@@ -62,11 +72,16 @@ def _is_a_host_name_and_not_a_path(host_name):
     return host_name.find(PATH_SEPARATOR) == -1
 
 
-def _delete_host_directory(host_name):
-    """ deletes the config viewer data for the given host name """
+def _delete_host_directory(host_name, publisher):
+    """ deletes the config viewer data for the given host name. Published
+        symlinks are removed, their revision directories are left to the
+        garbage collector. """
 
     host_directory = build_config_viewer_host_directory(host_name)
-    if exists(host_directory):
+    if islink(host_directory):
+        LOGGER.info('Unpublishing config viewer data for host "%s"', host_name)
+        publisher.unpublish(host_name)
+    elif exists(host_directory):
         LOGGER.info('Deleting config viewer data for host "%s"', host_name)
         rmtree(host_directory)
     else:
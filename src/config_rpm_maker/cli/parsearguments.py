@@ -20,7 +20,16 @@ from logging import DEBUG, INFO
 from optparse import OptionParser
 from sys import stdout, exit
 
-from config_rpm_maker.configuration import get_rpm_upload_command, is_config_viewer_only_enabled, is_verbose_enabled, is_no_clean_up_enabled, set_property
+from config_rpm_maker.configuration import (PROFILING_MODE_CPROFILE,
+                                            PROFILING_MODE_SAMPLING,
+                                            get_daemon_address,
+                                            get_profiling_mode,
+                                            get_rpm_upload_command,
+                                            is_config_viewer_only_enabled,
+                                            is_dry_run_enabled,
+                                            is_verbose_enabled,
+                                            is_no_clean_up_enabled,
+                                            set_property)
 from config_rpm_maker.cli.returncodes import RETURN_CODE_NOT_ENOUGH_ARGUMENTS, RETURN_CODE_VERSION
 
 
@@ -34,18 +43,39 @@ Arguments:
   revision    subversion revision for which the configuration RPMs are going
               to be built"""
 
+DAEMON_USAGE_INFORMATION = """Usage: %prog repo-url [options]
+
+Builds the configuration RPMs of the revisions which are submitted via HTTP,
+e.g. by calling "curl -d revision=123 http://localhost:8300/jobs" within the
+post-commit hook.
+
+Arguments:
+  repo-url    URL to subversion repository or absolute path on localhost"""
+
+OPTION_ADDRESS = '--address'
+OPTION_ADDRESS_HELP = 'host:port or absolute path of a unix socket to listen on. Overwrite daemon_address in config file'
+
 OPTION_CONFIG_VIEWER_ONLY = '--config-viewer-only'
 OPTION_CONFIG_VIEWER_ONLY_HELP = 'Only generate files for config viewer. Skip RPM build and upload.'
 
 OPTION_DEBUG = '--debug'
 OPTION_DEBUG_HELP = "force DEBUG log level on console"
 
+OPTION_DRY_RUN = '--dry-run'
+OPTION_DRY_RUN_HELP = 'Only print the affected hosts and why they are affected. Skip RPM build and upload.'
+
 OPTION_NO_CLEAN_UP = '--no-clean-up'
 OPTION_NO_CLEAN_UP_HELP = "do not clean up working directory"
 
 OPTION_NO_SYSLOG = '--no-syslog'
 OPTION_NO_SYSLOG_HELP = "switch logging of debug information to syslog off"
 
+OPTION_PROFILE = '--profile'
+OPTION_PROFILE_HELP = 'profile the build using cProfile and write pstats and collapsed stacks'
+
+OPTION_PROFILE_SAMPLING = '--profile-sampling'
+OPTION_PROFILE_SAMPLING_HELP = 'profile the build by sampling the stacks only (low overhead for long runs)'
+
 OPTION_RPM_UPLOAD_CMD = '--rpm-upload-cmd'
 OPTION_RPM_UPLOAD_CMD_HELP = 'Overwrite rpm_upload_config in config file'
 
@@ -66,7 +96,10 @@ def parse_arguments(argv, version):
             --debug: boolean, True if option is given
             --no-syslog: boolean, True if option is given
             --config-viewer-only: boolean, True if option is given
+            --dry-run: boolean, True if option is given
             --no-clean-up: boolean, True if option is given
+            --profile: boolean, True if option is given
+            --profile-sampling: boolean, True if option is given
             --rpm-upload-cmd: string, sets the configuration property
                                       rpm_upload_cmd to the given value
             --verbose: boolean, True if option is given
@@ -81,12 +114,21 @@ def parse_arguments(argv, version):
     parser.add_option("", OPTION_DEBUG,
                       action="store_true", dest="debug", default=False,
                       help=OPTION_DEBUG_HELP)
+    parser.add_option("", OPTION_DRY_RUN,
+                      action="store_true", dest="dry_run", default=False,
+                      help=OPTION_DRY_RUN_HELP)
     parser.add_option("", OPTION_NO_CLEAN_UP,
                       action="store_true", dest="no_clean_up", default=False,
                       help=OPTION_NO_CLEAN_UP_HELP)
     parser.add_option("", OPTION_NO_SYSLOG,
                       action="store_true", dest="no_syslog", default=False,
                       help=OPTION_NO_SYSLOG_HELP)
+    parser.add_option("", OPTION_PROFILE,
+                      action="store_true", dest="profile", default=False,
+                      help=OPTION_PROFILE_HELP)
+    parser.add_option("", OPTION_PROFILE_SAMPLING,
+                      action="store_true", dest="profile_sampling", default=False,
+                      help=OPTION_PROFILE_SAMPLING_HELP)
     parser.add_option("", OPTION_RPM_UPLOAD_CMD,
                       dest='rpm_upload_command', default=False,
                       help=OPTION_RPM_UPLOAD_CMD_HELP)
@@ -109,8 +151,11 @@ def parse_arguments(argv, version):
     arguments = {OPTION_DEBUG: values.debug,
                  OPTION_NO_CLEAN_UP: values.no_clean_up,
                  OPTION_NO_SYSLOG: values.no_syslog,
+                 OPTION_PROFILE: values.profile,
+                 OPTION_PROFILE_SAMPLING: values.profile_sampling,
                  OPTION_RPM_UPLOAD_CMD: values.rpm_upload_command,
                  OPTION_CONFIG_VIEWER_ONLY: values.config_viewer_only,
+                 OPTION_DRY_RUN: values.dry_run,
                  OPTION_VERBOSE: values.verbose,
                  ARGUMENT_REPOSITORY: args[0],
                  ARGUMENT_REVISION: args[1]}
@@ -127,12 +172,81 @@ def apply_arguments_to_config(arguments):
     if arguments[OPTION_CONFIG_VIEWER_ONLY]:
         set_property(is_config_viewer_only_enabled, arguments[OPTION_CONFIG_VIEWER_ONLY])
 
+    if arguments[OPTION_DRY_RUN]:
+        set_property(is_dry_run_enabled, arguments[OPTION_DRY_RUN])
+
     if arguments[OPTION_NO_CLEAN_UP]:
         set_property(is_no_clean_up_enabled, arguments[OPTION_NO_CLEAN_UP])
 
     if arguments[OPTION_VERBOSE]:
         set_property(is_verbose_enabled, arguments[OPTION_VERBOSE])
 
+    if arguments[OPTION_PROFILE_SAMPLING]:
+        set_property(get_profiling_mode, PROFILING_MODE_SAMPLING)
+
+    elif arguments[OPTION_PROFILE]:
+        set_property(get_profiling_mode, PROFILING_MODE_CPROFILE)
+
+
+def parse_daemon_arguments(argv, version):
+    """ Parses the given command line arguments of the build daemon.
+
+        if -h or --help is given it will print the help screen and exit
+        if --version is given it will display the version information and exit
+
+        Otherwise it will return a dictionary containing the keys and values for
+            --address: string, sets the configuration property
+                               daemon_address to the given value
+            --debug: boolean, True if option is given
+            --no-syslog: boolean, True if option is given
+            --verbose: boolean, True if option is given
+            <repository-url>: string, the first argument """
+
+    parser = OptionParser(usage=DAEMON_USAGE_INFORMATION)
+
+    parser.add_option("", OPTION_ADDRESS,
+                      dest='address', default=False,
+                      help=OPTION_ADDRESS_HELP)
+    parser.add_option("", OPTION_DEBUG,
+                      action="store_true", dest="debug", default=False,
+                      help=OPTION_DEBUG_HELP)
+    parser.add_option("", OPTION_NO_SYSLOG,
+                      action="store_true", dest="no_syslog", default=False,
+                      help=OPTION_NO_SYSLOG_HELP)
+    parser.add_option("", OPTION_VERBOSE,
+                      action="store_true", dest="verbose", default=False,
+                      help=OPTION_VERBOSE_HELP)
+    parser.add_option("", OPTION_VERSION,
+                      action="store_true", dest="version", default=False,
+                      help=OPTION_VERSION_HELP)
+    values, args = parser.parse_args(argv)
+
+    if values.version:
+        stdout.write(version + '\n')
+        return exit(RETURN_CODE_VERSION)
+
+    if len(args) < 1:
+        parser.print_help()
+        return exit(RETURN_CODE_NOT_ENOUGH_ARGUMENTS)
+
+    arguments = {OPTION_ADDRESS: values.address,
+                 OPTION_DEBUG: values.debug,
+                 OPTION_NO_SYSLOG: values.no_syslog,
+                 OPTION_VERBOSE: values.verbose,
+                 ARGUMENT_REPOSITORY: args[0]}
+
+    return arguments
+
+
+def apply_daemon_arguments_to_config(arguments):
+    """ Overrides configuration properties if command line options of the build daemon are specified. """
+
+    if arguments[OPTION_ADDRESS]:
+        set_property(get_daemon_address, arguments[OPTION_ADDRESS])
+
+    if arguments[OPTION_VERBOSE]:
+        set_property(is_verbose_enabled, arguments[OPTION_VERBOSE])
+
 
 def determine_console_log_level(arguments):
     """ Determines the log level based on arguments and configuration. """
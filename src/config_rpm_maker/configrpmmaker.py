@@ -16,7 +16,6 @@
 
 import os
 import shutil
-import subprocess
 import tempfile
 import traceback
 from logging import ERROR, FileHandler, Formatter, getLogger
@@ -24,32 +23,68 @@ from os import makedirs, remove
 from os.path import exists, join
 from Queue import Queue, Empty
 from shutil import rmtree, move
+from multiprocessing import Event, Pool
 from threading import Thread
 from tempfile import mkdtemp
 
 import configuration
-from config_rpm_maker.configuration.properties import (get_error_log_url,
+from config_rpm_maker.configuration.properties import (get_build_cache_directory,
+                                                       get_build_cache_policy,
+                                                       get_build_engine,
+                                                       get_config_viewer_host_directory,
+                                                       get_config_viewer_publication,
+                                                       get_dns_cache_file,
+                                                       get_dns_cache_ttl,
+                                                       get_dns_lookup_concurrency,
+                                                       get_dns_lookup_timeout,
+                                                       get_dns_static_hosts_file,
+                                                       get_error_log_url,
                                                        get_error_log_directory,
                                                        get_max_failed_hosts,
+                                                       is_effective_change_analysis_enabled,
                                                        is_no_clean_up_enabled,
                                                        get_rpm_upload_command,
                                                        get_rpm_upload_chunk_size,
+                                                       get_rpm_upload_concurrency,
+                                                       get_rpm_upload_time_window,
+                                                       get_svn_client_pool_size,
                                                        get_thread_count,
                                                        get_temporary_directory,
+                                                       is_rpm_upload_streaming_enabled,
                                                        is_verbose_enabled)
-from config_rpm_maker.configuration import build_config_viewer_host_directory
+from config_rpm_maker.artifactindex import ARTIFACT_INDEX_FILE_NAME, ArtifactIndex
+from config_rpm_maker.buildcache import BuildCache
+from config_rpm_maker.configuration import (BUILD_CACHE_POLICY_ALWAYS,
+                                            BUILD_ENGINE_PROCESSES,
+                                            CONFIG_VIEWER_PUBLICATION_SYMLINK,
+                                            build_config_viewer_host_directory)
+from config_rpm_maker.buildprocess import (build_host_in_process,
+                                           initialize_build_process,
+                                           merge_build_process_statistics)
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+from config_rpm_maker.configviewer import ConfigViewerGarbageCollector, ConfigViewerPublisher
+from config_rpm_maker.hostresolver import HostResolver, HostResolverCache, read_static_hosts_file
 from config_rpm_maker.hostrpmbuilder import HostRpmBuilder
+from config_rpm_maker.impact import ImpactAnalyzer
+from config_rpm_maker.rpmupload import RpmUploadPipeline
 from config_rpm_maker.utilities.logutils import log_elements_of_list
+from config_rpm_maker.utilities.codeprofiler import CODE_PROFILER
 from config_rpm_maker.utilities.profiler import measure_execution_time, log_directories_summary
-from config_rpm_maker.segment import OVERLAY_ORDER
+from config_rpm_maker.segment import SvnPathIndex
+from config_rpm_maker.segmentcache import SegmentExportCache, get_shared_svn_paths
+from config_rpm_maker.svnservice import SvnServicePool
+from config_rpm_maker.token.encoding import ENCODING_DETECTION_STATISTICS
+from config_rpm_maker.token.template import TEMPLATE_CACHE
+from config_rpm_maker.utilities.filecopy import FILE_COPY_STATISTICS
 
 LOGGER = getLogger(__name__)
 
 
 class BuildHostThread(Thread):
     def __init__(self, revision, host_queue, svn_service_queue, rpm_queue,
-                 failed_host_queue, work_dir, name=None, error_logging_handler=None):
+                 failed_host_queue, work_dir, name=None, error_logging_handler=None,
+                 segment_export_cache=None, artifact_index=None, rpm_upload_pipeline=None, resolved_hosts=None,
+                 rpm_builder=None):
         super(BuildHostThread, self).__init__(name=name)
         self.revision = revision
         self.host_queue = host_queue
@@ -58,6 +93,11 @@ class BuildHostThread(Thread):
         self.failed_host_queue = failed_host_queue
         self.work_dir = work_dir
         self.error_logging_handler = error_logging_handler
+        self.segment_export_cache = segment_export_cache
+        self.artifact_index = artifact_index
+        self.rpm_upload_pipeline = rpm_upload_pipeline
+        self.resolved_hosts = resolved_hosts
+        self.rpm_builder = rpm_builder
 
     def _notify_that_host_failed(self, host_name, stack_trace):
         failure_information = (host_name, stack_trace)
@@ -67,6 +107,8 @@ class BuildHostThread(Thread):
                      '{count} builds failed.'.format(host_name=host_name,
                                                      count=approximately_count))
 
+        self._abort_rpm_upload()
+
         maximum_allowed_failed_hosts = get_max_failed_hosts()
         if approximately_count >= maximum_allowed_failed_hosts:
             LOGGER.error('Stopping to build more hosts since the maximum of '
@@ -74,7 +116,14 @@ class BuildHostThread(Thread):
                          maximum_allowed_failed_hosts)
             self.host_queue.queue.clear()
 
+    def _abort_rpm_upload(self):
+        if self.rpm_upload_pipeline is not None:
+            self.rpm_upload_pipeline.abort()
+
     def run(self):
+        CODE_PROFILER.profile(self._build_hosts_from_queue)
+
+    def _build_hosts_from_queue(self):
         rpms_built = 0
         while True:
             try:
@@ -84,9 +133,16 @@ class BuildHostThread(Thread):
                                       revision=self.revision,
                                       work_dir=self.work_dir,
                                       svn_service_queue=self.svn_service_queue,
-                                      error_logging_handler=self.error_logging_handler).build()
+                                      error_logging_handler=self.error_logging_handler,
+                                      segment_export_cache=self.segment_export_cache,
+                                      resolved_hosts=self.resolved_hosts,
+                                      rpm_builder=self.rpm_builder).build()
+                if self.artifact_index is not None:
+                    self.artifact_index.add(host, rpms)
                 for rpm in rpms:
                     self.rpm_queue.put(rpm)
+                    if self.rpm_upload_pipeline is not None:
+                        self.rpm_upload_pipeline.put(rpm)
                 rpms_built += len(rpms)
 
             except BaseConfigRpmMakerException as e:
@@ -108,10 +164,6 @@ class CouldNotBuildSomeRpmsException(BaseConfigRpmMakerException):
     error_info = "Could not build all rpms\n"
 
 
-class CouldNotUploadRpmsException(BaseConfigRpmMakerException):
-    error_info = "Could not upload rpms!\n"
-
-
 class ConfigurationException(BaseConfigRpmMakerException):
     error_info = "Configuration error, please fix it\n"
 
@@ -128,14 +180,20 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
 ------------------------------------------------------------------------
 """
 
-    def __init__(self, revision, svn_service):
+    def __init__(self, revision, svn_service, rpm_builder=None, svn_service_pool=None):
         self.revision = revision
         self.svn_service = svn_service
+        self.rpm_builder = rpm_builder
+        self.svn_service_pool = svn_service_pool
         self.temp_dir = get_temporary_directory()
         self._assure_temp_dir_if_set()
         self.logger = None
         self._create_logger()
         self.work_dir = None
+        self.segment_staging_dir = None
+        self.artifact_index = ArtifactIndex()
+        self.config_viewer_garbage_collector = None
+        self.resolved_hosts = None
 
     def __build_error_msg_and_move_to_public_access(self, revision):
         err_url = get_error_log_url()
@@ -147,7 +205,16 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
         return error_msg
 
     def build(self):
+        try:
+            return self._build_revision()
+
+        finally:
+            # the build daemon creates many instances, so the error log handlers must not pile up
+            self._remove_logger()
+
+    def _build_revision(self):
         LOGGER.info('Working on revision %s', self.revision)
+        TEMPLATE_CACHE.clear()
         self.logger.info("Starting with revision %s", self.revision)
         try:
             changed_paths = self.svn_service.get_changed_paths(self.revision)
@@ -164,8 +231,8 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
             log_elements_of_list(LOGGER.debug, 'Detected %s affected host(s).', affected_hosts)
 
             self._prepare_work_dir()
-            rpms = self._build_hosts(affected_hosts)
-            self._upload_rpms(rpms)
+            rpms = self._build_hosts_and_upload_rpms(affected_hosts)
+            self._commit_build_cache(affected_hosts)
             self._move_configviewer_dirs_to_final_destination(affected_hosts)
 
         except BaseConfigRpmMakerException as exception:
@@ -182,6 +249,7 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
         self._clean_up_work_dir()
         return rpms
 
+    @measure_execution_time
     def _clean_up_work_dir(self):
         if self._keep_work_dir():
             LOGGER.info(
@@ -216,12 +284,18 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
 
         return integer_from_file
 
+    @measure_execution_time
     def _move_configviewer_dirs_to_final_destination(self, hosts):
         LOGGER.info("Updating configviewer data.")
 
+        publisher = None
+        if get_config_viewer_publication() == CONFIG_VIEWER_PUBLICATION_SYMLINK:
+            publisher = ConfigViewerPublisher(get_config_viewer_host_directory(), self.revision)
+
         for host in hosts:
             temp_path = build_config_viewer_host_directory(host, revision=self.revision)
             dest_path = build_config_viewer_host_directory(host)
+            revision_from_file = None
 
             if exists(dest_path):
                 path_to_revision_file = join(dest_path, "%s.rev" % host)
@@ -231,27 +305,99 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
                     LOGGER.debug(
                         'Will not update configviewer data for host "%s" since the current revision file contains revision %d which is higher than %s',
                         host, revision_from_file, self.revision)
-                    rmtree(temp_path)
+                    if publisher:
+                        publisher.discard(host, temp_path)
+                    else:
+                        rmtree(temp_path)
                     continue
 
-                rmtree(dest_path)
+                if not publisher:
+                    rmtree(dest_path)
 
             LOGGER.debug('Updating configviewer data for host "%s"', host)
-            move(temp_path, dest_path)
+            if publisher:
+                publisher.publish(host, temp_path, revision_from_file)
+            else:
+                move(temp_path, dest_path)
+
+        if publisher:
+            self._remove_superseded_configviewer_dirs_in_background(publisher, hosts)
+
+    def _remove_superseded_configviewer_dirs_in_background(self, publisher, hosts):
+        self.config_viewer_garbage_collector = ConfigViewerGarbageCollector(publisher, hosts)
+        self.config_viewer_garbage_collector.start()
+
+    @measure_execution_time
+    def _build_hosts_and_upload_rpms(self, hosts):
+        rpm_upload_cmd = get_rpm_upload_command()
+
+        if not rpm_upload_cmd or not is_rpm_upload_streaming_enabled():
+            rpms = self._build_hosts(hosts)
+            self._upload_rpms(rpms)
+            return rpms
+
+        rpm_upload_pipeline = RpmUploadPipeline(rpm_upload_cmd,
+                                                chunk_size=self._get_chunk_size([]),
+                                                time_window=get_rpm_upload_time_window(),
+                                                concurrency=self._get_rpm_upload_concurrency())
+        LOGGER.debug('Uploading rpm(s) while building hosts using command "%s"', rpm_upload_cmd)
+        rpm_upload_pipeline.start()
+        try:
+            rpms = self._build_hosts(hosts, rpm_upload_pipeline)
+            LOGGER.info("Uploading remaining rpm(s).")
+            rpm_upload_pipeline.close()
 
-    def _build_hosts(self, hosts):
+        except BaseException:
+            rpm_upload_pipeline.abort()
+            rpm_upload_pipeline.join()
+            raise
+
+        finally:
+            rpm_upload_pipeline.log_summary(LOGGER.debug)
+
+        return rpms
+
+    @measure_execution_time
+    def _build_hosts(self, hosts, rpm_upload_pipeline=None):
         if not hosts:
             LOGGER.warn('Trying to build rpms for hosts, but no hosts given!')
             return
 
+        self.resolved_hosts = self._resolve_hosts(hosts)
+
+        build_engine = get_build_engine()
+        LOGGER.debug('Building hosts using build engine "%s"', build_engine)
+
+        if build_engine == BUILD_ENGINE_PROCESSES:
+            built_rpms, failed_hosts = self._build_hosts_using_processes(hosts, rpm_upload_pipeline)
+        else:
+            built_rpms, failed_hosts = self._build_hosts_using_threads(hosts, rpm_upload_pipeline)
+
+        if failed_hosts:
+            failed_hosts_str = ['\n%s:\n\n%s\n\n' % (key, value) for (key, value) in failed_hosts.iteritems()]
+            raise CouldNotBuildSomeRpmsException(
+                "Could not build config rpm for some host(s): %s" % '\n'.join(failed_hosts_str))
+
+        LOGGER.info("Finished building configuration rpm(s).")
+        log_elements_of_list(LOGGER.debug, 'Built %s rpm(s).', built_rpms)
+        self._write_artifact_index()
+
+        return built_rpms
+
+    def _build_hosts_using_threads(self, hosts, rpm_upload_pipeline=None):
         host_queue = Queue()
         for host in hosts:
             host_queue.put(host)
 
         rpm_queue = Queue()
-        svn_service_queue = Queue()
         failed_host_queue = Queue()
-        svn_service_queue.put(self.svn_service)
+        svn_service_queue = self._get_svn_service_pool()
+
+        segment_export_cache = None
+        if self.segment_staging_dir:
+            segment_export_cache = SegmentExportCache(revision=self.revision,
+                                                      staging_dir=self.segment_staging_dir,
+                                                      svn_service_queue=svn_service_queue)
 
         thread_count = self._get_thread_count(hosts)
         thread_pool = [BuildHostThread(name='Thread-%d' % i,
@@ -261,7 +407,12 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
                                        host_queue=host_queue,
                                        failed_host_queue=failed_host_queue,
                                        work_dir=self.work_dir,
-                                       error_logging_handler=self.error_handler) for i in range(thread_count)]
+                                       error_logging_handler=self.error_handler,
+                                       segment_export_cache=segment_export_cache,
+                                       artifact_index=self.artifact_index,
+                                       rpm_upload_pipeline=rpm_upload_pipeline,
+                                       resolved_hosts=self.resolved_hosts,
+                                       rpm_builder=self.rpm_builder) for i in range(thread_count)]
 
         for thread in thread_pool:
             LOGGER.debug('%s: starting ...', thread.name)
@@ -270,17 +421,139 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
         for thread in thread_pool:
             thread.join()
 
-        failed_hosts = dict(self._consume_queue(failed_host_queue))
-        if failed_hosts:
-            failed_hosts_str = ['\n%s:\n\n%s\n\n' % (key, value) for (key, value) in failed_hosts.iteritems()]
-            raise CouldNotBuildSomeRpmsException(
-                "Could not build config rpm for some host(s): %s" % '\n'.join(failed_hosts_str))
+        svn_service_queue.log_summary(LOGGER.debug)
+        ENCODING_DETECTION_STATISTICS.log_summary(LOGGER.debug)
+        FILE_COPY_STATISTICS.log_summary(LOGGER.debug)
 
-        LOGGER.info("Finished building configuration rpm(s).")
+        failed_hosts = dict(self._consume_queue(failed_host_queue))
         built_rpms = self._consume_queue(rpm_queue)
-        log_elements_of_list(LOGGER.debug, 'Built %s rpm(s).', built_rpms)
+        return built_rpms, failed_hosts
 
-        return built_rpms
+    def _get_svn_service_pool(self):
+        if self.svn_service_pool is not None:
+            return self.svn_service_pool
+
+        return SvnServicePool(self.svn_service, size=self._get_svn_client_pool_size())
+
+    def _build_hosts_using_processes(self, hosts, rpm_upload_pipeline=None):
+        process_count = self._get_thread_count(hosts)
+        maximum_allowed_failed_hosts = get_max_failed_hosts()
+        abort_event = Event()
+        svn_service_pool = self._get_svn_service_pool()
+
+        staged_segments = None
+        if self.segment_staging_dir:
+            staged_segments = self._stage_shared_segments(hosts, svn_service_pool)
+
+        svn_service_parameters = {'base_url': self.svn_service.base_url,
+                                  'username': self.svn_service.username,
+                                  'password': self.svn_service.password,
+                                  'path_to_config': self.svn_service.path_to_config}
+
+        LOGGER.debug('Starting %d build process(es) ...', process_count)
+        process_pool = Pool(processes=process_count,
+                            initializer=initialize_build_process,
+                            initargs=(self.revision,
+                                      self.work_dir,
+                                      svn_service_parameters,
+                                      self._get_svn_client_pool_size(),
+                                      self.error_log_file,
+                                      self.segment_staging_dir,
+                                      abort_event,
+                                      self.resolved_hosts,
+                                      self.rpm_builder,
+                                      staged_segments))
+
+        built_rpms = []
+        failed_hosts = {}
+        try:
+            for host, rpms, error, statistics in process_pool.imap_unordered(build_host_in_process, hosts):
+                merge_build_process_statistics(statistics, svn_service_pool)
+
+                if error:
+                    failed_hosts[host] = error
+                    LOGGER.error('Build for host "{host_name}" failed. {count} builds '
+                                 'failed.'.format(host_name=host, count=len(failed_hosts)))
+
+                    if rpm_upload_pipeline is not None:
+                        rpm_upload_pipeline.abort()
+
+                    if len(failed_hosts) >= maximum_allowed_failed_hosts and not abort_event.is_set():
+                        LOGGER.error('Stopping to build more hosts since the maximum of '
+                                     '%d failed hosts has been reached',
+                                     maximum_allowed_failed_hosts)
+                        abort_event.set()
+
+                elif rpms is not None:
+                    self.artifact_index.add(host, rpms)
+                    built_rpms += rpms
+                    if rpm_upload_pipeline is not None:
+                        for rpm in rpms:
+                            rpm_upload_pipeline.put(rpm)
+
+            process_pool.close()
+
+        except BaseException:
+            process_pool.terminate()
+            raise
+
+        finally:
+            process_pool.join()
+
+        svn_service_pool.log_summary(LOGGER.debug)
+        ENCODING_DETECTION_STATISTICS.log_summary(LOGGER.debug)
+        FILE_COPY_STATISTICS.log_summary(LOGGER.debug)
+
+        return built_rpms, failed_hosts
+
+    def _stage_shared_segments(self, hosts, svn_service_pool):
+        """ Exports the segments shared by the given hosts once, before the
+            build processes are started. Returns the staged segments which
+            are handed to the build processes. """
+
+        segment_export_cache = SegmentExportCache(revision=self.revision,
+                                                  staging_dir=self.segment_staging_dir,
+                                                  svn_service_queue=svn_service_pool)
+        svn_paths = get_shared_svn_paths(hosts)
+        LOGGER.debug('Staging %d shared segment path(s) for the build processes ...', len(svn_paths))
+        segment_export_cache.stage(svn_paths, svn_service_pool.size)
+        return segment_export_cache.get_staged_segments()
+
+    @measure_execution_time
+    def _resolve_hosts(self, hosts):
+        """ Resolves all hosts up front, so the build threads only have to
+            look up the results. """
+
+        static_hosts = {}
+        static_hosts_file = get_dns_static_hosts_file()
+        if static_hosts_file:
+            static_hosts = read_static_hosts_file(static_hosts_file)
+
+        cache = HostResolverCache(get_dns_cache_file(), get_dns_cache_ttl())
+        cache.load()
+
+        host_resolver = HostResolver(static_hosts, cache, timeout=get_dns_lookup_timeout())
+        resolved_hosts = host_resolver.resolve_all(hosts, concurrency=self._get_dns_lookup_concurrency())
+
+        cache.save()
+        host_resolver.log_summary(LOGGER.debug)
+        return resolved_hosts
+
+    @measure_execution_time
+    def _commit_build_cache(self, hosts):
+        """ The rpms built in this run will be reused by later runs from now
+            on, since all of them have been uploaded. """
+
+        if get_build_cache_policy() == BUILD_CACHE_POLICY_ALWAYS:
+            return
+
+        build_cache = BuildCache(get_build_cache_directory())
+        LOGGER.debug('Committing build cache entries of %d host(s) in "%s"', len(hosts), build_cache.cache_dir)
+        for host in hosts:
+            build_cache.commit(host, self.revision)
+
+    def _write_artifact_index(self):
+        self.artifact_index.write(join(self.work_dir, ARTIFACT_INDEX_FILE_NAME))
 
     @measure_execution_time
     def _upload_rpms(self, rpms):
@@ -291,41 +564,26 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
             LOGGER.info("Uploading %s rpm(s).", len(rpms))
             LOGGER.debug('Uploading rpm(s) using command "%s" and chunk_size "%s"', rpm_upload_cmd, chunk_size)
 
-            pos = 0
-            while pos < len(rpms):
-                rpm_chunk = rpms[pos:pos + chunk_size]
-                cmd = '%s %s' % (rpm_upload_cmd, ' '.join(rpm_chunk))
-                process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                stdout, stderr = process.communicate()
-                if process.returncode:
-                    error_message = 'Rpm upload failed with exit code %s. Executed command "%s"\n' % (
-                        process.returncode, cmd)
-                    if stdout:
-                        error_message += 'stdout: "%s"\n' % stdout.strip()
-                    if stderr:
-                        error_message += 'stderr: "%s"\n' % stderr.strip()
-                    raise CouldNotUploadRpmsException(error_message)
-                pos += chunk_size
+            rpm_upload_pipeline = RpmUploadPipeline(rpm_upload_cmd,
+                                                    chunk_size=chunk_size,
+                                                    concurrency=self._get_rpm_upload_concurrency())
+            for rpm in rpms:
+                rpm_upload_pipeline.put(rpm)
+
+            rpm_upload_pipeline.start()
+            try:
+                rpm_upload_pipeline.close()
+            finally:
+                rpm_upload_pipeline.log_summary(LOGGER.debug)
         else:
             LOGGER.info("Rpms will not be uploaded since no upload command has been configured.")
 
-    def _get_affected_hosts(self, changed_paths, available_host):
-        result = set()
-        for segment in OVERLAY_ORDER:
-            for changed_path in changed_paths:
-                result |= set(self._find_matching_hosts(segment, changed_path, available_host))
-
-        return result
-
-    def _find_matching_hosts(self, segment, svn_path, available_hosts):
-        result = []
-        for host in available_hosts:
-            for path in segment.get_svn_paths(host):
-                if svn_path.startswith(path):
-                    result.append(host)
-                    break
+    @measure_execution_time
+    def _get_affected_hosts(self, changed_paths, available_hosts):
+        if is_effective_change_analysis_enabled():
+            return ImpactAnalyzer(self.svn_service, self.revision).find_hosts(changed_paths, available_hosts)
 
-        return result
+        return SvnPathIndex(available_hosts).find_hosts(changed_paths)
 
     def _get_thread_count(self, affected_hosts):
         thread_count = int(get_thread_count())
@@ -341,6 +599,27 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
             LOGGER.info("%s: using one thread for each affected host." % reason)
         return thread_count
 
+    def _get_svn_client_pool_size(self):
+        pool_size = get_svn_client_pool_size()
+        if pool_size < 1:
+            raise ConfigurationException('%s is %s, values <1 are not allowed' % (get_svn_client_pool_size, pool_size))
+
+        return pool_size
+
+    def _get_rpm_upload_concurrency(self):
+        concurrency = get_rpm_upload_concurrency()
+        if concurrency < 1:
+            raise ConfigurationException('%s is %s, values <1 are not allowed' % (get_rpm_upload_concurrency, concurrency))
+
+        return concurrency
+
+    def _get_dns_lookup_concurrency(self):
+        concurrency = get_dns_lookup_concurrency()
+        if concurrency < 1:
+            raise ConfigurationException('%s is %s, values <1 are not allowed' % (get_dns_lookup_concurrency, concurrency))
+
+        return concurrency
+
     def _consume_queue(self, queue):
         items = []
 
@@ -363,10 +642,15 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
         self.logger.addHandler(self.error_handler)
         self.logger.propagate = False
 
+    def _remove_logger(self):
+        self.logger.removeHandler(self.error_handler)
+        self.error_handler.close()
+
     def _assure_temp_dir_if_set(self):
         if self.temp_dir and not os.path.exists(self.temp_dir):
             os.makedirs(self.temp_dir)
 
+    @measure_execution_time
     def _prepare_work_dir(self):
         LOGGER.debug('Preparing working directory "%s"', self.temp_dir)
         self.work_dir = mkdtemp(prefix='yadt-config-rpm-maker.',
@@ -380,6 +664,11 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
             if not exists(path):
                 makedirs(path)
 
+        self.segment_staging_dir = join(self.work_dir, 'segments')
+        if not exists(self.segment_staging_dir):
+            LOGGER.debug('Creating staging directory for segment exports "%s"', self.segment_staging_dir)
+            makedirs(self.segment_staging_dir)
+
     def _get_chunk_size(self, rpms):
         chunk_size_raw = get_rpm_upload_chunk_size()
         try:
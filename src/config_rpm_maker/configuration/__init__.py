@@ -37,6 +37,31 @@ DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
 LOG_FILE_FORMAT = "%(asctime)s %(levelname)s: %(message)s"
 LOG_FILE_DATE_FORMAT = DATE_FORMAT
 
+BUILD_CACHE_POLICY_ALWAYS = 'always'
+BUILD_CACHE_POLICY_RELINK = 'relink'
+BUILD_CACHE_POLICY_SKIP = 'skip'
+BUILD_CACHE_POLICIES = (BUILD_CACHE_POLICY_ALWAYS, BUILD_CACHE_POLICY_RELINK, BUILD_CACHE_POLICY_SKIP)
+
+CONFIG_VIEWER_PUBLICATION_MOVE = 'move'
+CONFIG_VIEWER_PUBLICATION_SYMLINK = 'symlink'
+CONFIG_VIEWER_PUBLICATIONS = (CONFIG_VIEWER_PUBLICATION_MOVE, CONFIG_VIEWER_PUBLICATION_SYMLINK)
+
+FILE_COPY_STRATEGY_AUTO = 'auto'
+FILE_COPY_STRATEGY_COPY = 'copy'
+FILE_COPY_STRATEGIES = (FILE_COPY_STRATEGY_AUTO, FILE_COPY_STRATEGY_COPY)
+
+PROFILING_MODE_OFF = 'off'
+PROFILING_MODE_CPROFILE = 'cprofile'
+PROFILING_MODE_SAMPLING = 'sampling'
+
+BUILD_ENGINE_THREADS = 'threads'
+BUILD_ENGINE_PROCESSES = 'processes'
+BUILD_ENGINES = (BUILD_ENGINE_THREADS, BUILD_ENGINE_PROCESSES)
+
+RPM_BUILD_BACKEND_RPMBUILD = 'rpmbuild'
+RPM_BUILD_BACKEND_NATIVE = 'native'
+RPM_BUILD_BACKENDS = (RPM_BUILD_BACKEND_RPMBUILD, RPM_BUILD_BACKEND_NATIVE)
+
 _properties = None
 _file_path_of_loaded_configuration = None
 
@@ -182,44 +207,103 @@ def _ensure_properties_are_valid(raw_properties):
         LOGGER.warn("Loaded configuration properties are empty.")
         raw_properties = {}
 
+    build_cache_directory = raw_properties.get(get_build_cache_directory.key, get_build_cache_directory.default)
+    build_cache_policy = raw_properties.get(get_build_cache_policy.key, get_build_cache_policy.default)
+    build_engine = raw_properties.get(get_build_engine.key, get_build_engine.default)
+    build_source_rpms = raw_properties.get(is_source_rpm_build_enabled.key, is_source_rpm_build_enabled.default)
     allow_unknown_hosts = raw_properties.get(unknown_hosts_are_allowed.key, unknown_hosts_are_allowed.default)
     config_rpm_prefix = raw_properties.get(get_config_rpm_prefix.key, get_config_rpm_prefix.default)
     config_viewer_hosts_dir = raw_properties.get(get_config_viewer_host_directory.key,
                                                  get_config_viewer_host_directory.default)
+    config_viewer_publication = raw_properties.get(get_config_viewer_publication.key,
+                                                   get_config_viewer_publication.default)
     custom_dns_searchlist = raw_properties.get(get_custom_dns_search_list.key, get_custom_dns_search_list.default)
+    daemon_address = raw_properties.get(get_daemon_address.key, get_daemon_address.default)
+    daemon_job_history = raw_properties.get(get_daemon_job_history.key, get_daemon_job_history.default)
+    dns_cache_file = raw_properties.get(get_dns_cache_file.key, get_dns_cache_file.default)
+    dns_cache_ttl = raw_properties.get(get_dns_cache_ttl.key, get_dns_cache_ttl.default)
+    dns_lookup_concurrency = raw_properties.get(get_dns_lookup_concurrency.key, get_dns_lookup_concurrency.default)
+    dns_lookup_timeout = raw_properties.get(get_dns_lookup_timeout.key, get_dns_lookup_timeout.default)
+    dns_static_hosts_file = raw_properties.get(get_dns_static_hosts_file.key, get_dns_static_hosts_file.default)
+    effective_change_analysis = raw_properties.get(is_effective_change_analysis_enabled.key,
+                                                   is_effective_change_analysis_enabled.default)
     error_log_directory = raw_properties.get(get_error_log_directory.key, get_error_log_directory.default)
     error_log_url = raw_properties.get(get_error_log_url.key, get_error_log_url.default)
+    execution_times_file = raw_properties.get(get_execution_times_file.key, get_execution_times_file.default)
+    file_copy_strategy = raw_properties.get(get_file_copy_strategy.key, get_file_copy_strategy.default)
     log_level = raw_properties.get(get_log_level.key, get_log_level.default)
     max_file_size = raw_properties.get(get_max_file_size.key, get_max_file_size.default)
     max_failed_hosts = raw_properties.get(get_max_failed_hosts.key, get_max_failed_hosts.default)
     path_to_spec_file = raw_properties.get(get_path_to_spec_file.key, get_path_to_spec_file.default)
+    profiling_sampling_interval = raw_properties.get(get_profiling_sampling_interval.key,
+                                                     get_profiling_sampling_interval.default)
     repo_packages_regex = raw_properties.get(get_repo_packages_regex.key, get_repo_packages_regex.default)
+    rpmbuild_direct_buildroot = raw_properties.get(is_rpmbuild_direct_buildroot_enabled.key,
+                                                   is_rpmbuild_direct_buildroot_enabled.default)
+    rpm_build_backend = raw_properties.get(get_rpm_build_backend.key, get_rpm_build_backend.default)
     rpm_upload_chunk_size = raw_properties.get(get_rpm_upload_chunk_size.key, get_rpm_upload_chunk_size.default)
     rpm_upload_command = raw_properties.get(get_rpm_upload_command.key, get_rpm_upload_command.default)
+    rpm_upload_concurrency = raw_properties.get(get_rpm_upload_concurrency.key, get_rpm_upload_concurrency.default)
+    rpm_upload_streaming = raw_properties.get(is_rpm_upload_streaming_enabled.key,
+                                              is_rpm_upload_streaming_enabled.default)
+    rpm_upload_time_window = raw_properties.get(get_rpm_upload_time_window.key, get_rpm_upload_time_window.default)
+    svn_client_pool_size = raw_properties.get(get_svn_client_pool_size.key, get_svn_client_pool_size.default)
     svn_path_to_config = raw_properties.get(get_svn_path_to_config.key, get_svn_path_to_config.default)
     temporary_directory = raw_properties.get(get_temporary_directory.key, get_temporary_directory.default)
+    template_cache_size = raw_properties.get(get_template_cache_size.key, get_template_cache_size.default)
     thread_count = raw_properties.get(get_thread_count.key, get_thread_count.default)
+    trace_file = raw_properties.get(get_trace_file.key, get_trace_file.default)
 
     valid_properties = {
+        is_effective_change_analysis_enabled: _ensure_is_a_boolean_value(is_effective_change_analysis_enabled,
+                                                                         effective_change_analysis),
+        is_rpm_upload_streaming_enabled: _ensure_is_a_boolean_value(is_rpm_upload_streaming_enabled,
+                                                                    rpm_upload_streaming),
+        is_rpmbuild_direct_buildroot_enabled: _ensure_is_a_boolean_value(is_rpmbuild_direct_buildroot_enabled,
+                                                                         rpmbuild_direct_buildroot),
+        is_source_rpm_build_enabled: _ensure_is_a_boolean_value(is_source_rpm_build_enabled, build_source_rpms),
         get_log_level: _ensure_valid_log_level(log_level),
         unknown_hosts_are_allowed: _ensure_is_a_boolean_value(unknown_hosts_are_allowed, allow_unknown_hosts),
+        get_build_cache_directory: _ensure_is_a_string(get_build_cache_directory, build_cache_directory),
+        get_build_cache_policy: _ensure_valid_build_cache_policy(build_cache_policy),
+        get_build_engine: _ensure_valid_build_engine(build_engine),
         get_config_rpm_prefix: _ensure_is_a_string(get_config_rpm_prefix, config_rpm_prefix),
         is_config_viewer_only_enabled: is_config_viewer_only_enabled.default,
         get_config_viewer_host_directory: _ensure_is_a_string(get_config_viewer_host_directory,
                                                               config_viewer_hosts_dir),
+        get_config_viewer_publication: _ensure_valid_config_viewer_publication(config_viewer_publication),
         get_custom_dns_search_list: _ensure_is_a_list_of_strings(get_custom_dns_search_list, custom_dns_searchlist),
+        get_daemon_address: _ensure_is_a_string(get_daemon_address, daemon_address),
+        get_daemon_job_history: _ensure_is_an_integer(get_daemon_job_history, daemon_job_history),
+        get_dns_cache_file: _ensure_is_a_string(get_dns_cache_file, dns_cache_file),
+        get_dns_cache_ttl: _ensure_is_an_integer(get_dns_cache_ttl, dns_cache_ttl),
+        get_dns_lookup_concurrency: _ensure_is_an_integer(get_dns_lookup_concurrency, dns_lookup_concurrency),
+        get_dns_lookup_timeout: _ensure_is_an_integer(get_dns_lookup_timeout, dns_lookup_timeout),
+        get_dns_static_hosts_file: _ensure_is_a_string(get_dns_static_hosts_file, dns_static_hosts_file),
+        is_dry_run_enabled: is_dry_run_enabled.default,
         get_error_log_directory: _ensure_is_a_string(get_error_log_directory, error_log_directory),
         get_error_log_url: _ensure_is_a_string(get_error_log_url, error_log_url),
+        get_execution_times_file: _ensure_is_a_string(get_execution_times_file, execution_times_file),
+        get_file_copy_strategy: _ensure_valid_file_copy_strategy(file_copy_strategy),
         get_max_failed_hosts: _ensure_is_an_integer(get_max_failed_hosts, max_failed_hosts),
         get_max_file_size: _ensure_is_an_integer(get_max_file_size, max_file_size),
         is_no_clean_up_enabled: is_no_clean_up_enabled.default,
         get_path_to_spec_file: _ensure_is_a_string(get_path_to_spec_file, path_to_spec_file),
+        get_profiling_mode: get_profiling_mode.default,
+        get_profiling_sampling_interval: _ensure_is_an_integer(get_profiling_sampling_interval,
+                                                               profiling_sampling_interval),
         get_repo_packages_regex: _ensure_repo_packages_regex_is_a_valid_regular_expression(repo_packages_regex),
+        get_rpm_build_backend: _ensure_valid_rpm_build_backend(rpm_build_backend),
         get_rpm_upload_chunk_size: _ensure_is_an_integer(get_rpm_upload_chunk_size, rpm_upload_chunk_size),
         get_rpm_upload_command: _ensure_is_a_string_or_none(get_rpm_upload_command, rpm_upload_command),
+        get_rpm_upload_concurrency: _ensure_is_an_integer(get_rpm_upload_concurrency, rpm_upload_concurrency),
+        get_rpm_upload_time_window: _ensure_is_an_integer(get_rpm_upload_time_window, rpm_upload_time_window),
+        get_svn_client_pool_size: _ensure_is_an_integer(get_svn_client_pool_size, svn_client_pool_size),
         get_svn_path_to_config: _ensure_is_a_string(get_svn_path_to_config, svn_path_to_config),
+        get_template_cache_size: _ensure_is_an_integer(get_template_cache_size, template_cache_size),
         get_thread_count: _ensure_is_an_integer(get_thread_count, thread_count),
         get_temporary_directory: _ensure_is_a_string(get_temporary_directory, temporary_directory),
+        get_trace_file: _ensure_is_a_string(get_trace_file, trace_file),
         is_verbose_enabled: is_verbose_enabled.default
     }
 
@@ -259,6 +343,51 @@ def _ensure_valid_log_level(log_level_name):
                                  'be DEBUG, ERROR or INFO' % log_level_name)
 
 
+def _ensure_valid_build_engine(build_engine):
+    """Return the given build engine or raise an exception if it is unknown."""
+    if build_engine not in BUILD_ENGINES:
+        raise ConfigurationException('Invalid build engine "%s". Build engine has to be one of: %s' % (
+            build_engine, ', '.join(BUILD_ENGINES)))
+
+    return build_engine
+
+
+def _ensure_valid_build_cache_policy(build_cache_policy):
+    """Return the given build cache policy or raise an exception if it is unknown."""
+    if build_cache_policy not in BUILD_CACHE_POLICIES:
+        raise ConfigurationException('Invalid build cache policy "%s". Build cache policy has to be one of: %s' % (
+            build_cache_policy, ', '.join(BUILD_CACHE_POLICIES)))
+
+    return build_cache_policy
+
+
+def _ensure_valid_config_viewer_publication(config_viewer_publication):
+    """Return the given config viewer publication or raise an exception if it is unknown."""
+    if config_viewer_publication not in CONFIG_VIEWER_PUBLICATIONS:
+        raise ConfigurationException('Invalid config viewer publication "%s". Config viewer publication has to be one of: %s' % (
+            config_viewer_publication, ', '.join(CONFIG_VIEWER_PUBLICATIONS)))
+
+    return config_viewer_publication
+
+
+def _ensure_valid_file_copy_strategy(file_copy_strategy):
+    """Return the given file copy strategy or raise an exception if it is unknown."""
+    if file_copy_strategy not in FILE_COPY_STRATEGIES:
+        raise ConfigurationException('Invalid file copy strategy "%s". File copy strategy has to be one of: %s' % (
+            file_copy_strategy, ', '.join(FILE_COPY_STRATEGIES)))
+
+    return file_copy_strategy
+
+
+def _ensure_valid_rpm_build_backend(rpm_build_backend):
+    """Return the given rpm build backend or raise an exception if it is unknown."""
+    if rpm_build_backend not in RPM_BUILD_BACKENDS:
+        raise ConfigurationException('Invalid rpm build backend "%s". Rpm build backend has to be one of: %s' % (
+            rpm_build_backend, ', '.join(RPM_BUILD_BACKENDS)))
+
+    return rpm_build_backend
+
+
 def _ensure_is_a_string(key, value):
     """Return the given string or raise an exception if it is not a string."""
     if not isinstance(value, basestring):
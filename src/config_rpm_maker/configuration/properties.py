@@ -22,25 +22,51 @@
 
 from config_rpm_maker.configuration import ConfigurationProperty
 
+get_build_cache_directory = ConfigurationProperty(key='build_cache_dir', default='/tmp/yadt-config-rpm-maker-build-cache')
+get_build_cache_policy = ConfigurationProperty(key='build_cache_policy', default='always')
+get_build_engine = ConfigurationProperty(key='build_engine', default='threads')
 get_config_viewer_host_directory = ConfigurationProperty(key='config_viewer_hosts_dir', default='/tmp')
+get_config_viewer_publication = ConfigurationProperty(key='config_viewer_publication', default='move')
 get_config_rpm_prefix = ConfigurationProperty(key='config_rpm_prefix', default='yadt-config-')
 get_custom_dns_search_list = ConfigurationProperty(key='custom_dns_searchlist', default=[])
+get_daemon_address = ConfigurationProperty(key='daemon_address', default='localhost:8300')
+get_daemon_job_history = ConfigurationProperty(key='daemon_job_history', default=100)
+get_dns_cache_file = ConfigurationProperty(key='dns_cache_file', default='')
+get_dns_cache_ttl = ConfigurationProperty(key='dns_cache_ttl', default=3600)
+get_dns_lookup_concurrency = ConfigurationProperty(key='dns_lookup_concurrency', default=10)
+get_dns_lookup_timeout = ConfigurationProperty(key='dns_lookup_timeout', default=5)
+get_dns_static_hosts_file = ConfigurationProperty(key='dns_static_hosts_file', default='')
 get_error_log_directory = ConfigurationProperty(key='error_log_dir', default="")
 get_error_log_url = ConfigurationProperty(key='error_log_url', default='')
+get_file_copy_strategy = ConfigurationProperty(key='file_copy_strategy', default='auto')
+get_execution_times_file = ConfigurationProperty(key='execution_times_file', default='')
 get_log_format = ConfigurationProperty(key="log_format", default="[%(levelname)5s] %(message)s")
 get_log_level = ConfigurationProperty(key="log_level", default='DEBUG')
 get_max_failed_hosts = ConfigurationProperty(key='max_failed_hosts', default=3)
 get_max_file_size = ConfigurationProperty(key='max_file_size', default=100 * 1024)
 get_path_to_spec_file = ConfigurationProperty(key='path_to_spec_file', default='default.spec')
+get_profiling_mode = ConfigurationProperty(key='profiling_mode', default='off')
+get_profiling_sampling_interval = ConfigurationProperty(key='profiling_sampling_interval', default=10)
 get_repo_packages_regex = ConfigurationProperty(key='repo_packages_regex', default='.*-repo.*')
+get_rpm_build_backend = ConfigurationProperty(key='rpm_build_backend', default='rpmbuild')
 get_rpm_upload_chunk_size = ConfigurationProperty(key='rpm_upload_chunk_size', default=10)
 get_rpm_upload_command = ConfigurationProperty(key='rpm_upload_cmd', default=None)
+get_rpm_upload_concurrency = ConfigurationProperty(key='rpm_upload_concurrency', default=1)
+get_rpm_upload_time_window = ConfigurationProperty(key='rpm_upload_time_window', default=10)
+get_svn_client_pool_size = ConfigurationProperty(key='svn_client_pool_size', default=4)
 get_svn_path_to_config = ConfigurationProperty(key='svn_path_to_config', default='/config')
+get_template_cache_size = ConfigurationProperty(key='template_cache_size', default=1000)
 get_thread_count = ConfigurationProperty(key='thread_count', default=1)
+get_trace_file = ConfigurationProperty(key='trace_file', default='')
 get_temporary_directory = ConfigurationProperty(key='temp_dir', default='/tmp')
 
 is_config_viewer_only_enabled = ConfigurationProperty(key='config_viewer_only', default=False)
+is_dry_run_enabled = ConfigurationProperty(key='dry_run', default=False)
+is_effective_change_analysis_enabled = ConfigurationProperty(key='effective_change_analysis', default=False)
 is_no_clean_up_enabled = ConfigurationProperty(key='no_clean_up', default=False)
+is_rpm_upload_streaming_enabled = ConfigurationProperty(key='rpm_upload_streaming', default=False)
+is_rpmbuild_direct_buildroot_enabled = ConfigurationProperty(key='rpmbuild_direct_buildroot', default=False)
+is_source_rpm_build_enabled = ConfigurationProperty(key='build_source_rpms', default=True)
 is_verbose_enabled = ConfigurationProperty(key='verbose', default=False)
 
 unknown_hosts_are_allowed = ConfigurationProperty(key='allow_unknown_hosts', default=True)
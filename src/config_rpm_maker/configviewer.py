@@ -0,0 +1,176 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Publishes the config viewer data of each host as a symlink pointing to
+    a directory per revision, e.g. "devweb01 -> devweb01.revision-54".
+    Replacing the symlink is atomic, so the data of a host is never missing,
+    and the directories of superseded revisions are removed afterwards by
+    a background thread.
+"""
+
+import os
+import re
+
+from logging import getLogger
+from os.path import basename, islink, isdir, join, lexists
+from shutil import rmtree
+from threading import Thread
+
+LOGGER = getLogger(__name__)
+
+REVISION_DIRECTORY_PATTERN = re.compile(r'^(?P<host>.+)\.revision-(?P<revision>\d+)(\.\d+)?$')
+
+
+class ConfigViewerPublisher(object):
+
+    def __init__(self, hosts_dir, revision):
+        self.hosts_dir = hosts_dir
+        self.revision = revision
+
+    def publish(self, host, new_directory, published_revision=None):
+        """ Renames new_directory to a directory of this revision and points
+            the symlink of the host to it. published_revision is the
+            revision of the currently published data of the host if known. """
+
+        revision_directory = self._get_unused_revision_directory(host, self.revision)
+        os.rename(new_directory, revision_directory)
+
+        host_path = join(self.hosts_dir, host)
+        if isdir(host_path) and not islink(host_path):
+            # data which has been published by moving it has to be moved aside once
+            os.rename(host_path, self._get_unused_revision_directory(host, published_revision or 0))
+
+        link_path = join(self.hosts_dir, '%s.link-%s' % (host, self.revision))
+        if lexists(link_path):
+            os.remove(link_path)
+        os.symlink(basename(revision_directory), link_path)
+        os.rename(link_path, host_path)
+
+    def discard(self, host, new_directory):
+        """ Leaves the removal of a directory which will not be published to
+            the garbage collection. """
+
+        os.rename(new_directory, self._get_unused_revision_directory(host, self.revision))
+
+    def remove_superseded_directories(self, hosts):
+        """ Removes the revision directories of the given hosts which are not
+            linked and not newer than the linked one. Directories of newer
+            revisions might be published by a concurrent build.
+
+            Returns the number of removed directories. """
+
+        linked_revisions = {}
+        removed_directories = 0
+
+        for name, host, revision in self._list_revision_directories(hosts):
+            if host not in linked_revisions:
+                linked_revisions[host] = self._get_linked_revision_directory(host)
+
+            linked_directory, linked_revision = linked_revisions[host]
+            if linked_directory is None or name == linked_directory or revision > linked_revision:
+                continue
+
+            LOGGER.debug('Removing superseded config viewer directory "%s"', name)
+            rmtree(join(self.hosts_dir, name))
+            removed_directories += 1
+
+        return removed_directories
+
+    def unpublish(self, host):
+        """ Removes the symlink of a deleted host. Its revision directories
+            are left to remove_unpublished_directories. """
+
+        os.remove(join(self.hosts_dir, host))
+
+    def remove_unpublished_directories(self, hosts):
+        """ Removes the revision directories of the given hosts which are not
+            published anymore, up to the revision of this publisher. A host
+            which has been published again by a concurrent build is left alone.
+
+            Returns the number of removed directories. """
+
+        removed_directories = 0
+
+        for name, host, revision in self._list_revision_directories(hosts):
+            if lexists(join(self.hosts_dir, host)) or revision > int(self.revision):
+                continue
+
+            LOGGER.debug('Removing config viewer directory "%s" of deleted host', name)
+            rmtree(join(self.hosts_dir, name))
+            removed_directories += 1
+
+        return removed_directories
+
+    def _list_revision_directories(self, hosts):
+        """ Returns a tuple (name, host, revision) for each revision directory of the given hosts. """
+
+        hosts = set(hosts)
+        revision_directories = []
+
+        for name in sorted(os.listdir(self.hosts_dir)):
+            match = REVISION_DIRECTORY_PATTERN.match(name)
+            if match and match.group('host') in hosts:
+                revision_directories.append((name, match.group('host'), int(match.group('revision'))))
+
+        return revision_directories
+
+    def _get_linked_revision_directory(self, host):
+        host_path = join(self.hosts_dir, host)
+        if not islink(host_path):
+            return None, None
+
+        linked_directory = basename(os.readlink(host_path))
+        match = REVISION_DIRECTORY_PATTERN.match(linked_directory)
+        if not match:
+            return None, None
+
+        return linked_directory, int(match.group('revision'))
+
+    def _get_unused_revision_directory(self, host, revision):
+        revision_directory = join(self.hosts_dir, '%s.revision-%s' % (host, revision))
+
+        suffix = 1
+        unused_revision_directory = revision_directory
+        while lexists(unused_revision_directory):
+            unused_revision_directory = '%s.%d' % (revision_directory, suffix)
+            suffix += 1
+
+        return unused_revision_directory
+
+
+class ConfigViewerGarbageCollector(Thread):
+    """ Removes the superseded config viewer directories of the given hosts
+        and all directories of the given deleted hosts. The thread is not a
+        daemon, so the process waits for it before exiting. """
+
+    def __init__(self, publisher, hosts, deleted_hosts=None):
+        Thread.__init__(self, name='ConfigViewerGarbageCollector')
+        self.publisher = publisher
+        self.hosts = hosts
+        self.deleted_hosts = deleted_hosts or []
+        self.removed_directories = 0
+
+    def run(self):
+        try:
+            if self.hosts:
+                self.removed_directories += self.publisher.remove_superseded_directories(self.hosts)
+            if self.deleted_hosts:
+                self.removed_directories += self.publisher.remove_unpublished_directories(self.deleted_hosts)
+            LOGGER.debug('Removed %d superseded config viewer directories.', self.removed_directories)
+
+        except Exception as exception:
+            LOGGER.error('Could not remove superseded config viewer directories: %s', str(exception))
@@ -0,0 +1,313 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    The build daemon keeps the configuration, the svn clients and their
+    pools between builds. Revisions are submitted via a small HTTP API on a
+    local port or a unix socket and the request returns the id of the job
+    right away, so the post-commit hook does not have to wait for the build.
+    The jobs are built one after another by a single worker thread, in the
+    order they have been submitted.
+
+        POST /jobs          (form parameter revision) submits a job
+        GET  /jobs          lists the known jobs
+        GET  /jobs/<id>     returns the status and the timings of a job
+"""
+
+import json
+import os
+import stat
+import traceback
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from logging import getLogger
+from os.path import exists
+from Queue import Queue
+from SocketServer import ThreadingMixIn, UnixStreamServer
+from threading import Lock, Thread
+from time import time
+from urlparse import parse_qs, urlparse
+
+from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+from config_rpm_maker.token.encoding import ENCODING_DETECTION_STATISTICS
+from config_rpm_maker.utilities.filecopy import FILE_COPY_STATISTICS
+from config_rpm_maker.utilities.profiler import EXECUTION_TIME_PROFILER
+from config_rpm_maker.version import __version__
+
+LOGGER = getLogger(__name__)
+
+JOB_STATUS_QUEUED = 'queued'
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_SUCCEEDED = 'succeeded'
+JOB_STATUS_FAILED = 'failed'
+
+JOBS_PATH = '/jobs'
+
+
+class BuildDaemonException(BaseConfigRpmMakerException):
+    error_info = "Build daemon error:\n"
+
+
+class BuildJob(object):
+    """ The build of one revision. The timestamps are seconds since the epoch,
+        execution_times contains the statistics of the measured functions. """
+
+    def __init__(self, job_id, revision):
+        self.job_id = job_id
+        self.revision = revision
+        self.status = JOB_STATUS_QUEUED
+        self.submitted_at = time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.execution_times = {}
+
+    def is_finished(self):
+        return self.status in (JOB_STATUS_SUCCEEDED, JOB_STATUS_FAILED)
+
+    def get_queue_time(self):
+        if self.started_at is None:
+            return time() - self.submitted_at
+
+        return self.started_at - self.submitted_at
+
+    def get_build_time(self):
+        if self.started_at is None:
+            return None
+
+        if self.finished_at is None:
+            return time() - self.started_at
+
+        return self.finished_at - self.started_at
+
+    def to_dict(self):
+        return {'id': self.job_id,
+                'revision': self.revision,
+                'status': self.status,
+                'submitted_at': self.submitted_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'queue_time': self.get_queue_time(),
+                'build_time': self.get_build_time(),
+                'error': self.error,
+                'execution_times': self.execution_times}
+
+
+class BuildDaemon(object):
+    """ Builds the submitted revisions by calling build_function(revision)
+        in a worker thread. Only the last job_history finished jobs are kept. """
+
+    def __init__(self, build_function, job_history=100):
+        self.build_function = build_function
+        self.job_history = job_history
+        self._job_queue = Queue()
+        self._jobs = {}
+        self._job_ids = []
+        self._next_job_id = 1
+        self._lock = Lock()
+        self._worker = None
+
+    def start(self):
+        self._worker = Thread(target=self._build_jobs_from_queue, name='BuildDaemon')
+        self._worker.daemon = True
+        self._worker.start()
+
+    def stop(self):
+        """ Waits for the running job to finish. Jobs which are still queued
+            will not be built. """
+
+        with self._job_queue.mutex:
+            pending_jobs = list(self._job_queue.queue)
+            self._job_queue.queue.clear()
+
+        for job in pending_jobs:
+            LOGGER.warn('Job %s for revision %s has not been built.', job.job_id, job.revision)
+
+        self._job_queue.put(None)
+        if self._worker is not None:
+            self._worker.join()
+
+    def submit(self, revision):
+        with self._lock:
+            job = BuildJob(str(self._next_job_id), revision)
+            self._next_job_id += 1
+            self._jobs[job.job_id] = job
+            self._job_ids.append(job.job_id)
+
+        LOGGER.info('Accepted job %s for revision %s.', job.job_id, revision)
+        self._job_queue.put(job)
+        return job
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_jobs(self):
+        with self._lock:
+            return [self._jobs[job_id] for job_id in self._job_ids]
+
+    def _build_jobs_from_queue(self):
+        while True:
+            job = self._job_queue.get()
+            if job is None:
+                break
+
+            self._build(job)
+
+            with self._lock:
+                self._forget_old_jobs()
+
+    def _build(self, job):
+        LOGGER.info('Starting job %s for revision %s after %.2fs in queue.',
+                    job.job_id, job.revision, job.get_queue_time())
+        EXECUTION_TIME_PROFILER.reset()
+        ENCODING_DETECTION_STATISTICS.reset()
+        FILE_COPY_STATISTICS.reset()
+        job.started_at = time()
+        job.status = JOB_STATUS_RUNNING
+
+        try:
+            self.build_function(job.revision)
+            job.status = JOB_STATUS_SUCCEEDED
+
+        except BaseConfigRpmMakerException as exception:
+            job.error = str(exception)
+            job.status = JOB_STATUS_FAILED
+
+        except Exception:
+            job.error = traceback.format_exc()
+            job.status = JOB_STATUS_FAILED
+
+        finally:
+            job.finished_at = time()
+            summary_by_function = EXECUTION_TIME_PROFILER.summarize_by_function()
+            job.execution_times = dict((function_name, statistics.to_dict())
+                                       for function_name, statistics in summary_by_function.iteritems())
+
+        LOGGER.info('Job %s for revision %s %s after %.2fs.', job.job_id, job.revision, job.status, job.get_build_time())
+
+    def _forget_old_jobs(self):
+        finished_job_ids = [job_id for job_id in self._job_ids if self._jobs[job_id].is_finished()]
+
+        for job_id in finished_job_ids[:max(0, len(finished_job_ids) - self.job_history)]:
+            del self._jobs[job_id]
+            self._job_ids.remove(job_id)
+
+
+class BuildDaemonRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'yadt-config-rpm-maker/%s' % __version__
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip('/')
+        build_daemon = self.server.build_daemon
+
+        if path == JOBS_PATH:
+            self._send_json(200, [job.to_dict() for job in build_daemon.get_jobs()])
+
+        elif path.startswith(JOBS_PATH + '/'):
+            job_id = path[len(JOBS_PATH) + 1:]
+            job = build_daemon.get_job(job_id)
+            if job is None:
+                self._send_json(404, {'error': 'Unknown job "%s".' % job_id})
+            else:
+                self._send_json(200, job.to_dict())
+
+        else:
+            self._send_json(404, {'error': 'Unknown path "%s".' % path})
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip('/')
+        if path != JOBS_PATH:
+            self._send_json(404, {'error': 'Unknown path "%s".' % path})
+            return
+
+        revision = self._read_parameters().get('revision', [''])[0]
+        if not revision.isdigit():
+            self._send_json(400, {'error': 'Given revision "%s" is not an integer.' % revision})
+            return
+
+        job = self.server.build_daemon.submit(revision)
+        self._send_json(202, job.to_dict(), location='%s/%s' % (JOBS_PATH, job.job_id))
+
+    def _read_parameters(self):
+        """ Returns the parameters of the query string and the form encoded body. """
+
+        parameters = parse_qs(urlparse(self.path).query)
+
+        content_length = int(self.headers.getheader('Content-Length') or 0)
+        if content_length:
+            parameters.update(parse_qs(self.rfile.read(content_length)))
+
+        return parameters
+
+    def _send_json(self, status_code, content, location=None):
+        body = json.dumps(content, indent=2, sort_keys=True) + '\n'
+
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if location:
+            self.send_header('Location', location)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, message_format, *args):
+        # client_address is empty for unix sockets, so the default implementation can not be used
+        LOGGER.debug('Build daemon request: %s', message_format % args)
+
+
+class BuildDaemonHTTPServer(ThreadingMixIn, HTTPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, server_address, build_daemon):
+        HTTPServer.__init__(self, server_address, BuildDaemonRequestHandler)
+        self.build_daemon = build_daemon
+
+
+class BuildDaemonUnixServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, build_daemon):
+        if exists(socket_path):
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise BuildDaemonException('Can not listen on "%s" since it is not a socket.' % socket_path)
+
+            LOGGER.debug('Removing socket "%s" of a former build daemon.', socket_path)
+            os.remove(socket_path)
+
+        UnixStreamServer.__init__(self, socket_path, BuildDaemonRequestHandler)
+        self.build_daemon = build_daemon
+
+    def server_close(self):
+        UnixStreamServer.server_close(self)
+        if exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def create_server(address, build_daemon):
+    """ Creates a server listening on the given address, which is either
+        "host:port" or the absolute path of a unix socket. """
+
+    if address.startswith('/'):
+        return BuildDaemonUnixServer(address, build_daemon)
+
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit():
+        raise BuildDaemonException('Invalid address "%s": expected "host:port" or the absolute path of a unix socket.'
+                                   % address)
+
+    return BuildDaemonHTTPServer((host, int(port)), build_daemon)
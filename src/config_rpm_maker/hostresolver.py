@@ -14,9 +14,23 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+"""
+    Resolves the host names of the hosts to build. ConfigRpmMaker resolves
+    all affected hosts up front using a few threads, so the build threads
+    only have to look up the results. Names found in a static hosts file
+    are not looked up at all, and the lookups can be kept in a cache file
+    for a configurable time.
+"""
+
+import json
+import os
 import socket
 
 from logging import getLogger
+from os.path import dirname, exists
+from Queue import Empty, Queue
+from threading import Lock, Thread
+from time import time
 
 from config_rpm_maker.utilities.logutils import verbose
 from config_rpm_maker.configuration.properties import unknown_hosts_are_allowed, get_custom_dns_search_list
@@ -24,8 +38,118 @@ from config_rpm_maker.configuration.properties import unknown_hosts_are_allowed,
 LOGGER = getLogger(__name__)
 
 
+def read_static_hosts_file(path):
+    """ Reads a file in the format of /etc/hosts and returns a dictionary
+        which maps each name to a tuple (ip, fqdn, aliases). """
+
+    static_hosts = {}
+    with open(path) as static_hosts_file:
+        for line in static_hosts_file:
+            fields = line.split('#', 1)[0].split()
+            if len(fields) < 2:
+                continue
+
+            result = (fields[0], fields[1], ' '.join(fields[2:]))
+            for name in fields[1:]:
+                static_hosts.setdefault(name, result)
+
+    return static_hosts
+
+
+class HostResolverCache(object):
+    """ A thread safe cache of lookups which expire after ttl seconds. The
+        cache is kept in a json file if a path is given. """
+
+    def __init__(self, path=None, ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = Lock()
+
+    def get(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+
+        if entry is None or time() - entry[0] >= self.ttl:
+            return None
+
+        return tuple(str(value) for value in entry[1:])
+
+    def put(self, name, result):
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[name] = [time()] + list(result)
+
+    def load(self):
+        if not self.path or not exists(self.path):
+            return
+
+        try:
+            with open(self.path) as cache_file:
+                entries = json.load(cache_file)
+
+        except (IOError, ValueError) as exception:
+            LOGGER.warn('Ignoring host resolver cache "%s": %s', self.path, str(exception))
+            return
+
+        with self._lock:
+            self._entries.update(entries)
+
+    def save(self):
+        """ Writes the entries which did not expire yet to the cache file. """
+
+        if not self.path:
+            return
+
+        now = time()
+        with self._lock:
+            entries = dict((name, entry) for name, entry in self._entries.iteritems() if now - entry[0] < self.ttl)
+
+        if dirname(self.path) and not exists(dirname(self.path)):
+            os.makedirs(dirname(self.path))
+
+        temporary_path = '%s.%d' % (self.path, os.getpid())
+        with open(temporary_path, 'w') as cache_file:
+            json.dump(entries, cache_file)
+        os.rename(temporary_path, self.path)
+
+
+class ResolvedHosts(object):
+    """ The results of resolving hosts up front. Looking up a host which
+        could not be resolved raises the error of its resolution again. """
+
+    def __init__(self, results=None):
+        self.results = results or {}
+
+    def __contains__(self, hostname):
+        return hostname in self.results
+
+    def __len__(self):
+        return len(self.results)
+
+    def lookup(self, hostname):
+        result = self.results[hostname]
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+
 class HostResolver(object):
 
+    STATIC = 'static hosts file'
+    CACHED = 'cache'
+    LOOKED_UP = 'looked up'
+
+    def __init__(self, static_hosts=None, cache=None, timeout=None):
+        self.static_hosts = static_hosts or {}
+        self.cache = cache
+        self.timeout = timeout
+        self._lock = Lock()
+        self.counters = {self.STATIC: 0, self.CACHED: 0, self.LOOKED_UP: 0}
+
     def resolve(self, hostname):
         dns_searchlist = get_custom_dns_search_list()
 
@@ -57,6 +181,96 @@ class HostResolver(object):
         verbose(LOGGER).debug('Could not resolve "%s" using default values %s', hostname, (ip, fqdn, aliases))
         return ip, fqdn, aliases
 
+    def resolve_all(self, hostnames, concurrency=1):
+        """ Resolves the given host names using at most concurrency threads
+            and returns the results as ResolvedHosts. """
+
+        hostname_queue = Queue()
+        for hostname in hostnames:
+            hostname_queue.put(hostname)
+
+        results = {}
+
+        def resolve_hostnames_from_queue():
+            while True:
+                try:
+                    hostname = hostname_queue.get(block=False)
+                except Empty:
+                    return
+
+                try:
+                    results[hostname] = self.resolve(hostname)
+                except Exception as exception:
+                    results[hostname] = exception
+
+        threads = [Thread(target=resolve_hostnames_from_queue, name='HostResolver-%d' % i)
+                   for i in range(min(concurrency, len(hostnames)))]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return ResolvedHosts(results)
+
+    def log_summary(self, logging_function):
+        with self._lock:
+            logging_function('Host resolution: %s',
+                             ', '.join('%s %s time(s)' % (name, count) for name, count in sorted(self.counters.iteritems())))
+
+    def _count(self, counter_name):
+        with self._lock:
+            self.counters[counter_name] += 1
+
     def _resolve(self, hostname):
+        if hostname in self.static_hosts:
+            self._count(self.STATIC)
+            return self.static_hosts[hostname]
+
+        if self.cache is not None:
+            result = self.cache.get(hostname)
+            if result is not None:
+                self._count(self.CACHED)
+                return result
+
+        self._count(self.LOOKED_UP)
+        result = self._lookup(hostname)
+
+        if self.cache is not None:
+            self.cache.put(hostname, result)
+
+        return result
+
+    def _lookup(self, hostname):
+        """ gethostbyname_ex can not be interrupted, so a lookup which takes
+            longer than the timeout is left behind in a daemon thread. """
+
+        if not self.timeout:
+            return self._gethostbyname_ex(hostname)
+
+        outcome = []
+
+        def lookup():
+            try:
+                outcome.append((True, self._gethostbyname_ex(hostname)))
+            except Exception as exception:
+                outcome.append((False, exception))
+
+        lookup_thread = Thread(target=lookup, name='HostLookup-%s' % hostname)
+        lookup_thread.daemon = True
+        lookup_thread.start()
+        lookup_thread.join(self.timeout)
+
+        if not outcome:
+            raise Exception('Lookup of "%s" timed out after %s second(s)' % (hostname, self.timeout))
+
+        succeeded, result = outcome[0]
+        if not succeeded:
+            raise result
+
+        return result
+
+    def _gethostbyname_ex(self, hostname):
         host, aliaslist, ipaddrlist = socket.gethostbyname_ex(hostname)
         return ipaddrlist[0], host, ' '.join(aliaslist)
@@ -27,20 +27,33 @@ from shutil import rmtree
 from subprocess import PIPE, Popen
 
 from config_rpm_maker import configuration
-from config_rpm_maker.configuration.properties import (is_no_clean_up_enabled,
+from config_rpm_maker.configuration.properties import (get_build_cache_directory,
+                                                       get_build_cache_policy,
+                                                       is_no_clean_up_enabled,
                                                        get_log_level,
                                                        get_repo_packages_regex,
                                                        get_config_rpm_prefix,
                                                        is_config_viewer_only_enabled,
-                                                       get_path_to_spec_file)
+                                                       get_path_to_spec_file,
+                                                       get_rpm_build_backend,
+                                                       is_rpmbuild_direct_buildroot_enabled,
+                                                       is_source_rpm_build_enabled)
 from config_rpm_maker.svnservice import SvnServiceException
-from config_rpm_maker.configuration import build_config_viewer_host_directory
+from config_rpm_maker.buildcache import REVISION_ONLY_VARIABLES, BuildCache, calculate_digest
+from config_rpm_maker.configuration import (BUILD_CACHE_POLICY_ALWAYS,
+                                            BUILD_CACHE_POLICY_SKIP,
+                                            RPM_BUILD_BACKEND_NATIVE,
+                                            build_config_viewer_host_directory)
 from config_rpm_maker.dependency import Dependency
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
 from config_rpm_maker.hostresolver import HostResolver
+from config_rpm_maker.nativerpm.builder import NativeRpmBuilder
+from config_rpm_maker.nativerpm.buildroot import prepare_build_root
+from config_rpm_maker.nativerpm.specfile import UnsupportedSpecFileException
 from config_rpm_maker.utilities.logutils import verbose
-from config_rpm_maker.segment import OVERLAY_ORDER, ALL_SEGEMENTS
+from config_rpm_maker.segment import OVERLAY_ORDER, ALL_SEGEMENTS, Host
 from config_rpm_maker.token.tokenreplacer import TokenReplacer
+from config_rpm_maker.utilities.filecopy import create_file_copier
 from config_rpm_maker.utilities.profiler import measure_execution_time
 
 
@@ -63,8 +76,14 @@ class CouldNotTarConfigurationDirectoryException(BaseConfigRpmMakerException):
     error_info = "Could not tar configuration directory: "
 
 
+def configviewer_token_replacer(token, replacement):
+    filtered_replacement = replacement.rstrip()
+    return '<strong title="%s">%s</strong>' % (token, filtered_replacement)
+
+
 class HostRpmBuilder(object):
-    def __init__(self, thread_name, hostname, revision, work_dir, svn_service_queue, error_logging_handler=None):
+    def __init__(self, thread_name, hostname, revision, work_dir, svn_service_queue, error_logging_handler=None,
+                 segment_export_cache=None, resolved_hosts=None, rpm_builder=None):
         self.thread_name = thread_name
         self.hostname = hostname
         self.revision = revision
@@ -74,6 +93,9 @@ class HostRpmBuilder(object):
         self.error_file_path = os.path.join(self.work_dir, self.hostname + '.error')
         self.logger = self._create_logger()
         self.svn_service_queue = svn_service_queue
+        self.segment_export_cache = segment_export_cache
+        self.resolved_hosts = resolved_hosts
+        self.rpm_builder = rpm_builder
         self.config_rpm_prefix = get_config_rpm_prefix()
         self.host_config_dir = os.path.join(self.work_dir, self.config_rpm_prefix + self.hostname)
         self.variables_dir = os.path.join(self.host_config_dir, 'VARIABLES')
@@ -82,7 +104,9 @@ class HostRpmBuilder(object):
         self.spec_file_path = os.path.join(self.host_config_dir, self.config_rpm_prefix + self.hostname + '.spec')
         self.config_viewer_host_dir = build_config_viewer_host_directory(hostname, revision=self.revision)
         self.rpm_build_dir = os.path.join(self.work_dir, 'rpmbuild')
+        self.rpm_output_dir = os.path.join(self.rpm_build_dir, 'hosts', self.hostname)
 
+    @measure_execution_time
     def build(self):
         LOGGER.info('%s: building configuration rpm(s) for host "%s"', self.thread_name, self.hostname)
         self.logger.info("Building config rpm for host %s revision %s", self.hostname, self.revision)
@@ -127,13 +151,12 @@ class HostRpmBuilder(object):
         self._save_segment_variables(
             do_not_write_host_segment_variable=self.is_a_group_rpm)
 
+        token_replacer = None
         if self.is_a_group_rpm:
-            # Do some preliminary token filtering so that the RPM_NAME is expanded
+            # Resolve the variables once so that the RPM_NAME is expanded
             try:
-                TokenReplacer.filter_directory(os.path.dirname(self.variables_dir),
-                                               self.variables_dir,
-                                               thread_name=self.thread_name,
-                                               skip=False)
+                token_replacer = TokenReplacer.from_directory(self.variables_dir)
+                token_replacer.filter_file(rpm_name_variable_file)
             except Exception as e:
                 LOGGER.warning("Problem during preliminary filtering of "
                                "variables for group {0}: {1}".format(self.hostname, e))
@@ -165,21 +188,28 @@ class HostRpmBuilder(object):
 
         self._save_network_variables()
 
+        build_digest = self._calculate_build_digest()
+
         patch_info = self._generate_patch_info()
 
-        self._copy_files_for_config_viewer()
+        self._prepare_config_viewer_host_dir()
 
         # write patch info into variable and config viewer
         self._write_file(os.path.join(self.variables_dir, 'VARIABLES'), patch_info)
         self._write_file(os.path.join(self.config_viewer_host_dir, self.hostname + '.variables'), patch_info)
 
-        self._filter_tokens_in_rpm_sources()
+        self._filter_tokens_in_rpm_sources_and_config_viewer(token_replacer)
 
         if not is_config_viewer_only_enabled():
-            self._build_rpm_using_rpmbuild()
+            self._prepare_rpm_output_dir()
+            if not self._reuse_cached_rpms(build_digest):
+                if self.rpm_builder is not None:
+                    self._build_rpm_using_rpm_builder()
+                elif get_rpm_build_backend() != RPM_BUILD_BACKEND_NATIVE or not self._build_rpm_natively():
+                    self._build_rpm_using_rpmbuild()
+                self._stage_rpms_in_build_cache(build_digest)
 
         LOGGER.debug('%s: writing configviewer data for host "%s"', self.thread_name, self.hostname)
-        self._filter_tokens_in_config_viewer()
         self._write_revision_file_for_config_viewer()
         self._write_overlaying_for_config_viewer(overall_exported)
 
@@ -188,6 +218,7 @@ class HostRpmBuilder(object):
 
         return self._find_rpms()
 
+    @measure_execution_time
     def _clean_up(self):
         if is_no_clean_up_enabled():
             verbose(LOGGER).debug('Not cleaning up anything for host "%s"', self.hostname)
@@ -200,52 +231,176 @@ class HostRpmBuilder(object):
         remove(self.output_file_path)
         remove(self.error_file_path)
 
-    def _filter_tokens_in_config_viewer(self):
-
-        def configviewer_token_replacer(token, replacement):
-            filtered_replacement = replacement.rstrip()
-            return '<strong title="%s">%s</strong>' % (token, filtered_replacement)
-
-        token_replacer = TokenReplacer.filter_directory(self.config_viewer_host_dir,
-                                                        self.variables_dir,
-                                                        html_escape=True,
-                                                        replacer_function=configviewer_token_replacer,
-                                                        thread_name=self.thread_name)
-        tokens_unused = set(token_replacer.token_values.keys()) - token_replacer.token_used
+    @measure_execution_time
+    def _filter_tokens_in_rpm_sources_and_config_viewer(self, token_replacer=None):
+        """ Resolves the variables once and reads every file only once to
+            write the filtered rpm sources and the html escaped config viewer
+            copies. The token_replacer which expanded the RPM_NAME of a group
+            rpm is reused. """
+
+        if token_replacer is None:
+            token_replacer = TokenReplacer.from_directory(self.variables_dir)
+        else:
+            # the variables written after RPM_NAME has been expanded
+            token_replacer.add_token_values_from_directory(self.variables_dir)
+        config_viewer_token_replacer = token_replacer.with_replacer_function(configviewer_token_replacer)
+
+        # rpmbuild post-processes the files of a direct build root in place
+        file_copier = create_file_copier(allow_hardlinks=not is_rpmbuild_direct_buildroot_enabled())
+
+        token_replacer.filter_directory_with_config_viewer_copy(self.host_config_dir,
+                                                                self.config_viewer_host_dir,
+                                                                config_viewer_token_replacer,
+                                                                thread_name=self.thread_name,
+                                                                file_copier=file_copier)
+
+        # the patch info in variable VARIABLES is written to <hostname>.variables
+        token_replacer.filter_directory_with_config_viewer_copy(self.variables_dir,
+                                                                os.path.join(self.config_viewer_host_dir, 'VARIABLES'),
+                                                                config_viewer_token_replacer,
+                                                                filter_in_place=False,
+                                                                ignored_names=('VARIABLES',),
+                                                                thread_name=self.thread_name,
+                                                                file_copier=file_copier)
+
+        config_viewer_token_replacer.filter_file(os.path.join(self.config_viewer_host_dir, self.hostname + '.variables'),
+                                                 html_escape=True)
+
+        tokens_unused = set(config_viewer_token_replacer.token_values.keys()) - config_viewer_token_replacer.token_used
         path_to_unused_variables = os.path.join(self.config_viewer_host_dir, 'unused_variables.txt')
         self._write_file(path_to_unused_variables, '\n'.join(sorted(tokens_unused)))
-        token_replacer.filter_file(path_to_unused_variables, html_escape=True)
+        config_viewer_token_replacer.filter_file(path_to_unused_variables, html_escape=True)
 
     def _write_revision_file_for_config_viewer(self):
         revision_file_path = os.path.join(self.config_viewer_host_dir, self.hostname + '.rev')
         self._write_file(revision_file_path, self.revision)
 
+    @measure_execution_time
+    def _calculate_build_digest(self):
+        """ Returns the digest of everything the rpms will be built from, or
+            None if the build cache is not used. Has to be called before the
+            tokens are filtered, since the filtered files contain the revision. """
+
+        if get_build_cache_policy() == BUILD_CACHE_POLICY_ALWAYS or is_config_viewer_only_enabled():
+            return None
+
+        settings = (get_rpm_build_backend(), is_rpmbuild_direct_buildroot_enabled(), is_source_rpm_build_enabled())
+        return calculate_digest([self.host_config_dir, self.variables_dir],
+                                ignored_names=REVISION_ONLY_VARIABLES,
+                                settings=settings)
+
+    @measure_execution_time
+    def _reuse_cached_rpms(self, build_digest):
+        """ Returns True if the rpms of the last build can be used since the
+            digest did not change. Depending on the build cache policy the
+            cached rpms are linked into the rpm output directory or no rpms
+            are returned at all for this host. """
+
+        if build_digest is None:
+            return False
+
+        build_cache = BuildCache(get_build_cache_directory())
+        if not build_cache.is_unchanged(self.hostname, build_digest):
+            return False
+
+        if get_build_cache_policy() == BUILD_CACHE_POLICY_SKIP:
+            LOGGER.info('%s: skipping rpm build for host "%s" since nothing changed', self.thread_name, self.hostname)
+            self.logger.info('Skipping rpm build since digest %s did not change', build_digest)
+            return True
+
+        rpms = build_cache.link_rpms(self.hostname, self.rpm_output_dir)
+        if not rpms:
+            return False
+
+        LOGGER.info('%s: reusing rpm(s) of last build for host "%s" since nothing changed', self.thread_name, self.hostname)
+        self.logger.info('Reusing rpms %s since digest %s did not change', ', '.join(rpms), build_digest)
+        return True
+
+    @measure_execution_time
+    def _stage_rpms_in_build_cache(self, build_digest):
+        if build_digest is None:
+            return
+
+        BuildCache(get_build_cache_directory()).stage(self.hostname, self.revision, build_digest,
+                                                      self.rpm_output_dir, self._find_rpms())
+
+    def _prepare_rpm_output_dir(self):
+        for name in ['RPMS/noarch', 'RPMS/x86_64', 'SRPMS']:
+            path = os.path.join(self.rpm_output_dir, name)
+            if not exists(path):
+                os.makedirs(path)
+
     def _find_rpms(self):
+        """ Returns the rpms in the output directory of this host. Since
+            every host has its own output directory, no other host's rpms
+            can be found here. """
+
         result = []
-        for root, dirs, files in os.walk(os.path.join(self.rpm_build_dir, 'RPMS')):
-            for filename in files:
-                if filename.startswith(self.config_rpm_prefix + self.rpm_name) and filename.endswith('.rpm'):
-                    result.append(os.path.join(root, filename))
-        for root, dirs, files in os.walk(os.path.join(self.rpm_build_dir, 'SRPMS')):
+        for root, dirs, files in os.walk(self.rpm_output_dir):
             for filename in files:
-                if filename.startswith(self.config_rpm_prefix + self.rpm_name) and filename.endswith('.rpm'):
+                if filename.endswith('.rpm'):
                     result.append(os.path.join(root, filename))
-        return result
+        return sorted(result)
 
     @measure_execution_time
-    def _build_rpm_using_rpmbuild(self):
-        tar_path = self._tar_sources()
+    def _build_rpm_natively(self):
+        """ Writes the rpms without calling rpmbuild. Returns False if the
+            spec file can not be handled, rpmbuild has to be used then. """
+
+        native_rpm_builder = NativeRpmBuilder(spec_file_path=self.spec_file_path,
+                                              build_root=self.host_config_dir,
+                                              rpms_dir=os.path.join(self.rpm_output_dir, 'RPMS'))
+        try:
+            rpms = native_rpm_builder.build()
+        except UnsupportedSpecFileException as exception:
+            LOGGER.warning('%s: falling back to rpmbuild for host "%s": %s', self.thread_name, self.hostname, exception)
+            self.logger.warning('Falling back to rpmbuild: %s', exception)
+            return False
 
+        self.logger.info('Wrote rpms %s', ', '.join(rpms))
+        return True
+
+    @measure_execution_time
+    def _build_rpm_using_rpm_builder(self):
+        """ Builds the rpms using the given rpm builder (e.g. a StubRpmBuilder). """
+
+        rpms = self.rpm_builder.build(rpm_name=self.config_rpm_prefix + self.rpm_name,
+                                      revision=self.revision,
+                                      rpms_dir=os.path.join(self.rpm_output_dir, 'RPMS'))
+        self.logger.info('Wrote rpms %s', ', '.join(rpms))
+
+    @measure_execution_time
+    def _build_rpm_using_rpmbuild(self):
         working_environment = environ.copy()
         working_environment['HOME'] = abspath(self.work_dir)
         absolute_rpm_build_path = abspath(self.rpm_build_dir)
+        absolute_rpm_output_path = abspath(self.rpm_output_dir)
+        output_options = "--define '_rpmdir %s/RPMS' --define '_srcrpmdir %s/SRPMS'" % (
+            absolute_rpm_output_path, absolute_rpm_output_path)
+
+        build_root_spec_file_path = None
+        if is_rpmbuild_direct_buildroot_enabled():
+            build_root_spec_file_path = self._prepare_build_root()
+
+        if build_root_spec_file_path:
+            # the build root is the host configuration directory, which is removed by _clean_up
+            rpmbuild_cmd = ("rpmbuild -bb --define '_topdir %s' %s --define '_builddir %s' "
+                            "--define '__spec_clean_body %%{nil}' --buildroot %s %s") % (
+                absolute_rpm_build_path, output_options, abspath(os.path.dirname(build_root_spec_file_path)),
+                abspath(self.host_config_dir), abspath(build_root_spec_file_path))
+        else:
+            tar_path = self._tar_sources()
 
-        clean_option = "--clean"
-        if is_no_clean_up_enabled():
-            clean_option = ""
+            clean_option = "--clean"
+            if is_no_clean_up_enabled():
+                clean_option = ""
 
-        rpmbuild_cmd = "rpmbuild %s --define '_topdir %s' -ta %s" % (
-            clean_option, absolute_rpm_build_path, tar_path)
+            build_option = "-ta"
+            if not is_source_rpm_build_enabled():
+                build_option = "-tb"
+
+            rpmbuild_cmd = "rpmbuild %s --define '_topdir %s' %s %s %s" % (
+                clean_option, absolute_rpm_build_path, output_options, build_option, tar_path)
 
         LOGGER.debug('%s: building rpms by executing "%s"', self.thread_name, rpmbuild_cmd)
         self.logger.info("Executing '%s' ...", rpmbuild_cmd)
@@ -267,6 +422,20 @@ class HostRpmBuilder(object):
                 'Could not build RPM for host "%s": stdout="%s", stderr="%s"' % (
                     self.hostname, stdout.strip(), stderr.strip()))
 
+    @measure_execution_time
+    def _prepare_build_root(self):
+        """ Prepares the host configuration directory as build root for
+            "rpmbuild -bb". Returns the path of the spec file to build or
+            None if the spec file does not support this, the sources have to
+            be tarred then. """
+
+        build_dir = os.path.join(self.rpm_build_dir, 'BUILD', self.hostname)
+        try:
+            return prepare_build_root(self.spec_file_path, self.host_config_dir, build_dir)
+        except UnsupportedSpecFileException as exception:
+            LOGGER.warning('%s: building rpms of host "%s" from tarball: %s', self.thread_name, self.hostname, exception)
+            return None
+
     @measure_execution_time
     def _tar_sources(self):
         if self.is_a_group_rpm:
@@ -295,16 +464,11 @@ class HostRpmBuilder(object):
         return output_file
 
     @measure_execution_time
-    def _filter_tokens_in_rpm_sources(self):
-        TokenReplacer.filter_directory(self.host_config_dir, self.variables_dir, thread_name=self.thread_name)
-
-    @measure_execution_time
-    def _copy_files_for_config_viewer(self):
+    def _prepare_config_viewer_host_dir(self):
         if os.path.exists(self.config_viewer_host_dir):
             shutil.rmtree(self.config_viewer_host_dir)
 
-        shutil.copytree(self.host_config_dir, self.config_viewer_host_dir, symlinks=True)
-        shutil.copytree(self.variables_dir, os.path.join(self.config_viewer_host_dir, 'VARIABLES'))
+        os.makedirs(self.config_viewer_host_dir)
 
     def _generate_patch_info(self):
         name_filter = lambda name: name not in ('SVNLOG', 'OVERLAYING')
@@ -319,7 +483,10 @@ class HostRpmBuilder(object):
 
     @measure_execution_time
     def _save_network_variables(self):
-        ip, fqdn, aliases = HostResolver().resolve(self.hostname)
+        if self.resolved_hosts is not None and self.hostname in self.resolved_hosts:
+            ip, fqdn, aliases = self.resolved_hosts.lookup(self.hostname)
+        else:
+            ip, fqdn, aliases = HostResolver().resolve(self.hostname)
         self._write_file(os.path.join(self.variables_dir, 'IP'), ip)
         self._write_file(os.path.join(self.variables_dir, 'FQDN'), fqdn)
         self._write_file(os.path.join(self.variables_dir, 'ALIASES'), aliases)
@@ -346,6 +513,7 @@ class HostRpmBuilder(object):
         shutil.move(self.variables_dir, new_var_dir)
         self.variables_dir = new_var_dir
 
+    @measure_execution_time
     def _save_log_entries_to_variable(self, svn_paths):
         svn_service = self._get_next_svn_service_from_queue()
         try:
@@ -370,6 +538,7 @@ class HostRpmBuilder(object):
         content = "\n".join(lines)
         self._write_file(os.path.join(self.variables_dir, 'OVERLAYING'), content)
 
+    @measure_execution_time
     def _write_overlaying_for_config_viewer(self, exported_dict):
         overlaying = {}
         for segment in OVERLAY_ORDER:
@@ -398,40 +567,48 @@ Change set:
          "\n   ".join([path['action'] + ' ' + path['path'] for path in log['changed_paths']]),
          log['message'])
 
+    @measure_execution_time
     def _export_spec_file(self):
         svn_service = self._get_next_svn_service_from_queue()
         try:
-            svn_service.export(get_path_to_spec_file(), self.spec_file_path, self.revision)
+            spec_file_content = svn_service.get_file_content(get_path_to_spec_file(), self.revision)
         finally:
             self.svn_service_queue.put(svn_service)
 
+        self._write_file(self.spec_file_path, spec_file_content)
+
     @measure_execution_time
     def _get_next_svn_service_from_queue(self):
         return self.svn_service_queue.get()
 
+    @measure_execution_time
     def _overlay_segment(self, segment):
         requires = []
         provides = []
         svn_base_paths = []
         exported_paths = []
         for svn_path in segment.get_svn_paths(self.hostname):
-            svn_service = self._get_next_svn_service_from_queue()
             try:
-                new_exported_paths = svn_service.export(svn_path, self.host_config_dir, self.revision)
-                exported_paths += new_exported_paths
-
+                exported_paths += self._export_segment_path(segment, svn_path)
             except ClientError:
                 pass
 
-            finally:
-                self.svn_service_queue.put(svn_service)
-
             svn_base_paths.append(svn_path)
             requires += self._parse_dependency_file(self.rpm_requires_path)
             provides += self._parse_dependency_file(self.rpm_provides_path)
 
         return svn_base_paths, exported_paths, requires, provides
 
+    def _export_segment_path(self, segment, svn_path):
+        if self.segment_export_cache and not isinstance(segment, Host):
+            return self.segment_export_cache.overlay(svn_path, self.host_config_dir)
+
+        svn_service = self._get_next_svn_service_from_queue()
+        try:
+            return svn_service.export(svn_path, self.host_config_dir, self.revision)
+        finally:
+            self.svn_service_queue.put(svn_service)
+
     def _parse_dependency_file(self, path):
         if os.path.exists(path):
             content = self._get_content(path)
@@ -439,6 +616,7 @@ Change set:
 
         return []
 
+    @measure_execution_time
     def _write_dependency_file(self, dependencies, file_path, accumulate_duplicates=True, filter_regex='.*',
                                positive_filter=True):
         dep = Dependency(accumulate_dependencies=accumulate_duplicates, filter_regex=filter_regex,
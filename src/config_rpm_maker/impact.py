@@ -0,0 +1,149 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    A changed path below a segment svn path of a host (e.g. "all/etc/motd")
+    does not change the rpm of the host if a segment with a higher priority
+    in the overlay order (e.g. "host/devweb01/etc/motd") provides the same
+    file, since that file wins when the segments are overlaid.
+
+    The ImpactAnalyzer lists the files of all segments in the revision once
+    and determines for each host whether the winning source of any changed
+    file actually changed.
+"""
+
+from logging import getLogger
+
+from config_rpm_maker.segment import OVERLAY_ORDER, SvnPathIndex
+from config_rpm_maker.utilities.profiler import measure_execution_time
+
+LOGGER = getLogger(__name__)
+
+# these variables are read after each segment has been overlaid and
+# accumulated, so they can not be overridden by another segment
+ACCUMULATED_VARIABLES = ('VARIABLES/RPM_REQUIRES', 'VARIABLES/RPM_PROVIDES')
+
+
+class HostImpact(object):
+
+    def __init__(self, host, affected, reason):
+        self.host = host
+        self.affected = affected
+        self.reason = reason
+
+    def __str__(self):
+        state = 'affected' if self.affected else 'not affected'
+        return '%s %s: %s' % (self.host, state, self.reason)
+
+
+class ImpactAnalyzer(object):
+
+    def __init__(self, svn_service, revision, segments=None):
+        self.svn_service = svn_service
+        self.revision = revision
+        self.segments = segments if segments is not None else OVERLAY_ORDER
+        self._hosts = []
+        self._files_by_svn_path = None
+
+    def find_hosts(self, changed_paths, hosts):
+        """ Returns the set of hosts whose overlaid configuration is changed
+            by the given changed paths. """
+
+        return set(impact.host for impact in self.analyze(changed_paths, hosts) if impact.affected)
+
+    @measure_execution_time
+    def analyze(self, changed_paths, hosts):
+        """ Returns a HostImpact for each host which has a segment svn path
+            the changed paths start with. The list is sorted by host. """
+
+        self._hosts = hosts
+        svn_path_index = SvnPathIndex(hosts, segments=self.segments)
+
+        changed_paths_by_host = {}
+        for changed_path in changed_paths:
+            for svn_path in svn_path_index.find_svn_paths(changed_path):
+                for host in svn_path_index.hosts_by_svn_path[svn_path]:
+                    changed_paths_by_host.setdefault(host, []).append((svn_path, changed_path))
+
+        return [self._analyze_host(host, changed_paths_by_host[host]) for host in sorted(changed_paths_by_host)]
+
+    def _analyze_host(self, host, changes):
+        svn_paths = [svn_path for segment in self.segments for svn_path in segment.get_svn_paths(host)]
+        overridden = []
+
+        for svn_path, changed_path in changes:
+            relative_path = changed_path[len(svn_path):]
+
+            if not relative_path:
+                return HostImpact(host, True, '"%s" has been changed' % svn_path)
+
+            if not relative_path.startswith('/'):
+                # e.g. "typ/webserver/file" starts with the svn path "typ/web"
+                continue
+
+            relative_path = relative_path.lstrip('/')
+            if relative_path in ACCUMULATED_VARIABLES:
+                return HostImpact(host, True, '"%s" is accumulated from all segments' % changed_path)
+
+            overriding_svn_path = self._find_overriding_svn_path(relative_path, svn_paths[svn_paths.index(svn_path) + 1:])
+            if overriding_svn_path is None:
+                return HostImpact(host, True, '"%s" is used' % changed_path)
+
+            overridden.append('"%s" is overridden by "%s"' % (changed_path, overriding_svn_path))
+
+        if not overridden:
+            return HostImpact(host, False, 'no changed path belongs to a segment of the host')
+
+        return HostImpact(host, False, ', '.join(overridden))
+
+    def _find_overriding_svn_path(self, relative_path, svn_paths_with_higher_priority):
+        """ Returns the svn path with the highest priority which provides the
+            file at the relative path, or None if no svn path provides it. """
+
+        for svn_path in reversed(svn_paths_with_higher_priority):
+            if relative_path in self._get_files(svn_path):
+                return svn_path
+
+        return None
+
+    def _get_files(self, svn_path):
+        if self._files_by_svn_path is None:
+            self._files_by_svn_path = self._list_segments()
+
+        return self._files_by_svn_path.get(svn_path, ())
+
+    def _list_segments(self):
+        """ Lists each segment directory (e.g. "typ") only once, instead of
+            listing the svn path of each host (e.g. "typ/web") separately. """
+
+        files_by_svn_path = {}
+
+        for segment in self.segments:
+            prefix = segment.get_svn_prefix()
+            if prefix:
+                listed_paths = [prefix.rstrip('/')]
+            else:
+                listed_paths = set(svn_path for host in self._hosts for svn_path in segment.get_svn_paths(host))
+
+            depth = prefix.count('/') + 1
+            for listed_path in listed_paths:
+                for path in self.svn_service.get_files(listed_path, self.revision):
+                    parts = path.split('/')
+                    svn_path = '/'.join(parts[:depth])
+                    files_by_svn_path.setdefault(svn_path, set()).add('/'.join(parts[depth:]))
+
+        LOGGER.debug('Listed files of %d segment svn path(s) in revision %s', len(files_by_svn_path), self.revision)
+        return files_by_svn_path
@@ -0,0 +1,324 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Builds binary config rpms without calling rpmbuild. The build root is
+    the filtered host configuration directory, the spec file is only used
+    for the package metadata (name, version, dependencies, descriptions and
+    scriptlets). The files of the packages are determined like the %install
+    section of the default spec file does it:
+
+        - the main package contains all files except those in /etc/yum.repos.d
+          and the spec file itself (file list "files.lst")
+        - the optional subpackage contains the files in /etc/yum.repos.d
+          (file list "files-repos.lst")
+
+    Spec files which use other file lists are not supported, an
+    UnsupportedSpecFileException is raised and the caller can fall back to
+    rpmbuild. Automatic dependencies are not generated.
+"""
+
+import gzip
+import hashlib
+import os
+import socket
+import stat
+import time
+
+from cStringIO import StringIO
+from grp import getgrgid
+from pwd import getpwuid
+
+from config_rpm_maker.nativerpm import header as rpmheader
+from config_rpm_maker.nativerpm.cpio import CpioWriter
+from config_rpm_maker.nativerpm.filelist import (FILE_TYPE_DIRECTORY,
+                                                 FILE_TYPE_SYMLINK,
+                                                 create_file_entries,
+                                                 get_file_lists)
+from config_rpm_maker.nativerpm.header import Header, create_lead
+from config_rpm_maker.nativerpm.specfile import (RPMSENSE_EQUAL,
+                                                 RPMSENSE_LESS,
+                                                 RPMSENSE_SCRIPT_POST,
+                                                 RPMSENSE_SCRIPT_POSTUN,
+                                                 RPMSENSE_SCRIPT_PRE,
+                                                 RPMSENSE_SCRIPT_PREUN,
+                                                 Dependency,
+                                                 SpecFile)
+
+RPMSENSE_INTERP = 1 << 8
+RPMSENSE_RPMLIB = 1 << 24
+
+RPMLIB_REQUIREMENTS = (('rpmlib(CompressedFileNames)', '3.0.4-1'),
+                       ('rpmlib(FileDigests)', '4.6.0-1'),
+                       ('rpmlib(PayloadFilesHavePrefix)', '4.0-1'))
+
+PGPHASHALGO_SHA256 = 8
+
+SCRIPTLET_TAGS = {'pre': (rpmheader.RPMTAG_PREIN, rpmheader.RPMTAG_PREINPROG, RPMSENSE_SCRIPT_PRE),
+                  'post': (rpmheader.RPMTAG_POSTIN, rpmheader.RPMTAG_POSTINPROG, RPMSENSE_SCRIPT_POST),
+                  'preun': (rpmheader.RPMTAG_PREUN, rpmheader.RPMTAG_PREUNPROG, RPMSENSE_SCRIPT_PREUN),
+                  'postun': (rpmheader.RPMTAG_POSTUN, rpmheader.RPMTAG_POSTUNPROG, RPMSENSE_SCRIPT_POSTUN)}
+
+STRING_TAGS = {'license': rpmheader.RPMTAG_LICENSE,
+               'url': rpmheader.RPMTAG_URL,
+               'vendor': rpmheader.RPMTAG_VENDOR,
+               'packager': rpmheader.RPMTAG_PACKAGER}
+
+DEPENDENCY_TAGS = {'provides': (rpmheader.RPMTAG_PROVIDENAME, rpmheader.RPMTAG_PROVIDEFLAGS, rpmheader.RPMTAG_PROVIDEVERSION),
+                   'requires': (rpmheader.RPMTAG_REQUIRENAME, rpmheader.RPMTAG_REQUIREFLAGS, rpmheader.RPMTAG_REQUIREVERSION),
+                   'conflicts': (rpmheader.RPMTAG_CONFLICTNAME, rpmheader.RPMTAG_CONFLICTFLAGS, rpmheader.RPMTAG_CONFLICTVERSION),
+                   'obsoletes': (rpmheader.RPMTAG_OBSOLETENAME, rpmheader.RPMTAG_OBSOLETEFLAGS, rpmheader.RPMTAG_OBSOLETEVERSION)}
+
+
+class PackagedFile(object):
+    """ A file entry together with everything which is needed for the
+        rpm header and the payload. """
+
+    def __init__(self, entry, mode, size, mtime, user, group, content, digest):
+        self.path = entry.path
+        self.link_target = entry.link_target or ''
+        self.verify_flags = entry.verify_flags
+        self.mode = mode
+        self.size = size
+        self.mtime = mtime
+        self.user = user
+        self.group = group
+        self.content = content
+        self.digest = digest
+
+
+class NativeRpmBuilder(object):
+
+    def __init__(self, spec_file_path, build_root, rpms_dir, build_time=None, build_host=None):
+        self.spec_file_path = spec_file_path
+        self.build_root = build_root
+        self.rpms_dir = rpms_dir
+        self.build_time = int(build_time if build_time is not None else time.time())
+        self.build_host = build_host or socket.gethostname()
+
+    def build(self):
+        """ Writes the binary rpms and returns their paths. """
+
+        with open(self.spec_file_path) as spec_file:
+            spec = SpecFile.parse(spec_file.read())
+
+        file_lists = get_file_lists(spec, self.build_root)
+        output_dir = os.path.join(self.rpms_dir, 'noarch')
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+
+        source_rpm = '%s-%s-%s.src.rpm' % (spec.main_package.name, spec.main_package.version, spec.main_package.release)
+        rpm_paths = []
+        for package, paths in file_lists:
+            rpm_path = os.path.join(output_dir, '%s-%s-%s.noarch.rpm' % (package.name, package.version, package.release))
+            files = [self._create_packaged_file(entry) for entry in create_file_entries(self.build_root, paths)]
+            self._write_rpm(rpm_path, package, files, source_rpm)
+            rpm_paths.append(rpm_path)
+
+        return rpm_paths
+
+    def _create_packaged_file(self, entry):
+        path = os.path.join(self.build_root, entry.path.lstrip('/'))
+        content = ''
+        digest = ''
+
+        if entry.file_type == FILE_TYPE_SYMLINK:
+            # symlinks created by a .%symlink marker do not exist in the build root
+            marker_stat = os.lstat(path if os.path.islink(path) else path + '.%symlink')
+            file_stat = marker_stat
+            mode = stat.S_IFLNK | 0777
+            content = entry.link_target
+            size = len(content)
+
+        elif entry.file_type == FILE_TYPE_DIRECTORY:
+            file_stat = os.lstat(path)
+            mode = stat.S_IFDIR | _get_permissions(entry.mode, file_stat)
+            size = file_stat.st_size
+
+        else:
+            file_stat = os.lstat(path)
+            mode = stat.S_IFREG | _get_permissions(entry.mode, file_stat)
+            with open(path, 'rb') as packaged_file:
+                content = packaged_file.read()
+            size = len(content)
+            digest = hashlib.sha256(content).hexdigest()
+
+        return PackagedFile(entry,
+                            mode=mode,
+                            size=size,
+                            mtime=int(file_stat.st_mtime),
+                            user=_get_user_name(entry.user, file_stat),
+                            group=_get_group_name(entry.group, file_stat),
+                            content=content,
+                            digest=digest)
+
+    def _write_rpm(self, rpm_path, package, files, source_rpm):
+        payload, payload_size = _create_payload(files)
+        main_header = self._create_main_header(package, files, source_rpm).to_bytes()
+
+        signature = Header(rpmheader.RPMTAG_HEADERSIGNATURES)
+        signature.add_int32(rpmheader.RPMSIGTAG_SIZE, [len(main_header) + len(payload)])
+        signature.add_binary(rpmheader.RPMSIGTAG_MD5, hashlib.md5(main_header + payload).digest())
+        signature.add_int32(rpmheader.RPMSIGTAG_PAYLOADSIZE, [payload_size])
+        signature.add_string(rpmheader.RPMSIGTAG_SHA1, hashlib.sha1(main_header).hexdigest())
+        signature.add_string(rpmheader.RPMSIGTAG_SHA256, hashlib.sha256(main_header).hexdigest())
+        signature_bytes = signature.to_bytes()
+        signature_bytes += '\x00' * ((8 - len(signature_bytes) % 8) % 8)
+
+        with open(rpm_path, 'wb') as rpm_file:
+            rpm_file.write(create_lead('%s-%s-%s' % (package.name, package.version, package.release)))
+            rpm_file.write(signature_bytes)
+            rpm_file.write(main_header)
+            rpm_file.write(payload)
+
+    def _create_main_header(self, package, files, source_rpm):
+        header = Header(rpmheader.RPMTAG_HEADERIMMUTABLE)
+        header.add_string_array(rpmheader.RPMTAG_HEADERI18NTABLE, ['C'])
+        header.add_string(rpmheader.RPMTAG_NAME, package.name)
+        header.add_string(rpmheader.RPMTAG_VERSION, package.version)
+        header.add_string(rpmheader.RPMTAG_RELEASE, package.release)
+        if package.epoch is not None:
+            header.add_int32(rpmheader.RPMTAG_EPOCH, [int(package.epoch)])
+        header.add_i18n_string(rpmheader.RPMTAG_SUMMARY, package.summary)
+        header.add_i18n_string(rpmheader.RPMTAG_DESCRIPTION, package.description)
+        header.add_i18n_string(rpmheader.RPMTAG_GROUP, package.tags.get('group', 'Unspecified'))
+        header.add_int32(rpmheader.RPMTAG_BUILDTIME, [self.build_time])
+        header.add_string(rpmheader.RPMTAG_BUILDHOST, self.build_host)
+        header.add_int32(rpmheader.RPMTAG_SIZE, [sum(packaged_file.size for packaged_file in files)])
+        header.add_string(rpmheader.RPMTAG_OS, 'linux')
+        header.add_string(rpmheader.RPMTAG_ARCH, 'noarch')
+        header.add_string(rpmheader.RPMTAG_SOURCERPM, source_rpm)
+        header.add_string(rpmheader.RPMTAG_PAYLOADFORMAT, 'cpio')
+        header.add_string(rpmheader.RPMTAG_PAYLOADCOMPRESSOR, 'gzip')
+        header.add_string(rpmheader.RPMTAG_PAYLOADFLAGS, '9')
+
+        for name, tag in STRING_TAGS.iteritems():
+            if name in package.tags:
+                header.add_string(tag, package.tags[name])
+
+        for name, scriptlet in package.scriptlets.iteritems():
+            script_tag, program_tag, _ = SCRIPTLET_TAGS[name]
+            header.add_string(script_tag, scriptlet.body)
+            header.add_string(program_tag, scriptlet.interpreter)
+
+        for name, dependencies in self._get_dependencies(package).iteritems():
+            if dependencies:
+                name_tag, flags_tag, version_tag = DEPENDENCY_TAGS[name]
+                header.add_string_array(name_tag, [dependency.name for dependency in dependencies])
+                header.add_int32(flags_tag, [dependency.flags for dependency in dependencies])
+                header.add_string_array(version_tag, [dependency.version for dependency in dependencies])
+
+        if files:
+            _add_file_tags(header, files)
+
+        return header
+
+    def _get_dependencies(self, package):
+        version = '%s-%s' % (package.version, package.release)
+        if package.epoch is not None:
+            version = '%s:%s' % (package.epoch, version)
+
+        requires = list(package.requires)
+        for name in sorted(package.scriptlets):
+            scriptlet = package.scriptlets[name]
+            requires.append(Dependency(scriptlet.interpreter, RPMSENSE_INTERP | SCRIPTLET_TAGS[name][2]))
+        for name, rpmlib_version in RPMLIB_REQUIREMENTS:
+            requires.append(Dependency(name, RPMSENSE_RPMLIB | RPMSENSE_LESS | RPMSENSE_EQUAL, rpmlib_version))
+
+        return {'provides': _unique(package.provides + [Dependency(package.name, RPMSENSE_EQUAL, version)]),
+                'requires': _unique(requires),
+                'conflicts': package.dependencies['conflicts'],
+                'obsoletes': package.dependencies['obsoletes']}
+
+
+def _add_file_tags(header, files):
+    directory_names = []
+    directory_indexes = []
+    base_names = []
+    for packaged_file in files:
+        directory_name, base_name = packaged_file.path.rsplit('/', 1)
+        directory_name += '/'
+        if directory_name not in directory_names:
+            directory_names.append(directory_name)
+        directory_indexes.append(directory_names.index(directory_name))
+        base_names.append(base_name)
+
+    header.add_int32(rpmheader.RPMTAG_FILESIZES, [packaged_file.size for packaged_file in files])
+    header.add_int16(rpmheader.RPMTAG_FILEMODES, [packaged_file.mode for packaged_file in files])
+    header.add_int16(rpmheader.RPMTAG_FILERDEVS, [0] * len(files))
+    header.add_int32(rpmheader.RPMTAG_FILEMTIMES, [packaged_file.mtime for packaged_file in files])
+    header.add_string_array(rpmheader.RPMTAG_FILEDIGESTS, [packaged_file.digest for packaged_file in files])
+    header.add_string_array(rpmheader.RPMTAG_FILELINKTOS, [packaged_file.link_target for packaged_file in files])
+    header.add_int32(rpmheader.RPMTAG_FILEFLAGS, [0] * len(files))
+    header.add_string_array(rpmheader.RPMTAG_FILEUSERNAME, [packaged_file.user for packaged_file in files])
+    header.add_string_array(rpmheader.RPMTAG_FILEGROUPNAME, [packaged_file.group for packaged_file in files])
+    header.add_int32(rpmheader.RPMTAG_FILEVERIFYFLAGS, [packaged_file.verify_flags for packaged_file in files])
+    header.add_int32(rpmheader.RPMTAG_FILEDEVICES, [1] * len(files))
+    header.add_int32(rpmheader.RPMTAG_FILEINODES, range(1, len(files) + 1))
+    header.add_string_array(rpmheader.RPMTAG_FILELANGS, [''] * len(files))
+    header.add_int32(rpmheader.RPMTAG_DIRINDEXES, directory_indexes)
+    header.add_string_array(rpmheader.RPMTAG_BASENAMES, base_names)
+    header.add_string_array(rpmheader.RPMTAG_DIRNAMES, directory_names)
+    header.add_int32(rpmheader.RPMTAG_FILEDIGESTALGO, [PGPHASHALGO_SHA256])
+
+
+def _create_payload(files):
+    """ Returns the gzip compressed cpio archive and its uncompressed size. """
+
+    compressed_payload = StringIO()
+    compressor = gzip.GzipFile(fileobj=compressed_payload, mode='wb', compresslevel=9, mtime=0)
+    cpio_writer = CpioWriter(compressor)
+    for inode, packaged_file in enumerate(files, 1):
+        cpio_writer.add('.' + packaged_file.path,
+                        mode=packaged_file.mode,
+                        mtime=packaged_file.mtime,
+                        content=packaged_file.content,
+                        inode=inode)
+    cpio_writer.write_trailer()
+    compressor.close()
+    return compressed_payload.getvalue(), cpio_writer.size
+
+
+def _get_permissions(mode, file_stat):
+    if mode == '-':
+        return stat.S_IMODE(file_stat.st_mode)
+    return int(mode, 8)
+
+
+def _get_user_name(user, file_stat):
+    if user != '-':
+        return user
+    try:
+        return getpwuid(file_stat.st_uid).pw_name
+    except KeyError:
+        return str(file_stat.st_uid)
+
+
+def _get_group_name(group, file_stat):
+    if group != '-':
+        return group
+    try:
+        return getgrgid(file_stat.st_gid).gr_name
+    except KeyError:
+        return str(file_stat.st_gid)
+
+
+def _unique(dependencies):
+    result = []
+    for dependency in dependencies:
+        if dependency not in result:
+            result.append(dependency)
+    return result
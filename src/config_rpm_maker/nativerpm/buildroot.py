@@ -0,0 +1,106 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Prepares the filtered host configuration directory as build root for
+    "rpmbuild -bb". The work of the %prep, %build and %install sections of
+    the default spec file is done here: the marker files are applied and
+    removed, the file lists are written and a spec file without those
+    sections is handed to rpmbuild. No tarball has to be created and
+    unpacked and the configuration tree is not copied.
+"""
+
+import os
+
+from config_rpm_maker.nativerpm.filelist import (FILE_TYPE_DIRECTORY,
+                                                 FILE_TYPE_SYMLINK,
+                                                 MARKER_ATTR,
+                                                 MARKER_DEFATTR,
+                                                 MARKER_DIR,
+                                                 MARKER_SYMLINK,
+                                                 MARKER_VERIFY,
+                                                 VERIFY_ALL,
+                                                 VERIFY_FLAGS,
+                                                 create_file_entries,
+                                                 get_file_lists)
+from config_rpm_maker.nativerpm.specfile import SpecFile, remove_build_sections
+
+MARKERS = (MARKER_ATTR, MARKER_DEFATTR, MARKER_DIR, MARKER_SYMLINK, MARKER_VERIFY)
+VERIFY_FLAG_NAMES = ('md5', 'size', 'link', 'user', 'group', 'mtime', 'mode', 'rdev')
+
+
+def prepare_build_root(spec_file_path, build_root, build_dir):
+    """ Turns build_root into the build root of the spec file. The spec
+        file without build sections and the file lists are written to
+        build_dir, which has to be passed to rpmbuild as _builddir.
+
+        Returns the path of the written spec file. Raises an
+        UnsupportedSpecFileException before anything has been changed if
+        the spec file does not follow the layout of the default spec file. """
+
+    with open(spec_file_path) as spec_file:
+        content = spec_file.read()
+
+    spec = SpecFile.parse(content)
+    file_lists = [(package, paths, create_file_entries(build_root, paths))
+                  for package, paths in get_file_lists(spec, build_root)]
+
+    if not os.path.isdir(build_dir):
+        os.makedirs(build_dir)
+
+    for package, paths, entries in file_lists:
+        with open(os.path.join(build_dir, package.file_list), 'w') as file_list:
+            for entry in entries:
+                file_list.write(format_file_list_entry(entry) + '\n')
+
+        _apply_markers(build_root, paths, entries)
+
+    packaged_spec_file_path = os.path.join(build_root, spec.main_package.name + '.spec')
+    if os.path.exists(packaged_spec_file_path):
+        os.remove(packaged_spec_file_path)
+
+    build_root_spec_file_path = os.path.join(build_dir, spec.main_package.name + '.spec')
+    with open(build_root_spec_file_path, 'w') as build_root_spec_file:
+        build_root_spec_file.write(remove_build_sections(content))
+
+    return build_root_spec_file_path
+
+
+def format_file_list_entry(entry):
+    """ Returns the line of the %files list for the given entry. """
+
+    directives = ['%%attr(%s,%s,%s)' % (entry.mode, entry.user, entry.group)]
+
+    if entry.verify_flags != VERIFY_ALL:
+        not_verified = [name for name in VERIFY_FLAG_NAMES if not entry.verify_flags & VERIFY_FLAGS[name]]
+        directives.append('%%verify(not %s)' % ' '.join(not_verified))
+
+    if entry.file_type == FILE_TYPE_DIRECTORY:
+        directives.append('%dir')
+
+    return '%s "%s"' % (' '.join(directives), entry.path)
+
+
+def _apply_markers(build_root, paths, entries):
+    for entry in entries:
+        if entry.file_type == FILE_TYPE_SYMLINK:
+            link_path = os.path.join(build_root, entry.path.lstrip('/'))
+            if not os.path.islink(link_path):
+                os.symlink(entry.link_target, link_path)
+
+    for path in paths:
+        if path.endswith(MARKERS):
+            os.remove(os.path.join(build_root, path.lstrip('/')))
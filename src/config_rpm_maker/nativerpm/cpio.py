@@ -0,0 +1,61 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Writes cpio archives in the "new ascii" format (070701) which rpm
+    uses for its payload.
+"""
+
+CPIO_MAGIC = '070701'
+CPIO_TRAILER = 'TRAILER!!!'
+
+
+class CpioWriter(object):
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.size = 0
+
+    def add(self, name, mode, mtime, content='', inode=0, nlink=1):
+        header = CPIO_MAGIC + ''.join('%08X' % value for value in (inode,
+                                                                   mode,
+                                                                   0,
+                                                                   0,
+                                                                   nlink,
+                                                                   mtime,
+                                                                   len(content),
+                                                                   0,
+                                                                   0,
+                                                                   0,
+                                                                   0,
+                                                                   len(name) + 1,
+                                                                   0))
+        self._write(header + name + '\x00')
+        self._pad()
+        self._write(content)
+        self._pad()
+
+    def write_trailer(self):
+        self.add(CPIO_TRAILER, mode=0, mtime=0)
+
+    def _write(self, data):
+        self.output_file.write(data)
+        self.size += len(data)
+
+    def _pad(self):
+        padding = (4 - self.size % 4) % 4
+        if padding:
+            self._write('\x00' * padding)
@@ -0,0 +1,231 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Determines the files of the config rpms the same way the %install
+    section of the default spec file does: all files and symlinks of the
+    configuration tree are packaged, directories only if they are marked.
+    The attributes of the files can be changed using marker files:
+
+        <path>.%attr      contains "mode,user,group" for <path>
+        <path>.%verify    contains the verify flags for <path>, e.g. "not,md5,mtime"
+        <path>.%dir       packages the directory <path>
+        <path>.%symlink   packages a symlink <path> pointing to the content of the marker
+        <dir>/.%defattr   contains "filemode,user,group,dirmode" for the files in <dir>
+
+    The marker files themselves are not packaged.
+"""
+
+import os
+import re
+
+from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+from config_rpm_maker.nativerpm.specfile import UnsupportedSpecFileException
+
+DEFAULT_ATTRIBUTES = ('0644', 'root', 'root', '0755')
+
+MAIN_FILE_LIST = 'files.lst'
+REPOS_FILE_LIST = 'files-repos.lst'
+REPOS_DIRECTORY = '/etc/yum.repos.d'
+
+MARKER_ATTR = '.%attr'
+MARKER_VERIFY = '.%verify'
+MARKER_DEFATTR = '.%defattr'
+MARKER_DIR = '.%dir'
+MARKER_SYMLINK = '.%symlink'
+
+FILE_TYPE_FILE = 'file'
+FILE_TYPE_DIRECTORY = 'directory'
+FILE_TYPE_SYMLINK = 'symlink'
+
+VERIFY_FLAGS = {'md5': 1 << 0,
+                'filedigest': 1 << 0,
+                'size': 1 << 1,
+                'link': 1 << 2,
+                'user': 1 << 3,
+                'owner': 1 << 3,
+                'group': 1 << 4,
+                'mtime': 1 << 5,
+                'mode': 1 << 6,
+                'rdev': 1 << 7,
+                'caps': 1 << 8}
+VERIFY_ALL = -1
+
+
+class InvalidFileListException(BaseConfigRpmMakerException):
+    error_info = "Could not determine the files of the rpm:\n"
+
+
+class FileEntry(object):
+    """ A file which will be packaged. path is the absolute path of the
+        installed file, e.g. "/etc/motd". """
+
+    def __init__(self, path, file_type, attributes, link_target=None):
+        self.path = path
+        self.file_type = file_type
+        self.mode = attributes[0] if file_type != FILE_TYPE_DIRECTORY else attributes[3]
+        self.user = attributes[1]
+        self.group = attributes[2]
+        self.link_target = link_target
+        self.verify_flags = VERIFY_ALL
+
+    def set_attributes(self, mode, user, group):
+        if mode != '-':
+            self.mode = mode
+        if user != '-':
+            self.user = user
+        if group != '-':
+            self.group = group
+
+    def __repr__(self):
+        return 'FileEntry(%r, %r, mode=%r, user=%r, group=%r)' % (self.path, self.file_type, self.mode, self.user, self.group)
+
+
+def get_file_lists(spec, build_root):
+    """ Returns a list of tuples (package, paths) for all packages which
+        will be built. Packages without %files section are not built. """
+
+    file_lists = []
+    for package in spec.packages:
+        if not package.has_files_section:
+            continue
+
+        if package is spec.main_package and package.file_list == MAIN_FILE_LIST:
+            excluded_paths = (REPOS_DIRECTORY, '/' + package.name + '.spec')
+            paths = [path for path in list_files(build_root, (REPOS_DIRECTORY,)) if path not in excluded_paths]
+
+        elif package is not spec.main_package and package.file_list == REPOS_FILE_LIST:
+            repos_directory = os.path.join(build_root, REPOS_DIRECTORY.lstrip('/'))
+            paths = []
+            if os.path.isdir(repos_directory):
+                paths = [REPOS_DIRECTORY + path for path in list_files(repos_directory)]
+
+        else:
+            raise UnsupportedSpecFileException('Unsupported file list "%s" for package "%s".'
+                                               % (package.file_list, package.name))
+
+        file_lists.append((package, paths))
+
+    return file_lists
+
+
+def list_files(build_root, excluded_paths=()):
+    """ Returns the sorted absolute paths of all files and symlinks below
+        build_root, like "find -not -type d" does. Directories in
+        excluded_paths (e.g. "/etc/yum.repos.d") are pruned. """
+
+    paths = []
+    for root, directory_names, file_names in os.walk(build_root):
+        relative_root = '/' + os.path.relpath(root, build_root) if root != build_root else ''
+
+        for directory_name in list(directory_names):
+            path = relative_root + '/' + directory_name
+            if path in excluded_paths:
+                directory_names.remove(directory_name)
+            elif os.path.islink(os.path.join(root, directory_name)):
+                paths.append(path)
+
+        for file_name in file_names:
+            paths.append(relative_root + '/' + file_name)
+
+    return sorted(paths)
+
+
+def create_file_entries(build_root, paths, default_attributes=DEFAULT_ATTRIBUTES):
+    """ Applies the marker files to the given sorted paths and returns the
+        list of FileEntry objects which will be packaged. """
+
+    entries = []
+    attributes = default_attributes
+    defattr_prefix = ''
+    current_entry = None
+
+    for path in paths:
+        if path.endswith(MARKER_ATTR) or path.endswith(MARKER_VERIFY):
+            if current_entry is not None:
+                content = _read_marker(build_root, path)
+                if path.endswith(MARKER_ATTR):
+                    current_entry.set_attributes(*_split_attributes(content, 3, path))
+                else:
+                    current_entry.verify_flags = parse_verify_flags(content)
+            continue
+
+        if current_entry is not None:
+            entries.append(current_entry)
+            current_entry = None
+
+        if path.endswith(MARKER_DEFATTR):
+            attributes = _split_attributes(_read_marker(build_root, path), 4, path)
+            defattr_prefix = path[:-len(MARKER_DEFATTR)]
+
+        elif path.endswith(MARKER_DIR):
+            directory = path[:-len(MARKER_DIR)]
+            if not os.path.isdir(os.path.join(build_root, directory.lstrip('/'))):
+                raise InvalidFileListException('Directory "%s" marked by "%s" does not exist.' % (directory, path))
+            current_entry = FileEntry(directory, FILE_TYPE_DIRECTORY, attributes)
+
+        elif path.endswith(MARKER_SYMLINK):
+            with open(os.path.join(build_root, path.lstrip('/'))) as symlink_marker_file:
+                link_target = symlink_marker_file.read().rstrip('\n')
+            current_entry = FileEntry(path[:-len(MARKER_SYMLINK)], FILE_TYPE_SYMLINK, attributes, link_target)
+
+        else:
+            if defattr_prefix and not path.startswith(defattr_prefix):
+                attributes = default_attributes
+                defattr_prefix = ''
+
+            if os.path.islink(os.path.join(build_root, path.lstrip('/'))):
+                current_entry = FileEntry(path, FILE_TYPE_SYMLINK, attributes,
+                                          os.readlink(os.path.join(build_root, path.lstrip('/'))))
+            else:
+                current_entry = FileEntry(path, FILE_TYPE_FILE, attributes)
+
+    if current_entry is not None:
+        entries.append(current_entry)
+
+    return sorted(entries, key=lambda entry: entry.path)
+
+
+def parse_verify_flags(content):
+    names = [name for name in content.split(',') if name]
+    negate = bool(names) and names[0] == 'not'
+    if negate:
+        names = names[1:]
+
+    flags = 0
+    for name in names:
+        if name not in VERIFY_FLAGS:
+            raise InvalidFileListException('Unknown verify flag "%s".' % name)
+        flags |= VERIFY_FLAGS[name]
+
+    if negate:
+        return VERIFY_ALL & ~flags
+    return flags
+
+
+def _read_marker(build_root, path):
+    """ Reads the marker content like the default spec does using
+        tr -cd -- '-a-zA-Z0-9,' """
+
+    with open(os.path.join(build_root, path.lstrip('/'))) as marker_file:
+        return re.sub(r'[^-a-zA-Z0-9,]', '', marker_file.read())
+
+
+def _split_attributes(content, count, path):
+    attributes = content.split(',')
+    if len(attributes) != count or not all(attributes):
+        raise InvalidFileListException('Marker "%s" has to contain %d comma separated values, found "%s".' % (path, count, content))
+    return tuple(attributes)
@@ -0,0 +1,212 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Serialization of rpm headers and of the rpm lead.
+"""
+
+import struct
+
+HEADER_MAGIC = '\x8e\xad\xe8\x01\x00\x00\x00\x00'
+LEAD_MAGIC = '\xed\xab\xee\xdb'
+
+RPM_TYPE_NULL = 0
+RPM_TYPE_CHAR = 1
+RPM_TYPE_INT8 = 2
+RPM_TYPE_INT16 = 3
+RPM_TYPE_INT32 = 4
+RPM_TYPE_INT64 = 5
+RPM_TYPE_STRING = 6
+RPM_TYPE_BIN = 7
+RPM_TYPE_STRING_ARRAY = 8
+RPM_TYPE_I18NSTRING = 9
+
+ALIGNMENTS = {RPM_TYPE_INT16: 2, RPM_TYPE_INT32: 4, RPM_TYPE_INT64: 8}
+# negative values are written as two's complement (e.g. -1 for "verify everything")
+INTEGER_FORMATS = {RPM_TYPE_INT16: ('>H', 0xffff), RPM_TYPE_INT32: ('>I', 0xffffffff)}
+
+RPMTAG_HEADERSIGNATURES = 62
+RPMTAG_HEADERIMMUTABLE = 63
+RPMTAG_HEADERI18NTABLE = 100
+
+RPMSIGTAG_SHA1 = 269
+RPMSIGTAG_SHA256 = 273
+RPMSIGTAG_SIZE = 1000
+RPMSIGTAG_MD5 = 1004
+RPMSIGTAG_PAYLOADSIZE = 1007
+
+RPMTAG_NAME = 1000
+RPMTAG_VERSION = 1001
+RPMTAG_RELEASE = 1002
+RPMTAG_EPOCH = 1003
+RPMTAG_SUMMARY = 1004
+RPMTAG_DESCRIPTION = 1005
+RPMTAG_BUILDTIME = 1006
+RPMTAG_BUILDHOST = 1007
+RPMTAG_SIZE = 1009
+RPMTAG_VENDOR = 1011
+RPMTAG_LICENSE = 1014
+RPMTAG_PACKAGER = 1015
+RPMTAG_GROUP = 1016
+RPMTAG_URL = 1020
+RPMTAG_OS = 1021
+RPMTAG_ARCH = 1022
+RPMTAG_PREIN = 1023
+RPMTAG_POSTIN = 1024
+RPMTAG_PREUN = 1025
+RPMTAG_POSTUN = 1026
+RPMTAG_FILESIZES = 1028
+RPMTAG_FILEMODES = 1030
+RPMTAG_FILERDEVS = 1033
+RPMTAG_FILEMTIMES = 1034
+RPMTAG_FILEDIGESTS = 1035
+RPMTAG_FILELINKTOS = 1036
+RPMTAG_FILEFLAGS = 1037
+RPMTAG_FILEUSERNAME = 1039
+RPMTAG_FILEGROUPNAME = 1040
+RPMTAG_SOURCERPM = 1044
+RPMTAG_FILEVERIFYFLAGS = 1045
+RPMTAG_PROVIDENAME = 1047
+RPMTAG_REQUIREFLAGS = 1048
+RPMTAG_REQUIRENAME = 1049
+RPMTAG_REQUIREVERSION = 1050
+RPMTAG_CONFLICTFLAGS = 1053
+RPMTAG_CONFLICTNAME = 1054
+RPMTAG_CONFLICTVERSION = 1055
+RPMTAG_RPMVERSION = 1064
+RPMTAG_PREINPROG = 1085
+RPMTAG_POSTINPROG = 1086
+RPMTAG_PREUNPROG = 1087
+RPMTAG_POSTUNPROG = 1088
+RPMTAG_OBSOLETENAME = 1090
+RPMTAG_FILEDEVICES = 1095
+RPMTAG_FILEINODES = 1096
+RPMTAG_FILELANGS = 1097
+RPMTAG_PROVIDEFLAGS = 1112
+RPMTAG_PROVIDEVERSION = 1113
+RPMTAG_OBSOLETEFLAGS = 1114
+RPMTAG_OBSOLETEVERSION = 1115
+RPMTAG_DIRINDEXES = 1116
+RPMTAG_BASENAMES = 1117
+RPMTAG_DIRNAMES = 1118
+RPMTAG_PAYLOADFORMAT = 1124
+RPMTAG_PAYLOADCOMPRESSOR = 1125
+RPMTAG_PAYLOADFLAGS = 1126
+RPMTAG_FILEDIGESTALGO = 5011
+
+LEAD_TYPE_BINARY = 0
+LEAD_ARCHITECTURE_NOARCH = 1
+LEAD_OS_LINUX = 1
+LEAD_SIGNATURE_TYPE_HEADER = 5
+
+
+class Header(object):
+    """ An rpm header: a list of tagged values which will be written
+        as an index followed by the data store. """
+
+    def __init__(self, region_tag):
+        self.region_tag = region_tag
+        self.entries = {}
+
+    def add(self, tag, value_type, value):
+        """ Adds a tag. Integer and string array values are given as lists. """
+
+        self.entries[tag] = (value_type, value)
+
+    def add_string(self, tag, value):
+        self.add(tag, RPM_TYPE_STRING, value)
+
+    def add_string_array(self, tag, values):
+        self.add(tag, RPM_TYPE_STRING_ARRAY, list(values))
+
+    def add_i18n_string(self, tag, value):
+        self.add(tag, RPM_TYPE_I18NSTRING, [value])
+
+    def add_int16(self, tag, values):
+        self.add(tag, RPM_TYPE_INT16, list(values))
+
+    def add_int32(self, tag, values):
+        self.add(tag, RPM_TYPE_INT32, list(values))
+
+    def add_binary(self, tag, value):
+        self.add(tag, RPM_TYPE_BIN, value)
+
+    def __contains__(self, tag):
+        return tag in self.entries
+
+    def to_bytes(self):
+        index = []
+        data = []
+        data_length = 0
+
+        for tag in sorted(self.entries):
+            value_type, value = self.entries[tag]
+            encoded_value, count = _encode_value(value_type, value)
+
+            alignment = ALIGNMENTS.get(value_type, 1)
+            padding = (alignment - data_length % alignment) % alignment
+            if padding:
+                data.append('\x00' * padding)
+                data_length += padding
+
+            index.append(struct.pack('>IIII', tag, value_type, data_length, count))
+            data.append(encoded_value)
+            data_length += len(encoded_value)
+
+        # the region tag marks all tags of this header as immutable
+        count_of_index_entries = len(index) + 1
+        region_trailer = struct.pack('>IIiI', self.region_tag, RPM_TYPE_BIN, -count_of_index_entries * 16, 16)
+        index.insert(0, struct.pack('>IIII', self.region_tag, RPM_TYPE_BIN, data_length, 16))
+        data.append(region_trailer)
+        data_length += len(region_trailer)
+
+        return HEADER_MAGIC + struct.pack('>II', count_of_index_entries, data_length) + ''.join(index) + ''.join(data)
+
+
+def create_lead(name):
+    return struct.pack('>4sBBhh66shh16s',
+                       LEAD_MAGIC,
+                       3,
+                       0,
+                       LEAD_TYPE_BINARY,
+                       LEAD_ARCHITECTURE_NOARCH,
+                       name[:65],
+                       LEAD_OS_LINUX,
+                       LEAD_SIGNATURE_TYPE_HEADER,
+                       '')
+
+
+def _encode_value(value_type, value):
+    if value_type in INTEGER_FORMATS:
+        integer_format, mask = INTEGER_FORMATS[value_type]
+        return ''.join(struct.pack(integer_format, integer & mask) for integer in value), len(value)
+
+    if value_type == RPM_TYPE_STRING:
+        return _encode_string(value) + '\x00', 1
+
+    if value_type in (RPM_TYPE_STRING_ARRAY, RPM_TYPE_I18NSTRING):
+        return ''.join(_encode_string(string) + '\x00' for string in value), len(value)
+
+    if value_type == RPM_TYPE_BIN:
+        return value, len(value)
+
+    raise ValueError('Unsupported rpm header value type %s' % value_type)
+
+
+def _encode_string(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
@@ -0,0 +1,477 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    A parser for the subset of the spec file syntax which the native rpm
+    writer understands. Everything else raises an
+    UnsupportedSpecFileException, so that the caller can fall back to
+    rpmbuild.
+
+    The sections %prep, %build, %install, %check and %clean are not
+    interpreted at all: the native rpm writer replaces them by the layout
+    of the default spec file.
+"""
+
+import re
+
+from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+
+
+class UnsupportedSpecFileException(BaseConfigRpmMakerException):
+    error_info = "The spec file can not be handled by the native rpm writer:\n"
+
+
+RPMSENSE_ANY = 0
+RPMSENSE_LESS = 1 << 1
+RPMSENSE_GREATER = 1 << 2
+RPMSENSE_EQUAL = 1 << 3
+RPMSENSE_SCRIPT_PRE = 1 << 9
+RPMSENSE_SCRIPT_POST = 1 << 10
+RPMSENSE_SCRIPT_PREUN = 1 << 11
+RPMSENSE_SCRIPT_POSTUN = 1 << 12
+
+DEPENDENCY_OPERATORS = {'<': RPMSENSE_LESS,
+                        '<=': RPMSENSE_LESS | RPMSENSE_EQUAL,
+                        '=': RPMSENSE_EQUAL,
+                        '==': RPMSENSE_EQUAL,
+                        '>=': RPMSENSE_GREATER | RPMSENSE_EQUAL,
+                        '>': RPMSENSE_GREATER}
+
+DEPENDENCY_QUALIFIERS = {'pre': RPMSENSE_SCRIPT_PRE,
+                         'post': RPMSENSE_SCRIPT_POST,
+                         'preun': RPMSENSE_SCRIPT_PREUN,
+                         'postun': RPMSENSE_SCRIPT_POSTUN}
+
+SCRIPTLETS = ('pre', 'post', 'preun', 'postun')
+IGNORED_SECTIONS = ('prep', 'build', 'install', 'check', 'clean')
+SUPPORTED_SECTIONS = ('package', 'description', 'files') + SCRIPTLETS + IGNORED_SECTIONS
+UNSUPPORTED_SECTIONS = ('changelog', 'pretrans', 'posttrans', 'verifyscript', 'triggerin', 'triggerun',
+                        'triggerprein', 'triggerpostun', 'filetriggerin', 'filetriggerun', 'filetriggerpostun',
+                        'transfiletriggerin', 'transfiletriggerun', 'transfiletriggerpostun', 'sepolicy')
+UNSUPPORTED_DIRECTIVES = ('if', 'ifarch', 'ifnarch', 'ifos', 'ifnos', 'else', 'elif', 'endif', 'include', 'undefine')
+
+BUILTIN_MACROS = {'_prefix': '/usr',
+                  '_exec_prefix': '/usr',
+                  '_bindir': '/usr/bin',
+                  '_sbindir': '/usr/sbin',
+                  '_libexecdir': '/usr/libexec',
+                  '_datadir': '/usr/share',
+                  '_sysconfdir': '/etc',
+                  '_sharedstatedir': '/var/lib',
+                  '_localstatedir': '/var'}
+
+# tags which only influence how rpmbuild builds the rpm
+IGNORED_TAGS = ('buildroot', 'buildrequires', 'buildconflicts', 'autoreqprov', 'autoreq', 'autoprov')
+IGNORED_TAG_PATTERN = re.compile(r'^(source|patch|nosource|nopatch)\d*$')
+SIMPLE_TAGS = ('summary', 'group', 'license', 'url', 'vendor', 'packager', 'epoch')
+DEPENDENCY_TAGS = ('requires', 'provides', 'conflicts', 'obsoletes')
+INHERITED_TAGS = ('epoch', 'version', 'release', 'license', 'group', 'url', 'vendor', 'packager')
+
+TAG_PATTERN = re.compile(r'^([A-Za-z][A-Za-z0-9]*)\s*(\(([^)]*)\))?\s*:\s*(.*)$')
+SECTION_PATTERN = re.compile(r'^%([a-z]+)\b(.*)$')
+DEFINITION_PATTERN = re.compile(r'^%(global|define)\s+([A-Za-z_][A-Za-z0-9_]*)(\([^)]*\))?\s+(.*)$')
+MACRO_NAME_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+MAXIMUM_MACRO_DEPTH = 16
+
+
+class Dependency(object):
+
+    def __init__(self, name, flags=RPMSENSE_ANY, version=''):
+        self.name = name
+        self.flags = flags
+        self.version = version
+
+    def __eq__(self, other):
+        return (self.name, self.flags, self.version) == (other.name, other.flags, other.version)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Dependency(%r, %r, %r)' % (self.name, self.flags, self.version)
+
+
+class Scriptlet(object):
+
+    def __init__(self, interpreter, body):
+        self.interpreter = interpreter
+        self.body = body
+
+
+class Package(object):
+    """ A (sub) package defined in a spec file. """
+
+    def __init__(self, name):
+        self.name = name
+        self.tags = {}
+        self.dependencies = dict((tag, []) for tag in DEPENDENCY_TAGS)
+        self.description = ''
+        self.scriptlets = {}
+        self.file_list = None
+        self.has_files_section = False
+
+    @property
+    def requires(self):
+        return self.dependencies['requires']
+
+    @property
+    def provides(self):
+        return self.dependencies['provides']
+
+    @property
+    def summary(self):
+        return self.tags.get('summary', '')
+
+    @property
+    def version(self):
+        return self.tags['version']
+
+    @property
+    def release(self):
+        return self.tags['release']
+
+    @property
+    def epoch(self):
+        return self.tags.get('epoch')
+
+
+class SpecFile(object):
+
+    def __init__(self, packages):
+        self.packages = packages
+
+    @property
+    def main_package(self):
+        return self.packages[0]
+
+    def get_package(self, name):
+        for package in self.packages:
+            if package.name == name:
+                return package
+        return None
+
+    @classmethod
+    def parse(cls, content):
+        return SpecFileParser(content).parse()
+
+
+class SpecFileParser(object):
+
+    def __init__(self, content):
+        self.lines = content.splitlines()
+        self.macros = dict(BUILTIN_MACROS)
+        self.packages = []
+        self.main_package = None
+
+    def parse(self):
+        section, package, arguments, body = 'preamble', None, [], []
+
+        for line in self.lines:
+            definition = DEFINITION_PATTERN.match(line)
+            if definition:
+                self.macros[definition.group(2)] = definition.group(4).strip()
+                continue
+
+            section_match = SECTION_PATTERN.match(line)
+            if section_match and self._is_section(section_match.group(1)):
+                self._finish_section(section, package, arguments, body)
+                section = section_match.group(1)
+                arguments = section_match.group(2).split()
+                package = self._get_package_of_section(section, arguments)
+                body = []
+                continue
+
+            if section == 'preamble' or section == 'package':
+                self._parse_tag_line(package, line)
+            else:
+                body.append(line)
+
+        self._finish_section(section, package, arguments, body)
+
+        if self.main_package is None:
+            raise UnsupportedSpecFileException('The spec file does not define a package name.')
+
+        for subpackage in self.packages[1:]:
+            for tag in INHERITED_TAGS:
+                if tag in self.main_package.tags and tag not in subpackage.tags:
+                    subpackage.tags[tag] = self.main_package.tags[tag]
+
+        return SpecFile(self.packages)
+
+    def expand(self, text, depth=0, strict=True):
+        """ Expands the macros in the given text. Raises an
+            UnsupportedSpecFileException for macros which can not be
+            expanded without rpm (e.g. shell expansion). Unknown macros are
+            only accepted if strict is False, they are kept unexpanded then
+            just like rpmbuild does. """
+
+        if depth > MAXIMUM_MACRO_DEPTH:
+            raise UnsupportedSpecFileException('Too deeply nested macros in "%s".' % text)
+
+        result = []
+        position = 0
+        while True:
+            start = text.find('%', position)
+            if start == -1:
+                result.append(text[position:])
+                return ''.join(result)
+
+            result.append(text[position:start])
+            macro, position = _find_macro(text, start)
+            result.append(self._expand_macro(macro, text, depth, strict))
+
+    def _expand_macro(self, macro, text, depth, strict):
+        if macro in ('', '%'):
+            return '%'
+        if macro == '(':
+            raise UnsupportedSpecFileException('Shell expansion is not supported: "%s"' % text)
+
+        name = macro
+        if macro.startswith('{'):
+            name = macro[1:-1]
+            if name.startswith('?'):
+                name, _, value = name[1:].partition(':')
+                if name not in self.macros:
+                    return ''
+                if value:
+                    return self.expand(value, depth + 1, strict)
+                return self.expand(self.macros[name], depth + 1, strict)
+
+        if name not in self.macros:
+            if strict:
+                raise UnsupportedSpecFileException('Unknown macro "%%%s" in "%s".' % (macro, text))
+            return '%' + macro
+        return self.expand(self.macros[name], depth + 1, strict)
+
+    def _is_section(self, name):
+        if name in UNSUPPORTED_SECTIONS or name in UNSUPPORTED_DIRECTIVES:
+            raise UnsupportedSpecFileException('"%%%s" is not supported.' % name)
+        return name in SUPPORTED_SECTIONS
+
+    def _get_package_of_section(self, section, arguments):
+        if section in IGNORED_SECTIONS:
+            return None
+
+        if self.main_package is None:
+            raise UnsupportedSpecFileException('Section "%%%s" appears before the package name has been defined.' % section)
+
+        name = self._get_package_name(arguments)
+
+        if section == 'package':
+            if name is None or self._find_package(name):
+                raise UnsupportedSpecFileException('Invalid package section "%%package %s".' % ' '.join(arguments))
+            package = Package(name)
+            self.packages.append(package)
+            return package
+
+        if name is None:
+            return self.main_package
+
+        package = self._find_package(name)
+        if package is None:
+            raise UnsupportedSpecFileException('Section "%%%s" refers to unknown package "%s".' % (section, name))
+        return package
+
+    def _get_package_name(self, arguments):
+        arguments = self._remove_options(arguments, ('-f', '-p'))
+
+        if not arguments:
+            return None
+        if arguments[0] == '-n' and len(arguments) == 2:
+            return self.expand(arguments[1])
+        if len(arguments) == 1 and not arguments[0].startswith('-'):
+            return self.main_package.name + '-' + self.expand(arguments[0])
+
+        raise UnsupportedSpecFileException('Unsupported section arguments "%s".' % ' '.join(arguments))
+
+    def _remove_options(self, arguments, options_with_value):
+        result = []
+        skip_next = False
+        for argument in arguments:
+            if skip_next:
+                skip_next = False
+            elif argument in options_with_value:
+                skip_next = True
+            else:
+                result.append(argument)
+        return result
+
+    def _get_option_value(self, arguments, option):
+        if option in arguments:
+            index = arguments.index(option)
+            if index + 1 < len(arguments):
+                return self.expand(arguments[index + 1])
+            raise UnsupportedSpecFileException('Option "%s" without value.' % option)
+        return None
+
+    def _find_package(self, name):
+        for package in self.packages:
+            if package.name == name:
+                return package
+        return None
+
+    def _parse_tag_line(self, package, line):
+        stripped_line = line.strip()
+        if not stripped_line or stripped_line.startswith('#'):
+            return
+
+        match = TAG_PATTERN.match(stripped_line)
+        if not match:
+            raise UnsupportedSpecFileException('Can not parse line "%s".' % line)
+
+        tag, qualifier, value = match.group(1).lower(), match.group(3), match.group(4).strip()
+
+        if tag in IGNORED_TAGS or IGNORED_TAG_PATTERN.match(tag):
+            return
+
+        if tag == 'name':
+            if package is not None:
+                raise UnsupportedSpecFileException('Tag "Name" is only allowed in the preamble.')
+            self.main_package = Package(self.expand(value))
+            self.packages.append(self.main_package)
+            self.macros['name'] = self.main_package.name
+            return
+
+        if package is None:
+            package = self.main_package
+            if package is None:
+                raise UnsupportedSpecFileException('Tag "%s" appears before the package name has been defined.' % tag)
+
+        if tag in ('version', 'release') and package is self.main_package:
+            package.tags[tag] = self.expand(value)
+            self.macros[tag] = package.tags[tag]
+
+        elif tag in ('buildarch', 'buildarchitectures'):
+            if self.expand(value) != 'noarch':
+                raise UnsupportedSpecFileException('Only noarch packages are supported, found "%s".' % value)
+
+        elif tag in SIMPLE_TAGS:
+            package.tags[tag] = self.expand(value)
+
+        elif tag in DEPENDENCY_TAGS:
+            flags = RPMSENSE_ANY
+            if qualifier:
+                if tag != 'requires':
+                    raise UnsupportedSpecFileException('Unsupported qualifier in "%s".' % line)
+                for name in qualifier.replace(' ', '').split(','):
+                    if name not in DEPENDENCY_QUALIFIERS:
+                        raise UnsupportedSpecFileException('Unsupported qualifier in "%s".' % line)
+                    flags |= DEPENDENCY_QUALIFIERS[name]
+            package.dependencies[tag] += parse_dependencies(self.expand(value), flags)
+
+        else:
+            raise UnsupportedSpecFileException('Unsupported tag "%s".' % match.group(1))
+
+    def _finish_section(self, section, package, arguments, body):
+        if section == 'description':
+            package.description = self.expand(_strip_trailing_blanks('\n'.join(body)), strict=False)
+
+        elif section == 'files':
+            if package.has_files_section:
+                raise UnsupportedSpecFileException('Multiple %%files sections for package "%s".' % package.name)
+            package.has_files_section = True
+            package.file_list = self._get_option_value(arguments, '-f')
+
+            for line in body:
+                if line.strip() and not line.strip().startswith('#'):
+                    raise UnsupportedSpecFileException('Only file lists given with "%%files -f" are supported, found "%s".' % line)
+
+        elif section in SCRIPTLETS:
+            if section in package.scriptlets:
+                raise UnsupportedSpecFileException('Multiple %%%s scriptlets for package "%s".' % (section, package.name))
+
+            interpreter = self._get_option_value(arguments, '-p') or '/bin/sh'
+            if interpreter.startswith('<'):
+                raise UnsupportedSpecFileException('Unsupported interpreter "%s".' % interpreter)
+            package.scriptlets[section] = Scriptlet(interpreter, self.expand(_strip_trailing_blanks('\n'.join(body))))
+
+
+def remove_build_sections(content):
+    """ Returns the spec file content without the sections %prep, %build,
+        %install, %check and %clean. """
+
+    lines = []
+    in_build_section = False
+    for line in content.splitlines():
+        section_match = SECTION_PATTERN.match(line)
+        if section_match and section_match.group(1) in SUPPORTED_SECTIONS:
+            in_build_section = section_match.group(1) in IGNORED_SECTIONS
+
+        if not in_build_section:
+            lines.append(line)
+
+    return '\n'.join(lines) + '\n'
+
+
+def parse_dependencies(value, flags=RPMSENSE_ANY):
+    """ Parses a dependency list like "foo, bar >= 1.0 baz". """
+
+    tokens = re.findall(r'[<>=]+|[^\s,<>=]+', value)
+    dependencies = []
+    index = 0
+    while index < len(tokens):
+        name = tokens[index]
+        if _is_operator(name):
+            raise UnsupportedSpecFileException('Can not parse dependencies "%s".' % value)
+
+        if index + 1 < len(tokens) and _is_operator(tokens[index + 1]):
+            operator = tokens[index + 1]
+            if operator not in DEPENDENCY_OPERATORS or index + 2 >= len(tokens) or _is_operator(tokens[index + 2]):
+                raise UnsupportedSpecFileException('Can not parse dependencies "%s".' % value)
+            dependencies.append(Dependency(name, flags | DEPENDENCY_OPERATORS[operator], tokens[index + 2]))
+            index += 3
+        else:
+            dependencies.append(Dependency(name, flags))
+            index += 1
+
+    return dependencies
+
+
+def _find_macro(text, start):
+    """ Returns the macro starting at text[start] (without the leading
+        percent sign) and the position behind it. Braces may be nested. """
+
+    position = start + 1
+    if position >= len(text):
+        return '', position
+
+    if text[position] in '%(':
+        return text[position], position + 1
+
+    if text[position] == '{':
+        nesting = 0
+        for end in range(position, len(text)):
+            if text[end] == '{':
+                nesting += 1
+            elif text[end] == '}':
+                nesting -= 1
+                if nesting == 0:
+                    return text[position:end + 1], end + 1
+        raise UnsupportedSpecFileException('Unbalanced braces in "%s".' % text)
+
+    match = MACRO_NAME_PATTERN.match(text, position)
+    if match:
+        return match.group(0), match.end()
+    return '', position
+
+
+def _is_operator(token):
+    return token[0] in '<>='
+
+
+def _strip_trailing_blanks(text):
+    return text.rstrip()
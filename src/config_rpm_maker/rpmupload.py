@@ -0,0 +1,208 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Uploads rpms in chunks using the configured upload command. The
+    RpmUploadPipeline consumes a queue of rpm paths, so uploading can start
+    while other hosts are still being built. A chunk is uploaded as soon as
+    it contains chunk_size rpms or its first rpm waited longer than the
+    time window. Several chunks can be uploaded concurrently.
+"""
+
+import subprocess
+
+from logging import getLogger
+from Queue import Empty, Queue
+from threading import Lock, Thread
+from time import time
+
+from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+from config_rpm_maker.utilities.profiler import measure_execution_time
+
+LOGGER = getLogger(__name__)
+
+END_OF_QUEUE = None
+
+
+class CouldNotUploadRpmsException(BaseConfigRpmMakerException):
+    error_info = "Could not upload rpms!\n"
+
+
+class UploadedChunk(object):
+
+    def __init__(self, size, upload_time, latency):
+        self.size = size
+        self.upload_time = upload_time
+        self.latency = latency
+
+
+class RpmUploadPipeline(object):
+
+    def __init__(self, upload_command, chunk_size, time_window=0, concurrency=1, rpm_queue=None):
+        """ chunk_size 0 means unlimited: a chunk will be uploaded when the
+            time window elapsed or the pipeline is closed. time_window 0
+            disables the time window. """
+
+        self.upload_command = upload_command
+        self.chunk_size = chunk_size
+        self.time_window = time_window
+        self.concurrency = concurrency
+        self.rpm_queue = rpm_queue if rpm_queue is not None else Queue()
+        self.uploaded_chunks = []
+        self.dropped_rpms = 0
+        self.error_message = None
+        self._aborted = False
+        self._chunk_queue = Queue()
+        self._lock = Lock()
+        self._threads = []
+
+    def start(self):
+        self._threads = [Thread(target=self._collect_chunks, name='RpmUpload-Collector')]
+        self._threads += [Thread(target=self._upload_chunks, name='RpmUpload-%d' % index) for index in range(self.concurrency)]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def put(self, rpm):
+        self.rpm_queue.put(rpm)
+
+    def abort(self):
+        """ Stops uploading: rpms which have not been uploaded yet will be
+            dropped. Uploads which are running already will be finished. """
+
+        with self._lock:
+            if not self._aborted:
+                LOGGER.warn('Aborting rpm upload, rpms which have not been uploaded yet will be dropped.')
+            self._aborted = True
+
+    def join(self):
+        """ Uploads the remaining rpms and waits until all uploads finished. """
+
+        if not self._threads:
+            return
+
+        self.rpm_queue.put(END_OF_QUEUE)
+        self._threads[0].join()
+
+        for _ in range(self.concurrency):
+            self._chunk_queue.put(END_OF_QUEUE)
+        for thread in self._threads[1:]:
+            thread.join()
+
+        self._threads = []
+
+    def close(self):
+        """ Like join, but raises a CouldNotUploadRpmsException if an upload failed. """
+
+        self.join()
+
+        if self.error_message:
+            raise CouldNotUploadRpmsException(self.error_message)
+
+    def log_summary(self, logging_function):
+        with self._lock:
+            uploaded_chunks = list(self.uploaded_chunks)
+            dropped_rpms = self.dropped_rpms
+
+        if not uploaded_chunks:
+            logging_function('Uploaded no rpm chunks, dropped %s rpm(s).', dropped_rpms)
+            return
+
+        upload_times = [chunk.upload_time for chunk in uploaded_chunks]
+        latencies = [chunk.latency for chunk in uploaded_chunks]
+        logging_function('Uploaded %s rpm(s) in %s chunk(s) using %s concurrent upload(s), dropped %s rpm(s).',
+                         sum(chunk.size for chunk in uploaded_chunks), len(uploaded_chunks), self.concurrency, dropped_rpms)
+        logging_function('Rpm upload chunks: average upload time %.2fs, maximum %.2fs; '
+                         'average latency %.2fs, maximum %.2fs',
+                         sum(upload_times) / len(upload_times), max(upload_times),
+                         sum(latencies) / len(latencies), max(latencies))
+
+    def _is_stopped(self):
+        with self._lock:
+            return self._aborted or self.error_message is not None
+
+    def _collect_chunks(self):
+        chunk = []
+        chunk_started_at = None
+
+        while True:
+            try:
+                if chunk and self.time_window:
+                    timeout = max(0, chunk_started_at + self.time_window - time())
+                    rpm = self.rpm_queue.get(timeout=timeout)
+                else:
+                    rpm = self.rpm_queue.get()
+            except Empty:
+                self._submit(chunk, chunk_started_at)
+                chunk = []
+                continue
+
+            if rpm is END_OF_QUEUE:
+                self._submit(chunk, chunk_started_at)
+                return
+
+            if not chunk:
+                chunk_started_at = time()
+            chunk.append(rpm)
+
+            if self.chunk_size and len(chunk) >= self.chunk_size:
+                self._submit(chunk, chunk_started_at)
+                chunk = []
+
+    def _submit(self, chunk, chunk_started_at):
+        if chunk:
+            self._chunk_queue.put((chunk, chunk_started_at))
+
+    def _upload_chunks(self):
+        while True:
+            item = self._chunk_queue.get()
+            if item is END_OF_QUEUE:
+                return
+
+            chunk, chunk_started_at = item
+            if self._is_stopped():
+                with self._lock:
+                    self.dropped_rpms += len(chunk)
+                continue
+
+            self._upload(chunk, chunk_started_at)
+
+    @measure_execution_time
+    def _upload(self, chunk, chunk_started_at):
+        cmd = '%s %s' % (self.upload_command, ' '.join(chunk))
+        upload_started_at = time()
+        process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, stderr = process.communicate()
+        finished_at = time()
+
+        if process.returncode:
+            error_message = 'Rpm upload failed with exit code %s. Executed command "%s"\n' % (process.returncode, cmd)
+            if stdout:
+                error_message += 'stdout: "%s"\n' % stdout.strip()
+            if stderr:
+                error_message += 'stderr: "%s"\n' % stderr.strip()
+
+            LOGGER.error(error_message)
+            with self._lock:
+                if self.error_message is None:
+                    self.error_message = error_message
+            return
+
+        uploaded_chunk = UploadedChunk(len(chunk), finished_at - upload_started_at, finished_at - chunk_started_at)
+        LOGGER.debug('Uploaded chunk of %s rpm(s) in %.2fs, latency since first rpm of chunk %.2fs',
+                     uploaded_chunk.size, uploaded_chunk.upload_time, uploaded_chunk.latency)
+        with self._lock:
+            self.uploaded_chunks.append(uploaded_chunk)
@@ -105,3 +105,51 @@ class Short_HostNr(HostnameSegment):
 
 OVERLAY_ORDER = [All(), Typ(), Loc(), LocTyp(), Host()]
 ALL_SEGEMENTS = OVERLAY_ORDER + [HostNr(), Short_HostNr()]
+
+
+class SvnPathIndex(object):
+    """ Maps the svn paths of the given segments to the hosts which use them.
+
+        A changed path affects a host when it starts with one of the host's
+        segment svn paths. Instead of comparing each changed path with the
+        svn paths of every host, only the prefixes of the changed path which
+        have the length of a known svn path are looked up. """
+
+    def __init__(self, hosts, segments=None):
+        if segments is None:
+            segments = OVERLAY_ORDER
+
+        self.hosts_by_svn_path = {}
+        for host in hosts:
+            for segment in segments:
+                for svn_path in segment.get_svn_paths(host):
+                    self.hosts_by_svn_path.setdefault(svn_path, set()).add(host)
+
+        self.svn_path_lengths = sorted(set(len(svn_path) for svn_path in self.hosts_by_svn_path))
+
+    def find_svn_paths(self, changed_path):
+        """ Returns the known svn paths the given changed path starts with. """
+
+        result = []
+        for length in self.svn_path_lengths:
+            if length > len(changed_path):
+                break
+
+            prefix = changed_path[:length]
+            if prefix in self.hosts_by_svn_path:
+                result.append(prefix)
+
+        return result
+
+    def find_hosts(self, changed_paths):
+        """ Returns the set of hosts affected by the given changed paths. """
+
+        affected_svn_paths = set()
+        for changed_path in changed_paths:
+            affected_svn_paths.update(self.find_svn_paths(changed_path))
+
+        result = set()
+        for svn_path in affected_svn_paths:
+            result |= self.hosts_by_svn_path[svn_path]
+
+        return result
@@ -0,0 +1,204 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    A segment (e.g. "all" or "typ/web") is usually shared by many hosts.
+    The SegmentExportCache exports each segment svn path only once per
+    revision into a local staging directory. The host builds overlay their
+    configuration directory from the staged copy instead of asking the
+    subversion server again.
+
+    With the build engine "processes" the shared segments are staged once
+    in the parent process, the worker processes are handed the result.
+"""
+
+import os
+
+from logging import getLogger
+from os.path import exists, isdir, islink, join
+from Queue import Empty, Queue
+from shutil import copystat
+from threading import Lock, Thread
+
+from pysvn import ClientError
+
+from config_rpm_maker.segment import OVERLAY_ORDER, Host
+from config_rpm_maker.utilities.filecopy import create_file_copier
+from config_rpm_maker.utilities.logutils import verbose
+from config_rpm_maker.utilities.profiler import measure_execution_time
+
+LOGGER = getLogger(__name__)
+
+
+def get_shared_svn_paths(hosts):
+    """ Returns the svn paths of all segments of the given hosts, except the
+        host segments, which are never shared with other hosts. """
+
+    svn_paths = set()
+    for host in hosts:
+        for segment in OVERLAY_ORDER:
+            if not isinstance(segment, Host):
+                svn_paths.update(segment.get_svn_paths(host))
+
+    return sorted(svn_paths)
+
+
+class StagedSegment(object):
+    """ The result of exporting one segment svn path into the staging area. """
+
+    def __init__(self, svn_path, directory):
+        self.svn_path = svn_path
+        self.directory = directory
+        self.exported_paths = []
+        self.exists = False
+        self.lock = Lock()
+        self.staged = False
+
+
+class SegmentExportCache(object):
+
+    def __init__(self, revision, staging_dir, svn_service_queue, file_copier=None, staged_segments=None):
+        self.revision = revision
+        self.staging_dir = staging_dir
+        self.svn_service_queue = svn_service_queue
+        # the overlaid files are filtered in place later, so they must not be hardlinks
+        self.file_copier = file_copier or create_file_copier(allow_hardlinks=False)
+        self._staged_segments = {}
+        self._lock = Lock()
+
+        for svn_path, (directory, segment_exists, exported_paths) in (staged_segments or {}).iteritems():
+            staged_segment = StagedSegment(svn_path, directory)
+            staged_segment.exists = segment_exists
+            staged_segment.exported_paths = exported_paths
+            staged_segment.staged = True
+            self._staged_segments[svn_path] = staged_segment
+
+    @measure_execution_time
+    def stage(self, svn_paths, thread_count):
+        """ Stages the given svn paths using up to thread_count threads. """
+
+        svn_path_queue = Queue()
+        for svn_path in svn_paths:
+            svn_path_queue.put(svn_path)
+
+        threads = [Thread(name='Staging-%d' % i, target=self._stage_from_queue, args=(svn_path_queue,))
+                   for i in range(min(thread_count, len(svn_paths)))]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+    def get_staged_segments(self):
+        """ Returns a dictionary svn_path -> (directory, exists, exported_paths)
+            of all staged segments, which can be passed to another
+            SegmentExportCache as staged_segments. """
+
+        with self._lock:
+            staged_segments = self._staged_segments.values()
+
+        return dict((staged_segment.svn_path, (staged_segment.directory, staged_segment.exists, staged_segment.exported_paths))
+                    for staged_segment in staged_segments if staged_segment.staged)
+
+    def overlay(self, svn_path, target_dir):
+        """ Copies the staged export of the given svn path into target_dir.
+
+            Returns the exported paths in the same format as SvnService.export
+            would have returned them. Raises ClientError if the svn path
+            does not exist in the revision. """
+
+        staged_segment = self._get_staged_segment(svn_path)
+
+        if not staged_segment.exists:
+            raise ClientError('Path "%s" does not exist in revision %s.' % (svn_path, self.revision))
+
+        self._copy_tree(staged_segment.directory, target_dir)
+        return list(staged_segment.exported_paths)
+
+    def _get_staged_segment(self, svn_path):
+        with self._lock:
+            staged_segment = self._staged_segments.get(svn_path)
+            if staged_segment is None:
+                directory = join(self.staging_dir, str(len(self._staged_segments)))
+                staged_segment = StagedSegment(svn_path, directory)
+                self._staged_segments[svn_path] = staged_segment
+
+        with staged_segment.lock:
+            if not staged_segment.staged:
+                self._stage(staged_segment)
+                staged_segment.staged = True
+
+        return staged_segment
+
+    def _stage_from_queue(self, svn_path_queue):
+        while True:
+            try:
+                svn_path = svn_path_queue.get_nowait()
+            except Empty:
+                return
+
+            try:
+                self._get_staged_segment(svn_path)
+            except Exception as exception:
+                LOGGER.warn('Could not stage "%s", it will be exported by the host builds: %s', svn_path, str(exception))
+
+    @measure_execution_time
+    def _stage(self, staged_segment):
+        LOGGER.debug('Staging export of "%s" in revision %s to "%s"',
+                     staged_segment.svn_path, self.revision, staged_segment.directory)
+
+        svn_service = self.svn_service_queue.get()
+        try:
+            staged_segment.exported_paths = svn_service.export(staged_segment.svn_path,
+                                                               staged_segment.directory,
+                                                               self.revision)
+            staged_segment.exists = True
+
+        except ClientError as exception:
+            verbose(LOGGER).debug('Could not export "%s": %s', staged_segment.svn_path, str(exception))
+
+        finally:
+            self.svn_service_queue.put(svn_service)
+
+    def _copy_tree(self, source_dir, target_dir):
+        """ Merges the content of source_dir into target_dir. Existing files
+            will be overwritten, just like "svn export --force" does. """
+
+        if not exists(target_dir):
+            os.makedirs(target_dir)
+
+        for name in os.listdir(source_dir):
+            source = join(source_dir, name)
+            target = join(target_dir, name)
+
+            if islink(source):
+                self._remove_file(target)
+                os.symlink(os.readlink(source), target)
+
+            elif isdir(source):
+                if islink(target) or (exists(target) and not isdir(target)):
+                    self._remove_file(target)
+                self._copy_tree(source, target)
+
+            else:
+                self._remove_file(target)
+                self.file_copier.copy(source, target)
+                copystat(source, target)
+
+    def _remove_file(self, path):
+        if islink(path) or exists(path):
+            os.remove(path)
@@ -0,0 +1,247 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Stand-ins for subversion and rpmbuild to measure the overhead of the
+    build orchestration (threads, queues, svn service pool) without a
+    subversion server and without building real rpms.
+
+    The FakeSvnService serves a directory tree which is laid out like the
+    configuration repository (e.g. testdata/svn_repo) and the StubRpmBuilder
+    writes empty rpms. Both can simulate latency, jitter and failures. Pass
+    them to ConfigRpmMaker:
+
+        ConfigRpmMaker(revision, FakeSvnService(directory, latency=SimulatedLatency(0.02, 0.01)),
+                       rpm_builder=StubRpmBuilder(SimulatedLatency(0.5))).build()
+"""
+
+import os
+import shutil
+
+from logging import getLogger
+from os.path import exists, isdir, join, relpath
+from random import Random
+from time import sleep, time
+
+from pysvn import ClientError
+
+from config_rpm_maker.hostrpmbuilder import CouldNotBuildRpmException
+from config_rpm_maker.svnservice import (SVN_ERROR_CODES_PATH_NOT_FOUND,
+                                         MAXIMUM_CONSECUTIVE_FAILURES,
+                                         RevisionMetadataCache,
+                                         SvnServiceException,
+                                         freeze)
+from config_rpm_maker.utilities.profiler import measure_execution_time
+
+LOGGER = getLogger(__name__)
+
+
+class SimulatedFailureException(SvnServiceException):
+    error_info = "Simulated failure:\n"
+
+
+class SimulatedLatency(object):
+    """ Waits latency seconds plus or minus a random jitter on each call
+        and fails with the given probability. Clones of a FakeSvnService
+        share their latency, so calls and failures are counted for all of
+        them. """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = Random(seed)
+        self.calls = 0
+        self.failures = 0
+
+    def wait(self):
+        self.calls += 1
+        duration = self.latency
+        if self.jitter:
+            duration += self.random.uniform(-self.jitter, self.jitter)
+
+        if duration > 0:
+            sleep(duration)
+
+    def should_fail(self):
+        if self.failure_rate > 0 and self.random.random() < self.failure_rate:
+            self.failures += 1
+            return True
+
+        return False
+
+
+NO_LATENCY = SimulatedLatency()
+
+
+class FakeSvnService(object):
+    """ Serves the configuration below directory + path_to_config for every
+        revision. The change set of each revision consists of the given
+        changed paths (relative to the configuration directory). """
+
+    def __init__(self, directory, path_to_config='/config', changed_paths=None, latency=None, metadata_cache=None):
+        self.directory = directory
+        self.path_to_config = path_to_config
+        self.base_url = 'fake://' + os.path.abspath(directory)
+        self.config_url = self.base_url + path_to_config
+        self.config_directory = join(directory, path_to_config.lstrip('/'))
+        self.username = None
+        self.password = None
+        self.changed_paths = list(changed_paths or [])
+        self.latency = latency or NO_LATENCY
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.metadata_cache = metadata_cache or RevisionMetadataCache()
+
+    def clone(self):
+        return FakeSvnService(directory=self.directory,
+                              path_to_config=self.path_to_config,
+                              changed_paths=self.changed_paths,
+                              latency=self.latency,
+                              metadata_cache=self.metadata_cache)
+
+    def is_healthy(self):
+        return self.consecutive_failures < MAXIMUM_CONSECUTIVE_FAILURES
+
+    def _call(self, description):
+        """ Simulates the round trip to the subversion server. """
+
+        self.latency.wait()
+
+        if self.latency.should_fail():
+            self.failures += 1
+            self.consecutive_failures += 1
+            raise SimulatedFailureException('Simulated failure of %s' % description)
+
+        self.consecutive_failures = 0
+
+    def log_change_set_meta_information(self, revision):
+        for info in self.get_logs_for_revision(revision):
+            LOGGER.info('Commit message is "%s" (%s)', info.message, info.author)
+
+    def get_logs_for_revision(self, revision):
+        return self.metadata_cache.get(('logs', str(revision)),
+                                       lambda: self._fetch_logs_for_revision(revision))
+
+    def _fetch_logs_for_revision(self, revision):
+        self._call('log of revision %s' % revision)
+        changed_paths = [{'path': self.path_to_config + '/' + path, 'action': 'M'} for path in self.changed_paths]
+        return freeze([{'revision': {'number': int(revision)},
+                        'author': 'fake',
+                        'date': time(),
+                        'message': 'Simulated change set',
+                        'changed_paths': changed_paths}])
+
+    def get_changed_paths_with_action(self, revision):
+        start_position = len(self.path_to_config + '/')
+        return [(path_object.path[start_position:], path_object.action)
+                for info in self.get_logs_for_revision(revision)
+                for path_object in info.changed_paths]
+
+    def get_deleted_paths(self, revision):
+        return []
+
+    def get_changed_paths(self, revision):
+        return [path for path, _ in self.get_changed_paths_with_action(revision)]
+
+    def get_hosts(self, revision):
+        return list(self.metadata_cache.get(('hosts', str(revision)), self._fetch_hosts))
+
+    def _fetch_hosts(self):
+        self._call('listing of hosts')
+        return sorted(os.listdir(join(self.config_directory, 'host')))
+
+    def get_files(self, svn_path, revision):
+        return list(self.metadata_cache.get(('files', svn_path, str(revision)),
+                                            lambda: self._fetch_files(svn_path)))
+
+    def _fetch_files(self, svn_path):
+        self._call('listing of "%s"' % svn_path)
+        result = []
+        for root, _, file_names in os.walk(join(self.config_directory, svn_path)):
+            for file_name in file_names:
+                result.append(relpath(join(root, file_name), self.config_directory))
+        return sorted(result)
+
+    def get_file_content(self, svn_path, revision):
+        return self.metadata_cache.get(('file', svn_path, str(revision)),
+                                       lambda: self._fetch_file_content(svn_path))
+
+    def _fetch_file_content(self, svn_path):
+        self._call('content of "%s"' % svn_path)
+        path = join(self.config_directory, svn_path)
+        if not exists(path):
+            raise self._create_path_not_found_error(svn_path)
+
+        with open(path) as source_file:
+            return source_file.read()
+
+    @measure_execution_time
+    def export(self, svn_path, target_dir, revision):
+        self._call('export of "%s"' % svn_path)
+        source = join(self.config_directory, svn_path)
+        if not exists(source):
+            raise self._create_path_not_found_error(svn_path)
+
+        if not isdir(source):
+            shutil.copy(source, target_dir)
+            return [(svn_path, os.path.basename(target_dir))]
+
+        exported_paths = []
+        for root, directory_names, file_names in os.walk(source):
+            target_root = join(target_dir, relpath(root, source))
+            if not exists(target_root):
+                os.makedirs(target_root)
+
+            for name in sorted(directory_names + file_names):
+                exported_paths.append((svn_path, relpath(join(root, name), source)))
+
+            for file_name in file_names:
+                shutil.copy(join(root, file_name), join(target_root, file_name))
+
+        return exported_paths
+
+    def _create_path_not_found_error(self, svn_path):
+        message = 'Path "%s" does not exist.' % svn_path
+        return ClientError(message, [(message, SVN_ERROR_CODES_PATH_NOT_FOUND[0])])
+
+    def __str__(self):
+        return '{0}(directory="{1}", path_to_config="{2}")'.format(
+            FakeSvnService.__name__, self.directory, self.path_to_config)
+
+
+class StubRpmBuilder(object):
+    """ Writes an empty rpm and an empty repos rpm instead of building them. """
+
+    def __init__(self, latency=None):
+        self.latency = latency or NO_LATENCY
+
+    def build(self, rpm_name, revision, rpms_dir):
+        self.latency.wait()
+
+        if self.latency.should_fail():
+            raise CouldNotBuildRpmException('Simulated failure of rpmbuild for "%s"' % rpm_name)
+
+        noarch_dir = join(rpms_dir, 'noarch')
+        if not exists(noarch_dir):
+            os.makedirs(noarch_dir)
+
+        rpms = []
+        for name in (rpm_name, rpm_name + '-repos'):
+            path = join(noarch_dir, '%s-1-%s.noarch.rpm' % (name, revision))
+            open(path, 'w').close()
+            rpms.append(path)
+        return rpms
@@ -18,8 +18,13 @@ import pysvn
 import os
 
 from logging import getLogger
+from os.path import basename, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Condition, Lock
+from time import ctime, time
 
-from time import ctime
+from config_rpm_maker.configuration.properties import get_temporary_directory
 from config_rpm_maker.utilities.logutils import log_elements_of_list
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
 from config_rpm_maker.utilities.profiler import measure_execution_time
@@ -29,19 +34,127 @@ LOGGER = getLogger(__name__)
 HOST_NAME_ENCODING = 'ascii'
 PYSVN_DELETE_ACTION = 'D'
 
+# svn error codes which mean that the requested path does not exist
+# in the revision. Those errors do not say anything about the health of
+# the subversion client.
+SVN_ERROR_CODES_PATH_NOT_FOUND = (160013, 170000)
+
+MAXIMUM_CONSECUTIVE_FAILURES = 3
+
 
 class SvnServiceException(BaseConfigRpmMakerException):
     error_info = "SVN Service error:\n"
 
 
+class FrozenRecord(dict):
+    """ A read-only dictionary which also allows attribute access
+        to its items, just like the log entries returned by pysvn. """
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('%s is read-only.' % self.__class__.__name__)
+
+    __setattr__ = __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return FrozenRecord, (dict(self),)
+
+
+def freeze(value):
+    """ Returns an immutable copy of the given value: dictionaries (and the
+        dictionary wrappers of pysvn) become FrozenRecords, lists become tuples. """
+
+    if isinstance(value, dict):
+        return FrozenRecord((key, freeze(item)) for key, item in value.items())
+
+    if isinstance(getattr(value, 'data', None), dict):
+        return freeze(value.data)
+
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+
+    return value
+
+
+class RevisionMetadataCache(object):
+    """ Keeps revision-level metadata (log, host list, file contents) so
+        that it will be fetched from the repository only once per run.
+        The cache is shared between all clones of a SvnService. Each key
+        is fetched under its own lock, so fetches of different keys do not
+        wait for each other. """
+
+    def __init__(self):
+        self._values = {}
+        self._key_locks = {}
+        self._lock = Lock()
+
+    def get(self, key, fetch_function):
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            key_lock = self._key_locks.setdefault(key, Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._values:
+                    return self._values[key]
+
+            value = freeze(fetch_function())
+
+            with self._lock:
+                self._values[key] = value
+                self._key_locks.pop(key, None)
+
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
+            self._key_locks = {}
+
+
 class SvnService(object):
-    def __init__(self, base_url, username=None, password=None, path_to_config='/config'):
+    def __init__(self, base_url, username=None, password=None, path_to_config='/config', metadata_cache=None):
         self.path_to_config = path_to_config
         self.base_url = base_url
         self.config_url = base_url + path_to_config
-        LOGGER.info('Configuration repository is "%s".', self.config_url)
+        self.username = username
+        self.password = password
+        self.consecutive_failures = 0
+        self.failures = 0
+        if metadata_cache is None:
+            # clones share the metadata cache of the service they have been cloned from
+            LOGGER.info('Configuration repository is "%s".', self.config_url)
+        self.metadata_cache = metadata_cache or RevisionMetadataCache()
         self._initialize_pysvn_client(username, password)
 
+    def clone(self):
+        """ Returns a new SvnService with its own pysvn client for the same repository. """
+
+        return SvnService(base_url=self.base_url,
+                          username=self.username,
+                          password=self.password,
+                          path_to_config=self.path_to_config,
+                          metadata_cache=self.metadata_cache)
+
+    def is_healthy(self):
+        """ A service is considered unhealthy after too many consecutive failures. """
+
+        return self.consecutive_failures < MAXIMUM_CONSECUTIVE_FAILURES
+
+    def _record_success(self):
+        self.consecutive_failures = 0
+
+    def _record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+
     def _initialize_pysvn_client(self, username, password):
         self.client = pysvn.Client()
         self.client.set_auth_cache(True)
@@ -64,15 +177,23 @@ class SvnService(object):
                         info.message.strip(), info.author, ctime(info.date))
 
     def get_logs_for_revision(self, revision):
-        """Return the logs for given revision of the repository at config_url"""
+        """Return the logs for given revision of the repository at config_url.
+           The logs are fetched only once and handed out as immutable copies."""
+
+        return self.metadata_cache.get(('logs', str(revision)),
+                                       lambda: self._fetch_logs_for_revision(revision))
 
+    def _fetch_logs_for_revision(self, revision):
         try:
             logs = self.client.log(self.base_url, self._rev(revision),
                                    self._rev(revision), discover_changed_paths=True)
         except Exception as exc:
+            self._record_failure()
             LOGGER.error('Retrieving change set information for revision "%s"'
                          ' in repository "%s" failed.', revision, self.config_url)
             raise SvnServiceException(str(exc))
+
+        self._record_success()
         return logs
 
     def get_changed_paths_with_action(self, revision):
@@ -116,8 +237,15 @@ class SvnService(object):
                              changed_paths_and_action)
         return changed_paths
 
-    @measure_execution_time
     def get_hosts(self, revision):
+        """Return the list of host names in the given revision"""
+
+        host_names = self.metadata_cache.get(('hosts', str(revision)),
+                                             lambda: self._fetch_hosts(revision))
+        return list(host_names)
+
+    @measure_execution_time
+    def _fetch_hosts(self, revision):
         url = self.config_url + '/host'
 
         items = self.client.list(url, revision=self._rev(revision),
@@ -129,14 +257,64 @@ class SvnService(object):
         repos_paths = [item[0].repos_path.encode(HOST_NAME_ENCODING) for item in items]
         return [os.path.basename(repos_path) for repos_path in repos_paths]
 
+    def get_files(self, svn_path, revision):
+        """Return the paths of all files below svn_path in the given revision.
+           The paths are relative to the configuration directory. An empty
+           list is returned if svn_path does not exist in the revision."""
+
+        return list(self.metadata_cache.get(('files', svn_path, str(revision)),
+                                            lambda: self._fetch_files(svn_path, revision)))
+
+    @measure_execution_time
+    def _fetch_files(self, svn_path, revision):
+        try:
+            items = self.client.list(self._get_url(svn_path), revision=self._rev(revision),
+                                     depth=pysvn.depth.infinity)
+        except pysvn.ClientError as error:
+            if self._is_path_not_found_error(error):
+                return []
+            self._record_failure()
+            raise
+
+        self._record_success()
+
+        start_pos = len(self.path_to_config + '/')
+        return [item[0].repos_path[start_pos:] for item in items
+                if item[0].kind == pysvn.node_kind.file]
+
+    def get_file_content(self, svn_path, revision):
+        """Return the content of the file at svn_path in the given revision.
+           The file is exported only once per revision."""
+
+        return self.metadata_cache.get(('file', svn_path, str(revision)),
+                                       lambda: self._fetch_file_content(svn_path, revision))
+
+    def _fetch_file_content(self, svn_path, revision):
+        temporary_directory = mkdtemp(prefix='yadt-config-rpm-maker.export.', dir=get_temporary_directory())
+        try:
+            target_file = join(temporary_directory, basename(svn_path))
+            self.export(svn_path, target_file, revision)
+            with open(target_file) as exported_file:
+                return exported_file.read()
+        finally:
+            rmtree(temporary_directory)
+
     @measure_execution_time
     def export(self, svn_path, target_dir, revision):
         url = self._get_url(svn_path)
 
         self.exported_files = []
         self.client.callback_notify = self._callback_notify
-        self.client.export(url, target_dir, force=True, revision=self._rev(revision))
-        self.client.callback_notify = None
+        try:
+            self.client.export(url, target_dir, force=True, revision=self._rev(revision))
+        except pysvn.ClientError as error:
+            if not self._is_path_not_found_error(error):
+                self._record_failure()
+            raise
+        finally:
+            self.client.callback_notify = None
+
+        self._record_success()
 
         normalized_length = len(os.path.normpath(target_dir) + os.sep)
         normalized_paths = [file_path[normalized_length:] for file_path in self.exported_files]
@@ -144,6 +322,16 @@ class SvnService(object):
 
         return [(svn_path, path) for path in normalized_paths]
 
+    def _is_path_not_found_error(self, error):
+        if len(error.args) < 2:
+            return False
+
+        for _, code in error.args[1]:
+            if code in SVN_ERROR_CODES_PATH_NOT_FOUND:
+                return True
+
+        return False
+
     def _rev(self, revision):
         return pysvn.Revision(pysvn.opt_revision_kind.number, int(revision))
 
@@ -161,3 +349,144 @@ class SvnService(object):
         return '{0}(base_url="{1}", path_to_config="{2}")'.format(
             SvnService.__name__, self.base_url, self.path_to_config)
 
+
+class SvnServicePool(object):
+    """ A pool of independent SvnService instances (each with its own pysvn
+        client) which can be shared between the build threads.
+
+        It can be used as a drop-in replacement for the svn_service_queue:
+        get() hands out a service and put() returns it to the pool.
+        Additional services are created lazily, up to the given size.
+        Services which became unhealthy are discarded when they are
+        returned and will be replaced by a new one when needed. """
+
+    def __init__(self, svn_service, size=1):
+        if size < 1:
+            raise SvnServiceException('The size of the svn service pool has to be at least 1, but is %s.' % size)
+
+        self.size = size
+        self._prototype = svn_service
+        self._idle_services = [svn_service]
+        self._services = [svn_service]
+        self._pending_services = 0
+        self._condition = Condition()
+
+        self.created_services = 1
+        self._reset_counters()
+
+    def get(self):
+        start_time = time()
+        waited = False
+
+        with self._condition:
+            while not self._idle_services and len(self._services) + self._pending_services >= self.size:
+                waited = True
+                self._condition.wait()
+
+            if self._idle_services:
+                svn_service = self._idle_services.pop()
+                self._record_get(svn_service, time() - start_time, waited)
+                return svn_service
+
+            # reserve the slot, the service is created without holding the lock
+            self._pending_services += 1
+
+        svn_service = self._create_service()
+
+        with self._condition:
+            self._pending_services -= 1
+            self._services.append(svn_service)
+            self.created_services += 1
+            self._record_get(svn_service, time() - start_time, waited)
+
+        return svn_service
+
+    def put(self, svn_service):
+        with self._condition:
+            if svn_service.is_healthy():
+                self._idle_services.append(svn_service)
+            else:
+                self._discard_service(svn_service)
+
+            self._condition.notify()
+
+    def take_statistics(self):
+        """ Returns the counters of this pool and resets them, so they can
+            be added to the pool of another process. """
+
+        with self._condition:
+            statistics = {'created_services': self.created_services,
+                          'discarded_services': self.discarded_services,
+                          'count_of_gets': self.count_of_gets,
+                          'count_of_waits': self.count_of_waits,
+                          'total_wait_time': self.total_wait_time,
+                          'maximum_wait_time': self.maximum_wait_time}
+            self.created_services = 0
+            self._reset_counters()
+            return statistics
+
+    def reset_statistics(self):
+        with self._condition:
+            self.created_services = 0
+            self._reset_counters()
+
+    def add_statistics(self, statistics):
+        with self._condition:
+            self.created_services += statistics['created_services']
+            self.discarded_services += statistics['discarded_services']
+            self.count_of_gets += statistics['count_of_gets']
+            self.count_of_waits += statistics['count_of_waits']
+            self.total_wait_time += statistics['total_wait_time']
+            self.maximum_wait_time = max(self.maximum_wait_time, statistics['maximum_wait_time'])
+
+    def _reset_counters(self):
+        self.discarded_services = 0
+        self.count_of_gets = 0
+        self.count_of_waits = 0
+        self.total_wait_time = 0.0
+        self.maximum_wait_time = 0.0
+        self.uses = {}
+
+    def log_summary(self, logging_function):
+        average_wait_time = 0.0
+        if self.count_of_gets:
+            average_wait_time = self.total_wait_time / self.count_of_gets
+
+        logging_function('Svn service pool (size %s): created %s, discarded %s service(s).',
+                         self.size, self.created_services, self.discarded_services)
+        logging_function('Svn service pool handed out %s service(s), %s time(s) had to wait: '
+                         'average wait %.2fs, maximum wait %.2fs, sum %.2fs',
+                         self.count_of_gets, self.count_of_waits, average_wait_time,
+                         self.maximum_wait_time, self.total_wait_time)
+
+        for index, svn_service in enumerate(self._services):
+            logging_function('    svn service #%s: used %s time(s), %s failure(s)',
+                             index, self.uses.get(id(svn_service), 0), svn_service.failures)
+
+    def _create_service(self):
+        """ Creates the service for a slot reserved by get(). It is called
+            without holding the lock, since creating a pysvn client is slow. """
+
+        LOGGER.debug('Creating svn service for pool of size %s.', self.size)
+        try:
+            return self._prototype.clone()
+        except Exception:
+            with self._condition:
+                self._pending_services -= 1
+                self._condition.notify()
+            raise
+
+    def _discard_service(self, svn_service):
+        LOGGER.warn('Discarding svn service after %s consecutive failure(s).', svn_service.consecutive_failures)
+        self._services.remove(svn_service)
+        self.discarded_services += 1
+
+    def _record_get(self, svn_service, wait_time, waited):
+        self.count_of_gets += 1
+        self.total_wait_time += wait_time
+        self.maximum_wait_time = max(self.maximum_wait_time, wait_time)
+        if waited:
+            self.count_of_waits += 1
+
+        key = id(svn_service)
+        self.uses[key] = self.uses.get(key, 0) + 1
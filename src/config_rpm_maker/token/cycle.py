@@ -63,44 +63,65 @@ class TokenCycleChecking(object):
 
 
 def tarjan_scc(graph):
-    """ Tarjan's partitioning algorithm for finding strongly connected components in a graph. """
+    """ Tarjan's partitioning algorithm for finding strongly connected components in a graph.
 
-    index_counter = [0]
+        The components are returned in reverse topological order: a component
+        is returned after all components which are reachable from it. The
+        depth first search is implemented without recursion, so deeply nested
+        graphs do not exceed the recursion limit. """
+
+    index_counter = 0
     stack = []
+    on_stack = set()
     lowlinks = {}
     index = {}
     result = []
 
-    def strongconnect(node):
-        index[node] = index_counter[0]
-        lowlinks[node] = index_counter[0]
-        index_counter[0] += 1
-        stack.append(node)
-
+    def successors_of(node):
         try:
-            successors = graph[node]
+            return iter(graph[node])
         except Exception:
-            successors = []
-        for successor in successors:
-            if successor not in lowlinks:
-                strongconnect(successor)
-                lowlinks[node] = min(lowlinks[node], lowlinks[successor])
-            elif successor in stack:
-                lowlinks[node] = min(lowlinks[node], index[successor])
-
-        if lowlinks[node] == index[node]:
-            connected_component = []
-
-            while True:
-                successor = stack.pop()
-                connected_component.append(successor)
-                if successor == node:
+            return iter([])
+
+    for root in graph:
+        if root in lowlinks:
+            continue
+
+        index[root] = lowlinks[root] = index_counter
+        index_counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        call_stack = [(root, successors_of(root))]
+
+        while call_stack:
+            node, successors = call_stack[-1]
+
+            for successor in successors:
+                if successor not in lowlinks:
+                    index[successor] = lowlinks[successor] = index_counter
+                    index_counter += 1
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    call_stack.append((successor, successors_of(successor)))
                     break
-            component = tuple(connected_component)
-            result.append(component)
-
-    for node in graph:
-        if node not in lowlinks:
-            strongconnect(node)
+                elif successor in on_stack:
+                    lowlinks[node] = min(lowlinks[node], index[successor])
+            else:
+                call_stack.pop()
+                if call_stack:
+                    parent = call_stack[-1][0]
+                    lowlinks[parent] = min(lowlinks[parent], lowlinks[node])
+
+                if lowlinks[node] == index[node]:
+                    connected_component = []
+
+                    while True:
+                        successor = stack.pop()
+                        on_stack.discard(successor)
+                        connected_component.append(successor)
+                        if successor == node:
+                            break
+                    component = tuple(connected_component)
+                    result.append(component)
 
     return result
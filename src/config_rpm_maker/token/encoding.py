@@ -0,0 +1,142 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+    Detection of the encoding of files which will be filtered. Asking
+    libmagic is expensive, so the cheap cases are checked first: pure ASCII
+    text and valid UTF-8 text are recognized directly. Only ambiguous
+    content is passed to libmagic, using a pool of reused magic cookies
+    since a cookie must not be used by two threads at the same time.
+"""
+
+from logging import getLogger
+from threading import Lock
+
+from config_rpm_maker.utilities.magic import Magic
+
+LOGGER = getLogger(__name__)
+
+ENCODING_ASCII = 'us-ascii'
+ENCODING_UTF_8 = 'utf-8'
+
+# the bytes which libmagic considers to be text within ASCII
+ASCII_TEXT_CHARACTERS = '\a\b\t\n\f\r\x1b' + ''.join(chr(code) for code in range(0x20, 0x7f))
+NON_ASCII_CHARACTERS = ''.join(chr(code) for code in range(0x80, 0x100))
+
+
+class EncodingDetectionStatistics(object):
+    """ Counts how often each way of handling a file has been taken. """
+
+    SKIPPED_WITHOUT_TOKENS = 'skipped (no tokens)'
+    DETECTED_ASCII = 'detected ascii'
+    DETECTED_UTF_8 = 'detected utf-8'
+    ASKED_LIBMAGIC = 'asked libmagic'
+
+    def __init__(self):
+        self._lock = Lock()
+        self.counters = {}
+        self.reset()
+
+    def increment(self, counter_name):
+        with self._lock:
+            self.counters[counter_name] += 1
+
+    def reset(self):
+        with self._lock:
+            self._reset_counters()
+
+    def take_counters(self):
+        """ Returns a copy of the counters and resets them. """
+
+        with self._lock:
+            counters = dict(self.counters)
+            self._reset_counters()
+            return counters
+
+    def add_counters(self, counters):
+        with self._lock:
+            for counter_name, count in counters.iteritems():
+                self.counters[counter_name] += count
+
+    def _reset_counters(self):
+        for counter_name in (self.SKIPPED_WITHOUT_TOKENS, self.DETECTED_ASCII,
+                             self.DETECTED_UTF_8, self.ASKED_LIBMAGIC):
+            self.counters[counter_name] = 0
+
+    def log_summary(self, logging_function):
+        with self._lock:
+            logging_function('Encoding detection: %s',
+                             ', '.join('%s %s time(s)' % (name, count) for name, count in sorted(self.counters.iteritems())))
+
+
+class MagicCookiePool(object):
+    """ A thread safe pool of libmagic wrappers which detect mime encodings.
+        New wrappers are created only if all existing ones are in use. """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._idle_magics = []
+        self.created_magics = 0
+
+    def from_buffer(self, content):
+        magic = self._get()
+        try:
+            return magic.from_buffer(content)
+        finally:
+            self._put(magic)
+
+    def _get(self):
+        with self._lock:
+            if self._idle_magics:
+                return self._idle_magics.pop()
+            self.created_magics += 1
+
+        LOGGER.debug('Creating magic cookie #%s', self.created_magics)
+        return Magic(mime_encoding=True)
+
+    def _put(self, magic):
+        with self._lock:
+            self._idle_magics.append(magic)
+
+
+ENCODING_DETECTION_STATISTICS = EncodingDetectionStatistics()
+MAGIC_COOKIE_POOL = MagicCookiePool()
+
+
+def detect_encoding(content):
+    """ Returns the mime encoding of the given content, using the same names
+        as libmagic does (e.g. "us-ascii", "utf-8", "binary"). """
+
+    if content:
+        if not content.translate(None, ASCII_TEXT_CHARACTERS):
+            ENCODING_DETECTION_STATISTICS.increment(EncodingDetectionStatistics.DETECTED_ASCII)
+            return ENCODING_ASCII
+
+        if not content.translate(None, ASCII_TEXT_CHARACTERS + NON_ASCII_CHARACTERS) and _is_valid_utf_8(content):
+            ENCODING_DETECTION_STATISTICS.increment(EncodingDetectionStatistics.DETECTED_UTF_8)
+            return ENCODING_UTF_8
+
+    ENCODING_DETECTION_STATISTICS.increment(EncodingDetectionStatistics.ASKED_LIBMAGIC)
+    return MAGIC_COOKIE_POOL.from_buffer(content)
+
+
+def _is_valid_utf_8(content):
+    try:
+        content.decode(ENCODING_UTF_8)
+        return True
+    except UnicodeDecodeError:
+        return False
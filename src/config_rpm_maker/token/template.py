@@ -0,0 +1,195 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+    Most files (e.g. the files in "all/files") are filtered for many hosts,
+    only the token values differ from host to host. A file's content is
+    therefore compiled only once into a template of literal chunks and token
+    slots. The compiled templates are cached by the hash of the content, and
+    the rendered outputs by the hash and the replacements, so hosts with
+    identical token values get the filtered output without filtering again.
+    The cache is bounded in bytes and cleared at the start of each revision
+    build, so the build daemon does not keep the outputs of old revisions.
+"""
+
+import re
+
+from collections import OrderedDict
+from hashlib import sha1
+from logging import getLogger
+from threading import Lock
+
+from config_rpm_maker.configuration.properties import get_max_file_size, get_template_cache_size
+
+LOGGER = getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"@@@([A-Za-z0-9_-]*)@@@")
+
+# the templates and outputs in the cache may take up to this many times max_file_size
+MAXIMUM_SIZE_IN_FILES = 100
+
+
+class CompiledTemplate(object):
+    """ Content split into literal chunks and token slots. """
+
+    def __init__(self, content):
+        self.size = len(content)
+        chunks = TOKEN_PATTERN.split(content)
+        self.literals = chunks[0::2]
+        self.token_names = []
+        self.slots = []
+
+        slot_by_token_name = {}
+        for token_name in chunks[1::2]:
+            if token_name not in slot_by_token_name:
+                slot_by_token_name[token_name] = len(self.token_names)
+                self.token_names.append(token_name)
+            self.slots.append(slot_by_token_name[token_name])
+
+    def render(self, replacements):
+        """ Fills the token slots. replacements is a tuple containing one
+            replacement for each name in token_names (in the same order). """
+
+        if not self.slots:
+            return self.literals[0]
+
+        parts = [self.literals[0]]
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            parts.append(replacements[slot])
+            parts.append(literal)
+        return ''.join(parts)
+
+
+class TemplateCache(object):
+    """ A thread safe least recently used cache of compiled templates and
+        their rendered outputs. The templates are keyed by the hash of the
+        content (see create_key), so a file filtered twice for the same host
+        only has to be hashed once. At most maximum_size templates are kept,
+        and the templates and outputs together take up at most
+        maximum_size_in_bytes. """
+
+    def __init__(self, maximum_size=None, maximum_size_in_bytes=None):
+        self.maximum_size = maximum_size
+        self.maximum_size_in_bytes = maximum_size_in_bytes
+        self.hits = 0
+        self.misses = 0
+        self.output_hits = 0
+        self.size_in_bytes = 0
+        self._template_count = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def is_enabled(self):
+        if self.maximum_size is None:
+            self.maximum_size = get_template_cache_size()
+
+        if self.maximum_size_in_bytes is None:
+            self.maximum_size_in_bytes = MAXIMUM_SIZE_IN_FILES * get_max_file_size()
+
+        return self.maximum_size > 0
+
+    def create_key(self, content):
+        """ Returns the key of the given content, or None if the cache is disabled. """
+
+        if not self.is_enabled():
+            return None
+
+        if isinstance(content, unicode):
+            return unicode, sha1(content.encode('utf-8')).hexdigest()
+        return str, sha1(content).hexdigest()
+
+    def get_template(self, content, key=None):
+        if key is None:
+            key = self.create_key(content)
+            if key is None:
+                return CompiledTemplate(content)
+
+        with self._lock:
+            template = self._get_entry(('template', key))
+            if template is not None:
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        template = CompiledTemplate(content)
+
+        with self._lock:
+            self._put_entry(('template', key), template, template.size)
+
+        return template
+
+    def render(self, template, key, values, replacer_function):
+        """ Returns the output of the template with the given key. values
+            contains the value of each name in template.token_names, the
+            replacement of a token is replacer_function(token_name, value).
+            The output is rendered only once for identical values. """
+
+        if key is None or not template.slots:
+            return self._render(template, values, replacer_function)
+
+        output_key = ('output', key, replacer_function, values)
+
+        with self._lock:
+            output = self._get_entry(output_key)
+            if output is not None:
+                self.output_hits += 1
+                return output
+
+        output = self._render(template, values, replacer_function)
+
+        with self._lock:
+            self._put_entry(output_key, output, len(output))
+
+        return output
+
+    def _render(self, template, values, replacer_function):
+        return template.render(tuple(replacer_function(token_name, value)
+                                     for token_name, value in zip(template.token_names, values)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._template_count = 0
+            self.size_in_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.output_hits = 0
+
+    def _get_entry(self, entry_key):
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self._entries[entry_key] = entry
+            return entry[0]
+        return None
+
+    def _put_entry(self, entry_key, value, size):
+        if size > self.maximum_size_in_bytes or entry_key in self._entries:
+            return
+
+        self._entries[entry_key] = (value, size)
+        self.size_in_bytes += size
+        if entry_key[0] == 'template':
+            self._template_count += 1
+
+        while self.size_in_bytes > self.maximum_size_in_bytes or self._template_count > self.maximum_size:
+            evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size_in_bytes -= evicted_size
+            if evicted_key[0] == 'template':
+                self._template_count -= 1
+
+
+TEMPLATE_CACHE = TemplateCache()
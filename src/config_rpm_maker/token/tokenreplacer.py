@@ -15,17 +15,17 @@
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import cgi
-import re
 import os
+import shutil
 
 from logging import getLogger
-from os.path import getsize
-
-import config_rpm_maker.utilities.magic
+from os.path import exists, getsize, islink
 
 from config_rpm_maker.configuration.properties import get_max_file_size
 from config_rpm_maker.utilities.logutils import verbose
-from config_rpm_maker.token.cycle import TokenCycleChecking
+from config_rpm_maker.token.cycle import TokenCycleChecking, tarjan_scc
+from config_rpm_maker.token.encoding import ENCODING_DETECTION_STATISTICS, EncodingDetectionStatistics, detect_encoding
+from config_rpm_maker.token.template import TEMPLATE_CACHE, TOKEN_PATTERN
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
 
 
@@ -78,13 +78,41 @@ class FileLimitExceededException(BaseConfigRpmMakerException):
         return 'The file "%s" (%d bytes) is bigger than the allowed file size %d bytes.' % (self.path, getsize(self.path), self.size_limit)
 
 
+def read_token_values(directory):
+    """ Returns the content of each file in the given directory by file name. """
+
+    token_values = {}
+    absolute_path = os.path.abspath(directory)
+
+    for name in os.listdir(absolute_path):
+        candidate = os.path.join(absolute_path, name)
+        if os.path.isfile(candidate):
+            with open(candidate) as property_file:
+                token_values[name] = property_file.read().strip()
+
+    return token_values
+
+
+def replace_token(token, replacement):
+    return replacement
+
+
+def html_escape(filename, content):
+    try:
+        content = cgi.escape(content, quote=True)
+        return u"<!DOCTYPE html><html><head><title>%s</title></head><body><pre>%s</pre></body></html>" % (filename, content)
+    except Exception as e:
+        raise CouldNotEscapeHtmlException("Could not html escape file: " + filename + '\n\n' + str(e))
+
+
 class TokenReplacer(object):
     """ Class that replaces tokens in strings.
 
         The general syntax is
             @@@TOKEN@@@ """
 
-    TOKEN_PATTERN = re.compile(r"@@@([A-Za-z0-9_-]*)@@@")
+    TOKEN_PATTERN = TOKEN_PATTERN
+    TOKEN_MARKER = '@@@'
 
     @classmethod
     def filter_directory(cls,
@@ -113,14 +141,7 @@ class TokenReplacer(object):
     def from_directory(cls, directory, replacer_function=None, html_escape_function=None):
         LOGGER.debug("Initializing token replacer of class %s from directory %s", cls.__name__, directory)
 
-        token_values = {}
-        absolute_path = os.path.abspath(directory)
-
-        for name in os.listdir(absolute_path):
-            candidate = os.path.join(absolute_path, name)
-            if os.path.isfile(candidate):
-                with open(candidate) as property_file:
-                    token_values[name] = property_file.read().strip()
+        token_values = read_token_values(directory)
 
         return cls(token_values=token_values, replacer_function=replacer_function, html_escape_function=html_escape_function)
 
@@ -133,38 +154,35 @@ class TokenReplacer(object):
             self.token_values[token] = token_values[token].decode('UTF-8').strip()
 
         if not replacer_function:
-            def replacer_function(token, replacement):
-                return replacement
+            replacer_function = replace_token
         else:
             verbose(LOGGER).debug("Using custom replacer_function %s", replacer_function.__name__)
 
-        if not html_escape_function:
-            def html_escape_function(filename, content):
-                try:
-                    content = cgi.escape(content, quote=True)
-                    return u"<!DOCTYPE html><html><head><title>%s</title></head><body><pre>%s</pre></body></html>" % (filename, content)
-                except Exception as e:
-                    raise CouldNotEscapeHtmlException("Could not html escape file: " + filename + '\n\n' + str(e))
-
         self.replacer_function = replacer_function
-        self.html_escape_function = html_escape_function
+        self.html_escape_function = html_escape_function or html_escape
 
         self.token_values = self._replace_tokens_in_token_values(self.token_values)
-        self.magic_mime_encoding = None
-
-    def filter(self, content):
-        while True:
-            match = TokenReplacer.TOKEN_PATTERN.search(content)
-            if not match:
-                return content
-            token_name = match.group(1)
-            if token_name not in self.token_values:
-                raise MissingTokenException(token_name)
-            replacement = self.replacer_function(token_name,
-                                                 self.token_values[token_name])
-
-            content = content.replace("@@@%s@@@" % token_name, replacement)
-            self.token_used.add(token_name)
+
+    def filter(self, content, content_key=None):
+        """ Replaces all tokens in the given content. The content is compiled
+            into a template once and the template is shared by all hosts, as
+            is the output for identical replacements. content_key is the key
+            of the content in the TEMPLATE_CACHE if it is already known. """
+
+        if content_key is None:
+            content_key = TEMPLATE_CACHE.create_key(content)
+
+        template = TEMPLATE_CACHE.get_template(content, content_key)
+
+        try:
+            values = tuple([self.token_values[token_name] for token_name in template.token_names])
+        except KeyError as error:
+            missing_token_name = error.args[0]
+            self.token_used.update(template.token_names[:template.token_names.index(missing_token_name)])
+            raise MissingTokenException(missing_token_name)
+        self.token_used.update(template.token_names)
+
+        return TEMPLATE_CACHE.render(template, content_key, values, self.replacer_function)
 
     def _read_content_from_file(self, filename):
 
@@ -183,8 +201,11 @@ class TokenReplacer(object):
 
         file_content_filtered = self.filter(file_content)
 
+        self._write_content_to_file(filename, file_content_filtered, file_encoding)
+
+    def _write_content_to_file(self, filename, content, file_encoding):
         with open(filename, "w") as output_file:
-            output_file.write(file_content_filtered.encode(file_encoding))
+            output_file.write(content.encode(file_encoding))
 
     def filter_file(self, filename, html_escape=False):
         try:
@@ -195,6 +216,10 @@ class TokenReplacer(object):
 
             file_content = self._read_content_from_file(filename)
 
+            if not html_escape and TokenReplacer.TOKEN_MARKER not in file_content:
+                ENCODING_DETECTION_STATISTICS.increment(EncodingDetectionStatistics.SKIPPED_WITHOUT_TOKENS)
+                return
+
             file_encoding = self._get_file_encoding(file_content)
             if file_encoding:
                 if file_encoding != 'binary' and file_encoding != 'unknown-8bit':
@@ -208,47 +233,159 @@ class TokenReplacer(object):
         except Exception as e:
             raise CannotFilterFileException('Cannot filter file %s.\n%s' % (os.path.basename(filename), str(e)))
 
-    def _replace_tokens_in_token_values(self, token_values):
-        tokens_without_sub_tokens = dict((key, value) for (key, value) in token_values.iteritems() if not TokenReplacer.TOKEN_PATTERN.search(value))
-        tokens_with_sub_tokens = dict((key, value) for (key, value) in token_values.iteritems() if TokenReplacer.TOKEN_PATTERN.search(value))
-
-        while tokens_with_sub_tokens:
-            tokens_with_sub_tokens_after_replace = {}
-            replace_count = 0
-            for (key, value) in tokens_with_sub_tokens.iteritems():
-                token_names = TokenReplacer.TOKEN_PATTERN.findall(value)
-                for token_name in token_names:
-                    if token_name in tokens_without_sub_tokens:
-                        value = value.replace("@@@%s@@@" % token_name, tokens_without_sub_tokens[token_name])
-                        replace_count += 1
-
-                if TokenReplacer.TOKEN_PATTERN.search(value):
-                    tokens_with_sub_tokens_after_replace[key] = value
+    def add_token_values_from_directory(self, directory):
+        """ Adds the variables of the given directory which are not known
+            yet, e.g. because they have been written after this token replacer
+            has been created. Only the added variables are resolved. """
+
+        token_values = {}
+        for token, value in read_token_values(directory).iteritems():
+            if token not in self.token_values:
+                token_values[token] = value.decode('UTF-8').strip()
+
+        LOGGER.debug("Adding %d variable(s) from directory %s", len(token_values), directory)
+        self.token_values = self._replace_tokens_in_token_values(token_values, self.token_values)
+
+    def with_replacer_function(self, replacer_function, html_escape_function=None):
+        """ Returns a token replacer using a different replacer function but
+            the already resolved token values of this token replacer. """
+
+        token_replacer = self.__class__(replacer_function=replacer_function, html_escape_function=html_escape_function)
+        token_replacer.token_values = self.token_values
+        return token_replacer
+
+    def filter_directory_with_config_viewer_copy(self,
+                                                 directory,
+                                                 config_viewer_directory,
+                                                 config_viewer_token_replacer,
+                                                 filter_in_place=True,
+                                                 ignored_names=(),
+                                                 thread_name="no thread name",
+                                                 file_copier=None):
+        """ Filters all files in the given directory in place and writes html
+            escaped copies, filtered by config_viewer_token_replacer, into
+            config_viewer_directory. Every file is read only once. Files which
+            can not be filtered are copied using file_copier if given. """
+
+        LOGGER.debug('%s: filtering files in directory "%s" and writing config viewer copies to "%s"',
+                     thread_name, directory, config_viewer_directory)
+
+        for root, directory_names, filenames in os.walk(directory):
+            config_viewer_root = os.path.normpath(os.path.join(config_viewer_directory, os.path.relpath(root, directory)))
+            if not exists(config_viewer_root):
+                os.makedirs(config_viewer_root)
+
+            for name in directory_names + filenames:
+                path = os.path.join(root, name)
+                if islink(path) and name not in ignored_names:
+                    os.symlink(os.readlink(path), os.path.join(config_viewer_root, name))
+
+            for filename in filenames:
+                absolute_filename = os.path.join(root, filename)
+                if filename in ignored_names:
+                    continue
+
+                if islink(absolute_filename):
+                    if filter_in_place:
+                        self.filter_file(absolute_filename)
+                    continue
+
+                self.filter_file_with_config_viewer_copy(absolute_filename,
+                                                         os.path.join(config_viewer_root, filename),
+                                                         config_viewer_token_replacer,
+                                                         filter_in_place=filter_in_place,
+                                                         file_copier=file_copier)
+
+    def filter_file_with_config_viewer_copy(self, filename, config_viewer_filename, config_viewer_token_replacer,
+                                            filter_in_place=True, file_copier=None):
+        try:
+            self.file_size_limit = get_max_file_size()
+
+            if getsize(filename) > self.file_size_limit:
+                raise FileLimitExceededException(filename, self.file_size_limit)
+
+            file_content = self._read_content_from_file(filename)
+
+            file_encoding = self._get_file_encoding(file_content)
+            if file_encoding and file_encoding != 'binary' and file_encoding != 'unknown-8bit':
+                verbose(LOGGER).debug('Filtering file "%s" using encoding "%s"', filename, file_encoding)
+                decoded_file_content = file_content.decode(file_encoding)
+
+                # the content is hashed only once, the key of the escaped content is derived from it
+                content_key = escaped_content_key = TEMPLATE_CACHE.create_key(file_content)
+                if content_key is not None:
+                    content_key = (file_encoding, content_key)
+                    escaped_content_key = (config_viewer_token_replacer.html_escape_function,
+                                           os.path.basename(filename)) + content_key
+
+                if filter_in_place and TokenReplacer.TOKEN_MARKER in file_content:
+                    self._write_content_to_file(filename, self.filter(decoded_file_content, content_key), file_encoding)
+
+                escaped_file_content = config_viewer_token_replacer.html_escape_function(os.path.basename(filename),
+                                                                                         decoded_file_content)
+                self._write_content_to_file(config_viewer_filename,
+                                            config_viewer_token_replacer.filter(escaped_file_content, escaped_content_key),
+                                            file_encoding)
+            else:
+                verbose(LOGGER).warn('Not filtering file "%s" since it has encoding "%s".', filename, file_encoding)
+                if file_copier:
+                    # the file is neither filtered in place nor html escaped
+                    file_copier.copy(filename, config_viewer_filename, immutable=True)
                 else:
-                    tokens_without_sub_tokens[key] = value
-
-            # there are still invalid tokens and we could not replace any of them in the last loop cycle, so let's throw an error
-            if tokens_with_sub_tokens_after_replace and not replace_count:
-                # maybe there is a cycle?
-                dependency_digraph = {}
-                for (variable, variable_contents) in tokens_with_sub_tokens_after_replace.iteritems():
-                    edge_source = variable
-                    edge_target = TokenReplacer.TOKEN_PATTERN.findall(variable_contents)
-                    dependency_digraph[edge_source] = edge_target
-                token_graph = TokenCycleChecking(dependency_digraph)
-                token_graph.assert_no_cycles_present()
-                # no cycle => variable undefined
-                unreplaced_variables = []
-                for(variable, variable_contents) in tokens_with_sub_tokens_after_replace.iteritems():
-                    unreplaced = TokenReplacer.TOKEN_PATTERN.findall(variable_contents)
-                    unreplaced_variables.append(unreplaced)
-                raise MissingOrRedundantTokenException("Unresolved variables :\n" + str(unreplaced_variables))
-
-            tokens_with_sub_tokens = tokens_with_sub_tokens_after_replace
-
-        return tokens_without_sub_tokens
+                    with open(config_viewer_filename, "w") as output_file:
+                        output_file.write(file_content)
+
+            shutil.copymode(filename, config_viewer_filename)
+
+        except MissingTokenException as exception:
+            raise MissingTokenException(exception.token, filename)
+
+        except Exception as e:
+            raise CannotFilterFileException('Cannot filter file %s.\n%s' % (os.path.basename(filename), str(e)))
+
+    def _replace_tokens_in_token_values(self, token_values, resolved_token_values=None):
+        """ Resolves variables which reference other variables. The dependency
+            graph is built once and the variables are resolved in topological
+            order, so every variable is resolved exactly once. The variables
+            may reference the already resolved_token_values as well. """
+
+        resolved_token_values = dict(resolved_token_values or {})
+
+        dependency_digraph = {}
+        for (variable, variable_contents) in token_values.iteritems():
+            dependency_digraph[variable] = [referenced_variable
+                                            for referenced_variable in TokenReplacer.TOKEN_PATTERN.findall(variable_contents)
+                                            if referenced_variable not in resolved_token_values]
+
+        components = tarjan_scc(dependency_digraph)
+        self._assert_variables_are_resolvable(dependency_digraph, components)
+
+        def replace_token(match):
+            return resolved_token_values[match.group(1)]
+
+        # tarjan_scc returns the variables after all the variables they depend on
+        for (variable,) in components:
+            if TokenReplacer.TOKEN_MARKER in token_values[variable]:
+                resolved_token_values[variable] = TokenReplacer.TOKEN_PATTERN.sub(replace_token, token_values[variable])
+            else:
+                resolved_token_values[variable] = token_values[variable]
+
+        return resolved_token_values
+
+    def _assert_variables_are_resolvable(self, dependency_digraph, components):
+        for component in components:
+            if len(component) > 1:
+                TokenCycleChecking(dependency_digraph).assert_no_cycles_present()
+
+        unreplaced_variables = []
+        for (variable, referenced_variables) in sorted(dependency_digraph.iteritems()):
+            unreplaced = [referenced_variable for referenced_variable in referenced_variables
+                          if referenced_variable == variable or referenced_variable not in dependency_digraph]
+            if unreplaced:
+                unreplaced_variables.append(unreplaced)
+
+        if unreplaced_variables:
+            raise MissingOrRedundantTokenException("Unresolved variables :\n" + str(unreplaced_variables))
 
     def _get_file_encoding(self, content):
-        if not self.magic_mime_encoding:
-            self.magic_mime_encoding = config_rpm_maker.utilities.magic.Magic(mime_encoding=True)
-        return self.magic_mime_encoding.from_buffer(content)
+        return detect_encoding(content)
@@ -0,0 +1,80 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Converts the measurements of the execution time profiler into the trace
+    event format of Chrome, which can be opened in chrome://tracing or in
+    the Perfetto UI (https://ui.perfetto.dev). Each thread gets its own
+    track, so the timeline shows what every build thread has been doing.
+"""
+
+import json
+import os
+
+from os.path import dirname, exists
+
+MICROSECONDS_PER_SECOND = 1000000
+
+
+def create_trace_events(measurements, process_id=None):
+    """ Returns a complete event ("ph": "X") for each measurement and the
+        metadata events naming the tracks. The timestamps are relative to
+        the start of the first measurement. """
+
+    if process_id is None:
+        process_id = os.getpid()
+
+    measurements = sorted(measurements, key=lambda measurement: (measurement.start_time, measurement.depth))
+    if not measurements:
+        return []
+
+    first_start_time = measurements[0].start_time
+    thread_ids = {}
+    trace_events = []
+
+    for measurement in measurements:
+        thread_id = thread_ids.setdefault(measurement.thread_name, len(thread_ids) + 1)
+
+        arguments = {'cpu_time': measurement.cpu_time}
+        if measurement.host:
+            arguments['host'] = measurement.host
+        if measurement.arguments:
+            arguments['arguments'] = measurement.arguments
+
+        trace_events.append({'name': measurement.function_name,
+                             'cat': 'host' if measurement.host else 'build',
+                             'ph': 'X',
+                             'ts': int((measurement.start_time - first_start_time) * MICROSECONDS_PER_SECOND),
+                             'dur': int(measurement.wall_time * MICROSECONDS_PER_SECOND),
+                             'pid': process_id,
+                             'tid': thread_id,
+                             'args': arguments})
+
+    for thread_name, thread_id in sorted(thread_ids.iteritems(), key=lambda item: item[1]):
+        trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': process_id, 'tid': thread_id,
+                             'args': {'name': thread_name}})
+        trace_events.append({'name': 'thread_sort_index', 'ph': 'M', 'pid': process_id, 'tid': thread_id,
+                             'args': {'sort_index': thread_id}})
+
+    return trace_events
+
+
+def write_chrome_trace(path, measurements):
+    if dirname(path) and not exists(dirname(path)):
+        os.makedirs(dirname(path))
+
+    with open(path, 'w') as trace_file:
+        json.dump({'traceEvents': create_trace_events(measurements), 'displayTimeUnit': 'ms'}, trace_file)
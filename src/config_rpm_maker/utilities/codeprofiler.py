@@ -0,0 +1,209 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Profiles a complete build on the level of python functions. The build
+    threads and the main thread run their work through CODE_PROFILER.profile,
+    so the deterministic mode ("cprofile") profiles each of them with its
+    own cProfile profiler and merges the statistics afterwards. In both modes
+    a sampler thread records the stacks of all threads every few
+    milliseconds. The sampling mode does nothing else and therefore costs
+    little enough to be used for long runs; its pstats file is derived from
+    the samples.
+"""
+
+import cProfile
+import marshal
+import os
+import sys
+
+from logging import getLogger
+from os.path import exists, join
+from pstats import Stats
+from thread import get_ident
+from threading import Event, Lock, Thread
+
+from config_rpm_maker.configuration import PROFILING_MODE_CPROFILE, PROFILING_MODE_OFF
+
+LOGGER = getLogger(__name__)
+
+
+class StackSampler(Thread):
+    """ Counts how often each stack of python frames has been seen in any
+        other thread. Since waiting threads are sampled, too, the counts
+        reflect the wall clock time. """
+
+    def __init__(self, interval):
+        super(StackSampler, self).__init__(name='StackSampler')
+        self.daemon = True
+        self.interval = interval
+        self.stack_counts = {}
+        self.sample_count = 0
+        self._stop_event = Event()
+
+    def run(self):
+        own_thread_id = get_ident()
+        while not self._stop_event.wait(self.interval):
+            self.sample(own_thread_id)
+
+    def sample(self, own_thread_id=None):
+        self.sample_count += 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            stack = tuple(reversed(stack))
+            self.stack_counts[stack] = self.stack_counts.get(stack, 0) + 1
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+
+def format_function(function):
+    file_name, line_number, function_name = function
+    return '%s (%s:%d)' % (function_name, file_name, line_number)
+
+
+def create_collapsed_stacks(stack_counts):
+    """ Returns the lines of the collapsed stack format which is read by
+        flamegraph.pl and speedscope: "root;caller;callee count". """
+
+    lines = []
+    for stack, count in stack_counts.iteritems():
+        lines.append('%s %d' % (';'.join(format_function(function) for function in stack), count))
+
+    return sorted(lines)
+
+
+def create_stats_from_samples(stack_counts, interval):
+    """ Returns a dictionary in the format of pstats (as written by
+        cProfile) where each sample counts as one call taking interval
+        seconds. """
+
+    stats = {}
+
+    def add(values, count, own_time, cumulative_time):
+        return (values[0] + count, values[1] + count, values[2] + own_time, values[3] + cumulative_time)
+
+    for stack, count in stack_counts.iteritems():
+        sampled_time = count * interval
+        seen_functions = set()
+        seen_calls = set()
+
+        for index, function in enumerate(stack):
+            is_leaf = index == len(stack) - 1
+            own_time = sampled_time if is_leaf else 0.0
+            values = stats.get(function, (0, 0, 0.0, 0.0, {}))
+            callers = values[4]
+
+            if function in seen_functions:
+                values = (values[0], values[1], values[2] + own_time, values[3], callers)
+            else:
+                seen_functions.add(function)
+                values = add(values, count, own_time, sampled_time) + (callers,)
+
+            if index > 0 and (stack[index - 1], function) not in seen_calls:
+                caller = stack[index - 1]
+                seen_calls.add((caller, function))
+                callers[caller] = add(callers.get(caller, (0, 0, 0.0, 0.0)), count, own_time, sampled_time)
+
+            stats[function] = values
+
+    return stats
+
+
+class CodeProfiler(object):
+
+    def __init__(self):
+        self.mode = PROFILING_MODE_OFF
+        self.sampling_interval = 0.01
+        self._profiles = []
+        self._sampler = None
+        self._lock = Lock()
+
+    def start(self, mode, sampling_interval):
+        self.stop()
+        self.mode = mode
+        self.sampling_interval = sampling_interval
+        self._profiles = []
+        self._sampler = None
+
+        if mode != PROFILING_MODE_OFF:
+            LOGGER.info('Profiling build in mode "%s" sampling every %.3fs', mode, sampling_interval)
+            self._sampler = StackSampler(sampling_interval)
+            self._sampler.start()
+
+    def stop(self):
+        if self._sampler is not None:
+            self._sampler.stop()
+
+    def profile(self, function, *args, **kwargs):
+        """ Calls the given function and profiles it deterministically
+            if the mode is "cprofile". """
+
+        if self.mode != PROFILING_MODE_CPROFILE:
+            return function(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(function, *args, **kwargs)
+
+        finally:
+            with self._lock:
+                self._profiles.append(profile)
+
+    def get_merged_stats(self):
+        with self._lock:
+            profiles = list(self._profiles)
+
+        if profiles:
+            return Stats(*profiles)
+
+        return None
+
+    def write(self, directory, name):
+        """ Writes <name>.pstats and <name>.collapsed to the given directory
+            and returns the paths of the written files. """
+
+        if not exists(directory):
+            os.makedirs(directory)
+
+        pstats_path = join(directory, name + '.pstats')
+        collapsed_stacks_path = join(directory, name + '.collapsed')
+        stack_counts = self._sampler.stack_counts if self._sampler is not None else {}
+
+        merged_stats = self.get_merged_stats()
+        if merged_stats is not None:
+            merged_stats.dump_stats(pstats_path)
+        else:
+            with open(pstats_path, 'wb') as pstats_file:
+                marshal.dump(create_stats_from_samples(stack_counts, self.sampling_interval), pstats_file)
+
+        with open(collapsed_stacks_path, 'w') as collapsed_stacks_file:
+            for line in create_collapsed_stacks(stack_counts):
+                collapsed_stacks_file.write(line + '\n')
+
+        return pstats_path, collapsed_stacks_path
+
+
+CODE_PROFILER = CodeProfiler()
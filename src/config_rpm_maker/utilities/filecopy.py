@@ -0,0 +1,198 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Copies files the cheapest way the file systems support: files which
+    will never be rewritten are hardlinked, all others are cloned using a
+    reflink (FICLONE) or copied within the kernel using copy_file_range.
+    A plain copy is the last resort. A strategy which is not supported by
+    the file systems is given up after its first failure.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import fcntl
+import os
+
+from ctypes import c_int, c_size_t, c_ssize_t, c_uint, c_void_p
+from logging import getLogger
+from shutil import copyfile
+from threading import Lock
+
+from config_rpm_maker.configuration import FILE_COPY_STRATEGY_COPY, get_file_copy_strategy
+from config_rpm_maker.utilities.logutils import verbose
+
+LOGGER = getLogger(__name__)
+
+FICLONE = 0x40049409
+
+STRATEGY_HARDLINK = 'hardlink'
+STRATEGY_REFLINK = 'reflink'
+STRATEGY_COPY_FILE_RANGE = 'copy_file_range'
+STRATEGY_COPY = 'copy'
+
+# the strategies which do not need additional data blocks for the copy
+SPACE_SAVING_STRATEGIES = (STRATEGY_HARDLINK, STRATEGY_REFLINK)
+
+UNSUPPORTED_ERRNOS = (errno.EINVAL, errno.ENOSYS, errno.ENOTTY, errno.EOPNOTSUPP, errno.EXDEV)
+
+
+def _load_copy_file_range():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        copy_file_range = libc.copy_file_range
+    except (AttributeError, OSError):
+        return None
+
+    copy_file_range.argtypes = [c_int, c_void_p, c_int, c_void_p, c_size_t, c_uint]
+    copy_file_range.restype = c_ssize_t
+    return copy_file_range
+
+
+_copy_file_range = _load_copy_file_range()
+
+
+class FileCopyStatistics(object):
+    """ Counts the files and bytes copied using each strategy. """
+
+    STRATEGIES = (STRATEGY_HARDLINK, STRATEGY_REFLINK, STRATEGY_COPY_FILE_RANGE, STRATEGY_COPY)
+
+    def __init__(self):
+        self._lock = Lock()
+        self.files = {}
+        self.bytes = {}
+        self.reset()
+
+    def record(self, strategy, size):
+        with self._lock:
+            self.files[strategy] += 1
+            self.bytes[strategy] += size
+
+    def reset(self):
+        with self._lock:
+            self._reset_counters()
+
+    def take_counters(self):
+        """ Returns a copy of the counters and resets them. """
+
+        with self._lock:
+            counters = {'files': dict(self.files), 'bytes': dict(self.bytes)}
+            self._reset_counters()
+            return counters
+
+    def add_counters(self, counters):
+        with self._lock:
+            for strategy in self.STRATEGIES:
+                self.files[strategy] += counters['files'][strategy]
+                self.bytes[strategy] += counters['bytes'][strategy]
+
+    def _reset_counters(self):
+        for strategy in self.STRATEGIES:
+            self.files[strategy] = 0
+            self.bytes[strategy] = 0
+
+    def get_saved_bytes(self):
+        with self._lock:
+            return sum(self.bytes[strategy] for strategy in SPACE_SAVING_STRATEGIES)
+
+    def log_summary(self, logging_function):
+        saved_bytes = self.get_saved_bytes()
+        with self._lock:
+            logging_function('File copies: %s, %d bytes saved',
+                             ', '.join('%s %s file(s) with %d bytes' % (strategy, self.files[strategy], self.bytes[strategy])
+                                       for strategy in self.STRATEGIES),
+                             saved_bytes)
+
+
+FILE_COPY_STATISTICS = FileCopyStatistics()
+
+
+class FileCopier(object):
+    """ Copies the content of files using the cheapest supported strategy.
+        The mode and times are not copied. """
+
+    def __init__(self, allow_hardlinks=True, allow_clones=True, statistics=FILE_COPY_STATISTICS):
+        self.statistics = statistics
+        self._supported_strategies = {STRATEGY_HARDLINK: allow_hardlinks,
+                                      STRATEGY_REFLINK: allow_clones,
+                                      STRATEGY_COPY_FILE_RANGE: allow_clones and _copy_file_range is not None}
+
+    def copy(self, source, target, immutable=False):
+        """ Copies source to target, which must not exist. Set immutable only
+            if neither source nor target will ever be rewritten in place,
+            since both might be the same file afterwards.
+
+            Returns the strategy which has been used. """
+
+        size = os.path.getsize(source)
+
+        strategies = [(STRATEGY_REFLINK, self._reflink), (STRATEGY_COPY_FILE_RANGE, self._copy_file_range)]
+        if immutable:
+            strategies.insert(0, (STRATEGY_HARDLINK, os.link))
+
+        for strategy, copy_function in strategies:
+            if self._supported_strategies[strategy] and self._try_to_copy(strategy, copy_function, source, target):
+                break
+        else:
+            strategy = STRATEGY_COPY
+            copyfile(source, target)
+
+        self.statistics.record(strategy, size)
+        return strategy
+
+    def _try_to_copy(self, strategy, copy_function, source, target):
+        try:
+            copy_function(source, target)
+            return True
+
+        except (IOError, OSError) as error:
+            if strategy != STRATEGY_HARDLINK and os.path.exists(target):
+                os.remove(target)
+
+            if error.errno not in UNSUPPORTED_ERRNOS:
+                raise
+
+            verbose(LOGGER).debug('Giving up file copy strategy %s: %s', strategy, str(error))
+            self._supported_strategies[strategy] = False
+            return False
+
+    def _reflink(self, source, target):
+        with open(source, 'rb') as source_file:
+            with open(target, 'wb') as target_file:
+                fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+
+    def _copy_file_range(self, source, target):
+        with open(source, 'rb') as source_file:
+            with open(target, 'wb') as target_file:
+                remaining = os.fstat(source_file.fileno()).st_size
+                while remaining > 0:
+                    copied = _copy_file_range(source_file.fileno(), None, target_file.fileno(), None, remaining, 0)
+                    if copied < 0:
+                        error_number = ctypes.get_errno()
+                        raise OSError(error_number, os.strerror(error_number))
+                    if copied == 0:
+                        break
+                    remaining -= copied
+
+
+def create_file_copier(allow_hardlinks=True):
+    """ Returns a file copier using the configured file copy strategy. """
+
+    if get_file_copy_strategy() == FILE_COPY_STRATEGY_COPY:
+        return FileCopier(allow_hardlinks=False, allow_clones=False)
+
+    return FileCopier(allow_hardlinks=allow_hardlinks)
@@ -16,15 +16,22 @@
 
 """
     This module contains functions which were created for performance
-    tweaking. The test coverage of this module is low since it's main
-    purpose is to add logging information.
+    tweaking. Every call of a function decorated with measure_execution_time
+    is recorded with its wall and cpu time, thread and host, so the summary
+    can show percentiles and break the times down by thread and by host.
 """
 
+import json
+import os
+import resource
+
 from functools import wraps
 from logging import getLogger
+from math import ceil
+from threading import Lock, current_thread, local
 from time import time
 from os import walk
-from os.path import join, getsize
+from os.path import dirname, exists, join, getsize
 
 from config_rpm_maker.configuration import get_thread_count
 
@@ -32,60 +39,252 @@ LOGGER = getLogger(__name__)
 
 LOG_EACH_MEASUREMENT = False
 
-_execution_time_summary = {}
+SLOWEST_HOSTS_TO_LOG = 5
+
+MAXIMUM_LENGTH_OF_RECORDED_ARGUMENTS = 200
+
+RUSAGE_THREAD = getattr(resource, 'RUSAGE_THREAD', 1)
+
+_measurement_context = local()
+
+
+def get_thread_cpu_time():
+    """ Returns the cpu time consumed by the current thread, or by the whole
+        process where the cpu time of a thread is not available. """
+
+    try:
+        usage = resource.getrusage(RUSAGE_THREAD)
+    except (ValueError, resource.error):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    return usage.ru_utime + usage.ru_stime
+
+
+def percentile(sorted_values, percent):
+    """ Returns the smallest of the sorted values which is greater than or
+        equal to percent of all values (nearest rank). """
+
+    if not sorted_values:
+        return 0.0
+
+    rank = int(ceil(percent / 100.0 * len(sorted_values)))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class Measurement(object):
+    """ A single call of a measured function. depth is 0 for calls which
+        have not been made from within another measured function. """
+
+    __slots__ = ('function_name', 'start_time', 'wall_time', 'cpu_time', 'thread_name', 'host', 'depth', 'arguments')
+
+    def __init__(self, function_name, start_time, wall_time, cpu_time, thread_name, host=None, depth=0, arguments=None):
+        self.function_name = function_name
+        self.start_time = start_time
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.thread_name = thread_name
+        self.host = host
+        self.depth = depth
+        self.arguments = arguments
+
+    def __getstate__(self):
+        # measurements of the build processes are pickled to be merged by the parent process
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+class ExecutionTimeStatistics(object):
+
+    def __init__(self, measurements):
+        wall_times = sorted(measurement.wall_time for measurement in measurements)
+
+        self.count = len(wall_times)
+        self.wall_time = sum(wall_times)
+        self.cpu_time = sum(measurement.cpu_time for measurement in measurements)
+        self.average = self.wall_time / self.count if self.count else 0.0
+        self.p50 = percentile(wall_times, 50)
+        self.p95 = percentile(wall_times, 95)
+        self.p99 = percentile(wall_times, 99)
+        self.max = wall_times[-1] if wall_times else 0.0
+
+    def to_dict(self):
+        return {'count': self.count,
+                'wall_time': self.wall_time,
+                'cpu_time': self.cpu_time,
+                'average': self.average,
+                'p50': self.p50,
+                'p95': self.p95,
+                'p99': self.p99,
+                'max': self.max}
+
+
+class ExecutionTimeProfiler(object):
+    """ Collects the measurements of all threads. The arguments of the
+        calls are only recorded if record_arguments is set, since formatting
+        them costs time. """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._measurements = []
+        self.record_arguments = False
+
+    def record(self, measurement):
+        with self._lock:
+            self._measurements.append(measurement)
+
+    def reset(self):
+        with self._lock:
+            self._measurements = []
+
+    def get_measurements(self):
+        with self._lock:
+            return list(self._measurements)
+
+    def take_measurements(self):
+        """ Returns the measurements recorded so far and resets them. """
+
+        with self._lock:
+            measurements = self._measurements
+            self._measurements = []
+            return measurements
+
+    def add_measurements(self, measurements):
+        with self._lock:
+            self._measurements.extend(measurements)
+
+    def summarize(self, key_function, top_level_only=False):
+        """ Groups the measurements by the key returned by key_function and
+            returns the statistics of each group. Measurements with key None
+            are left out. top_level_only leaves out calls made from within
+            other measured functions, which would be counted twice otherwise. """
+
+        groups = {}
+        for measurement in self.get_measurements():
+            if top_level_only and measurement.depth > 0:
+                continue
+
+            key = key_function(measurement)
+            if key is not None:
+                groups.setdefault(key, []).append(measurement)
+
+        return dict((key, ExecutionTimeStatistics(measurements)) for key, measurements in groups.iteritems())
+
+    def summarize_by_function(self):
+        return self.summarize(lambda measurement: measurement.function_name)
+
+    def summarize_by_thread(self):
+        return self.summarize(lambda measurement: measurement.thread_name, top_level_only=True)
+
+    def summarize_by_host(self):
+        return self.summarize(lambda measurement: measurement.host, top_level_only=True)
+
+    def to_dict(self):
+        def to_dicts(summary):
+            return dict((key, statistics.to_dict()) for key, statistics in summary.iteritems())
+
+        return {'functions': to_dicts(self.summarize_by_function()),
+                'threads': to_dicts(self.summarize_by_thread()),
+                'hosts': to_dicts(self.summarize_by_host())}
+
+    def write_json(self, path):
+        if dirname(path) and not exists(dirname(path)):
+            os.makedirs(dirname(path))
+
+        with open(path, 'w') as json_file:
+            json.dump(self.to_dict(), json_file, indent=2, sort_keys=True)
+
+    def log_summary(self, logging_function):
+        logging_function('Execution times summary (keep in mind thread_count was set to %s):', get_thread_count())
+
+        summary_by_function = self.summarize_by_function()
+        for function_name in sorted(summary_by_function.keys()):
+            statistics = summary_by_function[function_name]
+            logging_function('    %5s times with average %5.2fs = sum %7.2fs (cpu %7.2fs), p50 %5.2fs p95 %5.2fs p99 %5.2fs max %5.2fs : %s',
+                             statistics.count, statistics.average, statistics.wall_time, statistics.cpu_time,
+                             statistics.p50, statistics.p95, statistics.p99, statistics.max, function_name)
+
+        summary_by_thread = self.summarize_by_thread()
+        if summary_by_thread:
+            logging_function('Execution times by thread:')
+            for thread_name in sorted(summary_by_thread.keys()):
+                statistics = summary_by_thread[thread_name]
+                logging_function('    sum %7.2fs (cpu %7.2fs) : %s', statistics.wall_time, statistics.cpu_time, thread_name)
+
+        summary_by_host = self.summarize_by_host()
+        if summary_by_host:
+            logging_function('Slowest of %d host(s):', len(summary_by_host))
+            slowest_hosts = sorted(summary_by_host.iteritems(), key=lambda item: item[1].wall_time, reverse=True)
+            for host, statistics in slowest_hosts[:SLOWEST_HOSTS_TO_LOG]:
+                logging_function('    sum %7.2fs (cpu %7.2fs) : %s', statistics.wall_time, statistics.cpu_time, host)
+
+
+EXECUTION_TIME_PROFILER = ExecutionTimeProfiler()
 
 
 def measure_execution_time(original_function):
 
-    def process_measurement(elapsed_time_in_seconds, args, kwargs):
+    def get_function_name(args):
+        if len(args) > 0:
+            return "%s.%s" % (args[0].__class__.__name__, original_function.__name__)
+
+        return original_function.__name__
+
+    def format_arguments(args, kwargs):
         arguments = ', '.join([str(arg) for arg in args[1:]])
 
         key_word_arguments = ""
         if kwargs:
             key_word_arguments = ", " + str(kwargs)
 
-        if len(args) > 0:
-            function_name = "%s.%s" % (args[0].__class__.__name__, original_function.__name__)
-        else:
-            function_name = original_function.__name__
+        return arguments + key_word_arguments
 
-        if function_name not in _execution_time_summary.keys():
-            _execution_time_summary[function_name] = [elapsed_time_in_seconds, 1]
-        else:
-            _execution_time_summary[function_name][0] += elapsed_time_in_seconds
-            _execution_time_summary[function_name][1] += 1
-
-        if LOG_EACH_MEASUREMENT:
-            function_call = '%s(%s%s)' % (function_name, arguments, key_word_arguments)
-            LOGGER.debug('Took %.2fs to perform %s', elapsed_time_in_seconds, function_call)
+    def log_measurement(function_name, elapsed_time_in_seconds, args, kwargs):
+        function_call = '%s(%s)' % (function_name, format_arguments(args, kwargs))
+        LOGGER.debug('Took %.2fs to perform %s', elapsed_time_in_seconds, function_call)
 
     @wraps(original_function)
     def wrapped_function(*args, **kwargs):
-        start_time = time()
+        outer_host = getattr(_measurement_context, 'host', None)
+        depth = getattr(_measurement_context, 'depth', 0)
+
+        # calls made from within the methods of a HostRpmBuilder belong to its host
+        host = getattr(args[0], 'hostname', None) if args else None
+        if not isinstance(host, basestring):
+            host = outer_host
 
-        return_value_from_function = original_function(*args, **kwargs)
+        _measurement_context.host = host
+        _measurement_context.depth = depth + 1
+        start_time = time()
+        start_cpu_time = get_thread_cpu_time()
+        try:
+            return original_function(*args, **kwargs)
 
-        end_time = time()
+        finally:
+            elapsed_time_in_seconds = time() - start_time
+            cpu_time_in_seconds = get_thread_cpu_time() - start_cpu_time
+            _measurement_context.host = outer_host
+            _measurement_context.depth = depth
 
-        elapsed_time_in_seconds = end_time - start_time
+            arguments = None
+            if EXECUTION_TIME_PROFILER.record_arguments:
+                arguments = format_arguments(args, kwargs)[:MAXIMUM_LENGTH_OF_RECORDED_ARGUMENTS]
 
-        process_measurement(elapsed_time_in_seconds, args, kwargs)
+            function_name = get_function_name(args)
+            EXECUTION_TIME_PROFILER.record(Measurement(function_name, start_time, elapsed_time_in_seconds,
+                                                       cpu_time_in_seconds, current_thread().name, host, depth,
+                                                       arguments))
 
-        return return_value_from_function
+            if LOG_EACH_MEASUREMENT:
+                log_measurement(function_name, elapsed_time_in_seconds, args, kwargs)
 
     return wrapped_function
 
 
 def log_execution_time_summaries(logging_function):
-    logging_function('Execution times summary (keep in mind thread_count was set to %s):', get_thread_count())
-
-    for function_name in sorted(_execution_time_summary.keys()):
-        summary_of_function = _execution_time_summary[function_name]
-        elapsed_time = summary_of_function[0]
-        average_time = summary_of_function[0] / summary_of_function[1]
-
-        logging_function('    %5s times with average %5.2fs = sum %7.2fs : %s',
-                         summary_of_function[1], average_time, elapsed_time, function_name)
+    EXECUTION_TIME_PROFILER.log_summary(logging_function)
 
 
 def log_directories_summary(logging_function, start_path):
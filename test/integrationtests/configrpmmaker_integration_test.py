@@ -23,7 +23,6 @@ from integration_test_support import (IntegrationTest,
                                       IntegrationTestException)
 
 from config_rpm_maker.configrpmmaker import (CouldNotBuildSomeRpmsException,
-                                             CouldNotUploadRpmsException,
                                              ConfigRpmMaker,
                                              configuration)
 from config_rpm_maker.configuration.properties import (is_no_clean_up_enabled,
@@ -31,7 +30,7 @@ from config_rpm_maker.configuration.properties import (is_no_clean_up_enabled,
                                                        get_temporary_directory,
                                                        get_rpm_upload_command)
 from config_rpm_maker.configuration import build_config_viewer_host_directory
-from config_rpm_maker.segment import All, Typ
+from config_rpm_maker.rpmupload import CouldNotUploadRpmsException
 
 EXECUTION_ERROR_MESSAGE = """Execution of "{command_with_arguments}" failed. Error code was {error_code}
 stdout was: "{stdout}"
@@ -59,12 +58,6 @@ class ConfigRpmMakerIntegrationTestWithNonConfigCommitAndNoConfig(IntegrationTes
 
 class ConfigRpmMakerIntegrationTest(IntegrationTest):
 
-    def test_should_find_matching_hosts(self):
-        config_rpm_maker = ConfigRpmMaker(None, None)
-        self.assertEqual(['berweb01', 'devweb01'], config_rpm_maker._find_matching_hosts(All(), 'all/foo/bar', ['berweb01', 'devweb01']))
-        self.assertEqual([], config_rpm_maker._find_matching_hosts(All(), 'foo/bar', ['berweb01', 'devweb01']))
-        self.assertEqual(['berweb01', 'devweb01'], config_rpm_maker._find_matching_hosts(Typ(), 'typ/web', ['berweb01', 'devweb01']))
-
     def test_should_identify_affected_hosts(self):
         config_rpm_maker = ConfigRpmMaker(None, None)
         self.assertEqual(set(['berweb01', 'devweb01', 'tuvweb02']), config_rpm_maker._get_affected_hosts(['typ/web', 'foo/bar'], ['berweb01', 'devweb01', 'tuvweb02']))
@@ -240,3 +240,73 @@ class TokenReplacerFilterDirectoryIntegrationTest(IntegrationTestBase):
                                                       self.abspath("VARIABLES.localhost"))
 
             self.assertEqual(replacer.token_used, set(["SPAM", "EGGS"]))
+
+
+class TokenReplacerFilterDirectoryWithConfigViewerCopyIntegrationTest(IntegrationTestBase):
+
+    def setUp(self):
+        super(TokenReplacerFilterDirectoryWithConfigViewerCopyIntegrationTest, self).setUp()
+
+        def config_viewer_replacer(token, replacement):
+            return '<strong>%s</strong>' % replacement
+
+        def html_escape_function(filename, content):
+            return u'<pre>%s</pre>' % content
+
+        self.token_replacer = TokenReplacer({'SPAM': 'spam', 'EGGS': 'eggs'})
+        self.config_viewer_token_replacer = self.token_replacer.with_replacer_function(config_viewer_replacer,
+                                                                                       html_escape_function)
+        self.create_tmp_dir("yadt-config-localhost")
+        self.create_tmp_dir(("yadt-config-localhost", "tomorrow"))
+        self.create_tmp_file(("yadt-config-localhost", "motd"), "Today we serve @@@SPAM@@@ & @@@EGGS@@@.")
+        self.create_tmp_file(("yadt-config-localhost", "tomorrow", "motd"), "Tomorrow we serve spam.")
+
+    def filter_directory(self, **keyword_arguments):
+        self.token_replacer.filter_directory_with_config_viewer_copy(self.abspath("yadt-config-localhost"),
+                                                                     self.abspath("config-viewer"),
+                                                                     self.config_viewer_token_replacer,
+                                                                     **keyword_arguments)
+
+    def test_should_filter_files_in_place_and_write_config_viewer_copies(self):
+        self.filter_directory()
+
+        self.ensure_file_contents(("yadt-config-localhost", "motd"), "Today we serve spam & eggs.")
+        self.ensure_file_contents(("yadt-config-localhost", "tomorrow", "motd"), "Tomorrow we serve spam.")
+        self.ensure_file_contents(("config-viewer", "motd"),
+                                  "<pre>Today we serve <strong>spam</strong> & <strong>eggs</strong>.</pre>")
+        self.ensure_file_contents(("config-viewer", "tomorrow", "motd"), "<pre>Tomorrow we serve spam.</pre>")
+
+    def test_should_only_write_config_viewer_copies(self):
+        self.filter_directory(filter_in_place=False)
+
+        self.ensure_file_contents(("yadt-config-localhost", "motd"), "Today we serve @@@SPAM@@@ & @@@EGGS@@@.")
+        self.ensure_file_contents(("config-viewer", "motd"),
+                                  "<pre>Today we serve <strong>spam</strong> & <strong>eggs</strong>.</pre>")
+
+    def test_should_use_token_values_of_original_token_replacer(self):
+        self.filter_directory()
+
+        self.assertEqual(set(['SPAM', 'EGGS']), self.token_replacer.token_used)
+        self.assertEqual(set(['SPAM', 'EGGS']), self.config_viewer_token_replacer.token_used)
+
+    def test_should_not_write_config_viewer_copies_of_ignored_files(self):
+        self.filter_directory(ignored_names=('motd',))
+
+        self.assertFalse(os.path.exists(self.abspath(("config-viewer", "motd"))))
+        self.assertFalse(os.path.exists(self.abspath(("config-viewer", "tomorrow", "motd"))))
+
+    def test_should_copy_symlinks_into_config_viewer(self):
+        os.symlink("motd", self.abspath(("yadt-config-localhost", "link-to-motd")))
+
+        self.filter_directory()
+
+        self.assertEqual("motd", os.readlink(self.abspath(("config-viewer", "link-to-motd"))))
+
+    def test_should_copy_binary_files_into_config_viewer(self):
+        binary_content = struct.pack("BBBB", 0x00, 0xff, 0xfe, 0x01) + "@@@SPAM@@@"
+        self.create_tmp_file(("yadt-config-localhost", "bin"), binary_content, binary=True)
+
+        self.filter_directory()
+
+        self.ensure_file_contents(("yadt-config-localhost", "bin"), binary_content, binary=True)
+        self.ensure_file_contents(("config-viewer", "bin"), binary_content, binary=True)
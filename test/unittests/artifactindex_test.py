@@ -0,0 +1,59 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from config_rpm_maker.artifactindex import ArtifactIndex
+
+
+class ArtifactIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.artifact_index = ArtifactIndex()
+        self.artifact_index.add('devweb01', ['devweb01.rpm', 'devweb01-repos.rpm'])
+        self.artifact_index.add('tuvweb01', ['tuvweb01.rpm'])
+
+    def test_should_return_rpms_of_host(self):
+        self.assertEqual(['devweb01.rpm', 'devweb01-repos.rpm'], self.artifact_index.get_rpms('devweb01'))
+
+    def test_should_return_empty_list_for_unknown_host(self):
+        self.assertEqual([], self.artifact_index.get_rpms('berweb01'))
+
+    def test_should_return_hosts_in_order_of_addition(self):
+        self.assertEqual(['devweb01', 'tuvweb01'], self.artifact_index.hosts)
+
+    def test_should_return_all_rpms(self):
+        self.assertEqual(['devweb01.rpm', 'devweb01-repos.rpm', 'tuvweb01.rpm'], self.artifact_index.rpms)
+        self.assertEqual(3, len(self.artifact_index))
+
+    def test_should_write_one_line_for_each_rpm(self):
+        temporary_directory = mkdtemp(prefix='artifactindex_test.')
+        try:
+            path = os.path.join(temporary_directory, 'artifacts.index')
+
+            self.artifact_index.write(path)
+
+            with open(path) as index_file:
+                self.assertEqual('devweb01 devweb01.rpm\ndevweb01 devweb01-repos.rpm\ntuvweb01 tuvweb01.rpm\n',
+                                 index_file.read())
+        finally:
+            rmtree(temporary_directory)
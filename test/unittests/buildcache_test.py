@@ -0,0 +1,173 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import unittest
+
+from os.path import exists, join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from config_rpm_maker.buildcache import BuildCache, calculate_digest
+
+
+class BuildCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='buildcache-test-')
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def write_file(self, path, content):
+        path = join(self.temporary_directory, path)
+        if not exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as file_to_write:
+            file_to_write.write(content)
+        return path
+
+
+class CalculateDigestTests(BuildCacheTestCase):
+
+    def setUp(self):
+        super(CalculateDigestTests, self).setUp()
+        self.config_dir = join(self.temporary_directory, 'config')
+        self.variables_dir = join(self.temporary_directory, 'variables')
+        self.write_file('config/etc/app.conf', 'host=@@@HOST@@@')
+        self.write_file('variables/HOST', 'devweb01')
+        self.write_file('variables/REVISION', '123')
+
+    def calculate_digest(self, **kwargs):
+        return calculate_digest([self.config_dir, self.variables_dir], ignored_names=('REVISION',), **kwargs)
+
+    def test_should_return_same_digest_for_same_files(self):
+
+        self.assertEqual(self.calculate_digest(), self.calculate_digest())
+
+    def test_should_return_other_digest_when_content_of_file_changed(self):
+
+        digest = self.calculate_digest()
+        self.write_file('config/etc/app.conf', 'host=@@@FQDN@@@')
+
+        self.assertNotEqual(digest, self.calculate_digest())
+
+    def test_should_return_other_digest_when_file_has_been_added(self):
+
+        digest = self.calculate_digest()
+        self.write_file('config/etc/other.conf', '')
+
+        self.assertNotEqual(digest, self.calculate_digest())
+
+    def test_should_return_other_digest_when_mode_of_file_changed(self):
+
+        digest = self.calculate_digest()
+        os.chmod(join(self.config_dir, 'etc', 'app.conf'), 0755)
+
+        self.assertNotEqual(digest, self.calculate_digest())
+
+    def test_should_return_other_digest_when_variable_changed(self):
+
+        digest = self.calculate_digest()
+        self.write_file('variables/HOST', 'devweb02')
+
+        self.assertNotEqual(digest, self.calculate_digest())
+
+    def test_should_ignore_given_names_in_top_level_of_directories(self):
+
+        digest = self.calculate_digest()
+        self.write_file('variables/REVISION', '124')
+
+        self.assertEqual(digest, self.calculate_digest())
+
+    def test_should_not_ignore_given_names_in_subdirectories(self):
+
+        digest = self.calculate_digest()
+        self.write_file('config/etc/REVISION', '124')
+
+        self.assertNotEqual(digest, self.calculate_digest())
+
+    def test_should_return_other_digest_when_settings_changed(self):
+
+        self.assertNotEqual(self.calculate_digest(settings=('rpmbuild',)), self.calculate_digest(settings=('native',)))
+
+
+class BuildCacheTests(BuildCacheTestCase):
+
+    def setUp(self):
+        super(BuildCacheTests, self).setUp()
+        self.cache_dir = join(self.temporary_directory, 'cache')
+        self.rpm_output_dir = join(self.temporary_directory, 'output')
+        self.rpm = self.write_file('output/RPMS/noarch/yadt-config-devweb01-1-123.noarch.rpm', 'rpm')
+        self.build_cache = BuildCache(self.cache_dir)
+
+    def test_should_not_return_digest_of_unknown_host(self):
+
+        self.assertEqual(None, self.build_cache.get_digest('devweb01'))
+        self.assertFalse(self.build_cache.is_unchanged('devweb01', 'abc'))
+
+    def test_should_not_use_staged_build_before_it_has_been_committed(self):
+
+        self.build_cache.stage('devweb01', '123', 'abc', self.rpm_output_dir, [self.rpm])
+
+        self.assertEqual(None, self.build_cache.get_digest('devweb01'))
+        self.assertEqual([], self.build_cache.get_rpms('devweb01'))
+
+    def test_should_return_digest_and_rpms_of_committed_build(self):
+
+        self.build_cache.stage('devweb01', '123', 'abc', self.rpm_output_dir, [self.rpm])
+        self.build_cache.commit('devweb01', '123')
+
+        self.assertTrue(self.build_cache.is_unchanged('devweb01', 'abc'))
+        self.assertFalse(self.build_cache.is_unchanged('devweb01', 'def'))
+        self.assertEqual(['RPMS/noarch/yadt-config-devweb01-1-123.noarch.rpm'], self.build_cache.get_rpms('devweb01'))
+
+    def test_should_replace_committed_build(self):
+
+        self.build_cache.stage('devweb01', '123', 'abc', self.rpm_output_dir, [self.rpm])
+        self.build_cache.commit('devweb01', '123')
+        self.build_cache.stage('devweb01', '124', 'def', self.rpm_output_dir, [])
+        self.build_cache.commit('devweb01', '124')
+
+        self.assertEqual('def', self.build_cache.get_digest('devweb01'))
+        self.assertEqual([], self.build_cache.get_rpms('devweb01'))
+
+    def test_should_remove_builds_staged_for_other_revisions_when_committing(self):
+
+        self.build_cache.stage('devweb01', '122', 'abc', self.rpm_output_dir, [self.rpm])
+        self.build_cache.commit('devweb01', '123')
+
+        self.assertEqual([], os.listdir(join(self.cache_dir, 'devweb01')))
+        self.assertEqual(None, self.build_cache.get_digest('devweb01'))
+
+    def test_should_not_fail_when_committing_host_without_cache_entry(self):
+
+        self.build_cache.commit('devweb01', '123')
+
+    def test_should_link_committed_rpms_into_rpm_output_directory(self):
+
+        self.build_cache.stage('devweb01', '123', 'abc', self.rpm_output_dir, [self.rpm])
+        self.build_cache.commit('devweb01', '123')
+        other_rpm_output_dir = join(self.temporary_directory, 'other-output')
+
+        linked_rpms = self.build_cache.link_rpms('devweb01', other_rpm_output_dir)
+
+        expected_rpm = join(other_rpm_output_dir, 'RPMS/noarch/yadt-config-devweb01-1-123.noarch.rpm')
+        self.assertEqual([expected_rpm], linked_rpms)
+        with open(expected_rpm) as linked_rpm:
+            self.assertEqual('rpm', linked_rpm.read())
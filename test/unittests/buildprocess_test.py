@@ -0,0 +1,151 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from mock import Mock, patch
+
+from unittest_support import UnitTests
+
+from config_rpm_maker import buildprocess
+from config_rpm_maker.buildprocess import build_host_in_process, merge_build_process_statistics
+from config_rpm_maker.hostrpmbuilder import CouldNotBuildRpmException
+from config_rpm_maker.token.encoding import ENCODING_DETECTION_STATISTICS
+from config_rpm_maker.utilities.filecopy import FILE_COPY_STATISTICS, STRATEGY_COPY
+from config_rpm_maker.utilities.profiler import EXECUTION_TIME_PROFILER, Measurement
+
+
+class BuildHostInProcessTests(UnitTests):
+
+    def setUp(self):
+        self.mock_abort_event = Mock()
+        self.mock_abort_event.is_set.return_value = False
+        buildprocess._build_process_context.update(revision='123',
+                                                   work_dir='/tmp/work',
+                                                   svn_service_queue=Mock(),
+                                                   segment_export_cache=None,
+                                                   error_logging_handler=None,
+                                                   abort_event=self.mock_abort_event,
+                                                   resolved_hosts=None,
+                                                   rpm_builder=None)
+
+    def tearDown(self):
+        buildprocess._build_process_context.clear()
+
+    @patch('config_rpm_maker.buildprocess.HostRpmBuilder')
+    def test_should_return_built_rpms(self, mock_host_rpm_builder_class):
+
+        mock_host_rpm_builder_class.return_value.build.return_value = ['spam.rpm']
+
+        actual = build_host_in_process('devweb01')
+
+        self.assertEqual(('devweb01', ['spam.rpm'], None), actual[:3])
+
+    @patch('config_rpm_maker.buildprocess.HostRpmBuilder')
+    def test_should_pass_resolved_hosts_to_host_rpm_builder(self, mock_host_rpm_builder_class):
+
+        mock_resolved_hosts = Mock()
+        buildprocess._build_process_context['resolved_hosts'] = mock_resolved_hosts
+
+        build_host_in_process('devweb01')
+
+        self.assertEqual(mock_resolved_hosts, mock_host_rpm_builder_class.call_args[1]['resolved_hosts'])
+
+    @patch('config_rpm_maker.buildprocess.HostRpmBuilder')
+    def test_should_pass_rpm_builder_to_host_rpm_builder(self, mock_host_rpm_builder_class):
+
+        mock_rpm_builder = Mock()
+        buildprocess._build_process_context['rpm_builder'] = mock_rpm_builder
+
+        build_host_in_process('devweb01')
+
+        self.assertEqual(mock_rpm_builder, mock_host_rpm_builder_class.call_args[1]['rpm_builder'])
+
+    @patch('config_rpm_maker.buildprocess.HostRpmBuilder')
+    def test_should_return_error_message_when_build_failed(self, mock_host_rpm_builder_class):
+
+        mock_host_rpm_builder_class.return_value.build.side_effect = CouldNotBuildRpmException('spam')
+
+        actual = build_host_in_process('devweb01')
+
+        self.assertEqual(('devweb01', [], 'spam'), actual[:3])
+
+    @patch('config_rpm_maker.buildprocess.HostRpmBuilder')
+    def test_should_return_stack_trace_when_build_failed_unexpectedly(self, mock_host_rpm_builder_class):
+
+        mock_host_rpm_builder_class.return_value.build.side_effect = ValueError('eggs')
+
+        host, rpms, error, statistics = build_host_in_process('devweb01')
+
+        self.assertTrue('ValueError: eggs' in error)
+
+    @patch('config_rpm_maker.buildprocess.HostRpmBuilder')
+    def test_should_skip_build_when_build_has_been_aborted(self, mock_host_rpm_builder_class):
+
+        self.mock_abort_event.is_set.return_value = True
+
+        actual = build_host_in_process('devweb01')
+
+        self.assertEqual(('devweb01', None, None), actual[:3])
+        self.assert_mock_never_called(mock_host_rpm_builder_class)
+
+    @patch('config_rpm_maker.buildprocess.HostRpmBuilder')
+    def test_should_return_and_reset_statistics_collected_during_build(self, mock_host_rpm_builder_class):
+
+        measurement = Measurement('build', 0.0, 1.0, 0.5, 'Process-1', host='devweb01')
+
+        def fake_build():
+            EXECUTION_TIME_PROFILER.record(measurement)
+            ENCODING_DETECTION_STATISTICS.increment(ENCODING_DETECTION_STATISTICS.DETECTED_ASCII)
+            FILE_COPY_STATISTICS.record(STRATEGY_COPY, 42)
+            return ['spam.rpm']
+
+        mock_host_rpm_builder_class.return_value.build.side_effect = fake_build
+
+        host, rpms, error, statistics = build_host_in_process('devweb01')
+
+        self.assertEqual([measurement], statistics['measurements'])
+        self.assertEqual(1, statistics['encoding_detection'][ENCODING_DETECTION_STATISTICS.DETECTED_ASCII])
+        self.assertEqual(42, statistics['file_copies']['bytes'][STRATEGY_COPY])
+        self.assertEqual([], EXECUTION_TIME_PROFILER.get_measurements())
+        self.assertEqual(0, ENCODING_DETECTION_STATISTICS.counters[ENCODING_DETECTION_STATISTICS.DETECTED_ASCII])
+        self.assertEqual(0, FILE_COPY_STATISTICS.bytes[STRATEGY_COPY])
+
+
+class MergeBuildProcessStatisticsTests(UnitTests):
+
+    def tearDown(self):
+        EXECUTION_TIME_PROFILER.reset()
+        ENCODING_DETECTION_STATISTICS.reset()
+        FILE_COPY_STATISTICS.reset()
+
+    def test_should_add_statistics_of_build_process(self):
+
+        measurement = Measurement('build', 0.0, 1.0, 0.5, 'Process-1', host='devweb01')
+        encoding_detection = ENCODING_DETECTION_STATISTICS.take_counters()
+        encoding_detection[ENCODING_DETECTION_STATISTICS.ASKED_LIBMAGIC] = 3
+        file_copies = FILE_COPY_STATISTICS.take_counters()
+        file_copies['files'][STRATEGY_COPY] = 2
+        mock_svn_service_pool = Mock()
+        statistics = {'measurements': [measurement],
+                      'encoding_detection': encoding_detection,
+                      'file_copies': file_copies,
+                      'svn_service_pool': {'count_of_gets': 5}}
+
+        merge_build_process_statistics(statistics, mock_svn_service_pool)
+
+        self.assertEqual([measurement], EXECUTION_TIME_PROFILER.get_measurements())
+        self.assertEqual(3, ENCODING_DETECTION_STATISTICS.counters[ENCODING_DETECTION_STATISTICS.ASKED_LIBMAGIC])
+        self.assertEqual(2, FILE_COPY_STATISTICS.files[STRATEGY_COPY])
+        mock_svn_service_pool.add_statistics.assert_called_with({'count_of_gets': 5})
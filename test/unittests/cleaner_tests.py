@@ -16,6 +16,13 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import enumerate as enumerate_threads
+
 from mock import Mock, patch
 
 from unittest_support import UnitTests
@@ -109,3 +116,42 @@ class CleanerTests(UnitTests):
 
         mock_exists.assert_any_call('target/tmp/configviewer/hosts/devweb01')
         mock_rmtree.assert_any_call('target/tmp/configviewer/hosts/devweb01')
+
+
+class CleanerSymlinkPublicationTests(UnitTests):
+
+    def setUp(self):
+        self.hosts_dir = mkdtemp(prefix='cleaner_test.')
+
+    def tearDown(self):
+        rmtree(self.hosts_dir)
+
+    def _create_directory(self, name):
+        os.makedirs(join(self.hosts_dir, name))
+
+    def _wait_for_garbage_collection(self):
+        for thread in enumerate_threads():
+            if thread.name == 'ConfigViewerGarbageCollector':
+                thread.join()
+
+    @patch('config_rpm_maker.cleaner.get_config_viewer_publication')
+    @patch('config_rpm_maker.cleaner.get_config_viewer_host_directory')
+    @patch('config_rpm_maker.cleaner.build_config_viewer_host_directory')
+    def test_should_remove_symlink_and_revision_directories_of_deleted_host(self, mock_build_config_viewer_host_directory,
+                                                                           mock_get_config_viewer_host_directory,
+                                                                           mock_get_config_viewer_publication):
+
+        mock_build_config_viewer_host_directory.side_effect = lambda host_name: join(self.hosts_dir, host_name)
+        mock_get_config_viewer_host_directory.return_value = self.hosts_dir
+        mock_get_config_viewer_publication.return_value = 'symlink'
+        self._create_directory('devweb01.revision-41')
+        self._create_directory('devweb01.revision-43')
+        self._create_directory('tuvweb01.revision-41')
+        os.symlink('devweb01.revision-41', join(self.hosts_dir, 'devweb01'))
+        mock_svn_service = Mock(SvnService)
+        mock_svn_service.get_deleted_paths.return_value = ['host/devweb01']
+
+        clean_up_deleted_hosts_data(mock_svn_service, '42')
+        self._wait_for_garbage_collection()
+
+        self.assertEqual(['devweb01.revision-43', 'tuvweb01.revision-41'], sorted(os.listdir(self.hosts_dir)))
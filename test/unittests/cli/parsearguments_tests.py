@@ -20,9 +20,14 @@ from logging import DEBUG, INFO
 from mock import patch, Mock
 from unittest import TestCase
 
-from config_rpm_maker.configuration import is_config_viewer_only_enabled, get_rpm_upload_command, is_verbose_enabled, is_no_clean_up_enabled
-from config_rpm_maker.cli.parsearguments import USAGE_INFORMATION, OPTION_CONFIG_VIEWER_ONLY, OPTION_RPM_UPLOAD_CMD, OPTION_VERBOSE, OPTION_NO_CLEAN_UP
+from config_rpm_maker.configuration import is_config_viewer_only_enabled, get_rpm_upload_command, is_dry_run_enabled, is_verbose_enabled, is_no_clean_up_enabled
+from config_rpm_maker.configuration import PROFILING_MODE_CPROFILE, PROFILING_MODE_SAMPLING, get_profiling_mode
+from config_rpm_maker.configuration import get_daemon_address
+from config_rpm_maker.cli.parsearguments import USAGE_INFORMATION, OPTION_CONFIG_VIEWER_ONLY, OPTION_DRY_RUN, OPTION_RPM_UPLOAD_CMD, OPTION_VERBOSE, OPTION_NO_CLEAN_UP
+from config_rpm_maker.cli.parsearguments import OPTION_PROFILE, OPTION_PROFILE_SAMPLING
 from config_rpm_maker.cli.parsearguments import apply_arguments_to_config, parse_arguments, determine_console_log_level
+from config_rpm_maker.cli.parsearguments import (DAEMON_USAGE_INFORMATION, OPTION_ADDRESS,
+                                                 apply_daemon_arguments_to_config, parse_daemon_arguments)
 
 
 class ParseArgumentsTests(TestCase):
@@ -116,6 +121,37 @@ class ParseArgumentsTests(TestCase):
 
         self.assertTrue(actual_arguments["--config-viewer-only"])
 
+    def test_should_return_option_dry_run_as_false_when_no_option_given(self):
+
+        actual_arguments = parse_arguments(["foo", "123"], version="")
+
+        self.assertFalse(actual_arguments["--dry-run"])
+
+    def test_should_return_option_dry_run_as_true_when_option_is_given(self):
+
+        actual_arguments = parse_arguments(["foo", "123", "--dry-run"], version="")
+
+        self.assertTrue(actual_arguments["--dry-run"])
+
+    def test_should_return_option_profile_as_false_when_no_option_given(self):
+
+        actual_arguments = parse_arguments(["foo", "123"], version="")
+
+        self.assertFalse(actual_arguments["--profile"])
+        self.assertFalse(actual_arguments["--profile-sampling"])
+
+    def test_should_return_option_profile_as_true_when_option_is_given(self):
+
+        actual_arguments = parse_arguments(["foo", "123", "--profile"], version="")
+
+        self.assertTrue(actual_arguments["--profile"])
+
+    def test_should_return_option_profile_sampling_as_true_when_option_is_given(self):
+
+        actual_arguments = parse_arguments(["foo", "123", "--profile-sampling"], version="")
+
+        self.assertTrue(actual_arguments["--profile-sampling"])
+
     def test_should_return_first_argument_as_repository(self):
 
         actual_arguments = parse_arguments(["foo", "123"], version="")
@@ -135,7 +171,10 @@ class ApplyArgumentsToConfiguration(TestCase):
     def setUp(self):
         self.arguments = {OPTION_RPM_UPLOAD_CMD: False,
                           OPTION_CONFIG_VIEWER_ONLY: False,
+                          OPTION_DRY_RUN: False,
                           OPTION_NO_CLEAN_UP: False,
+                          OPTION_PROFILE: False,
+                          OPTION_PROFILE_SAMPLING: False,
                           OPTION_VERBOSE: False}
 
     def test_should_not_apply_anything_if_no_options_given(self, mock_set_property):
@@ -160,6 +199,14 @@ class ApplyArgumentsToConfiguration(TestCase):
 
         mock_set_property.assert_any_call(is_config_viewer_only_enabled, True)
 
+    def test_should_set_dry_run_when_option_is_given(self, mock_set_property):
+
+        self.arguments[OPTION_DRY_RUN] = True
+
+        apply_arguments_to_config(self.arguments)
+
+        mock_set_property.assert_any_call(is_dry_run_enabled, True)
+
     def test_should_set_verbose_when_option_is_given(self, mock_set_property):
 
         self.arguments[OPTION_VERBOSE] = True
@@ -176,6 +223,102 @@ class ApplyArgumentsToConfiguration(TestCase):
 
         mock_set_property.assert_any_call(is_no_clean_up_enabled, True)
 
+    def test_should_set_profiling_mode_cprofile_when_option_profile_is_given(self, mock_set_property):
+
+        self.arguments[OPTION_PROFILE] = True
+
+        apply_arguments_to_config(self.arguments)
+
+        mock_set_property.assert_any_call(get_profiling_mode, PROFILING_MODE_CPROFILE)
+
+    def test_should_prefer_profiling_mode_sampling_when_both_options_are_given(self, mock_set_property):
+
+        self.arguments[OPTION_PROFILE] = True
+        self.arguments[OPTION_PROFILE_SAMPLING] = True
+
+        apply_arguments_to_config(self.arguments)
+
+        mock_set_property.assert_called_once_with(get_profiling_mode, PROFILING_MODE_SAMPLING)
+
+
+class ParseDaemonArgumentsTests(TestCase):
+
+    @patch('config_rpm_maker.cli.parsearguments.OptionParser')
+    def test_should_use_daemon_usage_information(self, mock_option_parser_class):
+
+        mock_option_parser = Mock()
+        mock_values = Mock()
+        mock_values.version = False
+        mock_option_parser.parse_args.return_value = (mock_values, ["foo"])
+        mock_option_parser_class.return_value = mock_option_parser
+
+        parse_daemon_arguments([], version="")
+
+        mock_option_parser_class.assert_called_with(usage=DAEMON_USAGE_INFORMATION)
+
+    @patch('config_rpm_maker.cli.parsearguments.exit')
+    @patch('config_rpm_maker.cli.parsearguments.OptionParser')
+    def test_should_print_help_screen_and_exit_when_no_repository_url_is_given(self, mock_option_parser_class, mock_exit):
+
+        mock_option_parser = Mock()
+        mock_values = Mock()
+        mock_values.version = False
+        mock_option_parser.parse_args.return_value = (mock_values, [])
+        mock_option_parser_class.return_value = mock_option_parser
+
+        parse_daemon_arguments([], version="")
+
+        mock_option_parser.print_help.assert_called_with()
+        mock_exit.assert_called_with(1)
+
+    def test_should_return_repository_url(self):
+
+        actual_arguments = parse_daemon_arguments(["file:///repository"], version="")
+
+        self.assertEqual("file:///repository", actual_arguments["<repository-url>"])
+
+    def test_should_return_address_as_false_when_no_option_given(self):
+
+        actual_arguments = parse_daemon_arguments(["foo"], version="")
+
+        self.assertFalse(actual_arguments["--address"])
+
+    def test_should_return_address_when_option_given(self):
+
+        actual_arguments = parse_daemon_arguments(["foo", "--address", "/run/config-rpm-maker.socket"], version="")
+
+        self.assertEqual("/run/config-rpm-maker.socket", actual_arguments["--address"])
+
+
+@patch('config_rpm_maker.cli.parsearguments.set_property')
+class ApplyDaemonArgumentsToConfiguration(TestCase):
+
+    def setUp(self):
+        self.arguments = {OPTION_ADDRESS: False,
+                          OPTION_VERBOSE: False}
+
+    def test_should_not_apply_anything_if_no_options_given(self, mock_set_property):
+
+        apply_daemon_arguments_to_config(self.arguments)
+
+        self.assertEqual(0, len(mock_set_property.call_args_list))
+
+    def test_should_set_daemon_address_when_option_is_given(self, mock_set_property):
+
+        self.arguments[OPTION_ADDRESS] = 'localhost:9000'
+
+        apply_daemon_arguments_to_config(self.arguments)
+
+        mock_set_property.assert_called_once_with(get_daemon_address, 'localhost:9000')
+
+    def test_should_set_verbose_when_option_is_given(self, mock_set_property):
+
+        self.arguments[OPTION_VERBOSE] = True
+
+        apply_daemon_arguments_to_config(self.arguments)
+
+        mock_set_property.assert_called_once_with(is_verbose_enabled, True)
+
 
 class DetermineConsoleLogLevelTests(TestCase):
 
@@ -20,12 +20,19 @@ from unittest import TestCase
 
 from mock import Mock, call, patch
 
-from config_rpm_maker import (extract_repository_url_and_revision_from_arguments,
+from config_rpm_maker import (build_revision,
+                              daemon_main,
+                              extract_repository_url_and_revision_from_arguments,
                               initialize_configuration,
                               initialize_logging_to_console,
                               initialize_logging_to_syslog,
                               main,
-                              building_configuration_rpms_and_clean_host_directories)
+                              building_configuration_rpms_and_clean_host_directories,
+                              print_affected_hosts,
+                              serve_build_requests,
+                              write_code_profile,
+                              write_execution_times)
+from config_rpm_maker.impact import HostImpact
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
 from config_rpm_maker.configuration import ConfigurationException
 
@@ -189,6 +196,282 @@ class BuildingConfigurationRpmsAndCleanHostDirectoriesTests(TestCase):
         mock_clean_up_deleted_hosts_data.assert_called_with(mock_svn_service, '1980')
 
 
+    @patch('config_rpm_maker.print_affected_hosts')
+    @patch('config_rpm_maker.is_dry_run_enabled')
+    @patch('config_rpm_maker.clean_up_deleted_hosts_data')
+    @patch('config_rpm_maker.get_svn_path_to_config')
+    @patch('config_rpm_maker.SvnService')
+    @patch('config_rpm_maker.ConfigRpmMaker')
+    def test_should_only_print_affected_hosts_when_dry_run_is_enabled(self, mock_config_rpm_maker_class, mock_svn_service_constructor, mock_config, mock_clean_up_deleted_hosts_data, mock_is_dry_run_enabled, mock_print_affected_hosts):
+
+        mock_is_dry_run_enabled.return_value = True
+        mock_svn_service = Mock()
+        mock_svn_service_constructor.return_value = mock_svn_service
+
+        building_configuration_rpms_and_clean_host_directories('file:///path_to/testdata/repository', '1980')
+
+        mock_print_affected_hosts.assert_called_with(mock_svn_service, '1980')
+        self.assertEqual(0, mock_config_rpm_maker_class.call_count)
+        self.assertEqual(0, mock_clean_up_deleted_hosts_data.call_count)
+
+
+class BuildRevisionTests(TestCase):
+
+    @patch('config_rpm_maker.write_code_profile')
+    @patch('config_rpm_maker.write_execution_times')
+    @patch('config_rpm_maker.clean_up_deleted_hosts_data')
+    @patch('config_rpm_maker.ConfigRpmMaker')
+    def test_should_pass_given_arguments_to_config_rpm_maker(self, mock_config_rpm_maker_class, mock_clean_up_deleted_hosts_data,
+                                                             mock_write_execution_times, mock_write_code_profile):
+
+        mock_svn_service = Mock()
+        mock_svn_service_pool = Mock()
+
+        build_revision(mock_svn_service, '1980', svn_service_pool=mock_svn_service_pool)
+
+        mock_config_rpm_maker_class.assert_called_with(revision='1980', svn_service=mock_svn_service,
+                                                       svn_service_pool=mock_svn_service_pool)
+        mock_clean_up_deleted_hosts_data.assert_called_with(mock_svn_service, '1980')
+        mock_write_execution_times.assert_called_with('1980')
+
+
+class ServeBuildRequestsTests(TestCase):
+
+    def setUp(self):
+        self.svn_service_patcher = patch('config_rpm_maker.SvnService')
+        self.svn_service_pool_patcher = patch('config_rpm_maker.SvnServicePool')
+        self.build_daemon_patcher = patch('config_rpm_maker.BuildDaemon')
+        self.create_server_patcher = patch('config_rpm_maker.create_server')
+        self.build_revision_patcher = patch('config_rpm_maker.build_revision')
+
+        self.mock_svn_service_class = self.svn_service_patcher.start()
+        self.mock_svn_service_pool_class = self.svn_service_pool_patcher.start()
+        self.mock_build_daemon_class = self.build_daemon_patcher.start()
+        self.mock_create_server = self.create_server_patcher.start()
+        self.mock_build_revision = self.build_revision_patcher.start()
+
+    def tearDown(self):
+        self.svn_service_patcher.stop()
+        self.svn_service_pool_patcher.stop()
+        self.build_daemon_patcher.stop()
+        self.create_server_patcher.stop()
+        self.build_revision_patcher.stop()
+
+    def test_should_serve_until_interrupted_and_stop_build_daemon(self):
+
+        mock_server = self.mock_create_server.return_value
+        mock_server.serve_forever.side_effect = KeyboardInterrupt()
+        mock_build_daemon = self.mock_build_daemon_class.return_value
+
+        self.assertRaises(KeyboardInterrupt, serve_build_requests, 'file:///path_to/testdata/repository')
+
+        mock_build_daemon.start.assert_called_with()
+        mock_server.server_close.assert_called_with()
+        mock_build_daemon.stop.assert_called_with()
+
+    def test_should_build_submitted_revision_using_the_same_svn_service_pool(self):
+
+        serve_build_requests('file:///path_to/testdata/repository')
+        build_submitted_revision = self.mock_build_daemon_class.call_args[0][0]
+
+        build_submitted_revision('1980')
+
+        mock_svn_service = self.mock_svn_service_class.return_value
+        self.mock_build_revision.assert_called_with(mock_svn_service, '1980',
+                                                    svn_service_pool=self.mock_svn_service_pool_class.return_value)
+        mock_svn_service.metadata_cache.clear.assert_called_with()
+
+    def test_should_reset_statistics_of_svn_service_pool_before_each_build(self):
+
+        serve_build_requests('file:///path_to/testdata/repository')
+        build_submitted_revision = self.mock_build_daemon_class.call_args[0][0]
+
+        build_submitted_revision('1980')
+
+        self.mock_svn_service_pool_class.return_value.reset_statistics.assert_called_with()
+
+
+class PrintAffectedHostsTests(TestCase):
+
+    @patch('config_rpm_maker.stdout')
+    @patch('config_rpm_maker.ImpactAnalyzer')
+    def test_should_print_impact_of_each_host(self, mock_impact_analyzer_class, mock_stdout):
+
+        mock_svn_service = Mock()
+        mock_svn_service.get_changed_paths.return_value = ['all/etc/motd']
+        mock_svn_service.get_hosts.return_value = ['devweb01', 'devweb02']
+        mock_impact_analyzer_class.return_value.analyze.return_value = [
+            HostImpact('devweb01', False, '"all/etc/motd" is overridden by "host/devweb01"'),
+            HostImpact('devweb02', True, '"all/etc/motd" is used')]
+
+        print_affected_hosts(mock_svn_service, '1980')
+
+        mock_impact_analyzer_class.assert_called_with(mock_svn_service, '1980')
+        mock_impact_analyzer_class.return_value.analyze.assert_called_with(['all/etc/motd'], ['devweb01', 'devweb02'])
+        self.assertEqual([call('devweb01 not affected: "all/etc/motd" is overridden by "host/devweb01"\n'),
+                          call('devweb02 affected: "all/etc/motd" is used\n')],
+                         mock_stdout.write.call_args_list)
+
+
+class WriteExecutionTimesTests(TestCase):
+
+    @patch('config_rpm_maker.EXECUTION_TIME_PROFILER')
+    @patch('config_rpm_maker.get_execution_times_file')
+    def test_should_write_execution_times_to_configured_file(self, mock_get_execution_times_file, mock_profiler):
+
+        mock_get_execution_times_file.return_value = '/var/log/execution-times-{revision}.json'
+
+        write_execution_times('1980')
+
+        mock_profiler.write_json.assert_called_with('/var/log/execution-times-1980.json')
+
+    @patch('config_rpm_maker.EXECUTION_TIME_PROFILER')
+    @patch('config_rpm_maker.get_execution_times_file')
+    def test_should_not_write_execution_times_if_no_file_is_configured(self, mock_get_execution_times_file, mock_profiler):
+
+        mock_get_execution_times_file.return_value = ''
+
+        write_execution_times('1980')
+
+        self.assertEqual(0, mock_profiler.write_json.call_count)
+
+    @patch('config_rpm_maker.write_chrome_trace')
+    @patch('config_rpm_maker.EXECUTION_TIME_PROFILER')
+    @patch('config_rpm_maker.get_trace_file')
+    @patch('config_rpm_maker.get_execution_times_file')
+    def test_should_write_trace_to_configured_file(self, mock_get_execution_times_file, mock_get_trace_file,
+                                                    mock_profiler, mock_write_chrome_trace):
+
+        mock_get_execution_times_file.return_value = ''
+        mock_get_trace_file.return_value = '/var/log/trace-{revision}.json'
+        mock_profiler.get_measurements.return_value = ['measurement']
+
+        write_execution_times('1980')
+
+        mock_write_chrome_trace.assert_called_with('/var/log/trace-1980.json', ['measurement'])
+
+    @patch('config_rpm_maker.write_chrome_trace')
+    @patch('config_rpm_maker.EXECUTION_TIME_PROFILER')
+    @patch('config_rpm_maker.get_trace_file')
+    @patch('config_rpm_maker.get_execution_times_file')
+    def test_should_not_write_trace_if_no_file_is_configured(self, mock_get_execution_times_file, mock_get_trace_file,
+                                                              mock_profiler, mock_write_chrome_trace):
+
+        mock_get_execution_times_file.return_value = ''
+        mock_get_trace_file.return_value = ''
+
+        write_execution_times('1980')
+
+        self.assertEqual(0, mock_write_chrome_trace.call_count)
+
+    @patch('config_rpm_maker.write_execution_times')
+    @patch('config_rpm_maker.is_dry_run_enabled')
+    @patch('config_rpm_maker.get_svn_path_to_config')
+    @patch('config_rpm_maker.SvnService')
+    @patch('config_rpm_maker.ConfigRpmMaker')
+    def test_should_write_execution_times_when_build_failed(self, mock_config_rpm_maker_class, mock_svn_service_constructor,
+                                                             mock_config, mock_is_dry_run_enabled, mock_write_execution_times):
+
+        mock_is_dry_run_enabled.return_value = False
+        mock_config_rpm_maker_class.return_value.build.side_effect = BaseConfigRpmMakerException('spam')
+
+        self.assertRaises(BaseConfigRpmMakerException, building_configuration_rpms_and_clean_host_directories,
+                          'file:///path_to/testdata/repository', '1980')
+
+        mock_write_execution_times.assert_called_with('1980')
+
+
+class WriteCodeProfileTests(TestCase):
+
+    @patch('config_rpm_maker.CODE_PROFILER')
+    def test_should_not_write_profile_when_profiling_is_off(self, mock_code_profiler):
+
+        mock_code_profiler.mode = 'off'
+
+        write_code_profile('1980')
+
+        self.assertEqual(0, mock_code_profiler.write.call_count)
+
+    @patch('config_rpm_maker.get_temporary_directory')
+    @patch('config_rpm_maker.get_error_log_directory')
+    @patch('config_rpm_maker.CODE_PROFILER')
+    def test_should_stop_profiler_and_write_profile_to_error_log_directory(self, mock_code_profiler, mock_get_error_log_directory,
+                                                                            mock_get_temporary_directory):
+
+        mock_code_profiler.mode = 'sampling'
+        mock_code_profiler.write.return_value = ('profile-1980.pstats', 'profile-1980.collapsed')
+        mock_get_error_log_directory.return_value = '/var/log/errors'
+
+        write_code_profile('1980')
+
+        mock_code_profiler.stop.assert_called_with()
+        mock_code_profiler.write.assert_called_with('/var/log/errors', 'profile-1980')
+
+    @patch('config_rpm_maker.get_temporary_directory')
+    @patch('config_rpm_maker.get_error_log_directory')
+    @patch('config_rpm_maker.CODE_PROFILER')
+    def test_should_write_profile_to_temporary_directory_without_error_log_directory(self, mock_code_profiler,
+                                                                                      mock_get_error_log_directory,
+                                                                                      mock_get_temporary_directory):
+
+        mock_code_profiler.mode = 'cprofile'
+        mock_code_profiler.write.return_value = ('profile-1980.pstats', 'profile-1980.collapsed')
+        mock_get_error_log_directory.return_value = ''
+        mock_get_temporary_directory.return_value = '/tmp'
+
+        write_code_profile('1980')
+
+        mock_code_profiler.write.assert_called_with('/tmp', 'profile-1980')
+
+
+class DaemonMainTests(TestCase):
+
+    @patch('config_rpm_maker.serve_build_requests')
+    @patch('config_rpm_maker.log_additional_information')
+    @patch('config_rpm_maker.start_measuring_time')
+    @patch('config_rpm_maker.apply_daemon_arguments_to_config')
+    @patch('config_rpm_maker.load_configuration_file')
+    @patch('config_rpm_maker.initialize_logging_to_syslog')
+    @patch('config_rpm_maker.initialize_logging_to_console')
+    @patch('config_rpm_maker.parse_daemon_arguments')
+    @patch('config_rpm_maker.exit_program')
+    def test_should_serve_build_requests_for_given_repository(self, mock_exit_program, mock_parse_daemon_arguments,
+                                                              mock_initialize_logging_to_console,
+                                                              mock_initialize_logging_to_syslog,
+                                                              mock_load_configuration_file,
+                                                              mock_apply_daemon_arguments_to_config,
+                                                              mock_start_measuring_time,
+                                                              mock_log_additional_information,
+                                                              mock_serve_build_requests):
+
+        mock_parse_daemon_arguments.return_value = {'<repository-url>': 'svn://host/repository'}
+
+        daemon_main()
+
+        mock_serve_build_requests.assert_called_with('svn://host/repository')
+
+    @patch('config_rpm_maker.parse_daemon_arguments')
+    @patch('config_rpm_maker.exit_program')
+    def test_should_exit_with_success_when_daemon_is_interrupted(self, mock_exit_program, mock_parse_daemon_arguments):
+
+        mock_parse_daemon_arguments.side_effect = KeyboardInterrupt()
+
+        daemon_main()
+
+        mock_exit_program.assert_called_with('Build daemon stopped.', return_code=0)
+
+    @patch('config_rpm_maker.parse_daemon_arguments')
+    @patch('config_rpm_maker.exit_program')
+    def test_should_exit_with_error_code_when_configuration_exception_occurrs(self, mock_exit_program,
+                                                                              mock_parse_daemon_arguments):
+
+        mock_parse_daemon_arguments.side_effect = ConfigurationException("We knew this could happen!")
+
+        daemon_main()
+
+        mock_exit_program.assert_called_with('Configuration error!', return_code=3)
+
+
 class InitializeLoggingToConsoleTests(TestCase):
 
     @patch('config_rpm_maker.LOGGER')
@@ -14,12 +14,16 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from logging import getLogger
 from mock import Mock, call, patch
 
 from Queue import Queue
 
 from unittest_support import UnitTests
-from config_rpm_maker.configrpmmaker import ConfigRpmMaker, BuildHostThread
+from config_rpm_maker.configrpmmaker import (ConfigRpmMaker,
+                                             BuildHostThread,
+                                             ConfigurationException,
+                                             CouldNotBuildSomeRpmsException)
 
 
 class ConstructorTests(UnitTests):
@@ -45,6 +49,120 @@ class ConstructorTests(UnitTests):
 
         self.assertEqual(None, self.config_rpm_maker.work_dir)
 
+    def test_should_initialize_empty_artifact_index(self):
+
+        self.assertEqual(0, len(self.config_rpm_maker.artifact_index))
+
+    def test_should_not_use_an_rpm_builder_by_default(self):
+
+        self.assertEqual(None, self.config_rpm_maker.rpm_builder)
+
+    def test_should_not_use_an_svn_service_pool_by_default(self):
+
+        self.assertEqual(None, self.config_rpm_maker.svn_service_pool)
+
+
+class BuildTests(UnitTests):
+
+    def test_should_remove_error_log_handler_after_build(self):
+
+        mock_svn_service = Mock()
+        mock_svn_service.get_changed_paths.return_value = []
+        config_rpm_maker = ConfigRpmMaker('123', mock_svn_service)
+
+        config_rpm_maker.build()
+
+        self.assertFalse(config_rpm_maker.error_handler in getLogger('fileLogger').handlers)
+
+    def test_should_remove_error_log_handler_when_build_failed(self):
+
+        mock_svn_service = Mock()
+        mock_svn_service.get_changed_paths.side_effect = ConfigurationException('spam')
+        config_rpm_maker = ConfigRpmMaker('123', mock_svn_service)
+
+        self.assertRaises(ConfigurationException, config_rpm_maker.build)
+
+        self.assertFalse(config_rpm_maker.error_handler in getLogger('fileLogger').handlers)
+
+    @patch('config_rpm_maker.configrpmmaker.TEMPLATE_CACHE')
+    def test_should_clear_template_cache_before_building_revision(self, mock_template_cache):
+
+        mock_svn_service = Mock()
+        mock_svn_service.get_changed_paths.return_value = []
+        config_rpm_maker = ConfigRpmMaker('123', mock_svn_service)
+
+        config_rpm_maker.build()
+
+        mock_template_cache.clear.assert_called_with()
+
+
+class BuildHostsUsingThreadsTests(UnitTests):
+
+    @patch('config_rpm_maker.configrpmmaker.SvnServicePool')
+    @patch('config_rpm_maker.configrpmmaker.BuildHostThread')
+    def test_should_use_given_svn_service_pool(self, mock_build_host_thread_class, mock_svn_service_pool_class):
+
+        mock_svn_service_pool = Mock()
+        config_rpm_maker = ConfigRpmMaker('123', Mock(), svn_service_pool=mock_svn_service_pool)
+
+        config_rpm_maker._build_hosts_using_threads(['devweb01'])
+
+        self.assertEqual(mock_svn_service_pool, mock_build_host_thread_class.call_args[1]['svn_service_queue'])
+        self.assert_mock_never_called(mock_svn_service_pool_class)
+
+
+@patch('config_rpm_maker.configrpmmaker.merge_build_process_statistics')
+@patch('config_rpm_maker.configrpmmaker.SegmentExportCache')
+@patch('config_rpm_maker.configrpmmaker.Pool')
+class BuildHostsUsingProcessesTests(UnitTests):
+
+    def setUp(self):
+        self.mock_svn_service_pool = Mock()
+        self.mock_svn_service_pool.size = 4
+        self.config_rpm_maker = ConfigRpmMaker('123', Mock(), svn_service_pool=self.mock_svn_service_pool)
+        self.config_rpm_maker.segment_staging_dir = '/tmp/work/segments'
+        self.config_rpm_maker.error_log_file = '/tmp/work/errors.log'
+
+    def test_should_stage_shared_segments_once_and_pass_them_to_build_processes(self, mock_pool_class, mock_segment_export_cache_class, mock_merge):
+
+        mock_pool_class.return_value.imap_unordered.return_value = []
+        mock_segment_export_cache = mock_segment_export_cache_class.return_value
+
+        self.config_rpm_maker._build_hosts_using_processes(['devweb01', 'devweb02'])
+
+        mock_segment_export_cache.stage.assert_called_with(['all', 'loc/dev', 'loctyp/devweb', 'typ/web'], 4)
+        self.assertEqual(mock_segment_export_cache.get_staged_segments.return_value,
+                         mock_pool_class.call_args[1]['initargs'][-1])
+
+    def test_should_merge_statistics_returned_by_build_processes(self, mock_pool_class, mock_segment_export_cache_class, mock_merge):
+
+        mock_statistics = Mock()
+        mock_pool_class.return_value.imap_unordered.return_value = [('devweb01', ['devweb01.rpm'], None, mock_statistics)]
+
+        built_rpms, failed_hosts = self.config_rpm_maker._build_hosts_using_processes(['devweb01'])
+
+        self.assertEqual(['devweb01.rpm'], built_rpms)
+        mock_merge.assert_called_with(mock_statistics, self.mock_svn_service_pool)
+        self.assertEqual(1, self.mock_svn_service_pool.log_summary.call_count)
+
+
+class BuildHostThreadTests(UnitTests):
+
+    @patch('config_rpm_maker.configrpmmaker.HostRpmBuilder')
+    def test_should_pass_rpm_builder_to_host_rpm_builder(self, mock_host_rpm_builder_class):
+
+        mock_rpm_builder = Mock()
+        mock_host_rpm_builder_class.return_value.build.return_value = []
+        host_queue = Queue()
+        host_queue.put('devweb01')
+        build_host_thread = BuildHostThread(revision='123', host_queue=host_queue, svn_service_queue=Mock(),
+                                            rpm_queue=Queue(), failed_host_queue=Queue(), work_dir='/tmp/work',
+                                            name='Thread-0', rpm_builder=mock_rpm_builder)
+
+        build_host_thread.run()
+
+        self.assertEqual(mock_rpm_builder, mock_host_rpm_builder_class.call_args[1]['rpm_builder'])
+
 
 class MoveConfigviewerDirsToFinalDestinationTest(UnitTests):
 
@@ -231,6 +349,323 @@ class MoveConfigviewerDirsToFinalDestinationTest(UnitTests):
         mock_move.assert_any_call('target/tmp/configviewer/hosts/berweb01.new-revision-54', 'target/tmp/configviewer/hosts/berweb01')
 
 
+@patch('config_rpm_maker.configrpmmaker.ConfigViewerPublisher')
+@patch('config_rpm_maker.configrpmmaker.get_config_viewer_publication')
+@patch('config_rpm_maker.configrpmmaker.rmtree')
+@patch('config_rpm_maker.configrpmmaker.move')
+@patch('config_rpm_maker.configrpmmaker.exists')
+class PublishConfigviewerDirsUsingSymlinksTests(UnitTests):
+
+    def setUp(self):
+        self.mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        self.mock_config_rpm_maker.revision = '54'
+        self.mock_config_rpm_maker._read_integer_from_file.return_value = 53
+
+    def test_should_publish_directory_without_removing_the_current_one(self, mock_exists, mock_move, mock_rmtree,
+                                                                       mock_get_config_viewer_publication, mock_publisher_class):
+
+        mock_get_config_viewer_publication.return_value = 'symlink'
+        mock_exists.return_value = True
+
+        ConfigRpmMaker._move_configviewer_dirs_to_final_destination(self.mock_config_rpm_maker, ['devweb01'])
+
+        mock_publisher_class.assert_called_with('target/tmp/configviewer/hosts', '54')
+        mock_publisher_class.return_value.publish.assert_called_with('devweb01', 'target/tmp/configviewer/hosts/devweb01.new-revision-54', 53)
+        self.assert_mock_never_called(mock_rmtree)
+        self.assert_mock_never_called(mock_move)
+
+    def test_should_discard_directory_when_a_higher_revision_has_been_published(self, mock_exists, mock_move, mock_rmtree,
+                                                                                  mock_get_config_viewer_publication, mock_publisher_class):
+
+        mock_get_config_viewer_publication.return_value = 'symlink'
+        mock_exists.return_value = True
+        self.mock_config_rpm_maker._read_integer_from_file.return_value = 55
+
+        ConfigRpmMaker._move_configviewer_dirs_to_final_destination(self.mock_config_rpm_maker, ['devweb01'])
+
+        mock_publisher_class.return_value.discard.assert_called_with('devweb01', 'target/tmp/configviewer/hosts/devweb01.new-revision-54')
+        self.assert_mock_never_called(mock_publisher_class.return_value.publish)
+        self.assert_mock_never_called(mock_rmtree)
+
+    def test_should_remove_superseded_directories_in_background(self, mock_exists, mock_move, mock_rmtree,
+                                                                 mock_get_config_viewer_publication, mock_publisher_class):
+
+        mock_get_config_viewer_publication.return_value = 'symlink'
+        mock_exists.return_value = False
+
+        ConfigRpmMaker._move_configviewer_dirs_to_final_destination(self.mock_config_rpm_maker, ['devweb01', 'tuvweb01'])
+
+        self.mock_config_rpm_maker._remove_superseded_configviewer_dirs_in_background.assert_called_with(
+            mock_publisher_class.return_value, ['devweb01', 'tuvweb01'])
+
+    def test_should_not_use_publisher_when_directories_are_moved(self, mock_exists, mock_move, mock_rmtree,
+                                                                  mock_get_config_viewer_publication, mock_publisher_class):
+
+        mock_get_config_viewer_publication.return_value = 'move'
+        mock_exists.return_value = False
+
+        ConfigRpmMaker._move_configviewer_dirs_to_final_destination(self.mock_config_rpm_maker, ['devweb01'])
+
+        self.assert_mock_never_called(mock_publisher_class)
+        self.assert_mock_never_called(self.mock_config_rpm_maker._remove_superseded_configviewer_dirs_in_background)
+
+
+class BuildHostsTests(UnitTests):
+
+    def setUp(self):
+        self.mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        self.mock_config_rpm_maker._build_hosts_using_threads.return_value = (['thread.rpm'], {})
+        self.mock_config_rpm_maker._build_hosts_using_processes.return_value = (['process.rpm'], {})
+
+    @patch('config_rpm_maker.configrpmmaker.get_build_engine')
+    def test_should_build_hosts_using_threads(self, mock_get_build_engine):
+
+        mock_get_build_engine.return_value = 'threads'
+
+        actual = ConfigRpmMaker._build_hosts(self.mock_config_rpm_maker, ['devweb01'])
+
+        self.assertEqual(['thread.rpm'], actual)
+        self.assert_mock_never_called(self.mock_config_rpm_maker._build_hosts_using_processes)
+
+    @patch('config_rpm_maker.configrpmmaker.get_build_engine')
+    def test_should_build_hosts_using_processes(self, mock_get_build_engine):
+
+        mock_get_build_engine.return_value = 'processes'
+
+        actual = ConfigRpmMaker._build_hosts(self.mock_config_rpm_maker, ['devweb01'])
+
+        self.assertEqual(['process.rpm'], actual)
+        self.assert_mock_never_called(self.mock_config_rpm_maker._build_hosts_using_threads)
+
+    @patch('config_rpm_maker.configrpmmaker.get_build_engine')
+    def test_should_write_artifact_index_after_building_hosts(self, mock_get_build_engine):
+
+        mock_get_build_engine.return_value = 'threads'
+
+        ConfigRpmMaker._build_hosts(self.mock_config_rpm_maker, ['devweb01'])
+
+        self.mock_config_rpm_maker._write_artifact_index.assert_called_with()
+
+    @patch('config_rpm_maker.configrpmmaker.get_build_engine')
+    def test_should_raise_exception_when_some_hosts_failed(self, mock_get_build_engine):
+
+        mock_get_build_engine.return_value = 'processes'
+        self.mock_config_rpm_maker._build_hosts_using_processes.return_value = ([], {'devweb01': 'stacktrace'})
+
+        self.assertRaises(CouldNotBuildSomeRpmsException, ConfigRpmMaker._build_hosts, self.mock_config_rpm_maker, ['devweb01'])
+
+
+    @patch('config_rpm_maker.configrpmmaker.get_build_engine')
+    def test_should_pass_rpm_upload_pipeline_to_build_engine(self, mock_get_build_engine):
+
+        mock_get_build_engine.return_value = 'threads'
+        mock_rpm_upload_pipeline = Mock()
+
+        ConfigRpmMaker._build_hosts(self.mock_config_rpm_maker, ['devweb01'], mock_rpm_upload_pipeline)
+
+        self.mock_config_rpm_maker._build_hosts_using_threads.assert_called_with(['devweb01'], mock_rpm_upload_pipeline)
+
+
+@patch('config_rpm_maker.configrpmmaker.RpmUploadPipeline')
+@patch('config_rpm_maker.configrpmmaker.is_rpm_upload_streaming_enabled')
+@patch('config_rpm_maker.configrpmmaker.get_rpm_upload_command')
+class BuildHostsAndUploadRpmsTests(UnitTests):
+
+    def setUp(self):
+        self.mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        self.mock_config_rpm_maker._build_hosts.return_value = ['devweb01.rpm']
+        self.mock_config_rpm_maker._get_chunk_size.return_value = 10
+        self.mock_config_rpm_maker._get_rpm_upload_concurrency.return_value = 2
+
+    def test_should_upload_rpms_after_building_hosts_when_streaming_is_disabled(self, mock_get_rpm_upload_command,
+                                                                                mock_is_rpm_upload_streaming_enabled,
+                                                                                mock_rpm_upload_pipeline_class):
+
+        mock_get_rpm_upload_command.return_value = 'upload'
+        mock_is_rpm_upload_streaming_enabled.return_value = False
+
+        actual = ConfigRpmMaker._build_hosts_and_upload_rpms(self.mock_config_rpm_maker, ['devweb01'])
+
+        self.assertEqual(['devweb01.rpm'], actual)
+        self.mock_config_rpm_maker._build_hosts.assert_called_with(['devweb01'])
+        self.mock_config_rpm_maker._upload_rpms.assert_called_with(['devweb01.rpm'])
+        self.assert_mock_never_called(mock_rpm_upload_pipeline_class)
+
+    def test_should_not_stream_rpms_when_no_upload_command_is_configured(self, mock_get_rpm_upload_command,
+                                                                         mock_is_rpm_upload_streaming_enabled,
+                                                                         mock_rpm_upload_pipeline_class):
+
+        mock_get_rpm_upload_command.return_value = None
+        mock_is_rpm_upload_streaming_enabled.return_value = True
+
+        ConfigRpmMaker._build_hosts_and_upload_rpms(self.mock_config_rpm_maker, ['devweb01'])
+
+        self.mock_config_rpm_maker._upload_rpms.assert_called_with(['devweb01.rpm'])
+        self.assert_mock_never_called(mock_rpm_upload_pipeline_class)
+
+    def test_should_stream_rpms_while_building_hosts(self, mock_get_rpm_upload_command,
+                                                     mock_is_rpm_upload_streaming_enabled,
+                                                     mock_rpm_upload_pipeline_class):
+
+        mock_get_rpm_upload_command.return_value = 'upload'
+        mock_is_rpm_upload_streaming_enabled.return_value = True
+        mock_rpm_upload_pipeline = mock_rpm_upload_pipeline_class.return_value
+
+        actual = ConfigRpmMaker._build_hosts_and_upload_rpms(self.mock_config_rpm_maker, ['devweb01'])
+
+        self.assertEqual(['devweb01.rpm'], actual)
+        mock_rpm_upload_pipeline_class.assert_called_with('upload', chunk_size=10, time_window=10, concurrency=2)
+        mock_rpm_upload_pipeline.start.assert_called_with()
+        self.mock_config_rpm_maker._build_hosts.assert_called_with(['devweb01'], mock_rpm_upload_pipeline)
+        mock_rpm_upload_pipeline.close.assert_called_with()
+        self.assert_mock_never_called(self.mock_config_rpm_maker._upload_rpms)
+
+    def test_should_abort_streamed_upload_when_building_hosts_failed(self, mock_get_rpm_upload_command,
+                                                                     mock_is_rpm_upload_streaming_enabled,
+                                                                     mock_rpm_upload_pipeline_class):
+
+        mock_get_rpm_upload_command.return_value = 'upload'
+        mock_is_rpm_upload_streaming_enabled.return_value = True
+        mock_rpm_upload_pipeline = mock_rpm_upload_pipeline_class.return_value
+        self.mock_config_rpm_maker._build_hosts.side_effect = CouldNotBuildSomeRpmsException('devweb01')
+
+        self.assertRaises(CouldNotBuildSomeRpmsException,
+                          ConfigRpmMaker._build_hosts_and_upload_rpms, self.mock_config_rpm_maker, ['devweb01'])
+
+        mock_rpm_upload_pipeline.abort.assert_called_with()
+        mock_rpm_upload_pipeline.join.assert_called_with()
+        self.assert_mock_never_called(mock_rpm_upload_pipeline.close)
+
+
+@patch('config_rpm_maker.configrpmmaker.BuildCache')
+@patch('config_rpm_maker.configrpmmaker.get_build_cache_policy')
+class CommitBuildCacheTests(UnitTests):
+
+    def setUp(self):
+        self.mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        self.mock_config_rpm_maker.revision = '54'
+
+    def test_should_not_commit_anything_when_all_hosts_are_always_built(self, mock_get_build_cache_policy, mock_build_cache_class):
+
+        mock_get_build_cache_policy.return_value = 'always'
+
+        ConfigRpmMaker._commit_build_cache(self.mock_config_rpm_maker, ['devweb01'])
+
+        self.assert_mock_never_called(mock_build_cache_class)
+
+    def test_should_commit_build_cache_entry_of_each_host(self, mock_get_build_cache_policy, mock_build_cache_class):
+
+        mock_get_build_cache_policy.return_value = 'relink'
+
+        ConfigRpmMaker._commit_build_cache(self.mock_config_rpm_maker, ['devweb01', 'tuvweb01'])
+
+        self.assertEqual([call('devweb01', '54'), call('tuvweb01', '54')],
+                         mock_build_cache_class.return_value.commit.call_args_list)
+
+
+@patch('config_rpm_maker.configrpmmaker.is_effective_change_analysis_enabled')
+class GetAffectedHostsTests(UnitTests):
+
+    def setUp(self):
+        self.mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        self.mock_config_rpm_maker.revision = '54'
+        self.mock_config_rpm_maker.svn_service = Mock()
+
+    def test_should_return_hosts_with_segment_svn_path_of_changed_path(self, mock_is_effective_change_analysis_enabled):
+
+        mock_is_effective_change_analysis_enabled.return_value = False
+
+        actual = ConfigRpmMaker._get_affected_hosts(self.mock_config_rpm_maker, ['typ/web/etc/motd'], ['devweb01', 'devdbs01'])
+
+        self.assertEqual(set(['devweb01']), actual)
+
+    @patch('config_rpm_maker.configrpmmaker.ImpactAnalyzer')
+    def test_should_return_hosts_found_by_impact_analyzer_when_enabled(self, mock_impact_analyzer_class, mock_is_effective_change_analysis_enabled):
+
+        mock_is_effective_change_analysis_enabled.return_value = True
+        mock_impact_analyzer_class.return_value.find_hosts.return_value = set(['devweb02'])
+
+        actual = ConfigRpmMaker._get_affected_hosts(self.mock_config_rpm_maker, ['all/etc/motd'], ['devweb01', 'devweb02'])
+
+        self.assertEqual(set(['devweb02']), actual)
+        mock_impact_analyzer_class.assert_called_with(self.mock_config_rpm_maker.svn_service, '54')
+        mock_impact_analyzer_class.return_value.find_hosts.assert_called_with(['all/etc/motd'], ['devweb01', 'devweb02'])
+
+
+class GetRpmUploadConcurrencyTests(UnitTests):
+
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_concurrency')
+    def test_should_return_configured_rpm_upload_concurrency(self, mock_get_rpm_upload_concurrency):
+
+        mock_get_rpm_upload_concurrency.return_value = 3
+
+        self.assertEqual(3, ConfigRpmMaker._get_rpm_upload_concurrency(Mock(ConfigRpmMaker)))
+
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_concurrency')
+    def test_should_raise_exception_when_rpm_upload_concurrency_is_less_than_one(self, mock_get_rpm_upload_concurrency):
+
+        mock_get_rpm_upload_concurrency.return_value = 0
+
+        self.assertRaises(ConfigurationException, ConfigRpmMaker._get_rpm_upload_concurrency, Mock(ConfigRpmMaker))
+
+
+class GetDnsLookupConcurrencyTests(UnitTests):
+
+    @patch('config_rpm_maker.configrpmmaker.get_dns_lookup_concurrency')
+    def test_should_raise_exception_when_dns_lookup_concurrency_is_less_than_one(self, mock_get_dns_lookup_concurrency):
+
+        mock_get_dns_lookup_concurrency.return_value = 0
+
+        self.assertRaises(ConfigurationException, ConfigRpmMaker._get_dns_lookup_concurrency, Mock(ConfigRpmMaker))
+
+
+@patch('config_rpm_maker.configrpmmaker.get_dns_lookup_timeout')
+@patch('config_rpm_maker.configrpmmaker.get_dns_static_hosts_file')
+@patch('config_rpm_maker.configrpmmaker.read_static_hosts_file')
+@patch('config_rpm_maker.configrpmmaker.HostResolverCache')
+@patch('config_rpm_maker.configrpmmaker.HostResolver')
+class ResolveHostsTests(UnitTests):
+
+    def setUp(self):
+        self.mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        self.mock_config_rpm_maker._get_dns_lookup_concurrency.return_value = 4
+
+    def test_should_resolve_all_hosts_up_front(self, mock_host_resolver_class, mock_cache_class, mock_read_static_hosts_file,
+                                               mock_get_dns_static_hosts_file, mock_get_dns_lookup_timeout):
+
+        mock_get_dns_static_hosts_file.return_value = ''
+        mock_get_dns_lookup_timeout.return_value = 5
+
+        actual = ConfigRpmMaker._resolve_hosts(self.mock_config_rpm_maker, ['devweb01', 'tuvweb01'])
+
+        mock_host_resolver_class.assert_called_with({}, mock_cache_class.return_value, timeout=5)
+        mock_host_resolver_class.return_value.resolve_all.assert_called_with(['devweb01', 'tuvweb01'], concurrency=4)
+        self.assertEqual(mock_host_resolver_class.return_value.resolve_all.return_value, actual)
+        self.assert_mock_never_called(mock_read_static_hosts_file)
+
+    def test_should_load_and_save_cache(self, mock_host_resolver_class, mock_cache_class, mock_read_static_hosts_file,
+                                        mock_get_dns_static_hosts_file, mock_get_dns_lookup_timeout):
+
+        mock_get_dns_static_hosts_file.return_value = ''
+
+        ConfigRpmMaker._resolve_hosts(self.mock_config_rpm_maker, ['devweb01'])
+
+        mock_cache_class.return_value.load.assert_called_with()
+        mock_cache_class.return_value.save.assert_called_with()
+
+    def test_should_use_static_hosts_file(self, mock_host_resolver_class, mock_cache_class, mock_read_static_hosts_file,
+                                          mock_get_dns_static_hosts_file, mock_get_dns_lookup_timeout):
+
+        mock_get_dns_static_hosts_file.return_value = '/etc/hosts'
+        mock_get_dns_lookup_timeout.return_value = 5
+
+        ConfigRpmMaker._resolve_hosts(self.mock_config_rpm_maker, ['devweb01'])
+
+        mock_read_static_hosts_file.assert_called_with('/etc/hosts')
+        mock_host_resolver_class.assert_called_with(mock_read_static_hosts_file.return_value,
+                                                    mock_cache_class.return_value, timeout=5)
+
+
 @patch('config_rpm_maker.configrpmmaker.exists')
 @patch('config_rpm_maker.configrpmmaker.mkdtemp')
 @patch('config_rpm_maker.configrpmmaker.makedirs')
@@ -343,6 +778,17 @@ class PrepareWorkDirTests(UnitTests):
 
         mock_makedirs.assert_any_call('working-directory/rpmbuild/SOURCES')
 
+    def test_should_create_segment_staging_directory_when_it_does_not_exist(self, mock_makedirs, mock_mkdtemp, mock_exists):
+
+        mock_config_rpm_maker = self.create_mock_config_rpm_maker()
+        mock_exists.return_value = False
+        mock_mkdtemp.return_value = 'working-directory'
+
+        ConfigRpmMaker._prepare_work_dir(mock_config_rpm_maker)
+
+        mock_makedirs.assert_any_call('working-directory/segments')
+        self.assertEqual('working-directory/segments', mock_config_rpm_maker.segment_staging_dir)
+
     def create_mock_config_rpm_maker(self):
         mock_config_rpm_maker = Mock(ConfigRpmMaker)
         mock_config_rpm_maker.temp_dir = 'temporary directory'
@@ -495,3 +941,32 @@ class NotifyThatHostBuildFailedTest(UnitTests):
 
         mock_build_host_thread.host_queue.queue.clear.assert_called_with()
         mock_config.assert_called_with()
+
+    def test_should_abort_rpm_upload_when_host_failed(self):
+
+        mock_build_host_thread = Mock(BuildHostThread)
+        mock_build_host_thread.failed_host_queue = Queue()
+        mock_build_host_thread.host_queue = Mock()
+
+        BuildHostThread._notify_that_host_failed(mock_build_host_thread, 'devabc123', 'Stacktrace')
+
+        mock_build_host_thread._abort_rpm_upload.assert_called_with()
+
+
+class AbortRpmUploadTests(UnitTests):
+
+    def test_should_abort_rpm_upload_pipeline(self):
+
+        mock_build_host_thread = Mock(BuildHostThread)
+        mock_build_host_thread.rpm_upload_pipeline = Mock()
+
+        BuildHostThread._abort_rpm_upload(mock_build_host_thread)
+
+        mock_build_host_thread.rpm_upload_pipeline.abort.assert_called_with()
+
+    def test_should_not_fail_without_rpm_upload_pipeline(self):
+
+        mock_build_host_thread = Mock(BuildHostThread)
+        mock_build_host_thread.rpm_upload_pipeline = None
+
+        BuildHostThread._abort_rpm_upload(mock_build_host_thread)
@@ -27,23 +27,49 @@ from config_rpm_maker.configuration import (CONFIGURATION_FILE_PATH,
                                             ConfigurationException,
                                             ConfigurationProperty,
                                             unknown_hosts_are_allowed,
+                                            get_build_engine,
+                                            get_rpm_build_backend,
                                             get_config_rpm_prefix,
                                             get_config_viewer_host_directory,
+                                            get_config_viewer_publication,
                                             get_custom_dns_search_list,
+                                            get_daemon_address,
+                                            get_daemon_job_history,
+                                            get_dns_cache_file,
+                                            get_dns_cache_ttl,
+                                            get_dns_lookup_concurrency,
+                                            get_dns_lookup_timeout,
+                                            get_dns_static_hosts_file,
                                             get_error_log_directory,
                                             get_error_log_url,
+                                            get_execution_times_file,
+                                            get_file_copy_strategy,
                                             get_log_level,
                                             get_max_failed_hosts,
                                             get_max_file_size,
                                             get_path_to_spec_file,
+                                            get_profiling_mode,
+                                            get_profiling_sampling_interval,
+                                            get_svn_client_pool_size,
                                             get_svn_path_to_config,
+                                            get_trace_file,
                                             get_repo_packages_regex,
                                             get_rpm_upload_chunk_size,
                                             get_rpm_upload_command,
+                                            get_build_cache_directory,
+                                            get_build_cache_policy,
+                                            get_rpm_upload_concurrency,
+                                            get_rpm_upload_time_window,
+                                            get_template_cache_size,
                                             get_thread_count,
                                             get_temporary_directory,
                                             is_no_clean_up_enabled,
                                             is_config_viewer_only_enabled,
+                                            is_rpm_upload_streaming_enabled,
+                                            is_dry_run_enabled,
+                                            is_effective_change_analysis_enabled,
+                                            is_rpmbuild_direct_buildroot_enabled,
+                                            is_source_rpm_build_enabled,
                                             is_verbose_enabled,
                                             build_config_viewer_host_directory,
                                             get_file_path_of_loaded_configuration,
@@ -395,6 +421,330 @@ class EnsurePropertiesAreValidTest(UnitTests):
 
         self.assertEqual(None, actual_properties[get_rpm_upload_command])
 
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_rpm_upload_concurrency(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 4
+        properties = {'rpm_upload_concurrency': 4}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(4, actual_properties[get_rpm_upload_concurrency])
+        mock_ensure_is_an_integer.assert_any_call(get_rpm_upload_concurrency, 4)
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_dns_lookup_concurrency(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 20
+        properties = {'dns_lookup_concurrency': 20}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(20, actual_properties[get_dns_lookup_concurrency])
+        mock_ensure_is_an_integer.assert_any_call(get_dns_lookup_concurrency, 20)
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_string')
+    def test_should_return_dns_static_hosts_file(self, mock_ensure_is_a_string):
+
+        mock_ensure_is_a_string.return_value = '/etc/hosts'
+        properties = {'dns_static_hosts_file': '/etc/hosts'}
+
+        _ensure_properties_are_valid(properties)
+
+        mock_ensure_is_a_string.assert_any_call(get_dns_static_hosts_file, '/etc/hosts')
+
+    def test_should_return_defaults_for_dns_properties_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('', actual_properties[get_dns_cache_file])
+        self.assertEqual(3600, actual_properties[get_dns_cache_ttl])
+        self.assertEqual(10, actual_properties[get_dns_lookup_concurrency])
+        self.assertEqual(5, actual_properties[get_dns_lookup_timeout])
+        self.assertEqual('', actual_properties[get_dns_static_hosts_file])
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_string')
+    def test_should_return_daemon_address(self, mock_ensure_is_a_string):
+
+        mock_ensure_is_a_string.return_value = '/run/config-rpm-maker.socket'
+        properties = {'daemon_address': '/run/config-rpm-maker.socket'}
+
+        _ensure_properties_are_valid(properties)
+
+        mock_ensure_is_a_string.assert_any_call(get_daemon_address, '/run/config-rpm-maker.socket')
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_daemon_job_history(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 20
+        properties = {'daemon_job_history': 20}
+
+        _ensure_properties_are_valid(properties)
+
+        mock_ensure_is_an_integer.assert_any_call(get_daemon_job_history, 20)
+
+    def test_should_return_defaults_for_daemon_properties_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('localhost:8300', actual_properties[get_daemon_address])
+        self.assertEqual(100, actual_properties[get_daemon_job_history])
+
+    def test_should_return_build_cache_policy(self):
+
+        properties = {'build_cache_policy': 'relink'}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('relink', actual_properties[get_build_cache_policy])
+
+    def test_should_raise_exception_when_build_cache_policy_is_unknown(self):
+
+        properties = {'build_cache_policy': 'sometimes'}
+
+        self.assertRaises(ConfigurationException, _ensure_properties_are_valid, properties)
+
+    def test_should_return_config_viewer_publication(self):
+
+        properties = {'config_viewer_publication': 'symlink'}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('symlink', actual_properties[get_config_viewer_publication])
+
+    def test_should_raise_exception_when_config_viewer_publication_is_unknown(self):
+
+        properties = {'config_viewer_publication': 'copy'}
+
+        self.assertRaises(ConfigurationException, _ensure_properties_are_valid, properties)
+
+    def test_should_return_default_for_config_viewer_publication_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('move', actual_properties[get_config_viewer_publication])
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_string')
+    def test_should_return_execution_times_file(self, mock_ensure_is_a_string):
+
+        mock_ensure_is_a_string.return_value = 'execution-times.json'
+        properties = {'execution_times_file': 'execution-times.json'}
+
+        _ensure_properties_are_valid(properties)
+
+        mock_ensure_is_a_string.assert_any_call(get_execution_times_file, 'execution-times.json')
+
+    def test_should_return_default_for_execution_times_file_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('', actual_properties[get_execution_times_file])
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_profiling_sampling_interval(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 5
+        properties = {'profiling_sampling_interval': 5}
+
+        _ensure_properties_are_valid(properties)
+
+        mock_ensure_is_an_integer.assert_any_call(get_profiling_sampling_interval, 5)
+
+    def test_should_return_defaults_for_profiling_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('off', actual_properties[get_profiling_mode])
+        self.assertEqual(10, actual_properties[get_profiling_sampling_interval])
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_string')
+    def test_should_return_trace_file(self, mock_ensure_is_a_string):
+
+        mock_ensure_is_a_string.return_value = 'trace.json'
+        properties = {'trace_file': 'trace.json'}
+
+        _ensure_properties_are_valid(properties)
+
+        mock_ensure_is_a_string.assert_any_call(get_trace_file, 'trace.json')
+
+    def test_should_return_default_for_trace_file_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('', actual_properties[get_trace_file])
+
+    def test_should_return_file_copy_strategy(self):
+
+        properties = {'file_copy_strategy': 'copy'}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('copy', actual_properties[get_file_copy_strategy])
+
+    def test_should_raise_exception_when_file_copy_strategy_is_unknown(self):
+
+        properties = {'file_copy_strategy': 'teleport'}
+
+        self.assertRaises(ConfigurationException, _ensure_properties_are_valid, properties)
+
+    def test_should_return_default_for_file_copy_strategy_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('auto', actual_properties[get_file_copy_strategy])
+
+    def test_should_return_default_for_build_cache_policy_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('always', actual_properties[get_build_cache_policy])
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_string')
+    def test_should_return_build_cache_dir(self, mock_ensure_is_a_string):
+
+        mock_ensure_is_a_string.return_value = '/var/cache/build'
+        properties = {'build_cache_dir': '/var/cache/build'}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('/var/cache/build', actual_properties[get_build_cache_directory])
+        mock_ensure_is_a_string.assert_any_call(get_build_cache_directory, '/var/cache/build')
+
+    def test_should_return_default_for_build_cache_dir_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('/tmp/yadt-config-rpm-maker-build-cache', actual_properties[get_build_cache_directory])
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_boolean_value')
+    def test_should_return_effective_change_analysis(self, mock_ensure_is_a_boolean_value):
+
+        mock_ensure_is_a_boolean_value.return_value = True
+        properties = {'effective_change_analysis': True}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertTrue(actual_properties[is_effective_change_analysis_enabled])
+        mock_ensure_is_a_boolean_value.assert_any_call(is_effective_change_analysis_enabled, True)
+
+    def test_should_return_default_for_effective_change_analysis_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertFalse(actual_properties[is_effective_change_analysis_enabled])
+
+    def test_should_return_default_dry_run(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertFalse(actual_properties[is_dry_run_enabled])
+
+    def test_should_return_default_for_rpm_upload_concurrency_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(1, actual_properties[get_rpm_upload_concurrency])
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_rpm_upload_time_window(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 30
+        properties = {'rpm_upload_time_window': 30}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(30, actual_properties[get_rpm_upload_time_window])
+        mock_ensure_is_an_integer.assert_any_call(get_rpm_upload_time_window, 30)
+
+    def test_should_return_default_for_rpm_upload_time_window_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(10, actual_properties[get_rpm_upload_time_window])
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_boolean_value')
+    def test_should_return_rpm_upload_streaming(self, mock_ensure_is_a_boolean_value):
+
+        mock_ensure_is_a_boolean_value.return_value = True
+        properties = {'rpm_upload_streaming': True}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertTrue(actual_properties[is_rpm_upload_streaming_enabled])
+        mock_ensure_is_a_boolean_value.assert_any_call(is_rpm_upload_streaming_enabled, True)
+
+    def test_should_return_default_for_rpm_upload_streaming_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertFalse(actual_properties[is_rpm_upload_streaming_enabled])
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_boolean_value')
+    def test_should_return_rpmbuild_direct_buildroot(self, mock_ensure_is_a_boolean_value):
+
+        mock_ensure_is_a_boolean_value.return_value = True
+        properties = {'rpmbuild_direct_buildroot': True}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertTrue(actual_properties[is_rpmbuild_direct_buildroot_enabled])
+        mock_ensure_is_a_boolean_value.assert_any_call(is_rpmbuild_direct_buildroot_enabled, True)
+
+    def test_should_return_default_for_rpmbuild_direct_buildroot_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertFalse(actual_properties[is_rpmbuild_direct_buildroot_enabled])
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_boolean_value')
+    def test_should_return_build_source_rpms(self, mock_ensure_is_a_boolean_value):
+
+        mock_ensure_is_a_boolean_value.return_value = False
+        properties = {'build_source_rpms': False}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertFalse(actual_properties[is_source_rpm_build_enabled])
+        mock_ensure_is_a_boolean_value.assert_any_call(is_source_rpm_build_enabled, False)
+
+    def test_should_return_default_for_build_source_rpms_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertTrue(actual_properties[is_source_rpm_build_enabled])
+
     @patch('config_rpm_maker.configuration._ensure_is_a_string')
     def test_should_return_svn_path_to_config(self, mock_ensure_is_a_string):
 
@@ -414,6 +764,88 @@ class EnsurePropertiesAreValidTest(UnitTests):
 
         self.assertEqual('/config', actual_properties[get_svn_path_to_config])
 
+    def test_should_return_build_engine(self):
+
+        properties = {'build_engine': 'processes'}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('processes', actual_properties[get_build_engine])
+
+    def test_should_return_default_for_build_engine_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('threads', actual_properties[get_build_engine])
+
+    def test_should_raise_exception_when_build_engine_is_unknown(self):
+
+        properties = {'build_engine': 'fibers'}
+
+        self.assertRaises(ConfigurationException, _ensure_properties_are_valid, properties)
+
+    def test_should_return_rpm_build_backend(self):
+
+        properties = {'rpm_build_backend': 'native'}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('native', actual_properties[get_rpm_build_backend])
+
+    def test_should_return_default_for_rpm_build_backend_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('rpmbuild', actual_properties[get_rpm_build_backend])
+
+    def test_should_raise_exception_when_rpm_build_backend_is_unknown(self):
+
+        properties = {'rpm_build_backend': 'alien'}
+
+        self.assertRaises(ConfigurationException, _ensure_properties_are_valid, properties)
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_svn_client_pool_size(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 123
+        properties = {'svn_client_pool_size': 8}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(123, actual_properties[get_svn_client_pool_size])
+        mock_ensure_is_an_integer.assert_any_call(get_svn_client_pool_size, 8)
+
+    def test_should_return_default_for_svn_client_pool_size_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(4, actual_properties[get_svn_client_pool_size])
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_template_cache_size(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 123
+        properties = {'template_cache_size': 50}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(123, actual_properties[get_template_cache_size])
+        mock_ensure_is_an_integer.assert_any_call(get_template_cache_size, 50)
+
+    def test_should_return_default_for_template_cache_size_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(1000, actual_properties[get_template_cache_size])
+
     @patch('config_rpm_maker.configuration._ensure_is_an_integer')
     def test_should_return_thread_count(self, mock_ensure_is_an_integer):
 
@@ -0,0 +1,158 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from mock import Mock
+
+from unittest_support import UnitTests
+
+from config_rpm_maker.configviewer import ConfigViewerGarbageCollector, ConfigViewerPublisher
+
+
+class ConfigViewerPublisherTests(UnitTests):
+
+    def setUp(self):
+        self.hosts_dir = mkdtemp(prefix='configviewer_test.')
+        self.publisher = ConfigViewerPublisher(self.hosts_dir, '54')
+
+    def tearDown(self):
+        rmtree(self.hosts_dir)
+
+    def _create_host_directory(self, name, revision):
+        directory = os.path.join(self.hosts_dir, name)
+        os.makedirs(directory)
+        with open(os.path.join(directory, 'devweb01.rev'), 'w') as revision_file:
+            revision_file.write(revision)
+        return directory
+
+    def _read_published_revision(self):
+        with open(os.path.join(self.hosts_dir, 'devweb01', 'devweb01.rev')) as revision_file:
+            return revision_file.read()
+
+    def test_should_publish_new_directory_as_symlink_to_revision_directory(self):
+
+        self.publisher.publish('devweb01', self._create_host_directory('devweb01.new-revision-54', '54'))
+
+        self.assertEqual('devweb01.revision-54', os.readlink(os.path.join(self.hosts_dir, 'devweb01')))
+        self.assertEqual('54', self._read_published_revision())
+        self.assertEqual(['devweb01', 'devweb01.revision-54'], sorted(os.listdir(self.hosts_dir)))
+
+    def test_should_replace_symlink_and_keep_superseded_directory(self):
+
+        ConfigViewerPublisher(self.hosts_dir, '53').publish('devweb01', self._create_host_directory('devweb01.new-revision-53', '53'))
+
+        self.publisher.publish('devweb01', self._create_host_directory('devweb01.new-revision-54', '54'), 53)
+
+        self.assertEqual('devweb01.revision-54', os.readlink(os.path.join(self.hosts_dir, 'devweb01')))
+        self.assertEqual(['devweb01', 'devweb01.revision-53', 'devweb01.revision-54'], sorted(os.listdir(self.hosts_dir)))
+
+    def test_should_move_aside_directory_which_has_been_published_by_moving_it(self):
+
+        self._create_host_directory('devweb01', '53')
+
+        self.publisher.publish('devweb01', self._create_host_directory('devweb01.new-revision-54', '54'), 53)
+
+        self.assertEqual('54', self._read_published_revision())
+        self.assertTrue(os.path.isdir(os.path.join(self.hosts_dir, 'devweb01.revision-53')))
+
+    def test_should_use_unused_revision_directory_when_revision_is_published_again(self):
+
+        self.publisher.publish('devweb01', self._create_host_directory('devweb01.new-revision-54', '54'))
+
+        self.publisher.publish('devweb01', self._create_host_directory('devweb01.new-revision-54', '54'), 54)
+
+        self.assertEqual('devweb01.revision-54.1', os.readlink(os.path.join(self.hosts_dir, 'devweb01')))
+
+    def test_should_remove_superseded_directories_but_not_newer_ones(self):
+
+        self._create_host_directory('devweb01.revision-52', '52')
+        self._create_host_directory('devweb01.revision-55', '55')
+        self._create_host_directory('tuvweb01.revision-52', '52')
+        self.publisher.publish('devweb01', self._create_host_directory('devweb01.new-revision-54', '54'))
+        self.publisher.discard('devweb01', self._create_host_directory('devweb01.new-revision-54', '54'))
+
+        removed_directories = self.publisher.remove_superseded_directories(['devweb01'])
+
+        self.assertEqual(2, removed_directories)
+        self.assertEqual(['devweb01', 'devweb01.revision-54', 'devweb01.revision-55', 'tuvweb01.revision-52'],
+                         sorted(os.listdir(self.hosts_dir)))
+
+    def test_should_not_remove_directories_of_host_without_symlink(self):
+
+        self._create_host_directory('devweb01', '53')
+        self._create_host_directory('devweb01.revision-52', '52')
+
+        self.assertEqual(0, self.publisher.remove_superseded_directories(['devweb01']))
+
+    def test_should_remove_symlink_when_host_is_unpublished(self):
+
+        self.publisher.publish('devweb01', self._create_host_directory('devweb01.new-revision-54', '54'))
+
+        self.publisher.unpublish('devweb01')
+
+        self.assertEqual(['devweb01.revision-54'], sorted(os.listdir(self.hosts_dir)))
+
+    def test_should_remove_unpublished_directories_but_not_newer_ones(self):
+
+        self._create_host_directory('devweb01.revision-52', '52')
+        self._create_host_directory('devweb01.revision-54', '54')
+        self._create_host_directory('devweb01.revision-55', '55')
+        self._create_host_directory('tuvweb01.revision-52', '52')
+
+        removed_directories = self.publisher.remove_unpublished_directories(['devweb01'])
+
+        self.assertEqual(2, removed_directories)
+        self.assertEqual(['devweb01.revision-55', 'tuvweb01.revision-52'], sorted(os.listdir(self.hosts_dir)))
+
+    def test_should_not_remove_directories_of_host_which_has_been_published_again(self):
+
+        self.publisher.publish('devweb01', self._create_host_directory('devweb01.new-revision-54', '54'))
+
+        self.assertEqual(0, self.publisher.remove_unpublished_directories(['devweb01']))
+
+
+class ConfigViewerGarbageCollectorTests(UnitTests):
+
+    def test_should_remove_superseded_directories_of_given_hosts(self):
+
+        mock_publisher = Mock(ConfigViewerPublisher)
+        mock_publisher.remove_superseded_directories.return_value = 3
+        garbage_collector = ConfigViewerGarbageCollector(mock_publisher, ['devweb01'])
+
+        garbage_collector.start()
+        garbage_collector.join()
+
+        mock_publisher.remove_superseded_directories.assert_called_with(['devweb01'])
+        self.assertEqual(3, garbage_collector.removed_directories)
+        self.assertFalse(garbage_collector.daemon)
+
+    def test_should_remove_directories_of_deleted_hosts(self):
+
+        mock_publisher = Mock(ConfigViewerPublisher)
+        mock_publisher.remove_unpublished_directories.return_value = 2
+        garbage_collector = ConfigViewerGarbageCollector(mock_publisher, [], deleted_hosts=['tuvweb01'])
+
+        garbage_collector.start()
+        garbage_collector.join()
+
+        mock_publisher.remove_unpublished_directories.assert_called_with(['tuvweb01'])
+        self.assert_mock_never_called(mock_publisher.remove_superseded_directories)
+        self.assertEqual(2, garbage_collector.removed_directories)
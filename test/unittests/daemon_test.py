@@ -0,0 +1,344 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import socket
+
+from httplib import HTTPConnection, HTTPResponse
+from os.path import exists, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Event, Thread
+from unittest import TestCase
+from urllib import urlencode
+
+from mock import Mock, patch
+
+from config_rpm_maker.daemon import (JOB_STATUS_FAILED,
+                                     JOB_STATUS_QUEUED,
+                                     JOB_STATUS_RUNNING,
+                                     JOB_STATUS_SUCCEEDED,
+                                     BuildDaemon,
+                                     BuildDaemonException,
+                                     BuildDaemonHTTPServer,
+                                     BuildDaemonUnixServer,
+                                     BuildJob,
+                                     create_server)
+from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+
+
+class BuildJobTests(TestCase):
+
+    def test_should_be_queued_after_creation(self):
+
+        job = BuildJob('1', '123')
+
+        self.assertEqual(JOB_STATUS_QUEUED, job.status)
+        self.assertFalse(job.is_finished())
+        self.assertEqual(None, job.get_build_time())
+
+    def test_should_calculate_queue_time_and_build_time(self):
+
+        job = BuildJob('1', '123')
+        job.submitted_at = 10.0
+        job.started_at = 12.0
+        job.finished_at = 15.5
+        job.status = JOB_STATUS_SUCCEEDED
+
+        self.assertTrue(job.is_finished())
+        self.assertEqual(2.0, job.get_queue_time())
+        self.assertEqual(3.5, job.get_build_time())
+
+    def test_should_convert_job_to_dictionary(self):
+
+        job = BuildJob('1', '123')
+
+        actual = job.to_dict()
+
+        self.assertEqual('1', actual['id'])
+        self.assertEqual('123', actual['revision'])
+        self.assertEqual(JOB_STATUS_QUEUED, actual['status'])
+
+
+class BuildDaemonTests(TestCase):
+
+    def test_should_assign_increasing_job_ids(self):
+
+        build_daemon = BuildDaemon(Mock())
+
+        first_job = build_daemon.submit('123')
+        second_job = build_daemon.submit('124')
+
+        self.assertEqual('1', first_job.job_id)
+        self.assertEqual('2', second_job.job_id)
+        self.assertEqual([first_job, second_job], build_daemon.get_jobs())
+        self.assertEqual(second_job, build_daemon.get_job('2'))
+        self.assertEqual(None, build_daemon.get_job('3'))
+
+    def test_should_build_submitted_revisions_in_order(self):
+
+        built_revisions = []
+        last_revision_built = Event()
+
+        def build_function(revision):
+            built_revisions.append(revision)
+            if revision == '124':
+                last_revision_built.set()
+
+        build_daemon = BuildDaemon(build_function)
+        build_daemon.start()
+        build_daemon.submit('123')
+        job = build_daemon.submit('124')
+
+        last_revision_built.wait(5)
+        build_daemon.stop()
+
+        self.assertEqual(['123', '124'], built_revisions)
+        self.assertEqual(JOB_STATUS_SUCCEEDED, job.status)
+
+    def test_should_mark_job_as_running_while_building(self):
+
+        build_daemon = BuildDaemon(Mock())
+        job = BuildJob('1', '123')
+        build_daemon.build_function.side_effect = lambda revision: self.assertEqual(JOB_STATUS_RUNNING, job.status)
+
+        build_daemon._build(job)
+
+        self.assertEqual(JOB_STATUS_SUCCEEDED, job.status)
+        self.assertTrue(job.started_at <= job.finished_at)
+
+    def test_should_record_error_message_when_build_failed(self):
+
+        build_daemon = BuildDaemon(Mock(side_effect=BaseConfigRpmMakerException('spam')))
+        job = BuildJob('1', '123')
+
+        build_daemon._build(job)
+
+        self.assertEqual(JOB_STATUS_FAILED, job.status)
+        self.assertEqual('spam', job.error)
+
+    def test_should_record_stack_trace_when_build_failed_unexpectedly(self):
+
+        build_daemon = BuildDaemon(Mock(side_effect=ValueError('eggs')))
+        job = BuildJob('1', '123')
+
+        build_daemon._build(job)
+
+        self.assertEqual(JOB_STATUS_FAILED, job.status)
+        self.assertTrue('ValueError: eggs' in job.error)
+
+    @patch('config_rpm_maker.daemon.EXECUTION_TIME_PROFILER')
+    def test_should_record_execution_times_of_build(self, mock_profiler):
+
+        mock_statistics = Mock()
+        mock_statistics.to_dict.return_value = {'count': 1}
+        mock_profiler.summarize_by_function.return_value = {'_build_hosts': mock_statistics}
+        build_daemon = BuildDaemon(Mock())
+        job = BuildJob('1', '123')
+
+        build_daemon._build(job)
+
+        mock_profiler.reset.assert_called_with()
+        self.assertEqual({'_build_hosts': {'count': 1}}, job.execution_times)
+
+    @patch('config_rpm_maker.daemon.FILE_COPY_STATISTICS')
+    @patch('config_rpm_maker.daemon.ENCODING_DETECTION_STATISTICS')
+    def test_should_reset_statistics_before_each_build(self, mock_encoding_detection_statistics, mock_file_copy_statistics):
+
+        build_daemon = BuildDaemon(Mock())
+
+        build_daemon._build(BuildJob('1', '123'))
+
+        mock_encoding_detection_statistics.reset.assert_called_with()
+        mock_file_copy_statistics.reset.assert_called_with()
+
+    def test_should_forget_oldest_finished_jobs(self):
+
+        build_daemon = BuildDaemon(Mock(), job_history=1)
+        first_job = build_daemon.submit('123')
+        second_job = build_daemon.submit('124')
+        third_job = build_daemon.submit('125')
+        first_job.status = JOB_STATUS_SUCCEEDED
+        second_job.status = JOB_STATUS_FAILED
+
+        build_daemon._forget_old_jobs()
+
+        self.assertEqual([second_job, third_job], build_daemon.get_jobs())
+
+    def test_should_not_build_queued_jobs_after_stop(self):
+
+        build_function = Mock()
+        build_daemon = BuildDaemon(build_function)
+        build_daemon.submit('123')
+
+        build_daemon.stop()
+
+        self.assertEqual(0, build_function.call_count)
+
+
+class RequestHandlerTests(TestCase):
+
+    def setUp(self):
+        self.build_daemon = BuildDaemon(Mock())
+        self.server = BuildDaemonHTTPServer(('127.0.0.1', 0), self.build_daemon)
+        self.server_thread = Thread(target=self.server.serve_forever, args=(0.01,))
+        self.server_thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server_thread.join()
+        self.server.server_close()
+
+    def request(self, method, path, body=None):
+        connection = HTTPConnection('127.0.0.1', self.server.server_address[1], timeout=5)
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        content = json.loads(response.read())
+        connection.close()
+        return response, content
+
+    def test_should_accept_revision_and_return_job(self):
+
+        response, content = self.request('POST', '/jobs', urlencode({'revision': '123'}))
+
+        self.assertEqual(202, response.status)
+        self.assertEqual('/jobs/1', response.getheader('Location'))
+        self.assertEqual('123', content['revision'])
+        self.assertEqual(JOB_STATUS_QUEUED, content['status'])
+
+    def test_should_accept_revision_given_in_query_string(self):
+
+        response, content = self.request('POST', '/jobs?revision=123')
+
+        self.assertEqual(202, response.status)
+        self.assertEqual('123', content['revision'])
+
+    def test_should_reject_invalid_revision(self):
+
+        response, content = self.request('POST', '/jobs', urlencode({'revision': 'HEAD'}))
+
+        self.assertEqual(400, response.status)
+        self.assertEqual([], self.build_daemon.get_jobs())
+
+    def test_should_return_job(self):
+
+        job = self.build_daemon.submit('123')
+
+        response, content = self.request('GET', '/jobs/%s' % job.job_id)
+
+        self.assertEqual(200, response.status)
+        self.assertEqual(job.job_id, content['id'])
+
+    def test_should_return_all_jobs(self):
+
+        self.build_daemon.submit('123')
+        self.build_daemon.submit('124')
+
+        response, content = self.request('GET', '/jobs')
+
+        self.assertEqual(200, response.status)
+        self.assertEqual(['123', '124'], [job['revision'] for job in content])
+
+    def test_should_return_not_found_for_unknown_job(self):
+
+        response, content = self.request('GET', '/jobs/42')
+
+        self.assertEqual(404, response.status)
+
+    def test_should_return_not_found_for_unknown_path(self):
+
+        response, content = self.request('POST', '/spam')
+
+        self.assertEqual(404, response.status)
+
+
+class UnixServerTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='daemon-test.')
+        self.socket_path = join(self.temporary_directory, 'config-rpm-maker.socket')
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def test_should_accept_revision_on_unix_socket(self):
+
+        build_daemon = BuildDaemon(Mock())
+        server = BuildDaemonUnixServer(self.socket_path, build_daemon)
+        server_thread = Thread(target=server.serve_forever, args=(0.01,))
+        server_thread.start()
+
+        try:
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.connect(self.socket_path)
+            client.sendall('POST /jobs?revision=123 HTTP/1.0\r\nContent-Length: 0\r\n\r\n')
+            response = HTTPResponse(client)
+            response.begin()
+            content = json.loads(response.read())
+            client.close()
+
+        finally:
+            server.shutdown()
+            server_thread.join()
+            server.server_close()
+
+        self.assertEqual(202, response.status)
+        self.assertEqual('123', content['revision'])
+        self.assertFalse(exists(self.socket_path))
+
+    def test_should_replace_socket_of_former_daemon(self):
+
+        former_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        former_socket.bind(self.socket_path)
+        former_socket.close()
+
+        server = BuildDaemonUnixServer(self.socket_path, BuildDaemon(Mock()))
+        server.server_close()
+
+    def test_should_raise_exception_when_path_is_not_a_socket(self):
+
+        with open(self.socket_path, 'w') as file_which_is_not_a_socket:
+            file_which_is_not_a_socket.write('spam')
+
+        self.assertRaises(BuildDaemonException, BuildDaemonUnixServer, self.socket_path, BuildDaemon(Mock()))
+
+
+class CreateServerTests(TestCase):
+
+    @patch('config_rpm_maker.daemon.BuildDaemonUnixServer')
+    def test_should_create_unix_server_for_absolute_path(self, mock_unix_server_class):
+
+        build_daemon = Mock()
+
+        create_server('/run/config-rpm-maker.socket', build_daemon)
+
+        mock_unix_server_class.assert_called_with('/run/config-rpm-maker.socket', build_daemon)
+
+    @patch('config_rpm_maker.daemon.BuildDaemonHTTPServer')
+    def test_should_create_http_server_for_host_and_port(self, mock_http_server_class):
+
+        build_daemon = Mock()
+
+        create_server('localhost:8300', build_daemon)
+
+        mock_http_server_class.assert_called_with(('localhost', 8300), build_daemon)
+
+    def test_should_raise_exception_when_address_is_invalid(self):
+
+        self.assertRaises(BuildDaemonException, create_server, 'localhost', Mock())
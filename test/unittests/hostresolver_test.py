@@ -0,0 +1,213 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+import socket
+
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Event
+
+from mock import Mock, patch
+
+from unittest_support import UnitTests
+
+from config_rpm_maker.hostresolver import HostResolver, HostResolverCache, ResolvedHosts, read_static_hosts_file
+
+
+class ReadStaticHostsFileTests(UnitTests):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='hostresolver_test.')
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def test_should_map_fqdn_and_aliases_to_resolution(self):
+
+        path = os.path.join(self.temporary_directory, 'hosts')
+        with open(path, 'w') as static_hosts_file:
+            static_hosts_file.write('# static hosts\n'
+                                    '10.0.0.1  devweb01.example.com devweb01  # web server\n'
+                                    '\n'
+                                    '10.0.0.2 tuvweb01.example.com\n')
+
+        static_hosts = read_static_hosts_file(path)
+
+        self.assertEqual({'devweb01.example.com': ('10.0.0.1', 'devweb01.example.com', 'devweb01'),
+                          'devweb01': ('10.0.0.1', 'devweb01.example.com', 'devweb01'),
+                          'tuvweb01.example.com': ('10.0.0.2', 'tuvweb01.example.com', '')}, static_hosts)
+
+
+class HostResolverCacheTests(UnitTests):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='hostresolver_test.')
+        self.path = os.path.join(self.temporary_directory, 'cache', 'dns.json')
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def test_should_return_cached_result(self):
+
+        cache = HostResolverCache(ttl=60)
+        cache.put('devweb01', ('10.0.0.1', 'devweb01.example.com', ''))
+
+        self.assertEqual(('10.0.0.1', 'devweb01.example.com', ''), cache.get('devweb01'))
+
+    @patch('config_rpm_maker.hostresolver.time')
+    def test_should_not_return_expired_result(self, mock_time):
+
+        cache = HostResolverCache(ttl=60)
+        mock_time.return_value = 1000
+        cache.put('devweb01', ('10.0.0.1', 'devweb01.example.com', ''))
+        mock_time.return_value = 1060
+
+        self.assertEqual(None, cache.get('devweb01'))
+
+    def test_should_not_cache_anything_without_ttl(self):
+
+        cache = HostResolverCache(ttl=0)
+        cache.put('devweb01', ('10.0.0.1', 'devweb01.example.com', ''))
+
+        self.assertEqual(None, cache.get('devweb01'))
+
+    def test_should_keep_results_across_runs(self):
+
+        cache = HostResolverCache(self.path, ttl=60)
+        cache.put('devweb01', ('10.0.0.1', 'devweb01.example.com', ''))
+        cache.save()
+
+        next_cache = HostResolverCache(self.path, ttl=60)
+        next_cache.load()
+
+        self.assertEqual(('10.0.0.1', 'devweb01.example.com', ''), next_cache.get('devweb01'))
+
+    def test_should_ignore_broken_cache_file(self):
+
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as cache_file:
+            cache_file.write('{ broken')
+
+        cache = HostResolverCache(self.path, ttl=60)
+        cache.load()
+
+        self.assertEqual(None, cache.get('devweb01'))
+
+    @patch('config_rpm_maker.hostresolver.time')
+    def test_should_not_save_expired_results(self, mock_time):
+
+        cache = HostResolverCache(self.path, ttl=60)
+        mock_time.return_value = 1000
+        cache.put('devweb01', ('10.0.0.1', 'devweb01.example.com', ''))
+        mock_time.return_value = 1030
+        cache.put('tuvweb01', ('10.0.0.2', 'tuvweb01.example.com', ''))
+        mock_time.return_value = 1070
+        cache.save()
+
+        with open(self.path) as cache_file:
+            self.assertEqual(['tuvweb01'], json.load(cache_file).keys())
+
+
+class ResolvedHostsTests(UnitTests):
+
+    def test_should_return_result(self):
+
+        resolved_hosts = ResolvedHosts({'devweb01': ('10.0.0.1', 'devweb01.example.com', '')})
+
+        self.assertTrue('devweb01' in resolved_hosts)
+        self.assertEqual(('10.0.0.1', 'devweb01.example.com', ''), resolved_hosts.lookup('devweb01'))
+
+    def test_should_raise_error_of_resolution(self):
+
+        resolved_hosts = ResolvedHosts({'devweb01': ValueError('spam')})
+
+        self.assertRaises(ValueError, resolved_hosts.lookup, 'devweb01')
+
+
+@patch('config_rpm_maker.hostresolver.get_custom_dns_search_list')
+@patch('config_rpm_maker.hostresolver.unknown_hosts_are_allowed')
+class HostResolverTests(UnitTests):
+
+    def test_should_use_static_hosts_without_looking_up(self, mock_unknown_hosts_are_allowed, mock_get_custom_dns_search_list):
+
+        mock_get_custom_dns_search_list.return_value = ['example.com']
+        host_resolver = HostResolver(static_hosts={'devweb01.example.com': ('10.0.0.1', 'devweb01.example.com', '')})
+        host_resolver._gethostbyname_ex = Mock()
+
+        self.assertEqual(('10.0.0.1', 'devweb01.example.com', ''), host_resolver.resolve('devweb01'))
+        self.assert_mock_never_called(host_resolver._gethostbyname_ex)
+
+    def test_should_cache_looked_up_result(self, mock_unknown_hosts_are_allowed, mock_get_custom_dns_search_list):
+
+        mock_get_custom_dns_search_list.return_value = []
+        host_resolver = HostResolver(cache=HostResolverCache(ttl=60))
+        host_resolver._gethostbyname_ex = Mock(return_value=('10.0.0.1', 'devweb01.example.com', ''))
+
+        host_resolver.resolve('devweb01')
+        result = host_resolver.resolve('devweb01')
+
+        self.assertEqual(('10.0.0.1', 'devweb01.example.com', ''), result)
+        self.assertEqual(1, host_resolver._gethostbyname_ex.call_count)
+        self.assertEqual({'static hosts file': 0, 'cache': 1, 'looked up': 1}, host_resolver.counters)
+
+    def test_should_try_next_dns_suffix_when_lookup_times_out(self, mock_unknown_hosts_are_allowed, mock_get_custom_dns_search_list):
+
+        mock_get_custom_dns_search_list.return_value = ['slow.example.com', 'example.com']
+        never_answered = Event()
+
+        def gethostbyname_ex(hostname):
+            if hostname == 'devweb01.slow.example.com':
+                never_answered.wait(5)
+            return '10.0.0.1', hostname, ''
+
+        host_resolver = HostResolver(timeout=0.01)
+        host_resolver._gethostbyname_ex = gethostbyname_ex
+
+        try:
+            self.assertEqual(('10.0.0.1', 'devweb01.example.com', ''), host_resolver.resolve('devweb01'))
+        finally:
+            never_answered.set()
+
+    def test_should_resolve_all_hosts(self, mock_unknown_hosts_are_allowed, mock_get_custom_dns_search_list):
+
+        mock_get_custom_dns_search_list.return_value = []
+        mock_unknown_hosts_are_allowed.return_value = False
+
+        def gethostbyname_ex(hostname):
+            if hostname == 'unknown01':
+                raise socket.gaierror('Name or service not known')
+            return '10.0.0.1', hostname, ''
+
+        host_resolver = HostResolver()
+        host_resolver._gethostbyname_ex = gethostbyname_ex
+
+        resolved_hosts = host_resolver.resolve_all(['devweb01', 'tuvweb01', 'unknown01'], concurrency=2)
+
+        self.assertEqual(3, len(resolved_hosts))
+        self.assertEqual(('10.0.0.1', 'tuvweb01', ''), resolved_hosts.lookup('tuvweb01'))
+        self.assertRaises(Exception, resolved_hosts.lookup, 'unknown01')
+
+    def test_should_log_summary(self, mock_unknown_hosts_are_allowed, mock_get_custom_dns_search_list):
+
+        mock_logging_function = Mock()
+
+        HostResolver().log_summary(mock_logging_function)
+
+        mock_logging_function.assert_called_with('Host resolution: %s',
+                                                 'cache 0 time(s), looked up 0 time(s), static hosts file 0 time(s)')
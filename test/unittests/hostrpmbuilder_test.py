@@ -17,14 +17,17 @@
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from unittest import TestCase
-from mock import Mock, patch
+from mock import MagicMock, Mock, patch
 from subprocess import PIPE
 
 from unittest_support import UnitTests
 
 import config_rpm_maker
 
+from config_rpm_maker.hostresolver import ResolvedHosts
+from config_rpm_maker.segment import All, Host
 from config_rpm_maker.hostrpmbuilder import CouldNotBuildRpmException, ConfigDirAlreadyExistsException, CouldNotCreateConfigDirException, HostRpmBuilder
+from config_rpm_maker.nativerpm.specfile import UnsupportedSpecFileException
 
 
 class ConstructorTests(TestCase):
@@ -140,6 +143,12 @@ class ConstructorTests(TestCase):
 
         self.assertEqual('/tmp/rpmbuild', self.mock_host_rpm_builder.rpm_build_dir)
 
+    def test_should_build_rpm_output_directory_using_rpm_build_directory_and_hostname(self):
+
+        self.call_constructor()
+
+        self.assertEqual('/tmp/rpmbuild/hosts/hostname', self.mock_host_rpm_builder.rpm_output_dir)
+
     def test_should_have_error_file_path(self):
 
         self.call_constructor()
@@ -179,8 +188,10 @@ class BuildTests(TestCase):
         mock_host_rpm_builder.rpm_provides_path = 'rpm-provides-path'
         mock_host_rpm_builder.config_viewer_host_dir = 'config_viewer_host_dir'
         mock_host_rpm_builder.config_rpm_prefix = "any-config-prefix"
+        mock_host_rpm_builder.rpm_builder = None
 
         mock_host_rpm_builder._overlay_segment = self._create_mock_overlay_segment_method()
+        mock_host_rpm_builder._reuse_cached_rpms.return_value = False
 
         self.mock_host_rpm_builder = mock_host_rpm_builder
 
@@ -413,13 +424,13 @@ class BuildTests(TestCase):
 
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
-    def test_should_copy_files_for_config_viewer(self, mock_exists, mock_mkdir):
+    def test_should_prepare_config_viewer_host_dir(self, mock_exists, mock_mkdir):
 
         mock_exists.return_value = False
 
         HostRpmBuilder.build(self.mock_host_rpm_builder)
 
-        self.mock_host_rpm_builder._copy_files_for_config_viewer.assert_called_with()
+        self.mock_host_rpm_builder._prepare_config_viewer_host_dir.assert_called_with()
 
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
@@ -435,13 +446,27 @@ class BuildTests(TestCase):
 
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
-    def test_should_filter_tokens_in_rpm_sources(self, mock_exists, mock_mkdir):
+    def test_should_filter_tokens_in_rpm_sources_and_config_viewer(self, mock_exists, mock_mkdir):
 
         mock_exists.return_value = False
 
         HostRpmBuilder.build(self.mock_host_rpm_builder)
 
-        self.mock_host_rpm_builder._filter_tokens_in_rpm_sources.assert_called_with()
+        self.mock_host_rpm_builder._filter_tokens_in_rpm_sources_and_config_viewer.assert_called_with(None)
+
+    @patch('config_rpm_maker.hostrpmbuilder.mkdir')
+    @patch('config_rpm_maker.hostrpmbuilder.exists')
+    @patch('config_rpm_maker.hostrpmbuilder.TokenReplacer')
+    def test_should_filter_tokens_using_token_replacer_which_expanded_rpm_name_of_group_rpm(self, token_replacer, mock_exists, mock_mkdir):
+
+        mock_exists.side_effect = lambda path: path.endswith("RPM_NAME")
+        self.mock_host_rpm_builder._get_content.return_value = "any-group-rpm-name"
+
+        HostRpmBuilder.build(self.mock_host_rpm_builder)
+
+        token_replacer.from_directory.assert_called_once_with('/path/to/variables-directory')
+        token_replacer.from_directory.return_value.filter_file.assert_called_with('/path/to/variables-directory/RPM_NAME')
+        self.mock_host_rpm_builder._filter_tokens_in_rpm_sources_and_config_viewer.assert_called_with(token_replacer.from_directory.return_value)
 
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
@@ -466,15 +491,69 @@ class BuildTests(TestCase):
         mock_get.assert_any_call()
         self.assertEqual(0, len(self.mock_host_rpm_builder._build_rpm_using_rpmbuild.call_args_list))
 
+    @patch('config_rpm_maker.hostrpmbuilder.get_rpm_build_backend')
+    @patch('config_rpm_maker.hostrpmbuilder.mkdir')
+    @patch('config_rpm_maker.hostrpmbuilder.exists')
+    def test_should_build_rpm_natively_when_native_backend_is_configured(self, mock_exists, mock_mkdir, mock_get):
+
+        mock_get.return_value = 'native'
+        mock_exists.return_value = False
+        self.mock_host_rpm_builder._build_rpm_natively.return_value = True
+
+        HostRpmBuilder.build(self.mock_host_rpm_builder)
+
+        self.mock_host_rpm_builder._build_rpm_natively.assert_called_with()
+        self.assertEqual(0, len(self.mock_host_rpm_builder._build_rpm_using_rpmbuild.call_args_list))
+
+    @patch('config_rpm_maker.hostrpmbuilder.get_rpm_build_backend')
+    @patch('config_rpm_maker.hostrpmbuilder.mkdir')
+    @patch('config_rpm_maker.hostrpmbuilder.exists')
+    def test_should_fall_back_to_rpmbuild_when_native_build_is_not_possible(self, mock_exists, mock_mkdir, mock_get):
+
+        mock_get.return_value = 'native'
+        mock_exists.return_value = False
+        self.mock_host_rpm_builder._build_rpm_natively.return_value = False
+
+        HostRpmBuilder.build(self.mock_host_rpm_builder)
+
+        self.mock_host_rpm_builder._build_rpm_using_rpmbuild.assert_called_with()
+
+    @patch('config_rpm_maker.hostrpmbuilder.mkdir')
+    @patch('config_rpm_maker.hostrpmbuilder.exists')
+    def test_should_build_rpm_using_given_rpm_builder(self, mock_exists, mock_mkdir):
+
+        mock_exists.return_value = False
+        self.mock_host_rpm_builder.rpm_builder = Mock()
+
+        HostRpmBuilder.build(self.mock_host_rpm_builder)
+
+        self.mock_host_rpm_builder._build_rpm_using_rpm_builder.assert_called_with()
+        self.assertEqual(0, len(self.mock_host_rpm_builder._build_rpm_using_rpmbuild.call_args_list))
+
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
-    def test_should_filter_tokens_in_config_viewer(self, mock_exists, mock_mkdir):
+    def test_should_stage_built_rpms_in_build_cache(self, mock_exists, mock_mkdir):
 
         mock_exists.return_value = False
+        self.mock_host_rpm_builder._calculate_build_digest.return_value = 'digest'
 
         HostRpmBuilder.build(self.mock_host_rpm_builder)
 
-        self.mock_host_rpm_builder._filter_tokens_in_config_viewer.assert_called_with()
+        self.mock_host_rpm_builder._reuse_cached_rpms.assert_called_with('digest')
+        self.mock_host_rpm_builder._stage_rpms_in_build_cache.assert_called_with('digest')
+
+    @patch('config_rpm_maker.hostrpmbuilder.mkdir')
+    @patch('config_rpm_maker.hostrpmbuilder.exists')
+    def test_should_not_build_rpms_when_cached_rpms_are_reused(self, mock_exists, mock_mkdir):
+
+        mock_exists.return_value = False
+        self.mock_host_rpm_builder._reuse_cached_rpms.return_value = True
+
+        HostRpmBuilder.build(self.mock_host_rpm_builder)
+
+        self.assertEqual(0, len(self.mock_host_rpm_builder._build_rpm_using_rpmbuild.call_args_list))
+        self.assertEqual(0, len(self.mock_host_rpm_builder._stage_rpms_in_build_cache.call_args_list))
+        self.mock_host_rpm_builder._write_revision_file_for_config_viewer.assert_called_with()
 
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
@@ -533,6 +612,67 @@ class BuildTests(TestCase):
         self.mock_host_rpm_builder._clean_up.assert_called_with()
 
 
+class ExportSpecFileTests(UnitTests):
+
+    @patch('config_rpm_maker.hostrpmbuilder.get_path_to_spec_file')
+    def test_should_write_spec_file_content_from_svn_service(self, mock_get_path_to_spec_file):
+
+        mock_get_path_to_spec_file.return_value = 'default.spec'
+        mock_svn_service = Mock()
+        mock_svn_service.get_file_content.return_value = 'Name: spam'
+        mock_host_rpm_builder = Mock(HostRpmBuilder)
+        mock_host_rpm_builder.revision = '123'
+        mock_host_rpm_builder.spec_file_path = '/foo/bar/spam.spec'
+        mock_host_rpm_builder.svn_service_queue = Mock()
+        mock_host_rpm_builder._get_next_svn_service_from_queue.return_value = mock_svn_service
+
+        HostRpmBuilder._export_spec_file(mock_host_rpm_builder)
+
+        mock_svn_service.get_file_content.assert_called_with('default.spec', '123')
+        mock_host_rpm_builder.svn_service_queue.put.assert_called_with(mock_svn_service)
+        mock_host_rpm_builder._write_file.assert_called_with('/foo/bar/spam.spec', 'Name: spam')
+
+
+class ExportSegmentPathTests(UnitTests):
+
+    def setUp(self):
+        self.mock_svn_service = Mock()
+        self.mock_svn_service.export.return_value = [('host/devweb01', 'spam')]
+
+        mock_host_rpm_builder = Mock(HostRpmBuilder)
+        mock_host_rpm_builder.revision = '123'
+        mock_host_rpm_builder.host_config_dir = '/foo/bar'
+        mock_host_rpm_builder.svn_service_queue = Mock()
+        mock_host_rpm_builder.segment_export_cache = Mock()
+        mock_host_rpm_builder.segment_export_cache.overlay.return_value = [('all', 'eggs')]
+        mock_host_rpm_builder._get_next_svn_service_from_queue.return_value = self.mock_svn_service
+        self.mock_host_rpm_builder = mock_host_rpm_builder
+
+    def test_should_overlay_shared_segment_from_segment_export_cache(self):
+
+        actual = HostRpmBuilder._export_segment_path(self.mock_host_rpm_builder, All(), 'all')
+
+        self.assertEqual([('all', 'eggs')], actual)
+        self.mock_host_rpm_builder.segment_export_cache.overlay.assert_called_with('all', '/foo/bar')
+        self.assert_mock_never_called(self.mock_svn_service.export)
+
+    def test_should_export_host_segment_directly(self):
+
+        actual = HostRpmBuilder._export_segment_path(self.mock_host_rpm_builder, Host(), 'host/devweb01')
+
+        self.assertEqual([('host/devweb01', 'spam')], actual)
+        self.mock_svn_service.export.assert_called_with('host/devweb01', '/foo/bar', '123')
+        self.mock_host_rpm_builder.svn_service_queue.put.assert_called_with(self.mock_svn_service)
+
+    def test_should_export_directly_when_no_segment_export_cache_given(self):
+
+        self.mock_host_rpm_builder.segment_export_cache = None
+
+        HostRpmBuilder._export_segment_path(self.mock_host_rpm_builder, All(), 'all')
+
+        self.mock_svn_service.export.assert_called_with('all', '/foo/bar', '123')
+
+
 @patch('config_rpm_maker.hostrpmbuilder.is_no_clean_up_enabled')
 @patch('config_rpm_maker.hostrpmbuilder.rmtree')
 @patch('config_rpm_maker.hostrpmbuilder.remove')
@@ -590,6 +730,35 @@ class CleanUpTests(UnitTests):
         mock_remove.assert_any_call('/path/to/error/file')
 
 
+@patch('config_rpm_maker.hostrpmbuilder.os.walk')
+class FindRpmsTests(TestCase):
+
+    def setUp(self):
+        mock_host_rpm_builder = Mock(HostRpmBuilder)
+        mock_host_rpm_builder.rpm_output_dir = '/rpmbuild/hosts/devweb01'
+        self.mock_host_rpm_builder = mock_host_rpm_builder
+
+    def test_should_only_search_output_directory_of_host(self, mock_walk):
+
+        mock_walk.return_value = []
+
+        HostRpmBuilder._find_rpms(self.mock_host_rpm_builder)
+
+        mock_walk.assert_called_once_with('/rpmbuild/hosts/devweb01')
+
+    def test_should_return_all_rpms_in_output_directory(self, mock_walk):
+
+        mock_walk.return_value = [('/rpmbuild/hosts/devweb01/RPMS/noarch', [], ['yadt-config-devweb01-repos-1-1.noarch.rpm',
+                                                                                'yadt-config-devweb01-1-1.noarch.rpm']),
+                                  ('/rpmbuild/hosts/devweb01/SRPMS', [], ['yadt-config-devweb01-1-1.src.rpm', 'build.log'])]
+
+        actual = HostRpmBuilder._find_rpms(self.mock_host_rpm_builder)
+
+        self.assertEqual(['/rpmbuild/hosts/devweb01/RPMS/noarch/yadt-config-devweb01-1-1.noarch.rpm',
+                          '/rpmbuild/hosts/devweb01/RPMS/noarch/yadt-config-devweb01-repos-1-1.noarch.rpm',
+                          '/rpmbuild/hosts/devweb01/SRPMS/yadt-config-devweb01-1-1.src.rpm'], actual)
+
+
 class WriteRevisionFileForConfigViewerTests(TestCase):
 
     def setUp(self):
@@ -606,6 +775,205 @@ class WriteRevisionFileForConfigViewerTests(TestCase):
         self.mock_host_rpm_builder._write_file.assert_called_with('config-viewer-host-dir/hostname.rev', '1234')
 
 
+@patch('config_rpm_maker.hostrpmbuilder.TokenReplacer')
+class FilterTokensInRpmSourcesAndConfigViewerTests(TestCase):
+
+    def setUp(self):
+        mock_host_rpm_builder = Mock(HostRpmBuilder)
+        mock_host_rpm_builder.hostname = 'devweb01'
+        mock_host_rpm_builder.host_config_dir = 'host-config-dir'
+        mock_host_rpm_builder.variables_dir = 'variables'
+        mock_host_rpm_builder.config_viewer_host_dir = 'config-viewer-host-dir'
+        mock_host_rpm_builder.thread_name = 'thread-name'
+        self.mock_host_rpm_builder = mock_host_rpm_builder
+
+    def test_should_resolve_variables_from_directory(self, mock_token_replacer_class):
+
+        HostRpmBuilder._filter_tokens_in_rpm_sources_and_config_viewer(self.mock_host_rpm_builder)
+
+        mock_token_replacer_class.from_directory.assert_called_with('variables')
+
+    def test_should_add_variables_to_given_token_replacer(self, mock_token_replacer_class):
+        mock_token_replacer = MagicMock()
+
+        HostRpmBuilder._filter_tokens_in_rpm_sources_and_config_viewer(self.mock_host_rpm_builder, mock_token_replacer)
+
+        self.assertEqual(0, mock_token_replacer_class.from_directory.call_count)
+        mock_token_replacer.add_token_values_from_directory.assert_called_with('variables')
+
+
+class SaveNetworkVariablesTests(TestCase):
+
+    def setUp(self):
+        mock_host_rpm_builder = Mock(HostRpmBuilder)
+        mock_host_rpm_builder.hostname = 'devweb01'
+        mock_host_rpm_builder.variables_dir = 'variables'
+        mock_host_rpm_builder.resolved_hosts = ResolvedHosts({'devweb01': ('10.0.0.1', 'devweb01.example.com', 'devweb01')})
+        self.mock_host_rpm_builder = mock_host_rpm_builder
+
+    @patch('config_rpm_maker.hostrpmbuilder.HostResolver')
+    def test_should_look_up_host_which_has_been_resolved_up_front(self, mock_host_resolver_class):
+
+        HostRpmBuilder._save_network_variables(self.mock_host_rpm_builder)
+
+        self.assertEqual(0, mock_host_resolver_class.call_count)
+        self.mock_host_rpm_builder._write_file.assert_any_call('variables/IP', '10.0.0.1')
+        self.mock_host_rpm_builder._write_file.assert_any_call('variables/FQDN', 'devweb01.example.com')
+        self.mock_host_rpm_builder._write_file.assert_any_call('variables/ALIASES', 'devweb01')
+
+    def test_should_raise_error_of_host_which_could_not_be_resolved_up_front(self):
+
+        self.mock_host_rpm_builder.resolved_hosts = ResolvedHosts({'devweb01': Exception("Could not lookup 'devweb01'")})
+
+        self.assertRaises(Exception, HostRpmBuilder._save_network_variables, self.mock_host_rpm_builder)
+
+    @patch('config_rpm_maker.hostrpmbuilder.HostResolver')
+    def test_should_resolve_host_which_has_not_been_resolved_up_front(self, mock_host_resolver_class):
+
+        self.mock_host_rpm_builder.resolved_hosts = None
+        mock_host_resolver_class.return_value.resolve.return_value = ('127.0.0.1', 'localhost.localdomain', '')
+
+        HostRpmBuilder._save_network_variables(self.mock_host_rpm_builder)
+
+        mock_host_resolver_class.return_value.resolve.assert_called_with('devweb01')
+        self.mock_host_rpm_builder._write_file.assert_any_call('variables/IP', '127.0.0.1')
+
+
+@patch('config_rpm_maker.hostrpmbuilder.calculate_digest')
+@patch('config_rpm_maker.hostrpmbuilder.get_build_cache_policy')
+class CalculateBuildDigestTests(TestCase):
+
+    def setUp(self):
+        mock_host_rpm_builder = Mock(HostRpmBuilder)
+        mock_host_rpm_builder.host_config_dir = '/path/to/host/config/dir'
+        mock_host_rpm_builder.variables_dir = '/path/to/variables/dir'
+        self.mock_host_rpm_builder = mock_host_rpm_builder
+
+    def test_should_not_calculate_digest_when_all_hosts_are_always_built(self, mock_get_build_cache_policy, mock_calculate_digest):
+
+        mock_get_build_cache_policy.return_value = 'always'
+
+        actual = HostRpmBuilder._calculate_build_digest(self.mock_host_rpm_builder)
+
+        self.assertEqual(None, actual)
+        self.assertEqual(0, len(mock_calculate_digest.call_args_list))
+
+    def test_should_calculate_digest_of_host_config_dir_and_variables_without_revision(self, mock_get_build_cache_policy, mock_calculate_digest):
+
+        mock_get_build_cache_policy.return_value = 'skip'
+        mock_calculate_digest.return_value = 'digest'
+
+        actual = HostRpmBuilder._calculate_build_digest(self.mock_host_rpm_builder)
+
+        self.assertEqual('digest', actual)
+        mock_calculate_digest.assert_called_with(['/path/to/host/config/dir', '/path/to/variables/dir'],
+                                                 ignored_names=('REVISION', 'SVNLOG', 'VARIABLES'),
+                                                 settings=('rpmbuild', False, True))
+
+
+@patch('config_rpm_maker.hostrpmbuilder.get_build_cache_policy')
+@patch('config_rpm_maker.hostrpmbuilder.BuildCache')
+class ReuseCachedRpmsTests(TestCase):
+
+    def setUp(self):
+        mock_host_rpm_builder = Mock(HostRpmBuilder)
+        mock_host_rpm_builder.hostname = 'berweb01'
+        mock_host_rpm_builder.thread_name = 'thread-0'
+        mock_host_rpm_builder.logger = Mock()
+        mock_host_rpm_builder.rpm_output_dir = '/path/to/rpm/output/directory'
+        self.mock_host_rpm_builder = mock_host_rpm_builder
+
+    def test_should_not_reuse_rpms_without_digest(self, mock_build_cache_class, mock_get_build_cache_policy):
+
+        self.assertFalse(HostRpmBuilder._reuse_cached_rpms(self.mock_host_rpm_builder, None))
+
+    def test_should_not_reuse_rpms_when_digest_changed(self, mock_build_cache_class, mock_get_build_cache_policy):
+
+        mock_build_cache_class.return_value.is_unchanged.return_value = False
+
+        self.assertFalse(HostRpmBuilder._reuse_cached_rpms(self.mock_host_rpm_builder, 'digest'))
+        mock_build_cache_class.return_value.is_unchanged.assert_called_with('berweb01', 'digest')
+
+    def test_should_skip_build_without_linking_rpms(self, mock_build_cache_class, mock_get_build_cache_policy):
+
+        mock_get_build_cache_policy.return_value = 'skip'
+        mock_build_cache_class.return_value.is_unchanged.return_value = True
+
+        self.assertTrue(HostRpmBuilder._reuse_cached_rpms(self.mock_host_rpm_builder, 'digest'))
+        self.assertEqual(0, len(mock_build_cache_class.return_value.link_rpms.call_args_list))
+
+    def test_should_link_cached_rpms_into_rpm_output_directory(self, mock_build_cache_class, mock_get_build_cache_policy):
+
+        mock_get_build_cache_policy.return_value = 'relink'
+        mock_build_cache_class.return_value.is_unchanged.return_value = True
+        mock_build_cache_class.return_value.link_rpms.return_value = ['/path/to/rpm/output/directory/RPMS/noarch/foo.rpm']
+
+        self.assertTrue(HostRpmBuilder._reuse_cached_rpms(self.mock_host_rpm_builder, 'digest'))
+        mock_build_cache_class.return_value.link_rpms.assert_called_with('berweb01', '/path/to/rpm/output/directory')
+
+    def test_should_build_rpms_when_no_rpms_have_been_cached(self, mock_build_cache_class, mock_get_build_cache_policy):
+
+        mock_get_build_cache_policy.return_value = 'relink'
+        mock_build_cache_class.return_value.is_unchanged.return_value = True
+        mock_build_cache_class.return_value.link_rpms.return_value = []
+
+        self.assertFalse(HostRpmBuilder._reuse_cached_rpms(self.mock_host_rpm_builder, 'digest'))
+
+
+@patch('config_rpm_maker.hostrpmbuilder.NativeRpmBuilder')
+class BuildRpmNativelyTests(TestCase):
+
+    def setUp(self):
+        mock_host_rpm_builder = Mock(HostRpmBuilder)
+        mock_host_rpm_builder.hostname = 'berweb01'
+        mock_host_rpm_builder.thread_name = 'thread-0'
+        mock_host_rpm_builder.logger = Mock()
+        mock_host_rpm_builder.spec_file_path = '/path/to/spec/file.spec'
+        mock_host_rpm_builder.host_config_dir = '/path/to/host/config/dir'
+        mock_host_rpm_builder.rpm_output_dir = '/path/to/rpm/output/directory'
+        self.mock_host_rpm_builder = mock_host_rpm_builder
+
+    def test_should_build_rpms_using_host_config_dir_as_build_root(self, mock_native_rpm_builder_class):
+
+        mock_native_rpm_builder_class.return_value.build.return_value = ['/path/to/rpm/output/directory/RPMS/noarch/foo.rpm']
+
+        actual = HostRpmBuilder._build_rpm_natively(self.mock_host_rpm_builder)
+
+        self.assertTrue(actual)
+        mock_native_rpm_builder_class.assert_called_with(spec_file_path='/path/to/spec/file.spec',
+                                                         build_root='/path/to/host/config/dir',
+                                                         rpms_dir='/path/to/rpm/output/directory/RPMS')
+
+    def test_should_return_false_when_spec_file_is_not_supported(self, mock_native_rpm_builder_class):
+
+        mock_native_rpm_builder_class.return_value.build.side_effect = UnsupportedSpecFileException('%changelog')
+
+        actual = HostRpmBuilder._build_rpm_natively(self.mock_host_rpm_builder)
+
+        self.assertFalse(actual)
+
+
+class BuildRpmUsingRpmBuilderTests(TestCase):
+
+    def test_should_build_rpm_with_rpm_name_of_group(self):
+
+        mock_host_rpm_builder = Mock(HostRpmBuilder)
+        mock_host_rpm_builder.hostname = 'berweb01'
+        mock_host_rpm_builder.rpm_name = 'berweb-group'
+        mock_host_rpm_builder.config_rpm_prefix = 'yadt-config-'
+        mock_host_rpm_builder.revision = '123'
+        mock_host_rpm_builder.rpm_output_dir = '/path/to/rpm/output/directory'
+        mock_host_rpm_builder.logger = Mock()
+        mock_host_rpm_builder.rpm_builder = Mock()
+        mock_host_rpm_builder.rpm_builder.build.return_value = []
+
+        HostRpmBuilder._build_rpm_using_rpm_builder(mock_host_rpm_builder)
+
+        mock_host_rpm_builder.rpm_builder.build.assert_called_with(rpm_name='yadt-config-berweb-group',
+                                                                   revision='123',
+                                                                   rpms_dir='/path/to/rpm/output/directory/RPMS')
+
+
 @patch('config_rpm_maker.hostrpmbuilder.is_no_clean_up_enabled')
 @patch('config_rpm_maker.hostrpmbuilder.Popen')
 @patch('config_rpm_maker.hostrpmbuilder.abspath')
@@ -619,6 +987,7 @@ class BuildRpmUsingRpmbuildTests(UnitTests):
         mock_host_rpm_builder.logger = Mock()
         mock_host_rpm_builder.work_dir = '/path/to/working/directory'
         mock_host_rpm_builder.rpm_build_dir = '/path/to/rpm/build/directory'
+        mock_host_rpm_builder.rpm_output_dir = '/path/to/rpm/output/directory'
         mock_host_rpm_builder._tar_sources.return_value = '/path/to/tarred_sources.tar.gz'
 
         mock_process = Mock()
@@ -667,7 +1036,10 @@ class BuildRpmUsingRpmbuildTests(UnitTests):
 
         HostRpmBuilder._build_rpm_using_rpmbuild(self.mock_host_rpm_builder)
 
-        mock_popen.assert_called_with("rpmbuild  --define '_topdir /absolute/path/to/rpm/build/directory' -ta /path/to/tarred_sources.tar.gz", shell=True, env=mock_environment_copy, stderr=PIPE, stdout=PIPE)
+        mock_popen.assert_called_with("rpmbuild  --define '_topdir /absolute/path/to/rpm/build/directory' "
+                                      "--define '_rpmdir /absolute/path/to/rpm/output/directory/RPMS' "
+                                      "--define '_srcrpmdir /absolute/path/to/rpm/output/directory/SRPMS' "
+                                      "-ta /path/to/tarred_sources.tar.gz", shell=True, env=mock_environment_copy, stderr=PIPE, stdout=PIPE)
 
     def test_should_write_stdout_to_logger(self, mock_environ, mock_abspath, mock_popen, mock_config):
 
@@ -724,3 +1096,49 @@ class BuildRpmUsingRpmbuildTests(UnitTests):
         mock_popen.return_value = self.mock_process
 
         self.assertRaises(CouldNotBuildRpmException, HostRpmBuilder._build_rpm_using_rpmbuild, self.mock_host_rpm_builder)
+
+    @patch('config_rpm_maker.hostrpmbuilder.is_source_rpm_build_enabled')
+    def test_should_not_build_source_rpms_when_disabled(self, mock_source_rpm_build, mock_environ, mock_abspath, mock_popen, mock_config):
+
+        mock_source_rpm_build.return_value = False
+        mock_config.return_value = False
+        mock_popen.return_value = self.mock_process
+        mock_abspath.side_effect = lambda directory: '/absolute' + directory
+
+        HostRpmBuilder._build_rpm_using_rpmbuild(self.mock_host_rpm_builder)
+
+        self.assertEqual("rpmbuild --clean --define '_topdir /absolute/path/to/rpm/build/directory' "
+                         "--define '_rpmdir /absolute/path/to/rpm/output/directory/RPMS' "
+                         "--define '_srcrpmdir /absolute/path/to/rpm/output/directory/SRPMS' "
+                         "-tb /path/to/tarred_sources.tar.gz",
+                         mock_popen.call_args[0][0])
+
+    @patch('config_rpm_maker.hostrpmbuilder.is_rpmbuild_direct_buildroot_enabled')
+    def test_should_build_binary_rpms_from_prepared_build_root(self, mock_direct_buildroot, mock_environ, mock_abspath, mock_popen, mock_config):
+
+        mock_direct_buildroot.return_value = True
+        mock_popen.return_value = self.mock_process
+        mock_abspath.side_effect = lambda directory: directory
+        self.mock_host_rpm_builder.host_config_dir = '/path/to/host/config/dir'
+        self.mock_host_rpm_builder._prepare_build_root.return_value = '/path/to/build/dir/spec-file.spec'
+
+        HostRpmBuilder._build_rpm_using_rpmbuild(self.mock_host_rpm_builder)
+
+        self.assert_mock_never_called(self.mock_host_rpm_builder._tar_sources)
+        self.assertEqual("rpmbuild -bb --define '_topdir /path/to/rpm/build/directory' "
+                         "--define '_rpmdir /path/to/rpm/output/directory/RPMS' "
+                         "--define '_srcrpmdir /path/to/rpm/output/directory/SRPMS' "
+                         "--define '_builddir /path/to/build/dir' "
+                         "--define '__spec_clean_body %{nil}' --buildroot /path/to/host/config/dir /path/to/build/dir/spec-file.spec",
+                         mock_popen.call_args[0][0])
+
+    @patch('config_rpm_maker.hostrpmbuilder.is_rpmbuild_direct_buildroot_enabled')
+    def test_should_tar_sources_when_build_root_can_not_be_prepared(self, mock_direct_buildroot, mock_environ, mock_abspath, mock_popen, mock_config):
+
+        mock_direct_buildroot.return_value = True
+        mock_popen.return_value = self.mock_process
+        self.mock_host_rpm_builder._prepare_build_root.return_value = None
+
+        HostRpmBuilder._build_rpm_using_rpmbuild(self.mock_host_rpm_builder)
+
+        self.mock_host_rpm_builder._tar_sources.assert_called_with()
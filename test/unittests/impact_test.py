@@ -0,0 +1,106 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+
+from mock import Mock
+
+from config_rpm_maker.impact import ImpactAnalyzer
+from config_rpm_maker.svnservice import SvnService
+
+
+class ImpactAnalyzerTests(TestCase):
+
+    def setUp(self):
+        files = {'all': ['all/etc/motd', 'all/etc/app.conf', 'all/VARIABLES/RPM_REQUIRES'],
+                 'typ': ['typ/web/etc/app.conf'],
+                 'loc': [],
+                 'loctyp': [],
+                 'host': ['host/devweb01/etc/motd', 'host/devweb01/VARIABLES/RPM_REQUIRES']}
+        self.mock_svn_service = Mock(SvnService)
+        self.mock_svn_service.get_files.side_effect = lambda svn_path, revision: files[svn_path]
+        self.analyzer = ImpactAnalyzer(self.mock_svn_service, '123')
+
+    def analyze(self, changed_paths, hosts=('devweb01', 'devweb02', 'devdbs01')):
+        return dict((impact.host, impact) for impact in self.analyzer.analyze(changed_paths, list(hosts)))
+
+    def test_should_not_affect_host_which_overrides_changed_file(self):
+
+        impacts = self.analyze(['all/etc/motd'])
+
+        self.assertFalse(impacts['devweb01'].affected)
+        self.assertEqual('"all/etc/motd" is overridden by "host/devweb01"', impacts['devweb01'].reason)
+
+    def test_should_affect_hosts_which_use_changed_file(self):
+
+        impacts = self.analyze(['all/etc/motd'])
+
+        self.assertTrue(impacts['devweb02'].affected)
+        self.assertTrue(impacts['devdbs01'].affected)
+        self.assertEqual('"all/etc/motd" is used', impacts['devweb02'].reason)
+
+    def test_should_consider_segments_in_overlay_order(self):
+
+        impacts = self.analyze(['all/etc/app.conf'])
+
+        self.assertFalse(impacts['devweb01'].affected)
+        self.assertTrue(impacts['devdbs01'].affected)
+
+    def test_should_not_analyze_hosts_without_matching_segment(self):
+
+        impacts = self.analyze(['typ/web/etc/app.conf'])
+
+        self.assertEqual(['devweb01', 'devweb02'], sorted(impacts.keys()))
+
+    def test_should_always_affect_hosts_when_accumulated_variable_changed(self):
+
+        impacts = self.analyze(['all/VARIABLES/RPM_REQUIRES'])
+
+        self.assertTrue(impacts['devweb01'].affected)
+
+    def test_should_affect_hosts_when_segment_svn_path_itself_changed(self):
+
+        impacts = self.analyze(['typ/web'])
+
+        self.assertTrue(impacts['devweb01'].affected)
+        self.assertEqual('"typ/web" has been changed', impacts['devweb01'].reason)
+
+    def test_should_ignore_changed_paths_which_only_start_with_the_name_of_a_segment_svn_path(self):
+
+        impacts = self.analyze(['typ/webserver/etc/app.conf'])
+
+        self.assertFalse(impacts['devweb01'].affected)
+
+    def test_should_affect_host_if_one_of_several_changed_paths_is_used(self):
+
+        impacts = self.analyze(['all/etc/motd', 'all/etc/new.conf'])
+
+        self.assertTrue(impacts['devweb01'].affected)
+
+    def test_should_list_each_segment_directory_only_once(self):
+
+        self.analyze(['all/etc/motd', 'all/etc/app.conf'])
+
+        listed_paths = sorted(call_args[0][0] for call_args in self.mock_svn_service.get_files.call_args_list)
+        self.assertEqual(['all', 'host', 'loc', 'loctyp', 'typ'], listed_paths)
+
+    def test_should_return_affected_hosts(self):
+
+        actual = self.analyzer.find_hosts(['all/etc/motd'], ['devweb01', 'devweb02'])
+
+        self.assertEqual(set(['devweb02']), actual)
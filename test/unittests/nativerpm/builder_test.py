@@ -0,0 +1,160 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import hashlib
+import os
+import struct
+import unittest
+
+from shutil import rmtree
+from StringIO import StringIO
+from tempfile import mkdtemp
+
+from config_rpm_maker.nativerpm.builder import NativeRpmBuilder
+from config_rpm_maker.nativerpm.header import (RPMSIGTAG_MD5,
+                                               RPMSIGTAG_PAYLOADSIZE,
+                                               RPMSIGTAG_SIZE,
+                                               RPMTAG_BASENAMES,
+                                               RPMTAG_NAME,
+                                               RPMTAG_PROVIDENAME,
+                                               RPMTAG_REQUIRENAME)
+from config_rpm_maker.nativerpm.specfile import UnsupportedSpecFileException
+
+SPEC_FILE = """Name: yadt-config-devweb01
+Version: 21
+Release: 123
+Summary: config
+Group: YADT
+License: GPL
+BuildArch: noarch
+Requires: yadt-minion
+
+%description
+config
+
+%post
+true
+
+%files -f files.lst
+
+%package -n %{name}-repos
+Summary: repos
+Requires: yum
+
+%description -n %{name}-repos
+repos
+
+%files -n %{name}-repos -f files-repos.lst
+"""
+
+
+def read_rpm(path):
+    """ Returns the signature, the header and the uncompressed payload. """
+
+    with open(path, 'rb') as rpm_file:
+        data = rpm_file.read()
+
+    signature, header_offset = _read_header(data, 96)
+    header_offset += (8 - header_offset % 8) % 8
+    header, payload_offset = _read_header(data, header_offset)
+    payload = gzip.GzipFile(fileobj=StringIO(data[payload_offset:])).read()
+    return signature, header, payload, data[header_offset:]
+
+
+def _read_header(data, offset):
+    count, data_length = struct.unpack('>II', data[offset + 8:offset + 16])
+    store_offset = offset + 16 + 16 * count
+    entries = {}
+    for position in range(count):
+        tag, value_type, value_offset, value_count = struct.unpack('>IIII', data[offset + 16 + 16 * position:offset + 32 + 16 * position])
+        value_data = data[store_offset + value_offset:]
+        if value_type == 4:
+            entries[tag] = list(struct.unpack('>%dI' % value_count, value_data[:4 * value_count]))
+        elif value_type == 6:
+            entries[tag] = value_data.split('\x00')[0]
+        elif value_type == 7:
+            entries[tag] = value_data[:value_count]
+        elif value_type in (8, 9):
+            entries[tag] = value_data.split('\x00')[:value_count]
+    return entries, store_offset + data_length
+
+
+class NativeRpmBuilderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='builder_test.')
+        self.build_root = os.path.join(self.temporary_directory, 'yadt-config-devweb01')
+        self.rpms_dir = os.path.join(self.temporary_directory, 'RPMS')
+        self.spec_file_path = os.path.join(self.build_root, 'yadt-config-devweb01.spec')
+        self._write_file('/yadt-config-devweb01.spec', SPEC_FILE)
+        self._write_file('/etc/motd', 'hello\n')
+        self._write_file('/etc/yum.repos.d/spam.repo', '[spam]\n')
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def _write_file(self, path, content):
+        absolute_path = os.path.join(self.build_root, path.lstrip('/'))
+        if not os.path.isdir(os.path.dirname(absolute_path)):
+            os.makedirs(os.path.dirname(absolute_path))
+        with open(absolute_path, 'w') as file_to_write:
+            file_to_write.write(content)
+
+    def _build(self):
+        return NativeRpmBuilder(self.spec_file_path, self.build_root, self.rpms_dir, build_time=0, build_host='localhost').build()
+
+    def test_should_build_main_package_and_subpackage(self):
+        rpms = self._build()
+
+        self.assertEqual([os.path.join(self.rpms_dir, 'noarch', 'yadt-config-devweb01-21-123.noarch.rpm'),
+                          os.path.join(self.rpms_dir, 'noarch', 'yadt-config-devweb01-repos-21-123.noarch.rpm')], rpms)
+
+    def test_should_package_all_files_except_spec_file_and_repos_in_main_package(self):
+        _, header, payload, _ = read_rpm(self._build()[0])
+
+        self.assertEqual('yadt-config-devweb01', header[RPMTAG_NAME])
+        self.assertEqual(['motd'], header[RPMTAG_BASENAMES])
+        self.assertTrue('./etc/motd\x00' in payload)
+        self.assertFalse('spam.repo' in payload)
+
+    def test_should_package_repos_in_subpackage(self):
+        _, header, payload, _ = read_rpm(self._build()[1])
+
+        self.assertEqual('yadt-config-devweb01-repos', header[RPMTAG_NAME])
+        self.assertEqual(['spam.repo'], header[RPMTAG_BASENAMES])
+        self.assertTrue('[spam]\n' in payload)
+
+    def test_should_add_dependencies(self):
+        _, header, _, _ = read_rpm(self._build()[0])
+
+        self.assertEqual(['yadt-minion', '/bin/sh', 'rpmlib(CompressedFileNames)', 'rpmlib(FileDigests)',
+                          'rpmlib(PayloadFilesHavePrefix)'], header[RPMTAG_REQUIRENAME])
+        self.assertEqual(['yadt-config-devweb01'], header[RPMTAG_PROVIDENAME])
+
+    def test_should_write_signature_of_header_and_payload(self):
+        signature, _, payload, header_and_payload = read_rpm(self._build()[0])
+
+        self.assertEqual([len(header_and_payload)], signature[RPMSIGTAG_SIZE])
+        self.assertEqual(hashlib.md5(header_and_payload).digest(), signature[RPMSIGTAG_MD5])
+        self.assertEqual([len(payload)], signature[RPMSIGTAG_PAYLOADSIZE])
+
+    def test_should_raise_exception_when_file_list_is_unknown(self):
+        self._write_file('/yadt-config-devweb01.spec', SPEC_FILE.replace('files.lst', 'other.lst'))
+
+        self.assertRaises(UnsupportedSpecFileException, self._build)
@@ -0,0 +1,128 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from config_rpm_maker.nativerpm.buildroot import format_file_list_entry, prepare_build_root
+from config_rpm_maker.nativerpm.filelist import DEFAULT_ATTRIBUTES, FILE_TYPE_DIRECTORY, FILE_TYPE_FILE, VERIFY_ALL, FileEntry
+from config_rpm_maker.nativerpm.specfile import UnsupportedSpecFileException
+
+SPEC_FILE = """Name: yadt-config-devweb01
+Version: 21
+Release: 123
+Summary: config
+Group: YADT
+License: GPL
+Source0: %{name}.tar.gz
+BuildArch: noarch
+
+%description
+config
+
+%prep
+%setup -q -n %{name}
+
+%install
+tar -c . | tar -C $RPM_BUILD_ROOT/ -x -v
+
+%clean
+rm -rf $RPM_BUILD_ROOT
+
+%files -f files.lst
+"""
+
+
+class PrepareBuildRootTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='buildroot_test.')
+        self.build_root = os.path.join(self.temporary_directory, 'yadt-config-devweb01')
+        self.build_dir = os.path.join(self.temporary_directory, 'BUILD')
+        self.spec_file_path = os.path.join(self.build_root, 'yadt-config-devweb01.spec')
+        self._write_file('/yadt-config-devweb01.spec', SPEC_FILE)
+        self._write_file('/etc/motd', 'hello\n')
+        self._write_file('/etc/motd.%attr', '0600,root,root')
+        self._write_file('/etc/localtime.%symlink', '/usr/share/zoneinfo/UTC\n')
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def _write_file(self, path, content):
+        absolute_path = os.path.join(self.build_root, path.lstrip('/'))
+        if not os.path.isdir(os.path.dirname(absolute_path)):
+            os.makedirs(os.path.dirname(absolute_path))
+        with open(absolute_path, 'w') as file_to_write:
+            file_to_write.write(content)
+
+    def _read_file(self, path):
+        with open(path) as file_to_read:
+            return file_to_read.read()
+
+    def test_should_write_spec_file_without_build_sections(self):
+        spec_file_path = prepare_build_root(self.spec_file_path, self.build_root, self.build_dir)
+
+        content = self._read_file(spec_file_path)
+        self.assertEqual(os.path.join(self.build_dir, 'yadt-config-devweb01.spec'), spec_file_path)
+        self.assertTrue('%description\nconfig\n' in content)
+        self.assertTrue('%files -f files.lst' in content)
+        self.assertFalse('%setup' in content)
+        self.assertFalse('tar -c' in content)
+        self.assertFalse('rm -rf' in content)
+
+    def test_should_write_file_list(self):
+        prepare_build_root(self.spec_file_path, self.build_root, self.build_dir)
+
+        self.assertEqual('%attr(0644,root,root) "/etc/localtime"\n%attr(0600,root,root) "/etc/motd"\n',
+                         self._read_file(os.path.join(self.build_dir, 'files.lst')))
+
+    def test_should_apply_markers_and_remove_spec_file_from_build_root(self):
+        prepare_build_root(self.spec_file_path, self.build_root, self.build_dir)
+
+        self.assertEqual(['localtime', 'motd'], sorted(os.listdir(os.path.join(self.build_root, 'etc'))))
+        self.assertEqual('/usr/share/zoneinfo/UTC', os.readlink(os.path.join(self.build_root, 'etc', 'localtime')))
+        self.assertFalse(os.path.exists(self.spec_file_path))
+
+    def test_should_not_change_build_root_when_spec_file_is_not_supported(self):
+        self._write_file('/yadt-config-devweb01.spec', SPEC_FILE + '\n%changelog\n')
+
+        self.assertRaises(UnsupportedSpecFileException, prepare_build_root, self.spec_file_path, self.build_root, self.build_dir)
+        self.assertTrue(os.path.exists(os.path.join(self.build_root, 'etc', 'motd.%attr')))
+        self.assertFalse(os.path.exists(self.build_dir))
+
+
+class FormatFileListEntryTest(unittest.TestCase):
+
+    def test_should_format_file_with_attributes(self):
+        entry = FileEntry('/etc/motd', FILE_TYPE_FILE, DEFAULT_ATTRIBUTES)
+
+        self.assertEqual('%attr(0644,root,root) "/etc/motd"', format_file_list_entry(entry))
+
+    def test_should_format_directory(self):
+        entry = FileEntry('/var/spool/spam', FILE_TYPE_DIRECTORY, DEFAULT_ATTRIBUTES)
+
+        self.assertEqual('%attr(0755,root,root) %dir "/var/spool/spam"', format_file_list_entry(entry))
+
+    def test_should_format_verify_flags(self):
+        entry = FileEntry('/etc/motd', FILE_TYPE_FILE, DEFAULT_ATTRIBUTES)
+        entry.verify_flags = VERIFY_ALL & ~(1 | 32)
+
+        self.assertEqual('%attr(0644,root,root) %verify(not md5 mtime) "/etc/motd"', format_file_list_entry(entry))
@@ -0,0 +1,55 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from StringIO import StringIO
+
+from config_rpm_maker.nativerpm.cpio import CpioWriter
+
+
+class CpioWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output_file = StringIO()
+        self.cpio_writer = CpioWriter(self.output_file)
+
+    def test_should_write_entry_in_new_ascii_format(self):
+        self.cpio_writer.add('./etc/motd', mode=0100644, mtime=1, content='hello\n', inode=3)
+
+        output = self.output_file.getvalue()
+        self.assertEqual('070701', output[0:6])
+        self.assertEqual('%08X' % 3, output[6:14])
+        self.assertEqual('%08X' % 0100644, output[14:22])
+        self.assertEqual('%08X' % 6, output[54:62])
+        self.assertEqual('%08X' % 11, output[94:102])
+        self.assertEqual('./etc/motd\x00', output[110:121])
+
+    def test_should_pad_name_and_content_to_multiples_of_four(self):
+        self.cpio_writer.add('./etc/motd', mode=0100644, mtime=1, content='hello\n')
+
+        output = self.output_file.getvalue()
+        self.assertEqual(124 + 8, len(output))
+        self.assertEqual('hello\n\x00\x00', output[124:])
+        self.assertEqual(len(output), self.cpio_writer.size)
+
+    def test_should_write_trailer(self):
+        self.cpio_writer.write_trailer()
+
+        self.assertTrue('TRAILER!!!\x00' in self.output_file.getvalue())
+        self.assertEqual(0, self.cpio_writer.size % 4)
@@ -0,0 +1,149 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from config_rpm_maker.nativerpm.filelist import (FILE_TYPE_DIRECTORY,
+                                                 FILE_TYPE_FILE,
+                                                 FILE_TYPE_SYMLINK,
+                                                 VERIFY_ALL,
+                                                 InvalidFileListException,
+                                                 create_file_entries,
+                                                 list_files,
+                                                 parse_verify_flags)
+
+
+class FileListTest(unittest.TestCase):
+
+    def setUp(self):
+        self.build_root = mkdtemp(prefix='filelist_test.')
+
+    def tearDown(self):
+        rmtree(self.build_root)
+
+    def _write_file(self, path, content=''):
+        absolute_path = os.path.join(self.build_root, path.lstrip('/'))
+        if not os.path.isdir(os.path.dirname(absolute_path)):
+            os.makedirs(os.path.dirname(absolute_path))
+        with open(absolute_path, 'w') as file_to_write:
+            file_to_write.write(content)
+
+    def _create_file_entries(self):
+        entries = create_file_entries(self.build_root, list_files(self.build_root))
+        return dict((entry.path, entry) for entry in entries)
+
+    def test_should_list_files_but_not_directories(self):
+        self._write_file('/etc/motd')
+        self._write_file('/etc/foo/bar')
+
+        self.assertEqual(['/etc/foo/bar', '/etc/motd'], list_files(self.build_root))
+
+    def test_should_list_symlinks_to_directories(self):
+        self._write_file('/etc/foo/bar')
+        os.symlink('foo', os.path.join(self.build_root, 'etc', 'link'))
+
+        self.assertEqual(['/etc/foo/bar', '/etc/link'], list_files(self.build_root))
+
+    def test_should_not_list_excluded_directories(self):
+        self._write_file('/etc/motd')
+        self._write_file('/etc/yum.repos.d/spam.repo')
+
+        self.assertEqual(['/etc/motd'], list_files(self.build_root, ('/etc/yum.repos.d',)))
+
+    def test_should_use_default_attributes(self):
+        self._write_file('/etc/motd')
+
+        entry = self._create_file_entries()['/etc/motd']
+
+        self.assertEqual(FILE_TYPE_FILE, entry.file_type)
+        self.assertEqual(('0644', 'root', 'root'), (entry.mode, entry.user, entry.group))
+        self.assertEqual(VERIFY_ALL, entry.verify_flags)
+
+    def test_should_apply_attr_and_verify_markers_and_not_package_them(self):
+        self._write_file('/etc/motd')
+        self._write_file('/etc/motd.%attr', '0600,root,wheel\n')
+        self._write_file('/etc/motd.%verify', 'not,md5,mtime\n')
+
+        entries = self._create_file_entries()
+
+        self.assertEqual(['/etc/motd'], entries.keys())
+        self.assertEqual(('0600', 'root', 'wheel'), (entries['/etc/motd'].mode, entries['/etc/motd'].user, entries['/etc/motd'].group))
+        self.assertEqual(VERIFY_ALL & ~(1 | 32), entries['/etc/motd'].verify_flags)
+
+    def test_should_apply_defattr_to_files_of_directory_only(self):
+        self._write_file('/etc/foo/.%defattr', '0640,spam,eggs,0750')
+        self._write_file('/etc/foo/bar')
+        self._write_file('/etc/zzz')
+
+        entries = self._create_file_entries()
+
+        self.assertEqual(('0640', 'spam', 'eggs'), (entries['/etc/foo/bar'].mode, entries['/etc/foo/bar'].user, entries['/etc/foo/bar'].group))
+        self.assertEqual(('0644', 'root', 'root'), (entries['/etc/zzz'].mode, entries['/etc/zzz'].user, entries['/etc/zzz'].group))
+
+    def test_should_package_marked_directory(self):
+        os.makedirs(os.path.join(self.build_root, 'var', 'spool', 'spam'))
+        self._write_file('/var/spool/spam.%dir')
+
+        entry = self._create_file_entries()['/var/spool/spam']
+
+        self.assertEqual(FILE_TYPE_DIRECTORY, entry.file_type)
+        self.assertEqual('0755', entry.mode)
+
+    def test_should_raise_exception_when_marked_directory_does_not_exist(self):
+        self._write_file('/var/spool/spam.%dir')
+
+        self.assertRaises(InvalidFileListException, self._create_file_entries)
+
+    def test_should_package_symlink_marker_as_symlink(self):
+        self._write_file('/etc/localtime.%symlink', '/usr/share/zoneinfo/Europe/Berlin\n')
+
+        entry = self._create_file_entries()['/etc/localtime']
+
+        self.assertEqual(FILE_TYPE_SYMLINK, entry.file_type)
+        self.assertEqual('/usr/share/zoneinfo/Europe/Berlin', entry.link_target)
+
+    def test_should_package_existing_symlink(self):
+        self._write_file('/etc/motd')
+        os.symlink('motd', os.path.join(self.build_root, 'etc', 'issue'))
+
+        entry = self._create_file_entries()['/etc/issue']
+
+        self.assertEqual(FILE_TYPE_SYMLINK, entry.file_type)
+        self.assertEqual('motd', entry.link_target)
+
+    def test_should_raise_exception_when_attr_marker_is_incomplete(self):
+        self._write_file('/etc/motd')
+        self._write_file('/etc/motd.%attr', '0600,root')
+
+        self.assertRaises(InvalidFileListException, self._create_file_entries)
+
+
+class ParseVerifyFlagsTest(unittest.TestCase):
+
+    def test_should_combine_flags(self):
+        self.assertEqual(1 | 2, parse_verify_flags('md5,size'))
+
+    def test_should_negate_flags(self):
+        self.assertEqual(VERIFY_ALL & ~1, parse_verify_flags('not,md5'))
+
+    def test_should_raise_exception_when_flag_is_unknown(self):
+        self.assertRaises(InvalidFileListException, parse_verify_flags, 'spam')
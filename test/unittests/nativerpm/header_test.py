@@ -0,0 +1,105 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import struct
+import unittest
+
+from config_rpm_maker.nativerpm.header import (HEADER_MAGIC,
+                                               RPMTAG_HEADERIMMUTABLE,
+                                               RPMTAG_NAME,
+                                               RPMTAG_FILEMODES,
+                                               RPMTAG_FILESIZES,
+                                               RPM_TYPE_BIN,
+                                               RPM_TYPE_INT16,
+                                               RPM_TYPE_INT32,
+                                               RPM_TYPE_STRING,
+                                               Header,
+                                               create_lead)
+
+
+def parse_header(data):
+    count, data_length = struct.unpack('>II', data[8:16])
+    index = [struct.unpack('>IIII', data[16 + 16 * position:32 + 16 * position]) for position in range(count)]
+    store = data[16 + 16 * count:]
+    return index, store, data_length
+
+
+class HeaderTest(unittest.TestCase):
+
+    def test_should_start_with_header_magic(self):
+        header = Header(RPMTAG_HEADERIMMUTABLE)
+        header.add_string(RPMTAG_NAME, 'spam')
+
+        self.assertTrue(header.to_bytes().startswith(HEADER_MAGIC))
+
+    def test_should_write_region_tag_as_first_index_entry(self):
+        header = Header(RPMTAG_HEADERIMMUTABLE)
+        header.add_string(RPMTAG_NAME, 'spam')
+
+        index, store, data_length = parse_header(header.to_bytes())
+
+        self.assertEqual((RPMTAG_HEADERIMMUTABLE, RPM_TYPE_BIN, data_length - 16, 16), index[0])
+        self.assertEqual((RPMTAG_HEADERIMMUTABLE, RPM_TYPE_BIN, -2 * 16, 16), struct.unpack('>IIiI', store[-16:]))
+
+    def test_should_sort_index_by_tag(self):
+        header = Header(RPMTAG_HEADERIMMUTABLE)
+        header.add_int32(RPMTAG_FILESIZES, [1])
+        header.add_string(RPMTAG_NAME, 'spam')
+
+        index, _, _ = parse_header(header.to_bytes())
+
+        self.assertEqual([RPMTAG_HEADERIMMUTABLE, RPMTAG_NAME, RPMTAG_FILESIZES], [entry[0] for entry in index])
+
+    def test_should_align_integer_values(self):
+        header = Header(RPMTAG_HEADERIMMUTABLE)
+        header.add_string(RPMTAG_NAME, 'spam')
+        header.add_int32(RPMTAG_FILESIZES, [1, 2])
+
+        index, store, _ = parse_header(header.to_bytes())
+
+        self.assertEqual((RPMTAG_NAME, RPM_TYPE_STRING, 0, 1), index[1])
+        self.assertEqual((RPMTAG_FILESIZES, RPM_TYPE_INT32, 8, 2), index[2])
+        self.assertEqual('spam\x00', store[0:5])
+        self.assertEqual((1, 2), struct.unpack('>II', store[8:16]))
+
+    def test_should_write_negative_integers_as_twos_complement(self):
+        header = Header(RPMTAG_HEADERIMMUTABLE)
+        header.add_int16(RPMTAG_FILEMODES, [-1])
+
+        index, store, _ = parse_header(header.to_bytes())
+
+        self.assertEqual((RPMTAG_FILEMODES, RPM_TYPE_INT16, 0, 1), index[1])
+        self.assertEqual('\xff\xff', store[0:2])
+
+    def test_should_encode_unicode_strings_as_utf_8(self):
+        header = Header(RPMTAG_HEADERIMMUTABLE)
+        header.add_string(RPMTAG_NAME, u'sp\xe4m')
+
+        _, store, _ = parse_header(header.to_bytes())
+
+        self.assertEqual('sp\xc3\xa4m\x00', store[0:6])
+
+
+class CreateLeadTest(unittest.TestCase):
+
+    def test_should_create_lead_of_96_bytes(self):
+        lead = create_lead('spam-1-1')
+
+        self.assertEqual(96, len(lead))
+        self.assertEqual('\xed\xab\xee\xdb\x03\x00', lead[0:6])
+        self.assertEqual('spam-1-1\x00', lead[10:19])
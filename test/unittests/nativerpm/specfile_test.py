@@ -0,0 +1,149 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from config_rpm_maker.nativerpm.specfile import (RPMSENSE_EQUAL,
+                                                 RPMSENSE_GREATER,
+                                                 RPMSENSE_SCRIPT_POST,
+                                                 Dependency,
+                                                 SpecFile,
+                                                 UnsupportedSpecFileException,
+                                                 parse_dependencies)
+
+SPEC_FILE = """
+%global __os_install_post %(echo '%{__os_install_post}')
+
+Name:		yadt-config-devweb01
+Version:	21
+Release:	123
+Summary:	YADT config RPM for devweb01
+Group:		YADT
+License:	GPL
+Source0:	%{name}.tar.gz
+BuildRoot:	%(mktemp -ud %{_tmppath}/%{name}-XXXXXX)
+BuildArch:	noarch
+Provides:	yadt-config-all, spam
+Requires:	yadt-minion, %{name}-repos = %{version}-%{release}, eggs >= 1.0
+
+%description
+YADT config RPM for %{name}
+with %unknown macro
+
+%prep
+%setup -q -n %{name}
+
+%install
+rm -Rf $RPM_BUILD_ROOT
+
+%post
+echo "installed %{name}"
+
+%files -f files.lst
+
+%package -n %{name}-repos
+Requires: yum
+Summary: repos
+
+%description -n %{name}-repos
+repos
+
+%files -n %{name}-repos -f files-repos.lst
+"""
+
+
+class SpecFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.spec = SpecFile.parse(SPEC_FILE)
+
+    def test_should_parse_main_package(self):
+        package = self.spec.main_package
+
+        self.assertEqual('yadt-config-devweb01', package.name)
+        self.assertEqual('21', package.version)
+        self.assertEqual('123', package.release)
+        self.assertEqual('YADT config RPM for devweb01', package.summary)
+        self.assertEqual('files.lst', package.file_list)
+
+    def test_should_parse_dependencies(self):
+        self.assertEqual([Dependency('yadt-minion'),
+                          Dependency('yadt-config-devweb01-repos', RPMSENSE_EQUAL, '21-123'),
+                          Dependency('eggs', RPMSENSE_GREATER | RPMSENSE_EQUAL, '1.0')],
+                         self.spec.main_package.requires)
+        self.assertEqual([Dependency('yadt-config-all'), Dependency('spam')], self.spec.main_package.provides)
+
+    def test_should_keep_unknown_macros_in_description(self):
+        self.assertEqual('YADT config RPM for yadt-config-devweb01\nwith %unknown macro', self.spec.main_package.description)
+
+    def test_should_parse_scriptlet(self):
+        scriptlet = self.spec.main_package.scriptlets['post']
+
+        self.assertEqual('/bin/sh', scriptlet.interpreter)
+        self.assertEqual('echo "installed yadt-config-devweb01"', scriptlet.body)
+
+    def test_should_parse_subpackage_and_inherit_version_and_release(self):
+        package = self.spec.get_package('yadt-config-devweb01-repos')
+
+        self.assertEqual('21', package.version)
+        self.assertEqual('123', package.release)
+        self.assertEqual('YADT', package.tags['group'])
+        self.assertEqual('files-repos.lst', package.file_list)
+        self.assertEqual([Dependency('yum')], package.requires)
+
+    def test_should_raise_exception_when_spec_file_contains_changelog(self):
+        self.assertRaises(UnsupportedSpecFileException, SpecFile.parse, SPEC_FILE + "\n%changelog\n* nothing\n")
+
+    def test_should_raise_exception_when_spec_file_contains_conditionals(self):
+        self.assertRaises(UnsupportedSpecFileException, SpecFile.parse, SPEC_FILE + "\n%if 0\n%endif\n")
+
+    def test_should_raise_exception_when_shell_expansion_is_used_in_tag(self):
+        self.assertRaises(UnsupportedSpecFileException, SpecFile.parse, SPEC_FILE.replace('Release:\t123', 'Release:\t%(date)'))
+
+    def test_should_raise_exception_when_unknown_macro_is_used_in_tag(self):
+        self.assertRaises(UnsupportedSpecFileException, SpecFile.parse, SPEC_FILE.replace('Release:\t123', 'Release:\t%{dist}'))
+
+    def test_should_raise_exception_when_package_is_not_noarch(self):
+        self.assertRaises(UnsupportedSpecFileException, SpecFile.parse, SPEC_FILE.replace('noarch', 'x86_64'))
+
+    def test_should_raise_exception_when_files_are_listed_explicitly(self):
+        self.assertRaises(UnsupportedSpecFileException, SpecFile.parse, SPEC_FILE + "\n%files -n %{name}-repos\n/etc/motd\n")
+
+    def test_should_expand_optional_macros(self):
+        spec = SpecFile.parse("Name: spam\n%define flavor eggs\nVersion: 1%{?flavor:.%{flavor}}%{?dist}\nRelease: 1\n")
+
+        self.assertEqual('1.eggs', spec.main_package.version)
+
+
+class ParseDependenciesTest(unittest.TestCase):
+
+    def test_should_parse_names_separated_by_commas_and_blanks(self):
+        self.assertEqual([Dependency('foo'), Dependency('bar'), Dependency('baz')], parse_dependencies('foo, bar baz'))
+
+    def test_should_parse_versioned_dependencies(self):
+        self.assertEqual([Dependency('foo', RPMSENSE_GREATER | RPMSENSE_EQUAL, '1.0'), Dependency('bar')],
+                         parse_dependencies('foo >= 1.0, bar'))
+
+    def test_should_add_given_flags(self):
+        self.assertEqual([Dependency('foo', RPMSENSE_SCRIPT_POST)], parse_dependencies('foo', RPMSENSE_SCRIPT_POST))
+
+    def test_should_raise_exception_when_version_is_missing(self):
+        self.assertRaises(UnsupportedSpecFileException, parse_dependencies, 'foo >=')
+
+    def test_should_raise_exception_when_operator_is_unknown(self):
+        self.assertRaises(UnsupportedSpecFileException, parse_dependencies, 'foo => 1.0')
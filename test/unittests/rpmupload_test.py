@@ -0,0 +1,144 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from time import sleep
+
+from mock import Mock, patch
+
+from unittest_support import UnitTests
+from config_rpm_maker.rpmupload import CouldNotUploadRpmsException, RpmUploadPipeline
+
+
+class RpmUploadPipelineTests(UnitTests):
+
+    def setUp(self):
+        self.patcher = patch('config_rpm_maker.rpmupload.subprocess.Popen')
+        self.mock_popen = self.patcher.start()
+        self.mock_popen.return_value = self.create_process(0)
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def create_process(self, returncode):
+        mock_process = Mock()
+        mock_process.returncode = returncode
+        mock_process.communicate.return_value = ('stdout', 'stderr')
+        return mock_process
+
+    def executed_commands(self):
+        return [call_args[0][0] for call_args in self.mock_popen.call_args_list]
+
+    def upload(self, rpms, **kwargs):
+        rpm_upload_pipeline = RpmUploadPipeline('upload', **kwargs)
+        rpm_upload_pipeline.start()
+        for rpm in rpms:
+            rpm_upload_pipeline.put(rpm)
+        rpm_upload_pipeline.close()
+        return rpm_upload_pipeline
+
+    def test_should_upload_rpms_in_chunks(self):
+
+        self.upload(['a.rpm', 'b.rpm', 'c.rpm', 'd.rpm', 'e.rpm'], chunk_size=2)
+
+        self.assertEqual(['upload a.rpm b.rpm', 'upload c.rpm d.rpm', 'upload e.rpm'], self.executed_commands())
+
+    def test_should_upload_all_rpms_in_one_chunk_when_chunk_size_is_zero(self):
+
+        self.upload(['a.rpm', 'b.rpm', 'c.rpm'], chunk_size=0)
+
+        self.assertEqual(['upload a.rpm b.rpm c.rpm'], self.executed_commands())
+
+    def test_should_not_execute_upload_command_when_no_rpms_have_been_given(self):
+
+        self.upload([], chunk_size=2)
+
+        self.assert_mock_never_called(self.mock_popen)
+
+    def test_should_upload_incomplete_chunk_when_time_window_elapsed(self):
+
+        rpm_upload_pipeline = RpmUploadPipeline('upload', chunk_size=10, time_window=0.01)
+        rpm_upload_pipeline.start()
+        rpm_upload_pipeline.put('a.rpm')
+
+        for _ in range(500):
+            if self.mock_popen.called:
+                break
+            sleep(0.01)
+
+        self.assertEqual(['upload a.rpm'], self.executed_commands())
+        rpm_upload_pipeline.close()
+
+    def test_should_use_given_number_of_upload_threads(self):
+
+        rpm_upload_pipeline = RpmUploadPipeline('upload', chunk_size=1, concurrency=3)
+        rpm_upload_pipeline.start()
+
+        self.assertEqual(4, len(rpm_upload_pipeline._threads))
+        rpm_upload_pipeline.close()
+
+    def test_should_upload_all_chunks_when_uploading_concurrently(self):
+
+        self.upload(['a.rpm', 'b.rpm', 'c.rpm', 'd.rpm'], chunk_size=1, concurrency=3)
+
+        self.assertEqual(['upload a.rpm', 'upload b.rpm', 'upload c.rpm', 'upload d.rpm'],
+                         sorted(self.executed_commands()))
+
+    def test_should_raise_exception_when_upload_command_fails(self):
+
+        self.mock_popen.return_value = self.create_process(1)
+
+        self.assertRaises(CouldNotUploadRpmsException, self.upload, ['a.rpm'], chunk_size=2)
+
+    def test_should_not_upload_further_chunks_after_upload_command_failed(self):
+
+        self.mock_popen.return_value = self.create_process(1)
+        rpm_upload_pipeline = RpmUploadPipeline('upload', chunk_size=1)
+        for rpm in ['a.rpm', 'b.rpm', 'c.rpm']:
+            rpm_upload_pipeline.put(rpm)
+        rpm_upload_pipeline.start()
+
+        self.assertRaises(CouldNotUploadRpmsException, rpm_upload_pipeline.close)
+        self.assertEqual(['upload a.rpm'], self.executed_commands())
+        self.assertEqual(2, rpm_upload_pipeline.dropped_rpms)
+
+    def test_should_drop_pending_rpms_when_aborted(self):
+
+        rpm_upload_pipeline = RpmUploadPipeline('upload', chunk_size=1)
+        rpm_upload_pipeline.put('a.rpm')
+        rpm_upload_pipeline.put('b.rpm')
+        rpm_upload_pipeline.abort()
+        rpm_upload_pipeline.start()
+        rpm_upload_pipeline.close()
+
+        self.assert_mock_never_called(self.mock_popen)
+        self.assertEqual(2, rpm_upload_pipeline.dropped_rpms)
+
+    def test_should_record_uploaded_chunks(self):
+
+        rpm_upload_pipeline = self.upload(['a.rpm', 'b.rpm', 'c.rpm'], chunk_size=2)
+
+        self.assertEqual([2, 1], [chunk.size for chunk in rpm_upload_pipeline.uploaded_chunks])
+
+    def test_should_log_summary_of_uploaded_chunks(self):
+
+        mock_logging_function = Mock()
+        rpm_upload_pipeline = self.upload(['a.rpm', 'b.rpm', 'c.rpm'], chunk_size=2)
+
+        rpm_upload_pipeline.log_summary(mock_logging_function)
+
+        mock_logging_function.assert_any_call('Uploaded %s rpm(s) in %s chunk(s) using %s concurrent upload(s), dropped %s rpm(s).', 3, 2, 1, 0)
@@ -16,7 +16,7 @@
 
 import unittest
 
-from config_rpm_maker.segment import LocTyp, All, Host, Short_HostNr
+from config_rpm_maker.segment import LocTyp, All, Host, Short_HostNr, SvnPathIndex, Typ
 
 
 class SegmentTest(unittest.TestCase):
@@ -44,3 +44,31 @@ class SegmentTest(unittest.TestCase):
         self.assertEqual(['1', ], Short_HostNr().get('devweb01'))
         self.assertEqual(['21', ], Short_HostNr().get('devweb21'))
         self.assertEqual('SHORT_HOSTNR', Short_HostNr().get_variable_name())
+
+
+class SvnPathIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.svn_path_index = SvnPathIndex(['berweb01', 'devweb01', 'tuvweb02'])
+
+    def test_should_return_all_hosts_when_all_segment_changed(self):
+        self.assertEqual(set(['berweb01', 'devweb01', 'tuvweb02']), self.svn_path_index.find_hosts(['all/files/spam']))
+
+    def test_should_return_no_hosts_when_changed_path_is_outside_of_segments(self):
+        self.assertEqual(set(), self.svn_path_index.find_hosts(['foo/bar', '']))
+
+    def test_should_return_hosts_of_location_when_location_segment_changed(self):
+        self.assertEqual(set(['berweb01', 'tuvweb02']), self.svn_path_index.find_hosts(['loc/pro', 'loc/tuv']))
+
+    def test_should_return_host_when_host_segment_changed(self):
+        self.assertEqual(set(['devweb01']), self.svn_path_index.find_hosts(['host/devweb01/files/spam']))
+
+    def test_should_match_svn_path_as_plain_prefix_like_startswith(self):
+        self.assertEqual(set(['berweb01', 'devweb01', 'tuvweb02']), self.svn_path_index.find_hosts(['typ/webserver']))
+
+    def test_should_return_matching_svn_paths(self):
+        self.assertEqual(['loctyp/proweb'], SvnPathIndex(['berweb01']).find_svn_paths('loctyp/proweb/files'))
+
+    def test_should_only_index_given_segments(self):
+        self.assertEqual(set(), SvnPathIndex(['devweb01'], segments=[Typ()]).find_hosts(['all/spam']))
+
@@ -0,0 +1,137 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+from Queue import Queue
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from mock import Mock
+from pysvn import ClientError
+
+from unittest_support import UnitTests
+
+from config_rpm_maker.segmentcache import SegmentExportCache, get_shared_svn_paths
+
+
+class SegmentExportCacheTests(UnitTests):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='segmentcache_test.')
+        self.staging_dir = os.path.join(self.temporary_directory, 'segments')
+        os.makedirs(self.staging_dir)
+
+        self.mock_svn_service = Mock()
+        self.mock_svn_service.export.side_effect = self._fake_export
+
+        self.svn_service_queue = Queue()
+        self.svn_service_queue.put(self.mock_svn_service)
+
+        self.segment_export_cache = SegmentExportCache('123', self.staging_dir, self.svn_service_queue)
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def _fake_export(self, svn_path, target_dir, revision):
+        if svn_path == 'typ/missing':
+            raise ClientError('path not found')
+
+        os.makedirs(os.path.join(target_dir, 'files'))
+        with open(os.path.join(target_dir, 'files', 'spam'), 'w') as spam_file:
+            spam_file.write('content from %s' % svn_path)
+
+        return [(svn_path, 'files'), (svn_path, 'files/spam')]
+
+    def _read(self, path):
+        with open(path) as file_to_read:
+            return file_to_read.read()
+
+    def test_should_export_each_svn_path_only_once(self):
+
+        self.segment_export_cache.overlay('all', os.path.join(self.temporary_directory, 'host1'))
+        self.segment_export_cache.overlay('all', os.path.join(self.temporary_directory, 'host2'))
+
+        self.assertEqual(1, self.mock_svn_service.export.call_count)
+
+    def test_should_copy_staged_files_to_target_directory(self):
+
+        target_dir = os.path.join(self.temporary_directory, 'host1')
+
+        self.segment_export_cache.overlay('all', target_dir)
+
+        self.assertEqual('content from all', self._read(os.path.join(target_dir, 'files', 'spam')))
+
+    def test_should_overwrite_existing_files_in_target_directory(self):
+
+        target_dir = os.path.join(self.temporary_directory, 'host1')
+
+        self.segment_export_cache.overlay('all', target_dir)
+        self.segment_export_cache.overlay('typ/web', target_dir)
+
+        self.assertEqual('content from typ/web', self._read(os.path.join(target_dir, 'files', 'spam')))
+
+    def test_should_return_exported_paths_for_each_overlay(self):
+
+        first = self.segment_export_cache.overlay('all', os.path.join(self.temporary_directory, 'host1'))
+        second = self.segment_export_cache.overlay('all', os.path.join(self.temporary_directory, 'host2'))
+
+        self.assertEqual([('all', 'files'), ('all', 'files/spam')], first)
+        self.assertEqual(first, second)
+
+    def test_should_put_svn_service_back_into_queue(self):
+
+        self.segment_export_cache.overlay('all', os.path.join(self.temporary_directory, 'host1'))
+
+        self.assertEqual(self.mock_svn_service, self.svn_service_queue.get(block=False))
+
+    def test_should_raise_client_error_each_time_a_missing_path_is_overlaid(self):
+
+        target_dir = os.path.join(self.temporary_directory, 'host1')
+
+        self.assertRaises(ClientError, self.segment_export_cache.overlay, 'typ/missing', target_dir)
+        self.assertRaises(ClientError, self.segment_export_cache.overlay, 'typ/missing', target_dir)
+        self.assertEqual(1, self.mock_svn_service.export.call_count)
+
+    def test_should_stage_svn_paths_up_front(self):
+
+        self.segment_export_cache.stage(['all', 'typ/web', 'typ/missing'], 2)
+
+        self.assertEqual(3, self.mock_svn_service.export.call_count)
+        self.assertEqual(['all', 'typ/missing', 'typ/web'], sorted(self.segment_export_cache.get_staged_segments().keys()))
+
+    def test_should_overlay_segments_staged_by_other_cache_without_exporting_them_again(self):
+
+        self.segment_export_cache.stage(['all', 'typ/missing'], 1)
+        target_dir = os.path.join(self.temporary_directory, 'host1')
+        other_svn_service_queue = Queue()
+        other_svn_service_queue.put(Mock())
+
+        other_cache = SegmentExportCache('123', self.staging_dir, other_svn_service_queue,
+                                         staged_segments=self.segment_export_cache.get_staged_segments())
+
+        self.assertEqual([('all', 'files'), ('all', 'files/spam')], other_cache.overlay('all', target_dir))
+        self.assertRaises(ClientError, other_cache.overlay, 'typ/missing', target_dir)
+        self.assertEqual('content from all', self._read(os.path.join(target_dir, 'files', 'spam')))
+        self.assertEqual(0, other_svn_service_queue.get().export.call_count)
+
+
+class GetSharedSvnPathsTests(UnitTests):
+
+    def test_should_return_svn_paths_of_all_segments_except_host_segment(self):
+
+        self.assertEqual(['all', 'loc/dev', 'loc/tuv', 'loctyp/devweb', 'loctyp/tuvweb', 'typ/web'],
+                         get_shared_svn_paths(['devweb01', 'devweb02', 'tuvweb01']))
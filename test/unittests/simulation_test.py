@@ -0,0 +1,145 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+
+from os.path import exists, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from pysvn import ClientError
+
+from config_rpm_maker.hostrpmbuilder import CouldNotBuildRpmException
+from config_rpm_maker.simulation import (FakeSvnService,
+                                         SimulatedFailureException,
+                                         SimulatedLatency,
+                                         StubRpmBuilder)
+
+PATH_TO_TEST_REPOSITORY = join('testdata', 'svn_repo')
+
+
+class SimulatedLatencyTests(TestCase):
+
+    def test_should_never_fail_without_failure_rate(self):
+
+        latency = SimulatedLatency(seed=1)
+
+        self.assertFalse(any(latency.should_fail() for _ in range(100)))
+
+    def test_should_always_fail_with_failure_rate_of_one(self):
+
+        latency = SimulatedLatency(failure_rate=1.0, seed=1)
+
+        self.assertTrue(all(latency.should_fail() for _ in range(100)))
+        self.assertEqual(100, latency.failures)
+
+    def test_should_count_calls(self):
+
+        latency = SimulatedLatency()
+
+        latency.wait()
+        latency.wait()
+
+        self.assertEqual(2, latency.calls)
+
+
+class FakeSvnServiceTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp()
+        self.svn_service = FakeSvnService(PATH_TO_TEST_REPOSITORY, changed_paths=['host/devweb01/host_specific_file'])
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def test_should_return_hosts(self):
+
+        self.assertEqual(['berweb01', 'devweb00', 'devweb01', 'tuvweb01'], self.svn_service.get_hosts('1'))
+
+    def test_should_return_changed_paths(self):
+
+        self.assertEqual(['host/devweb01/host_specific_file'], self.svn_service.get_changed_paths('1'))
+
+    def test_should_return_logs_with_revision_number(self):
+
+        logs = self.svn_service.get_logs_for_revision('42')
+
+        self.assertEqual(42, logs[0]['revision'].number)
+        self.assertEqual('/config/host/devweb01/host_specific_file', logs[0]['changed_paths'][0]['path'])
+
+    def test_should_return_files_relative_to_configuration(self):
+
+        self.assertEqual(['host/devweb01/VARIABLES/DUMMY_VAR1', 'host/devweb01/host_specific_file'],
+                         self.svn_service.get_files('host/devweb01', '1'))
+
+    def test_should_export_directory(self):
+
+        target_directory = join(self.temporary_directory, 'devweb01')
+
+        exported_paths = self.svn_service.export('host/devweb01', target_directory, '1')
+
+        self.assertEqual([('host/devweb01', 'VARIABLES'),
+                          ('host/devweb01', 'host_specific_file'),
+                          ('host/devweb01', join('VARIABLES', 'DUMMY_VAR1'))], exported_paths)
+        self.assertTrue(exists(join(target_directory, 'VARIABLES', 'DUMMY_VAR1')))
+
+    def test_should_raise_client_error_when_path_does_not_exist(self):
+
+        self.assertRaises(ClientError, self.svn_service.export, 'host/spam', self.temporary_directory, '1')
+
+    def test_should_count_simulated_failures_and_become_unhealthy(self):
+
+        svn_service = FakeSvnService(PATH_TO_TEST_REPOSITORY, latency=SimulatedLatency(failure_rate=1.0))
+
+        for _ in range(3):
+            self.assertRaises(SimulatedFailureException, svn_service.export, 'all', self.temporary_directory, '1')
+
+        self.assertEqual(3, svn_service.failures)
+        self.assertFalse(svn_service.is_healthy())
+
+    def test_should_share_settings_and_metadata_cache_with_clone(self):
+
+        clone = self.svn_service.clone()
+
+        self.assertEqual(self.svn_service.changed_paths, clone.changed_paths)
+        self.assertTrue(self.svn_service.metadata_cache is clone.metadata_cache)
+
+
+class StubRpmBuilderTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def test_should_write_empty_rpms(self):
+
+        rpms = StubRpmBuilder().build('yadt-config-devweb01', '123', self.temporary_directory)
+
+        self.assertEqual([join(self.temporary_directory, 'noarch', 'yadt-config-devweb01-1-123.noarch.rpm'),
+                          join(self.temporary_directory, 'noarch', 'yadt-config-devweb01-repos-1-123.noarch.rpm')],
+                         rpms)
+        self.assertEqual(0, os.path.getsize(rpms[0]))
+
+    def test_should_raise_exception_when_simulating_failure(self):
+
+        rpm_builder = StubRpmBuilder(SimulatedLatency(failure_rate=1.0))
+
+        self.assertRaises(CouldNotBuildRpmException, rpm_builder.build, 'yadt-config-devweb01', '123',
+                          self.temporary_directory)
@@ -16,10 +16,17 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from threading import Event, Thread
 from unittest import TestCase
-from mock import Mock
+from mock import Mock, patch
+from pysvn import ClientError
 
-from config_rpm_maker.svnservice import SvnServiceException, SvnService
+from config_rpm_maker.svnservice import (FrozenRecord,
+                                         RevisionMetadataCache,
+                                         SvnServiceException,
+                                         SvnService,
+                                         SvnServicePool,
+                                         freeze)
 
 
 class SvnServiceTests(TestCase):
@@ -37,11 +44,21 @@ class SvnServiceTests(TestCase):
         item2.repos_path = u"spam"
         mock_svn_service.client.list.return_value = [(item0,), (item1,), (item2,)]
 
-        actual_host_names = SvnService.get_hosts(mock_svn_service, 123)
+        actual_host_names = SvnService._fetch_hosts(mock_svn_service, 123)
 
         self.assert_is_ordinary_string(actual_host_names[0])
         self.assert_is_ordinary_string(actual_host_names[1])
 
+    @patch('config_rpm_maker.svnservice.pysvn')
+    @patch('config_rpm_maker.svnservice.LOGGER')
+    def test_should_log_configuration_repository_only_once_when_cloned(self, mock_logger, mock_pysvn):
+
+        svn_service = SvnService(base_url='file:///path_to/repository')
+
+        svn_service.clone()
+
+        mock_logger.info.assert_called_once_with('Configuration repository is "%s".', 'file:///path_to/repository/config')
+
     def assert_is_ordinary_string(self, text):
         self.assertTrue(isinstance(text, str), '"%s" is NOT a ordinary string!' % text)
 
@@ -57,7 +74,7 @@ class GetLogsForRevision(TestCase):
         mock_svn_service.client = Mock()
         mock_svn_service.client.log.side_effect = Exception("Aaarrrgggghh...")
 
-        self.assertRaises(SvnServiceException, SvnService.get_logs_for_revision, mock_svn_service, '1980')
+        self.assertRaises(SvnServiceException, SvnService._fetch_logs_for_revision, mock_svn_service, '1980')
 
     def test_should_return_logs_for_revision(self):
         mock_svn_service = Mock(SvnService)
@@ -67,10 +84,170 @@ class GetLogsForRevision(TestCase):
         mock_logs = Mock()
         mock_svn_service.client.log.return_value = mock_logs
 
-        actual = SvnService.get_logs_for_revision(mock_svn_service, '1980')
+        actual = SvnService._fetch_logs_for_revision(mock_svn_service, '1980')
 
         self.assertEqual(mock_logs, actual)
 
+    def test_should_fetch_logs_only_once_per_revision(self):
+        mock_svn_service = Mock(SvnService)
+        mock_svn_service.metadata_cache = RevisionMetadataCache()
+        mock_svn_service._fetch_logs_for_revision.return_value = [{'message': 'spam'}]
+
+        SvnService.get_logs_for_revision(mock_svn_service, '1980')
+        actual = SvnService.get_logs_for_revision(mock_svn_service, '1980')
+
+        self.assertEqual('spam', actual[0].message)
+        mock_svn_service._fetch_logs_for_revision.assert_called_once_with('1980')
+
+    def test_should_fetch_logs_again_after_metadata_cache_has_been_cleared(self):
+        mock_svn_service = Mock(SvnService)
+        mock_svn_service.metadata_cache = RevisionMetadataCache()
+        mock_svn_service._fetch_logs_for_revision.return_value = [{'message': 'spam'}]
+
+        SvnService.get_logs_for_revision(mock_svn_service, '1980')
+        mock_svn_service.metadata_cache.clear()
+        SvnService.get_logs_for_revision(mock_svn_service, '1980')
+
+        self.assertEqual(2, mock_svn_service._fetch_logs_for_revision.call_count)
+
+
+class GetHostsTests(TestCase):
+
+    def test_should_fetch_hosts_only_once_per_revision_and_return_a_new_list_each_time(self):
+        mock_svn_service = Mock(SvnService)
+        mock_svn_service.metadata_cache = RevisionMetadataCache()
+        mock_svn_service._fetch_hosts.return_value = ['devweb01', 'tuvweb01']
+
+        first = SvnService.get_hosts(mock_svn_service, 123)
+        second = SvnService.get_hosts(mock_svn_service, 123)
+
+        self.assertEqual(['devweb01', 'tuvweb01'], second)
+        self.assertFalse(first is second)
+        mock_svn_service._fetch_hosts.assert_called_once_with(123)
+
+
+class GetFileContentTests(TestCase):
+
+    def test_should_fetch_file_content_only_once_per_revision(self):
+        mock_svn_service = Mock(SvnService)
+        mock_svn_service.metadata_cache = RevisionMetadataCache()
+        mock_svn_service._fetch_file_content.return_value = 'Name: spam'
+
+        SvnService.get_file_content(mock_svn_service, 'default.spec', '1980')
+        actual = SvnService.get_file_content(mock_svn_service, 'default.spec', '1980')
+
+        self.assertEqual('Name: spam', actual)
+        mock_svn_service._fetch_file_content.assert_called_once_with('default.spec', '1980')
+
+    @patch('config_rpm_maker.svnservice.rmtree')
+    @patch('config_rpm_maker.svnservice.mkdtemp')
+    @patch('config_rpm_maker.svnservice.get_temporary_directory')
+    def test_should_export_file_into_configured_temporary_directory(self, mock_get_temporary_directory, mock_mkdtemp, mock_rmtree):
+        mock_svn_service = Mock(SvnService)
+        mock_get_temporary_directory.return_value = '/var/tmp'
+        mock_mkdtemp.side_effect = IOError('stop here')
+
+        self.assertRaises(IOError, SvnService._fetch_file_content, mock_svn_service, 'default.spec', '1980')
+
+        self.assertEqual('/var/tmp', mock_mkdtemp.call_args[1]['dir'])
+
+
+class RevisionMetadataCacheTests(TestCase):
+
+    def test_should_not_block_other_keys_while_fetching_a_key(self):
+        cache = RevisionMetadataCache()
+        fetch_started = Event()
+        other_key_fetched = Event()
+
+        def slow_fetch():
+            fetch_started.set()
+            return other_key_fetched.wait(5)
+
+        thread = Thread(target=cache.get, args=('slow', slow_fetch))
+        thread.start()
+        fetch_started.wait(5)
+
+        cache.get('fast', lambda: 'eggs')
+        other_key_fetched.set()
+        thread.join()
+
+        self.assertTrue(cache.get('slow', Mock()))
+
+    def test_should_fetch_key_again_after_fetch_failed(self):
+        cache = RevisionMetadataCache()
+        failing_fetch = Mock(side_effect=IOError('spam'))
+
+        self.assertRaises(IOError, cache.get, 'key', failing_fetch)
+
+        self.assertEqual('eggs', cache.get('key', lambda: 'eggs'))
+
+
+class GetFilesTests(TestCase):
+
+    def setUp(self):
+        self.mock_svn_service = Mock(SvnService)
+        self.mock_svn_service.path_to_config = '/config'
+        self.mock_svn_service.client = Mock()
+        self.mock_svn_service._is_path_not_found_error.side_effect = lambda error: SvnService._is_path_not_found_error(self.mock_svn_service, error)
+
+    def create_item(self, repos_path, kind):
+        item = Mock()
+        item.repos_path = repos_path
+        item.kind = kind
+        return (item, None)
+
+    def test_should_return_files_relative_to_configuration_directory(self):
+
+        self.mock_svn_service.client.list.return_value = [self.create_item('/config/typ', 'dir'),
+                                                          self.create_item('/config/typ/web', 'dir'),
+                                                          self.create_item('/config/typ/web/motd', 'file')]
+
+        actual = SvnService._fetch_files(self.mock_svn_service, 'typ', '123')
+
+        self.assertEqual(['typ/web/motd'], actual)
+
+    def test_should_return_empty_list_when_path_does_not_exist(self):
+
+        self.mock_svn_service.client.list.side_effect = ClientError('not found', [('not found', 160013)])
+
+        actual = SvnService._fetch_files(self.mock_svn_service, 'typ', '123')
+
+        self.assertEqual([], actual)
+        self.assertEqual(0, self.mock_svn_service._record_failure.call_count)
+
+    def test_should_fetch_files_only_once_per_revision(self):
+
+        self.mock_svn_service.metadata_cache = RevisionMetadataCache()
+        self.mock_svn_service._fetch_files.return_value = ['typ/web/motd']
+
+        SvnService.get_files(self.mock_svn_service, 'typ', '123')
+        actual = SvnService.get_files(self.mock_svn_service, 'typ', '123')
+
+        self.assertEqual(['typ/web/motd'], actual)
+        self.mock_svn_service._fetch_files.assert_called_once_with('typ', '123')
+
+
+class FreezeTests(TestCase):
+
+    def test_should_freeze_dictionaries_and_lists(self):
+
+        actual = freeze({'changed_paths': [{'path': '/config/spam', 'action': 'A'}]})
+
+        self.assertTrue(isinstance(actual, FrozenRecord))
+        self.assertEqual(('/config/spam', 'A'), (actual.changed_paths[0].path, actual.changed_paths[0]['action']))
+        self.assertTrue(isinstance(actual.changed_paths, tuple))
+
+    def test_should_not_allow_to_modify_frozen_record(self):
+
+        actual = freeze({'message': 'spam'})
+
+        self.assertRaises(TypeError, actual.__setitem__, 'message', 'eggs')
+        self.assertRaises(TypeError, setattr, actual, 'message', 'eggs')
+
+    def test_should_raise_attribute_error_for_unknown_attribute(self):
+
+        self.assertRaises(AttributeError, getattr, freeze({}), 'message')
+
 
 class GetChangedPathsWithActionTests(TestCase):
 
@@ -230,3 +407,172 @@ class GetDeletedPathsTests(TestCase):
         actual = SvnService.get_deleted_paths(mock_svn_service, '1980')
 
         self.assertEqual(['example', 'spam.egg'], actual)
+
+
+class ExportHealthTests(TestCase):
+
+    def setUp(self):
+        self.mock_svn_service = Mock(SvnService)
+        self.mock_svn_service.config_url = 'svn://url/for/configuration/repository/config'
+        self.mock_svn_service.client = Mock()
+        self.mock_svn_service._is_path_not_found_error.side_effect = lambda error: SvnService._is_path_not_found_error(self.mock_svn_service, error)
+
+    def test_should_record_failure_when_export_fails(self):
+
+        self.mock_svn_service.client.export.side_effect = ClientError('connection closed', [('connection closed', 210002)])
+
+        self.assertRaises(ClientError, SvnService.export, self.mock_svn_service, 'all', '/tmp/target', '123')
+
+        self.mock_svn_service._record_failure.assert_called_with()
+
+    def test_should_not_record_failure_when_exported_path_does_not_exist(self):
+
+        self.mock_svn_service.client.export.side_effect = ClientError('not found', [('not found', 170000)])
+
+        self.assertRaises(ClientError, SvnService.export, self.mock_svn_service, 'all', '/tmp/target', '123')
+
+        self.assertEqual(0, self.mock_svn_service._record_failure.call_count)
+
+    def test_should_be_unhealthy_after_too_many_consecutive_failures(self):
+
+        self.mock_svn_service.consecutive_failures = 3
+
+        self.assertFalse(SvnService.is_healthy(self.mock_svn_service))
+
+
+class SvnServicePoolTests(TestCase):
+
+    def setUp(self):
+        self.mock_svn_service = Mock(SvnService)
+        self.mock_svn_service.is_healthy.return_value = True
+        self.mock_svn_service.failures = 0
+        self.mock_cloned_service = Mock(SvnService)
+        self.mock_cloned_service.is_healthy.return_value = True
+        self.mock_cloned_service.failures = 0
+        self.mock_svn_service.clone.return_value = self.mock_cloned_service
+
+    def test_should_raise_exception_when_size_is_less_than_one(self):
+
+        self.assertRaises(SvnServiceException, SvnServicePool, self.mock_svn_service, 0)
+
+    def test_should_hand_out_given_svn_service_first(self):
+
+        pool = SvnServicePool(self.mock_svn_service, size=2)
+
+        self.assertEqual(self.mock_svn_service, pool.get())
+        self.assertEqual(0, self.mock_svn_service.clone.call_count)
+
+    def test_should_create_additional_svn_service_lazily(self):
+
+        pool = SvnServicePool(self.mock_svn_service, size=2)
+
+        pool.get()
+        second = pool.get()
+
+        self.assertEqual(self.mock_cloned_service, second)
+        self.assertEqual(2, pool.created_services)
+
+    def test_should_create_additional_svn_service_without_holding_the_lock(self):
+
+        pool = SvnServicePool(self.mock_svn_service, size=2)
+        lock_acquired_by_other_thread = []
+
+        def acquire_lock():
+            if pool._condition.acquire(False):
+                lock_acquired_by_other_thread.append(True)
+                pool._condition.release()
+
+        def clone():
+            other_thread = Thread(target=acquire_lock)
+            other_thread.start()
+            other_thread.join()
+            return self.mock_cloned_service
+
+        self.mock_svn_service.clone.side_effect = clone
+
+        pool.get()
+        pool.get()
+
+        self.assertEqual([True], lock_acquired_by_other_thread)
+
+    def test_should_release_reserved_slot_when_svn_service_could_not_be_created(self):
+
+        pool = SvnServicePool(self.mock_svn_service, size=2)
+        pool.get()
+        self.mock_svn_service.clone.side_effect = ClientError('could not create client')
+
+        self.assertRaises(ClientError, pool.get)
+
+        self.mock_svn_service.clone.side_effect = None
+        self.assertEqual(self.mock_cloned_service, pool.get())
+        self.assertEqual(2, pool.created_services)
+
+    def test_should_reuse_returned_svn_service(self):
+
+        pool = SvnServicePool(self.mock_svn_service, size=2)
+
+        pool.put(pool.get())
+        pool.get()
+
+        self.assertEqual(0, self.mock_svn_service.clone.call_count)
+        self.assertEqual(2, pool.count_of_gets)
+
+    def test_should_replace_unhealthy_svn_service(self):
+
+        pool = SvnServicePool(self.mock_svn_service, size=1)
+        self.mock_svn_service.is_healthy.return_value = False
+        self.mock_svn_service.consecutive_failures = 3
+
+        pool.put(pool.get())
+        actual = pool.get()
+
+        self.assertEqual(self.mock_cloned_service, actual)
+        self.assertEqual(1, pool.discarded_services)
+
+    def test_should_log_summary(self):
+
+        pool = SvnServicePool(self.mock_svn_service, size=1)
+        pool.put(pool.get())
+        mock_logging_function = Mock()
+
+        pool.log_summary(mock_logging_function)
+
+        self.assertEqual(3, mock_logging_function.call_count)
+
+    def test_should_take_statistics_and_reset_them(self):
+
+        pool = SvnServicePool(self.mock_svn_service, size=1)
+        pool.put(pool.get())
+
+        statistics = pool.take_statistics()
+
+        self.assertEqual(1, statistics['created_services'])
+        self.assertEqual(1, statistics['count_of_gets'])
+        self.assertEqual(0, pool.created_services)
+        self.assertEqual(0, pool.count_of_gets)
+
+    def test_should_reset_statistics(self):
+
+        pool = SvnServicePool(self.mock_svn_service, size=1)
+        pool.put(pool.get())
+
+        pool.reset_statistics()
+
+        self.assertEqual(0, pool.count_of_gets)
+        self.assertEqual({}, pool.uses)
+
+    def test_should_add_statistics_of_other_pool(self):
+
+        pool = SvnServicePool(self.mock_svn_service, size=1)
+
+        pool.add_statistics({'created_services': 2,
+                             'discarded_services': 1,
+                             'count_of_gets': 5,
+                             'count_of_waits': 1,
+                             'total_wait_time': 0.5,
+                             'maximum_wait_time': 0.5})
+
+        self.assertEqual(3, pool.created_services)
+        self.assertEqual(1, pool.discarded_services)
+        self.assertEqual(5, pool.count_of_gets)
+        self.assertEqual(0.5, pool.maximum_wait_time)
@@ -19,7 +19,7 @@
 import unittest
 
 from config_rpm_maker.token.cycle import ContainsCyclesException
-from config_rpm_maker.token.cycle import TokenCycleChecking
+from config_rpm_maker.token.cycle import TokenCycleChecking, tarjan_scc
 
 
 class CycleTest(unittest.TestCase):
@@ -60,3 +60,27 @@ class CycleTest(unittest.TestCase):
         actual_graph = TokenCycleChecking(graph_with_cycle)
 
         self.assertRaises(ContainsCyclesException, actual_graph.assert_no_cycles_present)
+
+    def test_should_return_components_in_reverse_topological_order(self):
+        graph = {'foo': ['bar', 'baz'],
+                 'bar': ['baz'],
+                 'baz': []}
+
+        self.assertEqual([('baz',), ('bar',), ('foo',)], tarjan_scc(graph))
+
+    def test_should_return_cycle_as_one_component(self):
+        graph = {'foo': ['bar'],
+                 'bar': ['foo']}
+
+        components = tarjan_scc(graph)
+
+        self.assertEqual(1, len(components))
+        self.assertEqual(set(['foo', 'bar']), set(components[0]))
+
+    def test_should_not_exceed_recursion_limit_when_graph_is_deeply_nested(self):
+        graph = dict(('node%d' % number, ['node%d' % (number + 1)]) for number in range(10000))
+
+        components = tarjan_scc(graph)
+
+        self.assertEqual(10001, len(components))
+        self.assertEqual(('node10000',), components[0])
@@ -0,0 +1,110 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+
+from mock import Mock, patch
+
+from config_rpm_maker.token.encoding import (ENCODING_DETECTION_STATISTICS,
+                                             EncodingDetectionStatistics,
+                                             MagicCookiePool,
+                                             detect_encoding)
+
+
+class DetectEncodingTest(unittest.TestCase):
+
+    def setUp(self):
+        ENCODING_DETECTION_STATISTICS.reset()
+
+    @patch('config_rpm_maker.token.encoding.MAGIC_COOKIE_POOL')
+    def test_should_detect_ascii_without_libmagic(self, mock_magic_cookie_pool):
+
+        self.assertEqual('us-ascii', detect_encoding('key = @@@VALUE@@@\n\ttabbed\r\n'))
+
+        self.assertEqual(0, mock_magic_cookie_pool.from_buffer.call_count)
+        self.assertEqual(1, ENCODING_DETECTION_STATISTICS.counters[EncodingDetectionStatistics.DETECTED_ASCII])
+
+    @patch('config_rpm_maker.token.encoding.MAGIC_COOKIE_POOL')
+    def test_should_detect_utf_8_without_libmagic(self, mock_magic_cookie_pool):
+
+        self.assertEqual('utf-8', detect_encoding(u'k\xe4se = @@@VALUE@@@\n'.encode('utf-8')))
+
+        self.assertEqual(0, mock_magic_cookie_pool.from_buffer.call_count)
+        self.assertEqual(1, ENCODING_DETECTION_STATISTICS.counters[EncodingDetectionStatistics.DETECTED_UTF_8])
+
+    @patch('config_rpm_maker.token.encoding.MAGIC_COOKIE_POOL')
+    def test_should_ask_libmagic_when_content_is_not_valid_utf_8(self, mock_magic_cookie_pool):
+        mock_magic_cookie_pool.from_buffer.return_value = 'iso-8859-1'
+
+        self.assertEqual('iso-8859-1', detect_encoding(u'k\xe4se = @@@VALUE@@@\n'.encode('latin-1')))
+
+        self.assertEqual(1, ENCODING_DETECTION_STATISTICS.counters[EncodingDetectionStatistics.ASKED_LIBMAGIC])
+
+    @patch('config_rpm_maker.token.encoding.MAGIC_COOKIE_POOL')
+    def test_should_ask_libmagic_when_content_contains_control_characters(self, mock_magic_cookie_pool):
+        mock_magic_cookie_pool.from_buffer.return_value = 'binary'
+
+        self.assertEqual('binary', detect_encoding('@@@VALUE@@@\x00\x01'))
+
+    @patch('config_rpm_maker.token.encoding.MAGIC_COOKIE_POOL')
+    def test_should_ask_libmagic_when_content_contains_vertical_tab(self, mock_magic_cookie_pool):
+        mock_magic_cookie_pool.from_buffer.return_value = 'binary'
+
+        self.assertEqual('binary', detect_encoding('@@@VALUE@@@\v'))
+
+    @patch('config_rpm_maker.token.encoding.MAGIC_COOKIE_POOL')
+    def test_should_ask_libmagic_when_content_is_empty(self, mock_magic_cookie_pool):
+        mock_magic_cookie_pool.from_buffer.return_value = 'binary'
+
+        self.assertEqual('binary', detect_encoding(''))
+
+
+class MagicCookiePoolTest(unittest.TestCase):
+
+    @patch('config_rpm_maker.token.encoding.Magic')
+    def test_should_reuse_magic_cookie(self, mock_magic_class):
+        mock_magic_class.return_value.from_buffer.return_value = 'us-ascii'
+        magic_cookie_pool = MagicCookiePool()
+
+        magic_cookie_pool.from_buffer('spam')
+        magic_cookie_pool.from_buffer('eggs')
+
+        mock_magic_class.assert_called_once_with(mime_encoding=True)
+        self.assertEqual(1, magic_cookie_pool.created_magics)
+
+    @patch('config_rpm_maker.token.encoding.Magic')
+    def test_should_return_magic_cookie_to_pool_when_detection_fails(self, mock_magic_class):
+        mock_magic_class.return_value.from_buffer.side_effect = Exception('failed')
+        magic_cookie_pool = MagicCookiePool()
+
+        self.assertRaises(Exception, magic_cookie_pool.from_buffer, 'spam')
+
+        self.assertEqual([mock_magic_class.return_value], magic_cookie_pool._idle_magics)
+
+
+class EncodingDetectionStatisticsTest(unittest.TestCase):
+
+    def test_should_log_all_counters(self):
+        statistics = EncodingDetectionStatistics()
+        statistics.increment(EncodingDetectionStatistics.ASKED_LIBMAGIC)
+        mock_logging_function = Mock()
+
+        statistics.log_summary(mock_logging_function)
+
+        mock_logging_function.assert_called_with('Encoding detection: %s',
+                                                 'asked libmagic 1 time(s), detected ascii 0 time(s), '
+                                                 'detected utf-8 0 time(s), skipped (no tokens) 0 time(s)')
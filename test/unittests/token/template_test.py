@@ -0,0 +1,147 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+
+import unittest
+
+from config_rpm_maker.token.template import CompiledTemplate, TemplateCache
+
+
+def replace_token(token, replacement):
+    return replacement
+
+
+class CompiledTemplateTest(unittest.TestCase):
+
+    def test_should_split_content_into_literals_and_token_slots(self):
+        template = CompiledTemplate("a @@@FOO@@@ b @@@BAR@@@ c @@@FOO@@@")
+
+        self.assertEqual(["a ", " b ", " c ", ""], template.literals)
+        self.assertEqual(["FOO", "BAR"], template.token_names)
+        self.assertEqual([0, 1, 0], template.slots)
+
+    def test_should_render_replacements_into_slots(self):
+        template = CompiledTemplate("a @@@FOO@@@ b @@@BAR@@@ c @@@FOO@@@")
+
+        self.assertEqual("a foo b bar c foo", template.render(("foo", "bar")))
+
+    def test_should_return_content_when_content_does_not_contain_tokens(self):
+        content = "spam and eggs"
+
+        self.assertTrue(content is CompiledTemplate(content).render(()))
+
+
+class TemplateCacheTest(unittest.TestCase):
+
+    def test_should_return_cached_template_for_identical_content(self):
+        template_cache = TemplateCache(maximum_size=10, maximum_size_in_bytes=1000)
+
+        template = template_cache.get_template(u"@@@FOO@@@")
+
+        self.assertTrue(template is template_cache.get_template(u"@@@FOO@@@"))
+        self.assertEqual(1, template_cache.hits)
+        self.assertEqual(1, template_cache.misses)
+
+    def test_should_not_mix_up_byte_strings_and_unicode_strings(self):
+        template_cache = TemplateCache(maximum_size=10, maximum_size_in_bytes=1000)
+
+        template = template_cache.get_template("@@@FOO@@@")
+
+        self.assertFalse(template is template_cache.get_template(u"@@@FOO@@@"))
+
+    def test_should_evict_least_recently_used_template(self):
+        template_cache = TemplateCache(maximum_size=2, maximum_size_in_bytes=1000)
+        first_template = template_cache.get_template("first")
+        template_cache.get_template("second")
+        template_cache.get_template("first")
+
+        template_cache.get_template("third")
+
+        self.assertTrue(first_template is template_cache.get_template("first"))
+        self.assertEqual(3, template_cache.misses)
+        template_cache.get_template("second")
+        self.assertEqual(4, template_cache.misses)
+
+    def test_should_not_cache_templates_when_cache_is_disabled(self):
+        template_cache = TemplateCache(maximum_size=0, maximum_size_in_bytes=1000)
+
+        template = template_cache.get_template("@@@FOO@@@")
+
+        self.assertFalse(template is template_cache.get_template("@@@FOO@@@"))
+
+    def test_should_reuse_output_when_replacements_are_identical(self):
+        template_cache = TemplateCache(maximum_size=10, maximum_size_in_bytes=1000)
+        key = template_cache.create_key(u"@@@FOO@@@ and @@@BAR@@@")
+        template = template_cache.get_template(u"@@@FOO@@@ and @@@BAR@@@", key)
+
+        first_output = template_cache.render(template, key, (u"foo", u"bar"), replace_token)
+        second_output = template_cache.render(template, key, (u"foo", u"bar"), replace_token)
+
+        self.assertEqual(u"foo and bar", first_output)
+        self.assertTrue(first_output is second_output)
+        self.assertEqual(1, template_cache.output_hits)
+
+    def test_should_render_again_when_replacements_differ(self):
+        template_cache = TemplateCache(maximum_size=10, maximum_size_in_bytes=1000)
+        key = template_cache.create_key(u"@@@FOO@@@")
+        template = template_cache.get_template(u"@@@FOO@@@", key)
+
+        template_cache.render(template, key, (u"foo",), replace_token)
+
+        self.assertEqual(u"bar", template_cache.render(template, key, (u"bar",), replace_token))
+        self.assertEqual(0, template_cache.output_hits)
+
+    def test_should_render_again_when_replacer_function_differs(self):
+        template_cache = TemplateCache(maximum_size=10, maximum_size_in_bytes=1000)
+        key = template_cache.create_key(u"@@@FOO@@@")
+        template = template_cache.get_template(u"@@@FOO@@@", key)
+
+        template_cache.render(template, key, (u"foo",), replace_token)
+
+        self.assertEqual(u"<b>foo</b>", template_cache.render(template, key, (u"foo",), lambda token, value: u"<b>%s</b>" % value))
+
+    def test_should_evict_least_recently_used_entries_when_size_in_bytes_is_exceeded(self):
+        template_cache = TemplateCache(maximum_size=10, maximum_size_in_bytes=30)
+        key = template_cache.create_key(u"<@@@FOO@@@>")
+        template = template_cache.get_template(u"<@@@FOO@@@>", key)
+
+        first_output = template_cache.render(template, key, (u"x" * 10,), replace_token)
+        template_cache.render(template, key, (u"y" * 10,), replace_token)
+        template_cache.render(template, key, (u"z" * 10,), replace_token)
+
+        self.assertEqual(24, template_cache.size_in_bytes)
+        self.assertFalse(first_output is template_cache.render(template, key, (u"x" * 10,), replace_token))
+
+    def test_should_not_cache_output_larger_than_maximum_size_in_bytes(self):
+        template_cache = TemplateCache(maximum_size=10, maximum_size_in_bytes=20)
+        key = template_cache.create_key(u"@@@FOO@@@")
+        template = template_cache.get_template(u"@@@FOO@@@", key)
+
+        template_cache.render(template, key, (u"x" * 30,), replace_token)
+
+        self.assertEqual(9, template_cache.size_in_bytes)
+
+    def test_should_clear_templates_and_outputs(self):
+        template_cache = TemplateCache(maximum_size=10, maximum_size_in_bytes=1000)
+        key = template_cache.create_key(u"@@@FOO@@@")
+        template = template_cache.get_template(u"@@@FOO@@@", key)
+        first_output = template_cache.render(template, key, (u"foo",), replace_token)
+
+        template_cache.clear()
+
+        self.assertEqual(0, template_cache.size_in_bytes)
+        self.assertFalse(template is template_cache.get_template(u"@@@FOO@@@", key))
+        self.assertFalse(first_output is template_cache.render(template, key, (u"foo",), replace_token))
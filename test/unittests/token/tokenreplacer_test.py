@@ -21,7 +21,10 @@ import unittest
 from mock import Mock, patch
 
 from config_rpm_maker.token.cycle import ContainsCyclesException
-from config_rpm_maker.token.tokenreplacer import CannotFilterFileException, MissingTokenException, TokenReplacer
+from config_rpm_maker.token.tokenreplacer import (CannotFilterFileException,
+                                                  MissingOrRedundantTokenException,
+                                                  MissingTokenException,
+                                                  TokenReplacer)
 
 
 class TokenReplacerTest(unittest.TestCase):
@@ -60,16 +63,81 @@ class TokenReplacerTest(unittest.TestCase):
                           TokenReplacer({"spam": "eggs"},
                                         custom_replacer_function).filter("@@@spam@@@"))
 
+    def test_should_replace_all_occurrences_of_a_token(self):
+        self.assertEquals("spam and spam and spam", TokenReplacer({"SPAM": "spam"}).filter("@@@SPAM@@@ and @@@SPAM@@@ and @@@SPAM@@@"))
+
+    def test_should_call_replacer_function_once_for_each_distinct_token(self):
+        mock_replacer_function = Mock()
+        mock_replacer_function.__name__ = 'mock_replacer_function'
+        mock_replacer_function.return_value = 'eggs'
+
+        TokenReplacer({"SPAM": "spam"}, mock_replacer_function).filter("@@@SPAM@@@ @@@SPAM@@@")
+
+        mock_replacer_function.assert_called_once_with("SPAM", "spam")
+
+    def test_should_not_replace_tokens_which_appear_in_replacement(self):
+        def custom_replacer_function(token, value):
+            return "@@@%s@@@" % value
+        self.assertEquals("@@@eggs@@@", TokenReplacer({"spam": "eggs"}, custom_replacer_function).filter("@@@spam@@@"))
+
+    def test_should_track_used_tokens(self):
+        token_replacer = TokenReplacer({"SPAM": "spam", "EGGS": "eggs", "HAM": "ham"})
+
+        token_replacer.filter("@@@SPAM@@@ @@@EGGS@@@ @@@SPAM@@@")
+
+        self.assertEqual(set(["SPAM", "EGGS"]), token_replacer.token_used)
+
+    def test_should_raise_exception_with_name_of_missing_token(self):
+        token_replacer = TokenReplacer({"SPAM": "spam"})
+
+        try:
+            token_replacer.filter("@@@SPAM@@@ @@@NOT_FOUND@@@")
+            self.fail("MissingTokenException expected")
+        except MissingTokenException as exception:
+            self.assertEqual("NOT_FOUND", exception.token)
+
+        self.assertEqual(set(["SPAM"]), token_replacer.token_used)
+
     def test_should_replace_token_in_token(self):
         self.assertEquals("foo", TokenReplacer({"FOO": "foo", "BAR": "@@@FOO@@@"}).filter("@@@BAR@@@"))
 
     def test_should_replace_multiple_token_in_token(self):
         self.assertEquals("fooIGNOREfoo", TokenReplacer({"FOO": "foo", "BAR": "@@@FOO@@@", "BAT": "@@@FOO@@@IGNORE@@@BAR@@@"}).filter("@@@BAT@@@"))
 
+    def test_should_replace_tokens_in_deeply_chained_tokens(self):
+        token_values = {"TOKEN_0": "spam"}
+        for number in range(1, 5000):
+            token_values["TOKEN_%d" % number] = "@@@TOKEN_%d@@@" % (number - 1)
+
+        self.assertEquals("spam", TokenReplacer(token_values).filter("@@@TOKEN_4999@@@"))
+
+    def test_should_raise_exception_when_token_in_token_is_missing(self):
+        self.assertRaises(MissingOrRedundantTokenException, TokenReplacer, {"FOO": "foo", "BAR": "@@@FOO@@@@@@NOT_FOUND@@@"})
+
+    def test_should_raise_exception_when_token_references_itself(self):
+        self.assertRaises(MissingOrRedundantTokenException, TokenReplacer, {"FOO": "@@@FOO@@@"})
+
     def test_should_determine_token_recursion(self):
         self.assertRaises(ContainsCyclesException, TokenReplacer, {"FOO": "@@@BAR@@@", "BAR": "@@@FOO@@@"})
         self.assertRaises(ContainsCyclesException, TokenReplacer, {"FOO": "@@@BAR@@@", "BAR": "@@@BLO@@@", "BLO": "@@@FOO@@@"})
 
+    @patch('config_rpm_maker.token.tokenreplacer.read_token_values')
+    def test_should_add_and_resolve_only_variables_which_are_not_known_yet(self, mock_read_token_values):
+        token_replacer = TokenReplacer({"FOO": "foo", "BAR": "@@@FOO@@@"})
+        mock_read_token_values.return_value = {"FOO": "changed", "BAR": "changed", "BAT": "@@@BAR@@@ @@@BAZ@@@", "BAZ": "baz\n"}
+
+        token_replacer.add_token_values_from_directory("variables")
+
+        mock_read_token_values.assert_called_with("variables")
+        self.assertEquals({"FOO": "foo", "BAR": "foo", "BAT": "foo baz", "BAZ": "baz"}, token_replacer.token_values)
+
+    @patch('config_rpm_maker.token.tokenreplacer.read_token_values')
+    def test_should_raise_exception_when_added_variable_references_missing_token(self, mock_read_token_values):
+        token_replacer = TokenReplacer({"FOO": "foo"})
+        mock_read_token_values.return_value = {"BAR": "@@@FOO@@@@@@NOT_FOUND@@@"}
+
+        self.assertRaises(MissingOrRedundantTokenException, token_replacer.add_token_values_from_directory, "variables")
+
     @patch('config_rpm_maker.token.tokenreplacer.get_max_file_size')
     @patch('config_rpm_maker.token.tokenreplacer.getsize')
     def test_should_not_filter_file_with_encoding_unknown_8bit(self, mock_get_size, mock_config):
@@ -78,13 +146,43 @@ class TokenReplacerTest(unittest.TestCase):
         mock_config.return_value = 20
 
         mock_token_replacer = Mock(TokenReplacer)
-        mock_token_replacer._read_content_from_file.return_value = 'fake binary file content'
+        mock_token_replacer._read_content_from_file.return_value = 'fake binary file content @@@TOKEN@@@'
         mock_token_replacer._get_file_encoding.return_value = 'unknown-8bit'
 
         TokenReplacer.filter_file(mock_token_replacer, "binary.file")
 
         self.assertEqual(0, mock_token_replacer._perform_filtering_on_file.call_count)
 
+    @patch('config_rpm_maker.token.tokenreplacer.get_max_file_size')
+    @patch('config_rpm_maker.token.tokenreplacer.getsize')
+    def test_should_not_detect_encoding_of_file_without_tokens(self, mock_get_size, mock_config):
+
+        mock_get_size.return_value = 10
+        mock_config.return_value = 20
+
+        mock_token_replacer = Mock(TokenReplacer)
+        mock_token_replacer._read_content_from_file.return_value = 'file content without tokens'
+
+        TokenReplacer.filter_file(mock_token_replacer, "file")
+
+        self.assertEqual(0, mock_token_replacer._get_file_encoding.call_count)
+        self.assertEqual(0, mock_token_replacer._perform_filtering_on_file.call_count)
+
+    @patch('config_rpm_maker.token.tokenreplacer.get_max_file_size')
+    @patch('config_rpm_maker.token.tokenreplacer.getsize')
+    def test_should_html_escape_file_without_tokens(self, mock_get_size, mock_config):
+
+        mock_get_size.return_value = 10
+        mock_config.return_value = 20
+
+        mock_token_replacer = Mock(TokenReplacer)
+        mock_token_replacer._read_content_from_file.return_value = 'file content without tokens'
+        mock_token_replacer._get_file_encoding.return_value = 'us-ascii'
+
+        TokenReplacer.filter_file(mock_token_replacer, "file", html_escape=True)
+
+        mock_token_replacer._perform_filtering_on_file.assert_called_with("file", 'file content without tokens', 'us-ascii', True)
+
     @patch('config_rpm_maker.token.tokenreplacer.get_max_file_size')
     @patch('config_rpm_maker.token.tokenreplacer.getsize')
     def test_raise_exeception_when_file_limit_exceeded(self, mock_get_size, mock_config):
@@ -95,3 +193,29 @@ class TokenReplacerTest(unittest.TestCase):
         mock_token_replacer = Mock(TokenReplacer)
 
         self.assertRaises(CannotFilterFileException, TokenReplacer.filter_file, mock_token_replacer, "binary.file")
+
+    @patch('config_rpm_maker.token.tokenreplacer.TEMPLATE_CACHE')
+    @patch('config_rpm_maker.token.tokenreplacer.shutil')
+    @patch('config_rpm_maker.token.tokenreplacer.get_max_file_size')
+    @patch('config_rpm_maker.token.tokenreplacer.getsize')
+    def test_should_hash_content_only_once_for_rpm_source_and_config_viewer_copy(self, mock_get_size, mock_config,
+                                                                                 mock_shutil, mock_template_cache):
+
+        mock_get_size.return_value = 10
+        mock_config.return_value = 20
+        mock_template_cache.create_key.return_value = (str, 'digest')
+
+        mock_token_replacer = Mock(TokenReplacer)
+        mock_token_replacer._read_content_from_file.return_value = 'content @@@TOKEN@@@'
+        mock_token_replacer._get_file_encoding.return_value = 'us-ascii'
+        mock_config_viewer_token_replacer = Mock(TokenReplacer)
+        mock_config_viewer_token_replacer.html_escape_function = Mock(return_value=u'escaped content @@@TOKEN@@@')
+
+        TokenReplacer.filter_file_with_config_viewer_copy(mock_token_replacer, 'etc/motd', 'config-viewer/etc/motd',
+                                                          mock_config_viewer_token_replacer)
+
+        mock_template_cache.create_key.assert_called_once_with('content @@@TOKEN@@@')
+        mock_token_replacer.filter.assert_called_with(u'content @@@TOKEN@@@', ('us-ascii', (str, 'digest')))
+        mock_config_viewer_token_replacer.filter.assert_called_with(
+            u'escaped content @@@TOKEN@@@',
+            (mock_config_viewer_token_replacer.html_escape_function, 'motd', 'us-ascii', (str, 'digest')))
@@ -0,0 +1,83 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from config_rpm_maker.utilities.chrometrace import create_trace_events, write_chrome_trace
+from config_rpm_maker.utilities.profiler import Measurement
+
+
+class CreateTraceEventsTests(TestCase):
+
+    def setUp(self):
+        self.measurements = [Measurement('HostRpmBuilder.build', 100.5, 2.0, 0.5, 'Thread-1', 'devweb01', 0),
+                             Measurement('ConfigRpmMaker._prepare_work_dir', 100.0, 0.25, 0.1, 'MainThread'),
+                             Measurement('SvnService.export', 101.0, 0.5, 0.1, 'Thread-1', 'devweb01', 1,
+                                         'host/devweb01, /tmp/devweb01')]
+
+    def test_should_return_no_events_without_measurements(self):
+
+        self.assertEqual([], create_trace_events([], process_id=1))
+
+    def test_should_create_complete_events_relative_to_first_measurement(self):
+
+        events = [event for event in create_trace_events(self.measurements, process_id=1) if event['ph'] == 'X']
+
+        self.assertEqual(['ConfigRpmMaker._prepare_work_dir', 'HostRpmBuilder.build', 'SvnService.export'],
+                         [event['name'] for event in events])
+        self.assertEqual([0, 500000, 1000000], [event['ts'] for event in events])
+        self.assertEqual([250000, 2000000, 500000], [event['dur'] for event in events])
+
+    def test_should_create_one_track_per_thread(self):
+
+        events = create_trace_events(self.measurements, process_id=1)
+
+        thread_names = dict((event['tid'], event['args']['name']) for event in events if event['name'] == 'thread_name')
+        self.assertEqual({1: 'MainThread', 2: 'Thread-1'}, thread_names)
+        self.assertEqual([1, 2, 2], [event['tid'] for event in events if event['ph'] == 'X'])
+
+    def test_should_add_host_and_arguments_to_events(self):
+
+        export_event = create_trace_events(self.measurements, process_id=1)[2]
+
+        self.assertEqual({'cpu_time': 0.1, 'host': 'devweb01', 'arguments': 'host/devweb01, /tmp/devweb01'},
+                         export_event['args'])
+
+
+class WriteChromeTraceTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def test_should_write_trace_events_and_create_directory(self):
+
+        path = join(self.temporary_directory, 'traces', 'trace-1980.json')
+
+        write_chrome_trace(path, [Measurement('HostRpmBuilder.build', 100.0, 2.0, 0.5, 'Thread-1', 'devweb01')])
+
+        with open(path) as trace_file:
+            trace = json.load(trace_file)
+        self.assertEqual('ms', trace['displayTimeUnit'])
+        self.assertEqual('HostRpmBuilder.build', trace['traceEvents'][0]['name'])
@@ -0,0 +1,141 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import marshal
+
+from os.path import join
+from pstats import Stats
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Thread
+from unittest import TestCase
+
+from config_rpm_maker.utilities.codeprofiler import (CodeProfiler,
+                                                     StackSampler,
+                                                     create_collapsed_stacks,
+                                                     create_stats_from_samples)
+
+MAIN = ('config_rpm_maker/__init__.py', 10, 'main')
+BUILD = ('config_rpm_maker/hostrpmbuilder.py', 20, 'build')
+EXPORT = ('config_rpm_maker/svnservice.py', 30, 'export')
+
+
+def spin():
+    return sum(index * index for index in range(10000))
+
+
+class CreateCollapsedStacksTests(TestCase):
+
+    def test_should_join_frames_from_root_to_leaf(self):
+
+        lines = create_collapsed_stacks({(MAIN, BUILD): 3, (MAIN, BUILD, EXPORT): 2})
+
+        self.assertEqual(['main (config_rpm_maker/__init__.py:10);build (config_rpm_maker/hostrpmbuilder.py:20) 3',
+                          'main (config_rpm_maker/__init__.py:10);build (config_rpm_maker/hostrpmbuilder.py:20);'
+                          'export (config_rpm_maker/svnservice.py:30) 2'], lines)
+
+
+class CreateStatsFromSamplesTests(TestCase):
+
+    def test_should_count_own_time_of_leaf_and_cumulative_time_of_stack(self):
+
+        stats = create_stats_from_samples({(MAIN, BUILD): 3, (MAIN, BUILD, EXPORT): 2}, 0.5)
+
+        self.assertEqual((5, 5, 0.0, 2.5), stats[MAIN][:4])
+        self.assertEqual((5, 5, 1.5, 2.5), stats[BUILD][:4])
+        self.assertEqual((2, 2, 1.0, 1.0), stats[EXPORT][:4])
+        self.assertEqual({BUILD: (2, 2, 1.0, 1.0)}, stats[EXPORT][4])
+
+    def test_should_count_recursive_functions_once_per_sample(self):
+
+        stats = create_stats_from_samples({(MAIN, BUILD, BUILD): 4}, 1.0)
+
+        self.assertEqual((4, 4, 4.0, 4.0), stats[BUILD][:4])
+
+
+class StackSamplerTests(TestCase):
+
+    def test_should_sample_stacks_of_other_threads(self):
+
+        sampler = StackSampler(interval=0.01)
+
+        sampler.sample()
+
+        self.assertEqual(1, sampler.sample_count)
+        sampled_functions = set(function[2] for stack in sampler.stack_counts for function in stack)
+        self.assertTrue('test_should_sample_stacks_of_other_threads' in sampled_functions)
+
+
+class CodeProfilerTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp()
+        self.code_profiler = CodeProfiler()
+
+    def tearDown(self):
+        self.code_profiler.stop()
+        rmtree(self.temporary_directory)
+
+    def test_should_call_function_without_profiling_when_off(self):
+
+        self.code_profiler.start('off', 0.01)
+
+        self.assertEqual(spin(), self.code_profiler.profile(spin))
+        self.assertEqual(None, self.code_profiler.get_merged_stats())
+
+    def test_should_merge_profiles_of_all_threads(self):
+
+        self.code_profiler.start('cprofile', 0.01)
+        threads = [Thread(target=self.code_profiler.profile, args=(spin,)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.code_profiler.profile(spin)
+        self.code_profiler.stop()
+
+        stats = self.code_profiler.get_merged_stats()
+
+        spin_calls = [values[1] for function, values in stats.stats.items() if function[2] == 'spin']
+        self.assertEqual([4], spin_calls)
+
+    def test_should_write_pstats_and_collapsed_stacks(self):
+
+        self.code_profiler.start('cprofile', 0.001)
+        self.code_profiler.profile(spin)
+        self.code_profiler.stop()
+
+        pstats_path, collapsed_stacks_path = self.code_profiler.write(join(self.temporary_directory, 'errors'),
+                                                                      'profile-1980')
+
+        self.assertEqual(join(self.temporary_directory, 'errors', 'profile-1980.pstats'), pstats_path)
+        self.assertTrue([function for function in Stats(pstats_path).stats if function[2] == 'spin'])
+        self.assertEqual(join(self.temporary_directory, 'errors', 'profile-1980.collapsed'), collapsed_stacks_path)
+
+    def test_should_write_pstats_derived_from_samples_in_sampling_mode(self):
+
+        self.code_profiler.start('sampling', 0.01)
+        self.code_profiler.stop()
+        self.code_profiler._sampler.stack_counts = {(MAIN, BUILD): 3}
+
+        pstats_path, collapsed_stacks_path = self.code_profiler.write(self.temporary_directory, 'profile-1980')
+
+        with open(pstats_path, 'rb') as pstats_file:
+            self.assertEqual((3, 3, 0.03, 0.03), marshal.load(pstats_file)[BUILD][:4])
+        self.assertEqual(3, Stats(pstats_path).stats[BUILD][1])
+        with open(collapsed_stacks_path) as collapsed_stacks_file:
+            self.assertTrue(collapsed_stacks_file.read().endswith(' 3\n'))
@@ -0,0 +1,208 @@
+# coding=utf-8
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import errno
+import os
+
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from config_rpm_maker.utilities.filecopy import (FileCopier,
+                                                 FileCopyStatistics,
+                                                 STRATEGY_COPY,
+                                                 STRATEGY_COPY_FILE_RANGE,
+                                                 STRATEGY_HARDLINK,
+                                                 STRATEGY_REFLINK,
+                                                 create_file_copier)
+
+
+class FileCopierTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='filecopy_test.')
+        self.source = os.path.join(self.temporary_directory, 'source')
+        self.target = os.path.join(self.temporary_directory, 'target')
+        with open(self.source, 'w') as source_file:
+            source_file.write('spam and eggs')
+
+        self.statistics = FileCopyStatistics()
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def _read_target(self):
+        with open(self.target) as target_file:
+            return target_file.read()
+
+    def test_should_hardlink_immutable_files(self):
+
+        file_copier = FileCopier(statistics=self.statistics)
+
+        strategy = file_copier.copy(self.source, self.target, immutable=True)
+
+        self.assertEqual(STRATEGY_HARDLINK, strategy)
+        self.assertTrue(os.path.samefile(self.source, self.target))
+
+    def test_should_not_hardlink_files_which_might_be_rewritten(self):
+
+        file_copier = FileCopier(statistics=self.statistics)
+
+        strategy = file_copier.copy(self.source, self.target)
+
+        self.assertNotEqual(STRATEGY_HARDLINK, strategy)
+        self.assertFalse(os.path.samefile(self.source, self.target))
+        self.assertEqual('spam and eggs', self._read_target())
+
+    def test_should_copy_plainly_when_hardlinks_and_clones_are_not_allowed(self):
+
+        file_copier = FileCopier(allow_hardlinks=False, allow_clones=False, statistics=self.statistics)
+
+        strategy = file_copier.copy(self.source, self.target, immutable=True)
+
+        self.assertEqual(STRATEGY_COPY, strategy)
+        self.assertEqual('spam and eggs', self._read_target())
+
+    def test_should_fall_back_and_give_up_strategy_when_it_is_not_supported(self):
+
+        file_copier = FileCopier(statistics=self.statistics)
+        file_copier._reflink = Mock(side_effect=IOError(errno.EOPNOTSUPP, 'Operation not supported'))
+        file_copier._copy_file_range = Mock(side_effect=OSError(errno.EXDEV, 'Invalid cross-device link'))
+
+        strategy = file_copier.copy(self.source, self.target)
+        os.remove(self.target)
+        file_copier.copy(self.source, self.target)
+
+        self.assertEqual(STRATEGY_COPY, strategy)
+        self.assertEqual('spam and eggs', self._read_target())
+        self.assertEqual(1, file_copier._reflink.call_count)
+        self.assertEqual(1, file_copier._copy_file_range.call_count)
+
+    def test_should_remove_partially_written_target_before_falling_back(self):
+
+        def write_partially_and_fail(source, target):
+            with open(target, 'w') as target_file:
+                target_file.write('spam')
+            raise IOError(errno.EOPNOTSUPP, 'Operation not supported')
+
+        file_copier = FileCopier(statistics=self.statistics)
+        file_copier._reflink = Mock(side_effect=write_partially_and_fail)
+        file_copier._copy_file_range = Mock(side_effect=write_partially_and_fail)
+
+        strategy = file_copier.copy(self.source, self.target)
+
+        self.assertEqual(STRATEGY_COPY, strategy)
+        self.assertEqual('spam and eggs', self._read_target())
+
+    def test_should_raise_error_which_does_not_mean_that_strategy_is_unsupported(self):
+
+        def write_partially_and_fail(source, target):
+            with open(target, 'w') as target_file:
+                target_file.write('spam')
+            raise IOError(errno.ENOSPC, 'No space left on device')
+
+        file_copier = FileCopier(statistics=self.statistics)
+        file_copier._reflink = Mock(side_effect=write_partially_and_fail)
+
+        self.assertRaises(IOError, file_copier.copy, self.source, self.target)
+
+        self.assertFalse(os.path.exists(self.target))
+        self.assertTrue(file_copier._supported_strategies[STRATEGY_REFLINK])
+
+    def test_should_record_strategy_and_size_in_statistics(self):
+
+        file_copier = FileCopier(statistics=self.statistics)
+
+        file_copier.copy(self.source, self.target, immutable=True)
+
+        self.assertEqual(1, self.statistics.files[STRATEGY_HARDLINK])
+        self.assertEqual(13, self.statistics.bytes[STRATEGY_HARDLINK])
+        self.assertEqual(13, self.statistics.get_saved_bytes())
+
+    def test_should_copy_content_using_copy_file_range_if_available(self):
+
+        file_copier = FileCopier(statistics=self.statistics)
+        file_copier._reflink = Mock(side_effect=IOError(errno.EOPNOTSUPP, 'Operation not supported'))
+
+        strategy = file_copier.copy(self.source, self.target)
+
+        self.assertTrue(strategy in (STRATEGY_COPY_FILE_RANGE, STRATEGY_COPY))
+        self.assertEqual('spam and eggs', self._read_target())
+
+
+class FileCopyStatisticsTests(TestCase):
+
+    def test_should_count_only_hardlinked_and_reflinked_bytes_as_saved(self):
+
+        statistics = FileCopyStatistics()
+
+        statistics.record(STRATEGY_HARDLINK, 10)
+        statistics.record(STRATEGY_REFLINK, 20)
+        statistics.record(STRATEGY_COPY_FILE_RANGE, 40)
+        statistics.record(STRATEGY_COPY, 80)
+
+        self.assertEqual(30, statistics.get_saved_bytes())
+
+    def test_should_log_summary(self):
+
+        statistics = FileCopyStatistics()
+        statistics.record(STRATEGY_HARDLINK, 10)
+        mock_logging_function = Mock()
+
+        statistics.log_summary(mock_logging_function)
+
+        mock_logging_function.assert_called_with('File copies: %s, %d bytes saved',
+                                                 'hardlink 1 file(s) with 10 bytes, reflink 0 file(s) with 0 bytes, '
+                                                 'copy_file_range 0 file(s) with 0 bytes, copy 0 file(s) with 0 bytes',
+                                                 10)
+
+    def test_should_take_counters_and_add_them_to_other_statistics(self):
+
+        statistics = FileCopyStatistics()
+        statistics.record(STRATEGY_REFLINK, 10)
+        other_statistics = FileCopyStatistics()
+
+        other_statistics.add_counters(statistics.take_counters())
+
+        self.assertEqual(0, statistics.files[STRATEGY_REFLINK])
+        self.assertEqual(1, other_statistics.files[STRATEGY_REFLINK])
+        self.assertEqual(10, other_statistics.get_saved_bytes())
+
+
+class CreateFileCopierTests(TestCase):
+
+    @patch('config_rpm_maker.utilities.filecopy.get_file_copy_strategy')
+    def test_should_only_copy_plainly_when_copy_strategy_is_configured(self, mock_get_file_copy_strategy):
+
+        mock_get_file_copy_strategy.return_value = 'copy'
+
+        file_copier = create_file_copier()
+
+        self.assertEqual({STRATEGY_HARDLINK: False, STRATEGY_REFLINK: False, STRATEGY_COPY_FILE_RANGE: False},
+                         file_copier._supported_strategies)
+
+    @patch('config_rpm_maker.utilities.filecopy.get_file_copy_strategy')
+    def test_should_not_allow_hardlinks_if_requested(self, mock_get_file_copy_strategy):
+
+        mock_get_file_copy_strategy.return_value = 'auto'
+
+        file_copier = create_file_copier(allow_hardlinks=False)
+
+        self.assertFalse(file_copier._supported_strategies[STRATEGY_HARDLINK])
+        self.assertTrue(file_copier._supported_strategies[STRATEGY_REFLINK])
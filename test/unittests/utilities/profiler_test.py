@@ -16,10 +16,21 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
+import os
+import pickle
+
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Thread
 from unittest import TestCase
-from mock import patch
+from mock import Mock, patch
 
-from config_rpm_maker.utilities.profiler import measure_execution_time
+from config_rpm_maker.utilities.profiler import (ExecutionTimeProfiler,
+                                                 ExecutionTimeStatistics,
+                                                 Measurement,
+                                                 measure_execution_time,
+                                                 percentile)
 
 
 class ProfilerTests(TestCase):
@@ -36,3 +47,201 @@ class ProfilerTests(TestCase):
         actual_function()
 
         self.assertTrue(self.dummy_function_has_been_executed)
+
+    @patch('config_rpm_maker.utilities.profiler.EXECUTION_TIME_PROFILER')
+    def test_should_record_measurement_with_host_of_instance(self, mock_profiler):
+
+        class HostRpmBuilder(object):
+            hostname = 'devweb01'
+
+            @measure_execution_time
+            def build(self):
+                return 'spam.rpm'
+
+        self.assertEqual('spam.rpm', HostRpmBuilder().build())
+
+        measurement = mock_profiler.record.call_args[0][0]
+        self.assertEqual('HostRpmBuilder.build', measurement.function_name)
+        self.assertEqual('devweb01', measurement.host)
+        self.assertEqual(0, measurement.depth)
+
+    @patch('config_rpm_maker.utilities.profiler.EXECUTION_TIME_PROFILER')
+    def test_should_attribute_nested_calls_to_host_of_outer_call(self, mock_profiler):
+
+        @measure_execution_time
+        def export():
+            pass
+
+        class HostRpmBuilder(object):
+            hostname = 'devweb01'
+
+            @measure_execution_time
+            def build(self):
+                export()
+
+        HostRpmBuilder().build()
+
+        nested_measurement = mock_profiler.record.call_args_list[0][0][0]
+        self.assertEqual('export', nested_measurement.function_name)
+        self.assertEqual('devweb01', nested_measurement.host)
+        self.assertEqual(1, nested_measurement.depth)
+
+    @patch('config_rpm_maker.utilities.profiler.EXECUTION_TIME_PROFILER')
+    def test_should_record_measurement_when_function_raised_exception(self, mock_profiler):
+
+        @measure_execution_time
+        def fail():
+            raise ValueError('spam')
+
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(1, mock_profiler.record.call_count)
+
+    @patch('config_rpm_maker.utilities.profiler.EXECUTION_TIME_PROFILER')
+    def test_should_record_truncated_arguments_when_enabled(self, mock_profiler):
+
+        mock_profiler.record_arguments = True
+
+        class SvnService(object):
+
+            @measure_execution_time
+            def export(self, svn_path, target_dir):
+                pass
+
+        SvnService().export('host/devweb01', 'x' * 500)
+
+        measurement = mock_profiler.record.call_args[0][0]
+        self.assertTrue(measurement.arguments.startswith('host/devweb01, xxx'))
+        self.assertEqual(200, len(measurement.arguments))
+
+    @patch('config_rpm_maker.utilities.profiler.EXECUTION_TIME_PROFILER')
+    def test_should_not_record_arguments_by_default(self, mock_profiler):
+
+        mock_profiler.record_arguments = False
+
+        @measure_execution_time
+        def export(svn_path):
+            pass
+
+        export('host/devweb01')
+
+        self.assertEqual(None, mock_profiler.record.call_args[0][0].arguments)
+
+
+class PercentileTests(TestCase):
+
+    def test_should_return_nearest_rank(self):
+
+        values = [float(value) for value in range(1, 101)]
+
+        self.assertEqual(50.0, percentile(values, 50))
+        self.assertEqual(95.0, percentile(values, 95))
+        self.assertEqual(99.0, percentile(values, 99))
+        self.assertEqual(1.0, percentile(values, 0))
+
+    def test_should_return_zero_without_values(self):
+
+        self.assertEqual(0.0, percentile([], 50))
+
+
+class ExecutionTimeProfilerTests(TestCase):
+
+    def setUp(self):
+        self.profiler = ExecutionTimeProfiler()
+        self.profiler.record(Measurement('HostRpmBuilder.build', 0.0, 3.0, 1.0, 'Thread-0', 'devweb01', 0))
+        self.profiler.record(Measurement('SvnService.export', 0.0, 2.0, 0.5, 'Thread-0', 'devweb01', 1))
+        self.profiler.record(Measurement('HostRpmBuilder.build', 0.0, 1.0, 0.5, 'Thread-1', 'tuvweb01', 0))
+        self.profiler.record(Measurement('ConfigRpmMaker._upload_rpms', 0.0, 4.0, 0.1, 'MainThread', None, 0))
+
+    def test_should_summarize_by_function(self):
+
+        summary = self.profiler.summarize_by_function()
+
+        self.assertEqual(2, summary['HostRpmBuilder.build'].count)
+        self.assertEqual(4.0, summary['HostRpmBuilder.build'].wall_time)
+        self.assertEqual(1.5, summary['HostRpmBuilder.build'].cpu_time)
+        self.assertEqual(3.0, summary['HostRpmBuilder.build'].max)
+
+    def test_should_summarize_top_level_calls_by_thread(self):
+
+        summary = self.profiler.summarize_by_thread()
+
+        self.assertEqual(3.0, summary['Thread-0'].wall_time)
+        self.assertEqual(4.0, summary['MainThread'].wall_time)
+
+    def test_should_summarize_top_level_calls_by_host(self):
+
+        summary = self.profiler.summarize_by_host()
+
+        self.assertEqual(['devweb01', 'tuvweb01'], sorted(summary.keys()))
+        self.assertEqual(3.0, summary['devweb01'].wall_time)
+
+    def test_should_record_measurements_of_many_threads(self):
+
+        profiler = ExecutionTimeProfiler()
+
+        def record_measurements():
+            for _ in range(1000):
+                profiler.record(Measurement('spam', 0.0, 1.0, 1.0, 'thread'))
+
+        threads = [Thread(target=record_measurements) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(4000, len(profiler.get_measurements()))
+
+    def test_should_take_and_reset_measurements(self):
+
+        measurements = self.profiler.take_measurements()
+
+        self.assertEqual(4, len(measurements))
+        self.assertEqual([], self.profiler.get_measurements())
+
+    def test_should_add_measurements_of_build_process(self):
+
+        measurements = pickle.loads(pickle.dumps(self.profiler.take_measurements()))
+
+        profiler = ExecutionTimeProfiler()
+        profiler.add_measurements(measurements)
+
+        self.assertEqual(3.0, profiler.summarize_by_host()['devweb01'].wall_time)
+
+    def test_should_write_statistics_as_json(self):
+
+        temporary_directory = mkdtemp(prefix='profiler_test.')
+        try:
+            path = os.path.join(temporary_directory, 'runs', 'execution-times.json')
+
+            self.profiler.write_json(path)
+
+            with open(path) as json_file:
+                statistics = json.load(json_file)
+        finally:
+            rmtree(temporary_directory)
+
+        self.assertEqual(['functions', 'hosts', 'threads'], sorted(statistics.keys()))
+        self.assertEqual(3.0, statistics['hosts']['devweb01']['wall_time'])
+        self.assertEqual(2, statistics['functions']['HostRpmBuilder.build']['count'])
+
+    @patch('config_rpm_maker.utilities.profiler.get_thread_count')
+    def test_should_log_slowest_hosts_first(self, mock_get_thread_count):
+
+        mock_logging_function = Mock()
+
+        self.profiler.log_summary(mock_logging_function)
+
+        host_lines = [call_args[0] for call_args in mock_logging_function.call_args_list
+                      if call_args[0][0] == '    sum %7.2fs (cpu %7.2fs) : %s' and call_args[0][3] in ('devweb01', 'tuvweb01')]
+        self.assertEqual(['devweb01', 'tuvweb01'], [host_line[3] for host_line in host_lines])
+
+
+class ExecutionTimeStatisticsTests(TestCase):
+
+    def test_should_calculate_average(self):
+
+        statistics = ExecutionTimeStatistics([Measurement('spam', 0.0, 1.0, 0.0, 'thread'),
+                                              Measurement('spam', 0.0, 3.0, 0.0, 'thread')])
+
+        self.assertEqual(2.0, statistics.average)
+        self.assertEqual(1.0, statistics.p50)